@@ -0,0 +1,371 @@
+"""
+Password hashing executor
+
+bcrypt at cost 12 is ~250 ms of pure CPU. Run inline on a sync worker, a
+burst of logins blocks every other request on that worker, so the customer
+auth endpoints hand bcrypt to a small process pool instead:
+
+- Bounded: at most ``max_pending`` hash/verify jobs are queued or running per
+  API process. Beyond that ``PasswordPoolBusy`` is raised and the endpoint
+  answers 503 + Retry-After instead of queueing without limit. A job that
+  does not finish within ``timeout`` seconds raises it as well.
+- Deferred rehash: ``rehash_later`` runs the SHA256 -> bcrypt migration (and
+  cost upgrades after BCRYPT_ROUNDS changes) on a background thread after the
+  response. It is dropped when the pool is busy; the next login retries.
+- Verify cache: successful bcrypt verifications are remembered for a short
+  TTL, keyed by an HMAC (random per-process key) of hash + password, so
+  client retries and multi-device logins do not pay bcrypt again. Failures
+  are never cached.
+
+With ``workers=0`` (the default under pytest) everything runs inline on the
+calling thread, including the rehash.
+
+Environment:
+    PASSWORD_POOL_WORKERS          worker processes (default min(2, cpu count); 0 = inline)
+    PASSWORD_POOL_MAX_PENDING      queued + running jobs before shedding (default 4 per worker)
+    PASSWORD_POOL_TIMEOUT_SECONDS  max wait for one job (default 5)
+    PASSWORD_POOL_START_METHOD     multiprocessing start method (default forkserver)
+    PASSWORD_VERIFY_CACHE_SECONDS  verify cache TTL (default 60; 0 disables)
+
+Cost calibration (run on the production instance type, then set BCRYPT_ROUNDS):
+    python backend/calibrate_bcrypt.py --target-ms 250
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import bcrypt
+
+from . import passwords
+
+log = logging.getLogger("api")
+
+_CACHE_MAX_ENTRIES = 1024
+
+
+class PasswordPoolBusy(RuntimeError):
+    """The pool is saturated or a job timed out; callers should answer 503."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PasswordPool:
+    """Bounded bcrypt executor with a short-lived verify cache."""
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: Optional[int] = None,
+        timeout: float = 5.0,
+        verify_cache_seconds: float = 60.0,
+        start_method: Optional[str] = "forkserver",
+    ):
+        self.workers = max(0, int(workers))
+        if max_pending is None:
+            max_pending = 4 * max(1, self.workers)
+        self.max_pending = max(0, int(max_pending))
+        self.timeout = timeout
+        self.verify_cache_seconds = verify_cache_seconds
+        self.pid = os.getpid()
+        self._start_method = start_method
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._rehash_executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._rehash_pending = 0
+        self._cache: OrderedDict[bytes, float] = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._counts = {
+            "rejected": 0,
+            "timeouts": 0,
+            "cache_hits": 0,
+            "rehash_scheduled": 0,
+            "rehash_dropped": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def hash(self, plain: str) -> str:
+        """bcrypt-hash plain at the configured cost."""
+        return self._run(passwords.hash_password, plain, passwords.bcrypt_rounds())
+
+    def verify(self, plain: str, hashed: str, salt: Optional[str] = "") -> Tuple[bool, bool]:
+        """
+        Verify plain against a stored hash.
+
+        Returns:
+            Tuple[bool, bool]: (is_valid, needs_rehash). needs_rehash is True
+            for legacy SHA256 hashes and for bcrypt hashes whose cost differs
+            from bcrypt_rounds().
+        """
+        hashed = hashed or ""
+        if not passwords.is_bcrypt_hash(hashed):
+            # Legacy salted SHA256: microseconds, no reason to leave the thread
+            return passwords.verify_password_with_salt(plain, hashed, salt or "")
+        key = self._cache_key_for(plain, hashed)
+        if not self._cache_hit(key):
+            ok, _ = self._run(passwords.verify_password_with_salt, plain, hashed, salt or "")
+            if not ok:
+                return False, False
+            self._remember(key)
+        return True, passwords.bcrypt_cost(hashed) != passwords.bcrypt_rounds()
+
+    def rehash_later(self, plain: str, on_done: Callable[[str], None]) -> bool:
+        """
+        Hash plain off the request path and pass the result to on_done.
+
+        Returns False when the rehash was dropped because too many are queued.
+        Errors (including PasswordPoolBusy) are logged and swallowed.
+        """
+        with self._lock:
+            if self._rehash_pending >= max(1, self.max_pending):
+                self._counts["rehash_dropped"] += 1
+                return False
+            self._rehash_pending += 1
+            self._counts["rehash_scheduled"] += 1
+            if self.workers and self._rehash_executor is None:
+                self._rehash_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="password-rehash"
+                )
+            executor = self._rehash_executor
+
+        def _task() -> None:
+            try:
+                on_done(self.hash(plain))
+            except Exception as e:  # pragma: no cover - logged only
+                log.warning("password rehash failed: %s", e)
+            finally:
+                with self._lock:
+                    self._rehash_pending -= 1
+
+        if executor is None:
+            _task()
+        else:
+            executor.submit(_task)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "rehash_pending": self._rehash_pending,
+                "cache_entries": len(self._cache),
+                **self._counts,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            rehash, self._rehash_executor = self._rehash_executor, None
+        if rehash is not None:
+            rehash.shutdown(wait=True)
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _retry_after(self) -> int:
+        return max(1, int(self.timeout))
+
+    def _executor_locked(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            ctx = None
+            if self._start_method:
+                try:
+                    ctx = multiprocessing.get_context(self._start_method)
+                except ValueError:  # pragma: no cover - start method unsupported on platform
+                    ctx = None
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        return self._executor
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counts["rejected"] += 1
+                raise PasswordPoolBusy("password hashing queue full", self._retry_after())
+            self._pending += 1
+            executor = self._executor_locked() if self.workers else None
+        if executor is None:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception as e:
+            # BrokenProcessPool (a worker was killed): rebuild on next call
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            self._release()
+            raise PasswordPoolBusy(f"password hashing unavailable: {e}", 1) from e
+        # The slot is held until the worker finishes, even if we stop waiting
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeout as e:
+            future.cancel()
+            with self._lock:
+                self._counts["timeouts"] += 1
+            raise PasswordPoolBusy("password hashing timed out", self._retry_after()) from e
+
+    def _cache_key_for(self, plain: str, hashed: str) -> Optional[bytes]:
+        if self.verify_cache_seconds <= 0:
+            return None
+        msg = hashed.encode("utf-8") + b"\0" + plain.encode("utf-8")
+        return hmac.new(self._cache_key, msg, hashlib.sha256).digest()
+
+    def _cache_hit(self, key: Optional[bytes]) -> bool:
+        if key is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            expires = self._cache.get(key)
+            if expires is None:
+                return False
+            if expires <= now:
+                del self._cache[key]
+                return False
+            self._counts["cache_hits"] += 1
+            return True
+
+    def _remember(self, key: Optional[bytes]) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._cache[key] = time.monotonic() + self.verify_cache_seconds
+            self._cache.move_to_end(key)
+            while len(self._cache) > _CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _default_workers() -> int:
+    if "pytest" in sys.modules:
+        return 0
+    return min(2, os.cpu_count() or 1)
+
+
+_pool: Optional[PasswordPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> PasswordPool:
+    """Process-wide pool configured from the environment (rebuilt after fork)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            workers = int(_env_number("PASSWORD_POOL_WORKERS", _default_workers()))
+            max_pending = os.getenv("PASSWORD_POOL_MAX_PENDING")
+            _pool = PasswordPool(
+                workers=workers,
+                max_pending=int(max_pending) if max_pending else None,
+                timeout=_env_number("PASSWORD_POOL_TIMEOUT_SECONDS", 5.0),
+                verify_cache_seconds=_env_number("PASSWORD_VERIFY_CACHE_SECONDS", 60.0),
+                start_method=os.getenv("PASSWORD_POOL_START_METHOD", "forkserver") or None,
+            )
+        return _pool
+
+
+def reset_pool() -> None:
+    """Shut down and forget the process-wide pool (tests / config reload)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and pool.pid == os.getpid():
+        pool.shutdown()
+
+
+# ----------------------------------------------------------------------
+# Cost calibration
+# ----------------------------------------------------------------------
+def calibrate(
+    target_ms: float,
+    min_rounds: int = passwords.MIN_BCRYPT_ROUNDS,
+    max_rounds: int = passwords.MAX_BCRYPT_ROUNDS,
+    samples: int = 3,
+) -> Tuple[int, Dict[int, float]]:
+    """
+    Pick the highest bcrypt cost whose median hash time stays within target_ms.
+
+    Each extra round doubles the work, so measuring stops at the first cost
+    over the target. Returns (rounds, {rounds: median_ms}); min_rounds is
+    returned even when it already exceeds the target.
+    """
+    timings: Dict[int, float] = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        runs: List[float] = []
+        for _ in range(max(1, samples)):
+            salt = bcrypt.gensalt(rounds=rounds)
+            started = time.perf_counter()
+            bcrypt.hashpw(b"calibration-password", salt)
+            runs.append((time.perf_counter() - started) * 1000.0)
+        timings[rounds] = round(statistics.median(runs), 1)
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Pick BCRYPT_ROUNDS for this host from a target hash time"
+    )
+    parser.add_argument(
+        "--target-ms", type=float, default=250.0, help="Max time per hash (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=3, help="Hashes per cost (default: %(default)s)"
+    )
+    parser.add_argument("--min-rounds", type=int, default=passwords.MIN_BCRYPT_ROUNDS)
+    parser.add_argument("--max-rounds", type=int, default=passwords.MAX_BCRYPT_ROUNDS)
+    parser.add_argument("--json", action="store_true", help="Output JSON only")
+    args = parser.parse_args(argv)
+
+    rounds, timings = calibrate(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+    if args.json:
+        print(json.dumps({"rounds": rounds, "target_ms": args.target_ms, "timings_ms": timings}))
+        return 0
+    for cost, ms in timings.items():
+        marker = "  <- selected" if cost == rounds else ""
+        print(f"cost {cost:2d}: {ms:8.1f} ms{marker}")
+    if timings.get(rounds, 0.0) > args.target_ms:
+        print(f"warning: even cost {rounds} exceeds {args.target_ms} ms on this host")
+    print(f"BCRYPT_ROUNDS={rounds}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -6,24 +6,59 @@ replacing the insecure SHA256 system while supporting dual verification
 for backward compatibility and auto-migration.
 
 Security Features:
-- bcrypt with cost factor 12 for new passwords
+- bcrypt with cost factor 12 for new passwords (BCRYPT_ROUNDS overrides; see
+  password_pool.py for calibrating it per host)
 - Dual verification supporting both SHA256 (legacy) and bcrypt (secure)
 - Automatic migration from SHA256 to bcrypt on successful login
 - Secure password storage that meets modern security standards
 """
 
 import hashlib
-from typing import Tuple
+import os
+from typing import Optional, Tuple
 
 import bcrypt
 
+DEFAULT_BCRYPT_ROUNDS = 12
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 15
 
-def hash_password(plain: str) -> str:
+
+def bcrypt_rounds() -> int:
+    """
+    Configured bcrypt cost for new hashes (env BCRYPT_ROUNDS, default 12).
+
+    Values outside [MIN_BCRYPT_ROUNDS, MAX_BCRYPT_ROUNDS] are clamped; garbage
+    falls back to the default.
+    """
+    try:
+        rounds = int(os.getenv("BCRYPT_ROUNDS", str(DEFAULT_BCRYPT_ROUNDS)))
+    except ValueError:
+        return DEFAULT_BCRYPT_ROUNDS
+    return max(MIN_BCRYPT_ROUNDS, min(MAX_BCRYPT_ROUNDS, rounds))
+
+
+def bcrypt_cost(hashed: str) -> Optional[int]:
+    """
+    Return the cost factor encoded in a bcrypt hash ("$2b$12$..." -> 12).
+
+    Returns None for non-bcrypt (legacy SHA256) or malformed hashes.
+    """
+    if not is_bcrypt_hash(hashed or ""):
+        return None
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def hash_password(plain: str, rounds: Optional[int] = None) -> str:
     """
-    Hash a plain text password using bcrypt with cost factor 12.
+    Hash a plain text password using bcrypt (cost factor 12 unless configured).
 
     Args:
         plain: The plain text password to hash
+        rounds: bcrypt cost override; defaults to bcrypt_rounds()
 
     Returns:
         str: The bcrypt hashed password (starts with $2b$)
@@ -33,9 +68,8 @@ def hash_password(plain: str) -> str:
         >>> hashed.startswith("$2b$12$")
         True
     """
-    # Convert to bytes and hash with bcrypt using cost factor 12
     password_bytes = plain.encode("utf-8")
-    salt = bcrypt.gensalt(rounds=12)  # Cost factor 12 as required
+    salt = bcrypt.gensalt(rounds=rounds or bcrypt_rounds())
     hashed = bcrypt.hashpw(password_bytes, salt)
 
     # Return as string for database storage
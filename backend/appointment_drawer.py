@@ -0,0 +1,279 @@
+"""Appointment drawer read model.
+
+The drawer (opened from the board for every card click) needs the appointment,
+its customer and vehicle, the appointment services with their catalog
+operation, and every vehicle of the customer for the vehicle switcher. This
+module fetches all of it in one round-trip: two LATERAL subqueries aggregate
+services and customer vehicles with ``json_agg``, and the same statement joins
+the ``page_signature`` rows the drawer ETag is derived from:
+
+  appointment:<id>        appointment row, its services, customer / vehicle edits
+                          (migrations/20250904_017_add_appointment_drawer_signature.sql)
+  service_catalog:global  operation default price / category shown per service
+
+Used by ``GET /api/appointments/<id>`` (local_server) and the native Lambda
+``handle_get_appointment`` (via AppointmentRepository.get_drawer).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from backend.page_signatures import signature_validator
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from page_signatures import signature_validator  # type: ignore
+
+__all__ = [
+    "DRAWER_SQL",
+    "DRAWER_SQL_NO_SIGNATURE",
+    "build_drawer",
+    "drawer_etag",
+    "drawer_signature_keys",
+    "fetch_drawer_row",
+    "parse_appointment_id",
+]
+
+# appointments.id is a 32-bit serial
+_MAX_ID = 2**31 - 1
+
+_SELECT = """
+SELECT a.id::text,
+       a.status::text,
+       a.start_ts,
+       a.end_ts,
+       a.total_amount,
+       a.paid_amount,
+       a.location_address,
+       a.notes,
+       a.check_in_at,
+       a.check_out_at,
+       a.created_at,
+       a.updated_at,
+       a.tech_id::text AS tech_id,
+       c.id::text AS customer_id,
+       c.name AS customer_name,
+       c.email,
+       c.phone,
+       v.id::text AS vehicle_id,
+       v.year,
+       v.make,
+       v.model,
+       v.license_plate AS license_plate,
+       v.license_plate AS vin,
+       COALESCE(svc.items, '[]'::json) AS services,
+       COALESCE(cv.items, '[]'::json) AS customer_vehicles{sig_columns}
+  FROM appointments a
+  LEFT JOIN customers c ON c.id = a.customer_id
+  LEFT JOIN vehicles  v ON v.id = a.vehicle_id
+  LEFT JOIN LATERAL (
+        SELECT json_agg(
+                 json_build_object(
+                   'id', s.id::text,
+                   'name', s.name,
+                   'notes', s.notes,
+                   'estimated_hours', s.estimated_hours,
+                   'estimated_price', s.estimated_price,
+                   'service_operation_id', s.service_operation_id,
+                   'op_default_price', op.default_price,
+                   'op_category', op.category
+                 ) ORDER BY s.created_at
+               ) AS items
+          FROM appointment_services s
+          LEFT JOIN service_operations op ON op.id = s.service_operation_id
+         WHERE s.appointment_id = a.id
+  ) svc ON TRUE
+  LEFT JOIN LATERAL (
+        -- ORDER BY id: some deployed schemas lack vehicles.created_at
+        SELECT json_agg(
+                 json_build_object(
+                   'id', cv.id::text,
+                   'year', cv.year,
+                   'make', cv.make,
+                   'model', cv.model,
+                   'license_plate', cv.license_plate,
+                   'vin', cv.license_plate
+                 ) ORDER BY cv.id
+               ) AS items
+          FROM vehicles cv
+         WHERE a.customer_id IS NOT NULL AND cv.customer_id = a.customer_id
+  ) cv ON TRUE{sig_joins}
+ WHERE a.id = %s
+"""
+
+DRAWER_SQL = _SELECT.format(
+    sig_columns=""",
+       sig_appt.weak_etag AS sig_appointment,
+       sig_cat.weak_etag AS sig_catalog""",
+    sig_joins="""
+  LEFT JOIN page_signature sig_appt ON sig_appt.entity_id = 'appointment:' || a.id::text
+  LEFT JOIN page_signature sig_cat ON sig_cat.entity_id = 'service_catalog:global'""",
+)
+
+# page_signature is created outside the numbered migrations; degrade when absent.
+DRAWER_SQL_NO_SIGNATURE = _SELECT.format(sig_columns="", sig_joins="")
+
+
+def parse_appointment_id(value: Any) -> Optional[int]:
+    """The appointment id as an int, or None when it cannot name an appointment."""
+    text = str(value).strip()
+    if not text.isascii() or not text.isdigit():
+        return None
+    pk = int(text)
+    return pk if 0 < pk <= _MAX_ID else None
+
+
+def drawer_signature_keys(appointment_id: Any) -> List[str]:
+    return [f"appointment:{appointment_id}", "service_catalog:global"]
+
+
+def fetch_drawer_row(
+    execute: Callable[[str, tuple], Optional[Dict[str, Any]]],
+    appointment_id: Any,
+    rollback: Optional[Callable[[], None]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Run the drawer statement through execute(sql, params) -> row dict or None.
+
+    Falls back to the statement without signature joins when page_signature does
+    not exist (rollback, when given, clears the aborted transaction first).
+    Ids that are not integers match nothing and are not sent to the database.
+    """
+    pk = parse_appointment_id(appointment_id)
+    if pk is None:
+        return None
+    try:
+        return execute(DRAWER_SQL, (pk,))
+    except Exception as e:
+        if "page_signature" not in str(e):
+            raise
+        if rollback:
+            rollback()
+        return execute(DRAWER_SQL_NO_SIGNATURE, (pk,))
+
+
+def _json_list(value: Any) -> List[Dict[str, Any]]:
+    # psycopg2 / pg8000 decode json columns; other drivers may hand back text
+    if isinstance(value, str):
+        value = json.loads(value)
+    return list(value or [])
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _iso(dt: Any) -> Optional[str]:
+    if not dt:
+        return None
+    return dt.isoformat() if hasattr(dt, "isoformat") else str(dt)
+
+
+def build_drawer(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a drawer row into the GET /api/appointments/<id> payload."""
+    services = _json_list(row.get("services"))
+    vehicles = _json_list(row.get("customer_vehicles"))
+
+    customer_vehicles = [
+        {
+            "id": v.get("id"),
+            "plate": v.get("license_plate"),
+            "year": v.get("year"),
+            "make": v.get("make"),
+            "model": v.get("model"),
+            "vin": v.get("vin"),
+            "display": (
+                f"{v.get('year')} {v.get('make')} {v.get('model')}".strip()
+                if v.get("year") or v.get("make") or v.get("model")
+                else (v.get("license_plate") or "Vehicle")
+            ),
+        }
+        for v in vehicles
+    ]
+
+    services_list = [
+        {
+            "id": s["id"],
+            "name": s["name"],
+            "notes": s.get("notes"),
+            "estimated_hours": _float(s.get("estimated_hours")),
+            "estimated_price": _float(s.get("estimated_price")),
+            "service_operation_id": s.get("service_operation_id"),
+            "operation": (
+                {
+                    "id": s.get("service_operation_id"),
+                    "default_price": _float(s.get("op_default_price")),
+                    "category": s.get("op_category"),
+                }
+                if s.get("service_operation_id")
+                else None
+            ),
+        }
+        for s in services
+    ]
+
+    return {
+        "appointment": {
+            "id": row["id"],
+            "status": row["status"],
+            "start": _iso(row.get("start_ts")),
+            "end": _iso(row.get("end_ts")),
+            "total_amount": float(row.get("total_amount") or 0),
+            "paid_amount": float(row.get("paid_amount") or 0),
+            "location_address": row.get("location_address"),
+            "notes": row.get("notes"),
+            "check_in_at": _iso(row.get("check_in_at")),
+            "check_out_at": _iso(row.get("check_out_at")),
+            "tech_id": row.get("tech_id"),
+            "customer_id": row.get("customer_id"),
+            "vehicle_id": row.get("vehicle_id"),
+            "created_at": _iso(row.get("created_at")),
+            "updated_at": _iso(row.get("updated_at")),
+            "service_operation_ids": [
+                s.get("service_operation_id") for s in services if s.get("service_operation_id")
+            ],
+        },
+        "customer": {
+            "id": row.get("customer_id"),
+            "name": row.get("customer_name"),
+            "email": row.get("email"),
+            "phone": row.get("phone"),
+            "vehicles": customer_vehicles,
+        },
+        "vehicle": {
+            "id": row.get("vehicle_id"),
+            "plate": row.get("license_plate"),
+            "year": row.get("year"),
+            "make": row.get("make"),
+            "model": row.get("model"),
+            "vin": row.get("vin"),
+            "display": (
+                f"{row.get('year')} {row.get('make')} {row.get('model')}".strip()
+                if row.get("year") or row.get("make") or row.get("model")
+                else row.get("license_plate")
+            ),
+        },
+        "services": services_list,
+        "meta": {"version": 1},
+    }
+
+
+def drawer_etag(row: Dict[str, Any], payload: Dict[str, Any], tenant_id: Any = None) -> str:
+    """Per-appointment ETag.
+
+    Derived from the page_signature rows joined into the drawer statement, so it
+    matches the pre-handler conditional GET validator for the same keys. Falls
+    back to a digest of the payload when a signature row is missing.
+    """
+    appt_key, catalog_key = drawer_signature_keys(row["id"])
+    etag = signature_validator(
+        tenant_id,
+        {appt_key: row.get("sig_appointment"), catalog_key: row.get("sig_catalog")},
+    )
+    if etag:
+        return etag
+    digest = hashlib.sha1(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return f'W/"{digest}"'
@@ -0,0 +1,634 @@
+"""Bulk appointment import (NDJSON / CSV).
+
+``POST /api/admin/appointments/import`` and ``import_appointments.py`` (CLI)
+share this module. ``create_appointment`` spends 10-20 round-trips per
+appointment resolving the customer, the vehicle, the technician and the
+operation, then checking conflicts. An import batch uses a fixed number of
+statements no matter how many rows it holds:
+
+  1. rows are parsed and type-checked in Python (per-row ``invalid`` errors)
+  2. valid rows are streamed into a temp table with ``COPY``
+  3. tech / operation checks, then customer and vehicle resolution, run as
+     set-based UPDATEs using create_appointment's precedence:
+       customer  id, then phone, then email, then lower(name)
+       vehicle   id, then VIN + customer, then plate + customer (active only)
+     Unmatched rows get a pre-allocated id. New customers are deduplicated
+     by phone, then email, then name; new vehicles by VIN, then plate, per
+     customer.
+  4. conflicts for all rows are found with one statement. A row is rejected
+     when it overlaps an existing appointment (``block_range``, GiST-indexed)
+     or an earlier row of the batch, for the same tech or vehicle. Each key is
+     its own equi-join branch (an OR condition forces a nested loop over every
+     pair of rows). CANCELED and NO_SHOW rows are ignored.
+  5. customers and vehicles are created only for surviving rows, and the
+     appointments are inserted with one ``INSERT ... SELECT``
+
+The caller owns the transaction (commit, or roll back for a dry run).
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from backend.validation import DEFAULT_BLOCK_HOURS
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from validation import DEFAULT_BLOCK_HOURS  # type: ignore
+
+__all__ = [
+    "ImportReport",
+    "STAGE_COLUMNS",
+    "import_appointments",
+    "normalize_row",
+    "read_rows",
+]
+
+STATUSES = ("SCHEDULED", "IN_PROGRESS", "READY", "COMPLETED", "NO_SHOW", "CANCELED")
+
+# Columns staged through COPY, in order
+STAGE_COLUMNS = (
+    "row_no",
+    "start_ts",
+    "end_ts",
+    "status",
+    "customer_id",
+    "customer_name",
+    "customer_phone",
+    "customer_email",
+    "vehicle_id",
+    "license_plate",
+    "vin",
+    "vehicle_year",
+    "vehicle_make",
+    "vehicle_model",
+    "tech_id",
+    "primary_operation_id",
+    "service_category",
+    "notes",
+    "location_address",
+    "total_amount",
+    "paid_amount",
+    "mileage_at_service",
+)
+
+# Accepted input keys (create_appointment aliases) -> staged column
+_ALIASES = {
+    "start": "start_ts",
+    "requested_time": "start_ts",
+    "end": "end_ts",
+    "customer": "customer_name",
+    "vehicle_vin": "vin",
+    "techId": "tech_id",
+    "primaryOperationId": "primary_operation_id",
+    "serviceCategory": "service_category",
+}
+
+
+@dataclass
+class ImportReport:
+    received: int = 0
+    inserted: int = 0
+    customers_created: int = 0
+    vehicles_created: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    ids: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    def merge(self, other: ImportReport) -> None:
+        self.received += other.received
+        self.inserted += other.inserted
+        self.customers_created += other.customers_created
+        self.vehicles_created += other.vehicles_created
+        self.errors.extend(other.errors)
+        self.ids.extend(other.ids)
+
+    def as_dict(self, include_ids: bool = False) -> Dict[str, Any]:
+        out = {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "customers_created": self.customers_created,
+            "vehicles_created": self.vehicles_created,
+            "errors": sorted(self.errors, key=lambda e: e["row"]),
+        }
+        if include_ids:
+            out["appointments"] = self.ids
+        return out
+
+
+# ----------------------------------------------------------------------------
+# Parsing / normalisation
+# ----------------------------------------------------------------------------
+
+
+def read_rows(text: str, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (row_no, dict | error string) for NDJSON or CSV input.
+
+    row_no is 1-based over data rows (the CSV header is not counted); blank
+    NDJSON lines are skipped but still counted so numbers match the file.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        if reader.fieldnames:
+            reader.fieldnames = [(f or "").strip() for f in reader.fieldnames]
+        for row_no, raw in enumerate(reader, start=1):
+            yield row_no, {k: v for k, v in raw.items() if k}
+        return
+    for row_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            yield row_no, f"invalid JSON: {e.msg}"
+            continue
+        yield row_no, obj if isinstance(obj, dict) else "each line must be a JSON object"
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _ts(value: Any) -> Optional[datetime]:
+    raw = _text(value)
+    if raw is None:
+        return None
+    dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    raw = _text(value)
+    return Decimal(raw) if raw is not None else None
+
+
+def _int(value: Any) -> Optional[int]:
+    raw = _text(value)
+    return int(raw) if raw is not None else None
+
+
+def normalize_row(
+    raw: Dict[str, Any]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """Return (staged values, None) or (None, (field, message))."""
+    src = {k: v for k, v in raw.items() if k not in _ALIASES}
+    for alias, target in _ALIASES.items():
+        if alias in raw and _text(src.get(target)) is None:
+            src[target] = raw[alias]
+    out: Dict[str, Any] = {}
+    for col in STAGE_COLUMNS[1:]:
+        out[col] = _text(src.get(col))
+    # create_appointment uses the VIN as plate when no plate is given
+    out["license_plate"] = out["license_plate"] or out["vin"]
+
+    converters = (
+        ("start_ts", _ts),
+        ("end_ts", _ts),
+        ("total_amount", _decimal),
+        ("paid_amount", _decimal),
+        ("vehicle_year", _int),
+        ("mileage_at_service", _int),
+    )
+    for col, convert in converters:
+        try:
+            out[col] = convert(out[col])
+        except (ValueError, InvalidOperation):
+            return None, (col, f"{col} is not a valid value: {src.get(col)!r}")
+    if out["start_ts"] is None:
+        return None, ("start_ts", "start_ts is required")
+    if out["end_ts"] is not None and out["end_ts"] < out["start_ts"]:
+        return None, ("end_ts", "end_ts must not be before start_ts")
+    status = (out["status"] or "SCHEDULED").upper().replace("-", "_")
+    if status not in STATUSES:
+        return None, ("status", f"Invalid status value: {out['status']}")
+    out["status"] = status
+    if out["paid_amount"] is None:
+        out["paid_amount"] = Decimal("0")
+    if out["tech_id"] is not None:
+        try:
+            out["tech_id"] = str(uuid.UUID(out["tech_id"]))
+        except ValueError:
+            return None, ("tech_id", "tech_id not found or inactive (tech_id)")
+    if not (out["customer_id"] or out["customer_name"] or out["customer_phone"]):
+        if not out["customer_email"]:
+            return None, ("customer", "customer_id, customer_name, phone or email is required")
+    return out, None
+
+
+# ----------------------------------------------------------------------------
+# Database stages
+# ----------------------------------------------------------------------------
+
+
+def _val(row: Any, key: str, idx: int = 0) -> Any:
+    if row is None:
+        return None
+    return row[key] if isinstance(row, dict) else row[idx]
+
+
+def _schema(cur) -> Dict[str, str]:
+    """Column types of customer / vehicle / appointment ids and appointments.status,
+    plus the SQL used to allocate a new id for each table."""
+    cur.execute(
+        """
+        SELECT c.relname || '.' || a.attname AS col,
+               format_type(a.atttypid, a.atttypmod) AS type,
+               pg_get_serial_sequence(c.relname, a.attname) AS seq
+          FROM pg_attribute a
+          JOIN pg_class c ON c.oid = a.attrelid
+         WHERE c.oid IN ('customers'::regclass, 'vehicles'::regclass, 'appointments'::regclass)
+           AND a.attname IN ('id', 'status')
+           AND NOT a.attisdropped
+        """
+    )
+    info: Dict[str, str] = {}
+    for row in cur.fetchall() or []:
+        col = _val(row, "col", 0)
+        info[col] = _val(row, "type", 1)
+        seq = _val(row, "seq", 2)
+        if col.endswith(".id"):
+            table = col.split(".")[0]
+            if seq:
+                info[f"{table}.new_id"] = "nextval('" + seq.replace("'", "''") + "')"
+            elif info[col] == "uuid":
+                info[f"{table}.new_id"] = "gen_random_uuid()"
+    for table in ("customers", "vehicles", "appointments"):
+        if f"{table}.new_id" not in info:
+            raise RuntimeError(f"cannot allocate ids for {table}.id ({info.get(table + '.id')})")
+    info.setdefault("appointments.status", "text")
+    return info
+
+
+_CREATE_STAGE = """
+CREATE TEMP TABLE appt_import_stage (
+    row_no               INT PRIMARY KEY,
+    start_ts             TIMESTAMPTZ NOT NULL,
+    end_ts               TIMESTAMPTZ,
+    status               TEXT NOT NULL,
+    customer_id          TEXT,
+    customer_name        TEXT,
+    customer_phone       TEXT,
+    customer_email       TEXT,
+    vehicle_id           TEXT,
+    license_plate        TEXT,
+    vin                  TEXT,
+    vehicle_year         INT,
+    vehicle_make         TEXT,
+    vehicle_model        TEXT,
+    tech_id              UUID,
+    primary_operation_id TEXT,
+    service_category     TEXT,
+    notes                TEXT,
+    location_address     TEXT,
+    total_amount         NUMERIC,
+    paid_amount          NUMERIC NOT NULL,
+    mileage_at_service   INT,
+    customer_ref         {customer_type},
+    customer_new         BOOLEAN NOT NULL DEFAULT FALSE,
+    vehicle_ref          {vehicle_type},
+    vehicle_new          BOOLEAN NOT NULL DEFAULT FALSE,
+    appt_id              {appointment_type},
+    error_code           TEXT,
+    error_message        TEXT,
+    error_detail         JSONB
+) ON COMMIT DROP
+"""
+
+_VALIDATE_REFS = """
+WITH chk AS (
+    SELECT s.row_no,
+           s.tech_id IS NOT NULL AND t.id IS NULL AS bad_tech,
+           s.primary_operation_id IS NOT NULL AND o.id IS NULL AS bad_op,
+           o.category
+      FROM appt_import_stage s
+      LEFT JOIN technicians t ON t.id = s.tech_id AND t.is_active IS TRUE
+      LEFT JOIN service_operations o ON o.id = s.primary_operation_id
+)
+UPDATE appt_import_stage s
+   SET service_category = COALESCE(s.service_category, chk.category),
+       error_code = CASE WHEN chk.bad_tech OR chk.bad_op THEN 'invalid' END,
+       error_message = CASE
+           WHEN chk.bad_tech THEN 'tech_id not found or inactive (tech_id)'
+           WHEN chk.bad_op THEN 'primary_operation_id not found'
+       END
+  FROM chk
+ WHERE chk.row_no = s.row_no
+"""
+
+# Customer ids that match no row are treated as names, as in create_appointment
+_LOOKUP_NAME = "COALESCE(s.customer_name, s.customer_id)"
+_CUSTOMER_NAME = "COALESCE(s.customer_name, s.customer_id, 'Unknown Customer')"
+_CUSTOMER_KEY = (
+    "COALESCE('p:' || s.customer_phone, 'e:' || s.customer_email, 'n:' || lower("
+    + _CUSTOMER_NAME
+    + "))"
+)
+
+_RESOLVE_CUSTOMERS = f"""
+WITH phones AS (
+    SELECT DISTINCT ON (c.phone) c.phone, c.id FROM customers c
+     WHERE c.phone IN (SELECT customer_phone FROM appt_import_stage)
+     ORDER BY c.phone, c.id
+), emails AS (
+    SELECT DISTINCT ON (c.email) c.email, c.id FROM customers c
+     WHERE c.email IN (SELECT customer_email FROM appt_import_stage)
+     ORDER BY c.email, c.id
+), names AS (
+    SELECT DISTINCT ON (lower(c.name)) lower(c.name) AS lname, c.id FROM customers c
+     WHERE lower(c.name) IN (SELECT lower({_LOOKUP_NAME}) FROM appt_import_stage s)
+     ORDER BY lower(c.name), c.id
+), matched AS (
+    SELECT s.row_no, COALESCE(by_id.id, p.id, e.id, n.id) AS id
+      FROM appt_import_stage s
+      LEFT JOIN customers by_id ON by_id.id::text = s.customer_id
+      LEFT JOIN phones p ON p.phone = s.customer_phone
+      LEFT JOIN emails e ON e.email = s.customer_email
+      LEFT JOIN names n ON n.lname = lower({_LOOKUP_NAME})
+     WHERE s.error_code IS NULL
+)
+UPDATE appt_import_stage s
+   SET customer_ref = matched.id
+  FROM matched
+ WHERE matched.row_no = s.row_no AND matched.id IS NOT NULL
+"""
+
+# CTEs with volatile functions are evaluated once, so each key gets one id
+_ALLOCATE_CUSTOMERS = f"""
+WITH keys AS (
+    SELECT k.ckey, {{new_id}} AS id
+      FROM (SELECT DISTINCT {_CUSTOMER_KEY} AS ckey
+              FROM appt_import_stage s
+             WHERE s.error_code IS NULL AND s.customer_ref IS NULL) k
+)
+UPDATE appt_import_stage s
+   SET customer_ref = keys.id, customer_new = TRUE
+  FROM keys
+ WHERE s.error_code IS NULL AND s.customer_ref IS NULL AND keys.ckey = {_CUSTOMER_KEY}
+"""
+
+_RESOLVE_VEHICLES = """
+WITH matched AS (
+    SELECT s.row_no, COALESCE(by_id.id, by_vin.id, by_plate.id) AS id
+      FROM appt_import_stage s
+      LEFT JOIN vehicles by_id ON by_id.id::text = s.vehicle_id
+      LEFT JOIN LATERAL (
+            SELECT v.id FROM vehicles v
+             WHERE s.vin IS NOT NULL AND NOT s.customer_new
+               AND v.vin = s.vin AND v.customer_id = s.customer_ref AND v.is_active = TRUE
+             ORDER BY v.id LIMIT 1
+      ) by_vin ON TRUE
+      LEFT JOIN LATERAL (
+            SELECT v.id FROM vehicles v
+             WHERE s.license_plate IS NOT NULL AND NOT s.customer_new
+               AND lower(v.license_plate) = lower(s.license_plate)
+               AND v.customer_id = s.customer_ref AND v.is_active = TRUE
+             ORDER BY v.id LIMIT 1
+      ) by_plate ON TRUE
+     WHERE s.error_code IS NULL
+)
+UPDATE appt_import_stage s
+   SET vehicle_ref = matched.id
+  FROM matched
+ WHERE matched.row_no = s.row_no AND matched.id IS NOT NULL
+"""
+
+_VEHICLE_KEY = (
+    "s.customer_ref::text || COALESCE('|v:' || s.vin, '|p:' || lower(s.license_plate), "
+    "'|r:' || s.row_no)"
+)
+
+_ALLOCATE_VEHICLES = f"""
+WITH keys AS (
+    SELECT k.vkey, {{new_id}} AS id
+      FROM (SELECT DISTINCT {_VEHICLE_KEY} AS vkey
+              FROM appt_import_stage s
+             WHERE s.error_code IS NULL AND s.vehicle_ref IS NULL
+               AND (s.license_plate IS NOT NULL OR s.vehicle_make IS NOT NULL
+                    OR s.vehicle_model IS NOT NULL)) k
+)
+UPDATE appt_import_stage s
+   SET vehicle_ref = keys.id, vehicle_new = TRUE
+  FROM keys
+ WHERE s.error_code IS NULL AND s.vehicle_ref IS NULL AND keys.vkey = {_VEHICLE_KEY}
+"""
+
+_BLOCK = (
+    "tstzrange({p}.start_ts, GREATEST(COALESCE({p}.end_ts, {p}.start_ts + "
+    f"INTERVAL '{DEFAULT_BLOCK_HOURS} hours'), {{p}}.start_ts), '[)')"
+)
+
+_CONFLICTS = f"""
+WITH cand AS (
+    SELECT s.row_no, s.tech_id, s.vehicle_ref, {_BLOCK.format(p="s")} AS r
+      FROM appt_import_stage s
+     WHERE s.error_code IS NULL AND s.status NOT IN ('CANCELED', 'NO_SHOW')
+), hits AS (
+    SELECT c.row_no, 'tech' AS kind, a.id::text AS ref
+      FROM cand c JOIN appointments a
+        ON a.tech_id = c.tech_id AND a.block_range && c.r
+       AND a.status NOT IN ('CANCELED', 'NO_SHOW')
+    UNION ALL
+    SELECT c.row_no, 'vehicle', a.id::text
+      FROM cand c JOIN appointments a
+        ON a.vehicle_id = c.vehicle_ref AND a.block_range && c.r
+       AND a.status NOT IN ('CANCELED', 'NO_SHOW')
+    UNION ALL
+    SELECT c.row_no, 'rows', o.row_no::text
+      FROM cand c JOIN cand o
+        ON o.tech_id = c.tech_id AND o.row_no < c.row_no AND o.r && c.r
+    UNION ALL
+    SELECT c.row_no, 'rows', o.row_no::text
+      FROM cand c JOIN cand o
+        ON o.vehicle_ref = c.vehicle_ref AND o.row_no < c.row_no AND o.r && c.r
+), agg AS (
+    SELECT row_no,
+           jsonb_build_object(
+               'tech', COALESCE(jsonb_agg(DISTINCT ref) FILTER (WHERE kind = 'tech'), '[]'),
+               'vehicle', COALESCE(jsonb_agg(DISTINCT ref) FILTER (WHERE kind = 'vehicle'), '[]'),
+               'rows', COALESCE(jsonb_agg(DISTINCT ref::int) FILTER (WHERE kind = 'rows'), '[]')
+           ) AS detail
+      FROM hits GROUP BY row_no
+)
+UPDATE appt_import_stage s
+   SET error_code = 'conflict',
+       error_message = 'Scheduling conflict detected',
+       error_detail = agg.detail
+  FROM agg
+ WHERE agg.row_no = s.row_no
+"""
+
+_INSERT_CUSTOMERS = f"""
+INSERT INTO customers (id, name, phone, email)
+SELECT DISTINCT ON (s.customer_ref) s.customer_ref, {_CUSTOMER_NAME}, s.customer_phone,
+       s.customer_email
+  FROM appt_import_stage s
+ WHERE s.error_code IS NULL AND s.customer_new
+ ORDER BY s.customer_ref, s.row_no
+"""
+
+_INSERT_VEHICLES = """
+INSERT INTO vehicles (id, customer_id, year, make, model, license_plate, vin,
+                      is_active, total_services, updated_at)
+SELECT DISTINCT ON (s.vehicle_ref) s.vehicle_ref, s.customer_ref, s.vehicle_year,
+       COALESCE(s.vehicle_make, 'Unknown'), COALESCE(s.vehicle_model, 'Unknown'),
+       s.license_plate, s.vin, TRUE, 0, CURRENT_TIMESTAMP
+  FROM appt_import_stage s
+ WHERE s.error_code IS NULL AND s.vehicle_new
+ ORDER BY s.vehicle_ref, s.row_no
+"""
+
+# Same bookkeeping create_appointment does per appointment, once per vehicle
+_TOUCH_VEHICLES = """
+UPDATE vehicles v
+   SET last_service_date = CURRENT_DATE,
+       total_services = COALESCE(v.total_services, 0) + agg.n,
+       updated_at = CURRENT_TIMESTAMP,
+       is_active = TRUE,
+       vin = COALESCE(v.vin, agg.vin),
+       customer_id = COALESCE(v.customer_id, agg.customer_ref)
+  FROM (SELECT vehicle_ref, count(*) AS n, max(vin) AS vin,
+               (array_agg(customer_ref ORDER BY row_no))[1] AS customer_ref
+          FROM appt_import_stage
+         WHERE error_code IS NULL AND vehicle_ref IS NOT NULL
+         GROUP BY vehicle_ref) agg
+ WHERE v.id = agg.vehicle_ref
+"""
+
+_ALLOCATE_APPOINTMENTS = """
+UPDATE appt_import_stage SET appt_id = {new_id} WHERE error_code IS NULL
+"""
+
+_INSERT_APPOINTMENTS = """
+INSERT INTO appointments (id, status, start_ts, end_ts, total_amount, paid_amount, customer_id,
+                          vehicle_id, notes, location_address, primary_operation_id,
+                          service_category, tech_id)
+SELECT appt_id, status::{status_type}, start_ts, end_ts, total_amount, paid_amount, customer_ref,
+       vehicle_ref, notes, location_address, primary_operation_id, service_category, tech_id
+  FROM appt_import_stage
+ WHERE error_code IS NULL
+ ORDER BY row_no
+"""
+
+_LINK_VEHICLES = """
+INSERT INTO appointment_vehicles (appointment_id, vehicle_id, mileage_at_service)
+SELECT appt_id, vehicle_ref, mileage_at_service
+  FROM appt_import_stage
+ WHERE error_code IS NULL AND vehicle_ref IS NOT NULL
+ON CONFLICT (appointment_id, vehicle_id) DO NOTHING
+"""
+
+_RESULTS = """
+SELECT row_no, appt_id::text AS appt_id, error_code, error_message, error_detail
+  FROM appt_import_stage{where}
+ ORDER BY row_no
+"""
+
+
+def _stage(cur, rows: List[Dict[str, Any]]) -> None:
+    """COPY rows into appt_import_stage (executemany when the driver lacks COPY)."""
+    if hasattr(cur, "copy_expert"):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for r in rows:
+            writer.writerow(["" if r[c] is None else r[c] for c in STAGE_COLUMNS])
+        buf.seek(0)
+        cur.copy_expert(
+            f"COPY appt_import_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+        return
+    placeholders = ", ".join(["%s"] * len(STAGE_COLUMNS))
+    cur.executemany(
+        f"INSERT INTO appt_import_stage ({', '.join(STAGE_COLUMNS)}) VALUES ({placeholders})",
+        [tuple(r[c] for c in STAGE_COLUMNS) for r in rows],
+    )
+
+
+def import_appointments(
+    conn, rows: Iterable[Tuple[int, Any]], include_ids: bool = False
+) -> ImportReport:
+    """Import (row_no, raw dict | parse error) pairs inside the caller's transaction.
+
+    Rows with errors are reported and skipped; the rest are inserted. The
+    caller commits, or rolls back for a dry run. include_ids fills
+    report.ids with the new appointment id per row.
+    """
+    report = ImportReport()
+    staged: List[Dict[str, Any]] = []
+    for row_no, raw in rows:
+        report.received += 1
+        if not isinstance(raw, dict):
+            report.errors.append({"row": row_no, "code": "invalid", "message": str(raw)})
+            continue
+        values, problem = normalize_row(raw)
+        if problem:
+            report.errors.append(
+                {"row": row_no, "code": "invalid", "field": problem[0], "message": problem[1]}
+            )
+            continue
+        values["row_no"] = row_no
+        staged.append(values)
+    if not staged:
+        return report
+
+    with conn.cursor() as cur:
+        schema = _schema(cur)
+        cur.execute(
+            _CREATE_STAGE.format(
+                customer_type=schema["customers.id"],
+                vehicle_type=schema["vehicles.id"],
+                appointment_type=schema["appointments.id"],
+            )
+        )
+        _stage(cur, staged)
+        cur.execute(_VALIDATE_REFS)
+        cur.execute(_RESOLVE_CUSTOMERS)
+        cur.execute(_ALLOCATE_CUSTOMERS.format(new_id=schema["customers.new_id"]))
+        cur.execute(_RESOLVE_VEHICLES)
+        cur.execute(_ALLOCATE_VEHICLES.format(new_id=schema["vehicles.new_id"]))
+        cur.execute(_CONFLICTS)
+        cur.execute(_INSERT_CUSTOMERS)
+        report.customers_created = max(cur.rowcount or 0, 0)
+        cur.execute(_INSERT_VEHICLES)
+        report.vehicles_created = max(cur.rowcount or 0, 0)
+        cur.execute(_TOUCH_VEHICLES)
+        cur.execute(_ALLOCATE_APPOINTMENTS.format(new_id=schema["appointments.new_id"]))
+        cur.execute(_INSERT_APPOINTMENTS.format(status_type=schema["appointments.status"]))
+        report.inserted = max(cur.rowcount or 0, 0)
+        # Junction table is optional on older schemas (create_appointment tolerates it too)
+        cur.execute("SAVEPOINT appt_import_link")
+        try:
+            cur.execute(_LINK_VEHICLES)
+            cur.execute("RELEASE SAVEPOINT appt_import_link")
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT appt_import_link")
+        cur.execute(_RESULTS.format(where="" if include_ids else " WHERE error_code IS NOT NULL"))
+        for r in cur.fetchall() or []:
+            row_no = _val(r, "row_no", 0)
+            code = _val(r, "error_code", 2)
+            if code is None:
+                report.ids.append({"row": row_no, "id": _val(r, "appt_id", 1)})
+                continue
+            err: Dict[str, Any] = {
+                "row": row_no,
+                "code": code,
+                "message": _val(r, "error_message", 3),
+            }
+            detail = _val(r, "error_detail", 4)
+            if detail:
+                err["conflicts"] = json.loads(detail) if isinstance(detail, str) else detail
+            report.errors.append(err)
+    return report
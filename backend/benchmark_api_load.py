@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""Load benchmark for the hot admin API endpoints against a seeded dataset.
+
+Seed first with catalog_seed/generate_perf_dataset.py (N tenants of customers,
+vehicles, appointments and invoices), then:
+
+  run      drive every endpoint with --concurrency worker threads, either
+           in-process through the Flask test client (--mode inprocess, no
+           network or WSGI server in the numbers) or over HTTP against a running
+           server (--mode http --base-url ...). Requests rotate across the
+           seeded tenants; each tenant's path parameters (busiest day, heaviest
+           customer and vehicle, latest invoice, its technicians, a common last
+           name) are read from the database once.
+  compare  diff two result files (p95 and queries-per-request per endpoint).
+
+Per endpoint the report has p50/p95/p99/mean/max latency, throughput, status
+counts and queries-per-request. Queries are counted in-process from the
+db_query_duration_seconds histogram during a separate sequential pass (so
+concurrent requests cannot blur the count); in http mode that pass still runs
+in-process, so the server must use the same database. Result files carry the
+git commit, the dataset row counts and the run parameters, so two files are
+only compared when they describe the same dataset.
+
+The database is the app's (DATABASE_URL or POSTGRES_*); the token is signed with
+JWT_SECRET for the ``perf-bench`` staff member the generator registers.
+
+Usage:
+  python -m backend.benchmark_api_load run --out bench.json
+  python -m backend.benchmark_api_load run --mode http --base-url http://localhost:5001 \\
+      --concurrency 16 --requests 500 --out bench-http.json
+  python -m backend.benchmark_api_load compare main.json bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:  # flexible import (package vs direct script execution)
+    from backend import local_server as srv  # type: ignore
+    from backend.run_plan_baseline_snapshot import summarize  # type: ignore
+except ImportError:  # pragma: no cover
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import local_server as srv  # type: ignore
+    from run_plan_baseline_snapshot import summarize  # type: ignore
+
+SCHEMA_VERSION = 1
+BENCH_STAFF_ID = "perf-bench"
+DEFAULT_REQUESTS = 200
+DEFAULT_WARMUP = 20
+DEFAULT_CONCURRENCY = 8
+DEFAULT_QPR_SAMPLES = 5
+DATASET_TABLES = ("customers", "vehicles", "appointments", "invoices", "invoice_line_items")
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    key: str
+    path: str  # str.format template over the tenant fixture
+
+    def url(self, fixture: Dict[str, Any]) -> str:
+        return self.path.format(**fixture)
+
+
+ENDPOINTS: Tuple[Endpoint, ...] = (
+    Endpoint("board_day", "/api/admin/appointments/board?date={busy_day}"),
+    Endpoint("appointments_list", "/api/admin/appointments?limit=50"),
+    Endpoint("dashboard_stats", "/api/admin/dashboard/stats"),
+    Endpoint("customer_search", "/api/admin/customers/search?q={last_name}&limit=25"),
+    Endpoint("customer_profile", "/api/admin/customers/{customer_id}/profile"),
+    Endpoint("vehicle_profile", "/api/admin/vehicles/{vehicle_id}/profile"),
+    Endpoint("invoices_list", "/api/admin/invoices?pageSize=50"),
+    Endpoint("invoice_detail", "/api/admin/invoices/{invoice_id}"),
+    Endpoint("technicians", "/api/admin/technicians"),
+    Endpoint(
+        "free_slots",
+        "/api/admin/scheduling/free-slots?tech_id={tech_ids}&from={week_start}&to={week_end}",
+    ),
+    Endpoint("template_analytics", "/api/admin/analytics/templates?range=30d"),
+)
+
+_TENANTS_SQL = "SELECT id::text AS id FROM tenants WHERE slug LIKE %s ORDER BY slug"
+
+_FIXTURE_SQL = """
+SELECT
+  (SELECT start_ts::date FROM appointments WHERE tenant_id = %(t)s
+    GROUP BY 1 ORDER BY count(*) DESC, 1 LIMIT 1) AS busy_day,
+  (SELECT customer_id FROM appointments WHERE tenant_id = %(t)s AND customer_id IS NOT NULL
+    GROUP BY 1 ORDER BY count(*) DESC, 1 LIMIT 1) AS customer_id,
+  (SELECT vehicle_id FROM appointments WHERE tenant_id = %(t)s AND vehicle_id IS NOT NULL
+    GROUP BY 1 ORDER BY count(*) DESC, 1 LIMIT 1) AS vehicle_id,
+  (SELECT id::text FROM invoices WHERE tenant_id = %(t)s
+    ORDER BY created_at DESC, id LIMIT 1) AS invoice_id,
+  (SELECT split_part(name, ' ', 2) FROM customers WHERE tenant_id = %(t)s
+    GROUP BY 1 ORDER BY count(*) DESC, 1 LIMIT 1) AS last_name,
+  (SELECT string_agg(tech_id, ',') FROM (
+     SELECT tech_id::text FROM appointments WHERE tenant_id = %(t)s AND tech_id IS NOT NULL
+      GROUP BY 1 ORDER BY 1 LIMIT 5) t) AS tech_ids
+"""
+
+
+def git_revision() -> Dict[str, Any]:
+    root = Path(__file__).resolve().parent
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=root,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+    except Exception:  # noqa: BLE001 - not a checkout / git missing
+        return {"commit": None, "dirty": None}
+    return {"commit": sha, "dirty": dirty}
+
+
+def _token() -> str:
+    import jwt
+
+    payload = {
+        "sub": BENCH_STAFF_ID,
+        "role": "Owner",
+        "exp": datetime.now(timezone.utc) + timedelta(hours=6),
+    }
+    return jwt.encode(payload, srv.JWT_SECRET, algorithm="HS256")
+
+
+def load_fixtures(tenant_prefix: str) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Per-tenant path parameters plus total row counts of the seeded tenants."""
+    conn = srv.db_conn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(_TENANTS_SQL, (tenant_prefix + "%",))
+                tenant_ids = [r["id"] for r in cur.fetchall()]
+                fixtures = []
+                counts = dict.fromkeys(DATASET_TABLES, 0)
+                for tid in tenant_ids:
+                    cur.execute("SELECT set_config('app.tenant_id', %s, true)", (tid,))
+                    cur.execute(_FIXTURE_SQL, {"t": tid})
+                    row = dict(cur.fetchone())
+                    if any(v is None for v in row.values()):
+                        continue  # no appointments / invoices yet
+                    day = row["busy_day"]
+                    week_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+                    row.update(
+                        tenant_id=tid,
+                        busy_day=day.isoformat(),
+                        week_start=week_start.isoformat().replace("+00:00", "Z"),
+                        week_end=(week_start + timedelta(days=7))
+                        .isoformat()
+                        .replace("+00:00", "Z"),
+                    )
+                    fixtures.append(row)
+                    for table in DATASET_TABLES:
+                        cur.execute(
+                            f"SELECT count(*) AS n FROM {table} WHERE tenant_id = %s",  # nosec B608
+                            (tid,),
+                        )
+                        counts[table] += cur.fetchone()["n"]
+    finally:
+        conn.close()
+    return fixtures, counts
+
+
+def db_query_count() -> int:
+    return sum(int(value[2]) for _labels, value in srv._DB_QUERY_LATENCY.samples())
+
+
+Sender = Callable[[str, Dict[str, str]], int]
+
+
+def _inprocess_sender() -> Callable[[], Sender]:
+    def factory() -> Sender:
+        client = srv.app.test_client()
+
+        def send(url: str, headers: Dict[str, str]) -> int:
+            return client.get(url, headers=headers).status_code
+
+        return send
+
+    return factory
+
+
+def _http_sender(base_url: str, timeout: float) -> Callable[[], Sender]:
+    try:
+        import requests  # type: ignore
+    except ImportError as e:  # pragma: no cover
+        raise SystemExit("[benchmark] --mode http needs 'requests' (pip install requests)") from e
+    base = base_url.rstrip("/")
+
+    def factory() -> Sender:
+        session = requests.Session()
+
+        def send(url: str, headers: Dict[str, str]) -> int:
+            try:
+                return session.get(base + url, headers=headers, timeout=timeout).status_code
+            except requests.RequestException:
+                return 0
+
+        return send
+
+    return factory
+
+
+def _measure(
+    sender_factory: Callable[[], Sender],
+    requests_: Sequence[Tuple[str, Dict[str, str]]],
+    concurrency: int,
+) -> Tuple[List[float], Counter, float]:
+    """Send ``requests_`` from ``concurrency`` threads; one client per thread."""
+    local = threading.local()
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+
+    def one(item):
+        send = getattr(local, "send", None)
+        if send is None:
+            send = local.send = sender_factory()
+        url, headers = item
+        start = time.perf_counter()
+        status = send(url, headers)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with lock:
+            statuses[status] += 1
+        return elapsed
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        samples = list(pool.map(one, requests_))
+    return samples, statuses, time.perf_counter() - wall
+
+
+def queries_per_request(
+    endpoint: Endpoint, fixtures: Sequence[Dict[str, Any]], headers: Sequence[Dict], samples: int
+) -> Dict[str, float]:
+    """Sequential in-process pass: DB executes per request (mean and max)."""
+    client = srv.app.test_client()
+    counts = []
+    for i in range(samples):
+        k = i % len(fixtures)
+        before = db_query_count()
+        client.get(endpoint.url(fixtures[k]), headers=headers[k])
+        counts.append(db_query_count() - before)
+    return {"mean": round(sum(counts) / len(counts), 2), "max": max(counts)}
+
+
+def run_benchmark(
+    mode: str = "inprocess",
+    base_url: Optional[str] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    requests_per_endpoint: int = DEFAULT_REQUESTS,
+    warmup: int = DEFAULT_WARMUP,
+    qpr_samples: int = DEFAULT_QPR_SAMPLES,
+    only: Optional[Sequence[str]] = None,
+    tenant_prefix: str = "perf-",
+    timeout: float = 30.0,
+    seed: int = 11,
+) -> Dict[str, Any]:
+    fixtures, counts = load_fixtures(tenant_prefix)
+    if not fixtures:
+        raise RuntimeError(
+            f"no tenants with slug '{tenant_prefix}*'; run catalog_seed/generate_perf_dataset.py"
+        )
+    token = _token()
+    headers = [
+        {"Authorization": f"Bearer {token}", "X-Tenant-Id": f["tenant_id"]} for f in fixtures
+    ]
+    endpoints = [e for e in ENDPOINTS if not only or e.key in only]
+    unknown = set(only or ()) - {e.key for e in ENDPOINTS}
+    if unknown:
+        raise ValueError(f"unknown endpoint(s): {', '.join(sorted(unknown))}")
+    if mode == "http":
+        if not base_url:
+            raise ValueError("--base-url is required for --mode http")
+        factory = _http_sender(base_url, timeout)
+    else:
+        factory = _inprocess_sender()
+
+    rng = random.Random(seed)
+    results: Dict[str, Any] = {}
+    for endpoint in endpoints:
+        plan = [rng.randrange(len(fixtures)) for _ in range(warmup + requests_per_endpoint)]
+        work = [(endpoint.url(fixtures[k]), headers[k]) for k in plan]
+        _measure(factory, work[:warmup], concurrency)
+        samples, statuses, wall = _measure(factory, work[warmup:], concurrency)
+        stats = summarize(samples)
+        errors = sum(n for status, n in statuses.items() if not 200 <= status < 400)
+        results[endpoint.key] = {
+            "path": endpoint.path,
+            "requests": stats["n"],
+            "errors": errors,
+            "status": {str(k): v for k, v in sorted(statuses.items())},
+            "p50_ms": round(stats["p50"], 3),
+            "p95_ms": round(stats["p95"], 3),
+            "p99_ms": round(stats["p99"], 3),
+            "mean_ms": round(stats["mean"], 3),
+            "max_ms": round(max(samples), 3),
+            "throughput_rps": round(stats["n"] / wall, 1) if wall else None,
+            "queries_per_request": (
+                queries_per_request(endpoint, fixtures, headers, qpr_samples)
+                if qpr_samples
+                else None
+            ),
+        }
+    return {
+        "schema": SCHEMA_VERSION,
+        "git": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "mode": mode,
+        "base_url": base_url if mode == "http" else None,
+        "concurrency": concurrency,
+        "requests_per_endpoint": requests_per_endpoint,
+        "warmup": warmup,
+        "dataset": {"tenants": len(fixtures), "rows": counts},
+        "host": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Per-endpoint p95 and queries-per-request deltas, old -> new."""
+    lines = []
+    if old.get("dataset") != new.get("dataset"):
+        lines.append("WARNING datasets differ; latencies are not comparable")
+    if (old.get("mode"), old.get("concurrency")) != (new.get("mode"), new.get("concurrency")):
+        lines.append("WARNING mode/concurrency differ")
+    old_sha = (old.get("git") or {}).get("commit") or "?"
+    new_sha = (new.get("git") or {}).get("commit") or "?"
+    lines.append(
+        f"{'endpoint':<20} {'p95 ' + old_sha[:8]:>14} {'p95 ' + new_sha[:8]:>14} {'delta':>8}  qpr"
+    )
+    for key, cur in new.get("results", {}).items():
+        prev = old.get("results", {}).get(key)
+        if not prev:
+            lines.append(f"{key:<20} {'-':>14} {cur['p95_ms']:>14.2f} {'new':>8}")
+            continue
+        delta = (cur["p95_ms"] - prev["p95_ms"]) / prev["p95_ms"] * 100 if prev["p95_ms"] else 0.0
+        qpr_old = (prev.get("queries_per_request") or {}).get("mean")
+        qpr_new = (cur.get("queries_per_request") or {}).get("mean")
+        lines.append(
+            f"{key:<20} {prev['p95_ms']:>14.2f} {cur['p95_ms']:>14.2f} {delta:>+7.1f}%  "
+            f"{qpr_old} -> {qpr_new}"
+        )
+    return lines
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    rows = report["dataset"]["rows"]
+    print(
+        f"[benchmark] mode={report['mode']} concurrency={report['concurrency']} "
+        f"tenants={report['dataset']['tenants']} appointments={rows['appointments']} "
+        f"invoices={rows['invoices']} commit={(report['git']['commit'] or '?')[:8]}"
+    )
+    for key, r in report["results"].items():
+        qpr = r["queries_per_request"] or {}
+        print(
+            f"{key}: p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms "
+            f"rps={r['throughput_rps']} errors={r['errors']} queries/req={qpr.get('mean')}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = ap.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Benchmark the endpoints and write a result file")
+    run.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    run.add_argument("--base-url", help="Server for --mode http, e.g. http://localhost:5001")
+    run.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    run.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Per endpoint")
+    run.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="Per endpoint, discarded")
+    run.add_argument(
+        "--qpr-samples",
+        type=int,
+        default=DEFAULT_QPR_SAMPLES,
+        help="Sequential requests per endpoint for query counting (0 disables)",
+    )
+    run.add_argument("--only", nargs="+", metavar="ENDPOINT", help="Subset of endpoint keys")
+    run.add_argument("--tenant-prefix", default="perf-", help="Slug prefix of seeded tenants")
+    run.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout seconds")
+    run.add_argument("--out", help="Write the JSON report here")
+    cmp_ = sub.add_parser("compare", help="Compare two result files")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    args = ap.parse_args(argv)
+
+    if args.command == "compare":
+        old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+        new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+        print("\n".join(compare(old, new)))
+        return 0
+
+    os.environ.setdefault("E2E_SQL_TRACE", "true")  # query counting needs the cursor proxy
+    try:
+        report = run_benchmark(
+            mode=args.mode,
+            base_url=args.base_url,
+            concurrency=args.concurrency,
+            requests_per_endpoint=args.requests,
+            warmup=args.warmup,
+            qpr_samples=args.qpr_samples,
+            only=args.only,
+            tenant_prefix=args.tenant_prefix,
+            timeout=args.timeout,
+        )
+    except (RuntimeError, ValueError) as exc:
+        print(f"[benchmark] {exc}", file=sys.stderr)
+        return 1
+    _print_report(report)
+    if args.out:
+        Path(args.out).write_text(
+            json.dumps(report, indent=2, default=str) + "\n", encoding="utf-8"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
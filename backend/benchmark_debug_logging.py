@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Per-request overhead of request-path debug logging.
+
+Simulates the diagnostic traffic of one authenticated board request
+(~25 tenant/auth/board trace lines and ~6 SQL statements) under:
+
+1. legacy:   synchronous ``print()`` plus ``logger.error(f"...")`` per line and
+             eager SQL normalization for the ``sql.execute`` debug record
+2. disabled: ``DebugCategoryGate`` with no categories enabled (production default)
+3. sampled:  every category enabled at a 1% sample rate
+4. enabled:  every category enabled; records queued to a background worker
+
+stdout and log output go to /dev/null so terminal speed does not dominate.
+
+Usage:
+  python benchmark_debug_logging.py --requests 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from log_pipeline import DebugCategoryGate  # noqa: E402
+
+_TRACE_LINES = 25
+_SQL = (
+    "SELECT a.id::text, a.status::text, a.start_ts, a.end_ts, c.name AS customer_name\n"
+    "      FROM appointments a\n      LEFT JOIN customers c ON c.id = a.customer_id\n"
+    "     WHERE a.tenant_id = %s AND a.start_ts >= %s ORDER BY a.start_ts"
+)
+_SQL_PER_REQUEST = 6
+_AUTH = {"sub": "advisor-1", "role": "Advisor", "tenant_id": "00000000-0000-0000-0000-000000000001"}
+
+
+def _legacy_request(logger: logging.Logger) -> None:
+    for i in range(_TRACE_LINES):
+        print(f"[DEBUG] maybe_auth result: {_AUTH} step={i}")
+        logger.error(f"TENANT_DEBUG: step {i} auth={_AUTH}")
+    for _ in range(_SQL_PER_REQUEST):
+        q_single = " ".join(_SQL.split())
+        logger.debug("sql.execute", extra={"sql": q_single, "vars": repr(("t", "d"))[:400]})
+
+
+def _pipeline_request(gate: DebugCategoryGate, sink: queue.Queue[Any]) -> None:
+    def debug_log(category: str, msg: str, *args: Any) -> None:
+        if not gate.allow(category):
+            return
+        try:
+            sink.put_nowait(("debug", {"category": category, "msg": msg, "args": args}))
+        except queue.Full:
+            pass
+
+    for i in range(_TRACE_LINES):
+        debug_log("tenant", "maybe_auth result: %s step=%s", _AUTH, i)
+    for _ in range(_SQL_PER_REQUEST):
+        if gate.enabled("sql"):
+            debug_log("sql", "execute sql=%s vars=%s", " ".join(_SQL.split()), ("t", "d"))
+
+
+def _drain(sink: queue.Queue[Any], logger: logging.Logger) -> None:
+    while True:
+        level, payload = sink.get()
+        if level == "__stop__":
+            return
+        logger.debug("debug.%s " + payload["msg"], payload["category"], *payload["args"])
+
+
+def _time(fn: Callable[[], Any], runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1_000_000.0)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    samples_sorted = sorted(samples)
+    return {
+        "runs": len(samples),
+        "avg_us": round(sum(samples_sorted) / len(samples_sorted), 2),
+        "median_us": round(statistics.median(samples_sorted), 2),
+        "p95_us": round(samples_sorted[max(0, int(len(samples_sorted) * 0.95) - 1)], 2),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--requests", type=int, default=2000, help="Simulated requests (default: %(default)s)"
+    )
+    ap.add_argument("--json", action="store_true", help="Output JSON summary only")
+    args = ap.parse_args()
+
+    devnull = open(os.devnull, "w")
+    logger = logging.getLogger("bench.api")
+    logger.propagate = False
+    logger.addHandler(logging.StreamHandler(devnull))
+    logger.setLevel(logging.DEBUG)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with contextlib.redirect_stdout(devnull):
+        results["legacy"] = summarize(_time(lambda: _legacy_request(logger), args.requests))
+
+    for label, env in (
+        ("disabled", {}),
+        ("sampled_1pct", {"DEBUG_LOG_CATEGORIES": "*", "DEBUG_LOG_SAMPLE_RATE": "0.01"}),
+        ("enabled", {"DEBUG_LOG_CATEGORIES": "*"}),
+    ):
+        gate = DebugCategoryGate(env=env)
+        sink: queue.Queue[Any] = queue.Queue(maxsize=1024)
+        worker = threading.Thread(target=_drain, args=(sink, logger), daemon=True)
+        worker.start()
+        results[label] = summarize(
+            _time(lambda gate=gate, sink=sink: _pipeline_request(gate, sink), args.requests)
+        )
+        sink.put(("__stop__", None))
+        worker.join()
+
+    base = results["legacy"]["median_us"]
+    for label, res in results.items():
+        res["saved_us_vs_legacy"] = round(base - res["median_us"], 2)
+
+    if args.json:
+        print(json.dumps({"requests": args.requests, "results": results}, indent=2))
+    else:
+        print(
+            f"[benchmark] requests={args.requests} trace_lines={_TRACE_LINES}"
+            f" sql={_SQL_PER_REQUEST}"
+        )
+        for k, v in results.items():
+            print(
+                f"{k}: median={v['median_us']}us p95={v['p95_us']}us "
+                f"saved={v['saved_us_vs_legacy']}us/request"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Benchmark concurrent payments against one invoice: row-lock vs ledger mode.
+
+Each worker thread records ``--payments`` small payments through
+``invoice_service.record_payment_for_invoice``; ``locked`` uses the original
+SELECT ... FOR UPDATE path and ``ledger`` the append + atomic increment path
+(migrations/20250921_022_payment_ledger.sql must be applied). A sampler
+connection polls pg_stat_activity every ``--sample-ms`` and counts backends
+waiting on a heavyweight lock, which gives the lock-wait time per mode.
+
+Point it at a scratch invoice whose amount due covers
+threads * payments * amount-cents for every mode run; the invoice is paid
+down for real.
+
+Usage:
+  python backend/benchmark_payment_contention.py --invoice-id <id> \
+      --threads 8 --payments 25 --mode both
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+try:
+    from backend import invoice_service
+    from backend import local_server as srv
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import invoice_service  # type: ignore
+    import local_server as srv  # type: ignore
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    samples_sorted = sorted(samples)
+    return {
+        "runs": len(samples),
+        "avg_ms": round(sum(samples_sorted) / len(samples_sorted), 2),
+        "median_ms": round(statistics.median(samples_sorted), 2),
+        "min_ms": round(samples_sorted[0], 2),
+        "max_ms": round(samples_sorted[-1], 2),
+        "p95_ms": (
+            round(samples_sorted[int(len(samples_sorted) * 0.95) - 1], 2)
+            if len(samples_sorted) >= 2
+            else round(samples_sorted[0], 2)
+        ),
+    }
+
+
+def amount_due(invoice_id: str) -> int:
+    conn = srv.db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT amount_due_cents FROM invoices WHERE id = %s", (invoice_id,))
+            row = cur.fetchone()
+    finally:
+        conn.close()
+    if not row:
+        raise SystemExit(f"invoice {invoice_id} not found")
+    return int(row["amount_due_cents"] if isinstance(row, dict) else row[0])
+
+
+class LockWaitSampler(threading.Thread):
+    """Polls pg_stat_activity; waiting backends x interval approximates lock wait."""
+
+    def __init__(self, interval_ms: float):
+        super().__init__(daemon=True)
+        self.interval = interval_ms / 1000.0
+        self.waiting_samples = 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        conn = srv.db_conn()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                while not self._done.is_set():
+                    cur.execute(
+                        "SELECT count(*) FROM pg_stat_activity"
+                        " WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                    )
+                    row = cur.fetchone()
+                    self.waiting_samples += int(row["count"] if isinstance(row, dict) else row[0])
+                    time.sleep(self.interval)
+        finally:
+            conn.close()
+
+    def stop(self) -> float:
+        self._done.set()
+        self.join()
+        return round(self.waiting_samples * self.interval * 1000.0, 1)
+
+
+def run_mode(mode: str, args) -> Dict[str, Any]:
+    needed = args.threads * args.payments * args.amount_cents
+    if amount_due(args.invoice_id) < needed:
+        raise SystemExit(f"invoice {args.invoice_id} has less than {needed} cents due")
+    samples: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def worker() -> None:
+        for _ in range(args.payments):
+            start = time.perf_counter()
+            try:
+                invoice_service.record_payment_for_invoice(
+                    args.invoice_id,
+                    amount_cents=args.amount_cents,
+                    method=args.method,
+                    note="benchmark",
+                    idempotency_key=str(uuid.uuid4()) if mode == "ledger" else None,
+                    ledger=mode == "ledger",
+                )
+            except Exception as e:  # keep going; report at the end
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                samples.append((time.perf_counter() - start) * 1000.0)
+
+    sampler = LockWaitSampler(args.sample_ms)
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_ms = (time.perf_counter() - started) * 1000.0
+    result: Dict[str, Any] = summarize(samples) if samples else {"runs": 0}
+    result.update(
+        {
+            "lock_wait_ms": sampler.stop(),
+            "wall_ms": round(wall_ms, 1),
+            "payments_per_sec": round(len(samples) / (wall_ms / 1000.0), 1),
+            "errors": len(errors),
+        }
+    )
+    if errors:
+        print(f"[warn] {mode}: {len(errors)} errors, first: {errors[0]}", file=sys.stderr)
+    return result
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--invoice-id", required=True, help="scratch invoice to pay down")
+    ap.add_argument("--mode", choices=["locked", "ledger", "both"], default="both")
+    ap.add_argument(
+        "--threads", type=int, default=8, help="concurrent writers (default: %(default)s)"
+    )
+    ap.add_argument(
+        "--payments", type=int, default=25, help="payments per thread (default: %(default)s)"
+    )
+    ap.add_argument(
+        "--amount-cents", type=int, default=1, help="per payment (default: %(default)s)"
+    )
+    ap.add_argument("--method", default="cash", help="payment method (default: %(default)s)")
+    ap.add_argument(
+        "--sample-ms", type=float, default=2.0, help="lock sampler interval (default: %(default)s)"
+    )
+    ap.add_argument("--json", action="store_true", help="Output JSON summary only")
+    args = ap.parse_args()
+
+    modes = ["locked", "ledger"] if args.mode == "both" else [args.mode]
+    results = {mode: run_mode(mode, args) for mode in modes}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("\n=== Summary ===")
+        for k, v in results.items():
+            print(
+                f"{k}: avg={v.get('avg_ms')}ms p95={v.get('p95_ms')}ms "
+                f"lock_wait={v['lock_wait_ms']}ms throughput={v['payments_per_sec']}/s "
+                f"runs={v['runs']} errors={v['errors']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
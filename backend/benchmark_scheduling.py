@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Slot finder benchmark: per-candidate conflict checks vs ScheduleSnapshot.
+
+Synthetic shop of 50 technicians over 30 days (3-5 jobs per tech per shop
+day, a few carryover jobs), all in memory so only the search itself is
+measured.
+
+Scenarios:
+1. free_techs   which techs are free for 2h at 200 random start times
+2. first_slots  first 10 bookable 2h slots for a vehicle over the 30 days
+3. windows      free windows >= 1h for every tech over the 30 days
+
+"naive" reproduces the find_conflicts approach: every candidate (tech, start)
+is checked against that tech's appointments with a linear overlap scan.
+"snapshot" builds a ScheduleSnapshot (included in the timing, as on every
+request) and uses its bisect-backed interval indexes; "query" reuses a
+prebuilt snapshot. The naive first-slots search stops at the first free
+slots, so building the snapshot dominates that scenario.
+
+Usage:
+  python benchmark_scheduling.py --runs 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from conflict_engine import block_end  # noqa: E402
+from scheduling_service import ScheduleSnapshot, _open_windows  # noqa: E402
+
+BASE = datetime(2025, 3, 3, tzinfo=timezone.utc)
+DAYS = 30
+TECHS = 50
+HOURS = (8, 18)
+DURATION = timedelta(hours=2)
+STEP = timedelta(minutes=15)
+
+
+def _dataset(seed: int = 7):
+    rng = random.Random(seed)
+    techs = [
+        {"id": f"{i:08d}-0000-0000-0000-000000000000", "name": f"Tech {i}"} for i in range(TECHS)
+    ]
+    rows: List[Dict[str, Any]] = []
+    for day in range(DAYS):
+        for t in techs:
+            cursor = BASE + timedelta(days=day, hours=HOURS[0])
+            for _ in range(rng.randint(3, 5)):
+                cursor += timedelta(minutes=rng.choice((0, 15, 30, 60)))
+                length = timedelta(minutes=rng.choice((30, 60, 90, 120)))
+                rows.append(
+                    {
+                        "tech_id": t["id"],
+                        "vehicle_id": str(rng.randint(1, 4000)),
+                        "start_ts": cursor,
+                        "end_ts": cursor + length,
+                        "status": "SCHEDULED",
+                    }
+                )
+                cursor += length
+    for t in techs[:5]:
+        rows.append(
+            {
+                "tech_id": t["id"],
+                "vehicle_id": "carry",
+                "start_ts": BASE - timedelta(days=1),
+                "end_ts": BASE - timedelta(days=1, hours=-2),
+                "status": "IN_PROGRESS",
+            }
+        )
+    return techs, rows
+
+
+def _overlaps(rows, start, end) -> bool:
+    for r in rows:
+        if r["start_ts"] < end and start < block_end(r["start_ts"], r["end_ts"]):
+            return True
+    return False
+
+
+def _naive_by_tech(rows):
+    by_tech: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        by_tech.setdefault(r["tech_id"], []).append(r)
+    return by_tech
+
+
+def naive_free_techs(techs, rows, starts):
+    by_tech = _naive_by_tech(rows)
+    return [
+        [t["id"] for t in techs if not _overlaps(by_tech.get(t["id"], []), s, s + DURATION)]
+        for s in starts
+    ]
+
+
+def naive_first_slots(techs, rows, vehicle_id, limit=10):
+    by_tech = _naive_by_tech(rows)
+    vehicle_rows = [r for r in rows if r["vehicle_id"] == vehicle_id]
+    slots = []
+    for lo, hi in _open_windows(BASE, BASE + timedelta(days=DAYS), HOURS):
+        t = lo
+        while t + DURATION <= hi and len(slots) < limit:
+            if not _overlaps(vehicle_rows, t, t + DURATION):
+                free = [
+                    x["id"]
+                    for x in techs
+                    if not _overlaps(by_tech.get(x["id"], []), t, t + DURATION)
+                ]
+                if free:
+                    slots.append((t, free))
+            t += STEP
+    return slots
+
+
+def naive_windows(techs, rows):
+    by_tech = _naive_by_tech(rows)
+    out = {}
+    for x in techs:
+        gaps = []
+        for lo, hi in _open_windows(BASE, BASE + timedelta(days=DAYS), HOURS):
+            t, start = lo, None
+            while t < hi:
+                free = not _overlaps(by_tech.get(x["id"], []), t, t + STEP)
+                if free and start is None:
+                    start = t
+                if not free and start is not None:
+                    gaps.append((start, t))
+                    start = None
+                t += STEP
+            if start is not None:
+                gaps.append((start, hi))
+        out[x["id"]] = [g for g in gaps if g[1] - g[0] >= timedelta(hours=1)]
+    return out
+
+
+def _snapshot(techs, rows, vehicle_id=None):
+    return ScheduleSnapshot(
+        BASE,
+        BASE + timedelta(days=DAYS),
+        techs,
+        rows,
+        vehicle_id=vehicle_id,
+        as_of=BASE - timedelta(days=2),
+        hours=HOURS,
+    )
+
+
+def _time(fn: Callable[[], Any], runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    samples_sorted = sorted(samples)
+    return {
+        "runs": len(samples),
+        "avg_ms": round(sum(samples_sorted) / len(samples_sorted), 3),
+        "median_ms": round(statistics.median(samples_sorted), 3),
+        "p95_ms": round(samples_sorted[max(0, int(len(samples_sorted) * 0.95) - 1)], 3),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=20, help="Runs per scenario (default: %(default)s)")
+    ap.add_argument("--json", action="store_true", help="Output JSON summary only")
+    args = ap.parse_args()
+
+    techs, rows = _dataset()
+    rng = random.Random(11)
+    starts = [
+        BASE + timedelta(days=rng.randrange(DAYS), hours=8, minutes=15 * rng.randrange(32))
+        for _ in range(200)
+    ]
+    vehicle_id = rows[len(rows) // 3]["vehicle_id"]
+
+    prebuilt = _snapshot(techs, rows)
+    prebuilt_vehicle = _snapshot(techs, rows, vehicle_id)
+
+    def free_techs(snap):
+        return [snap.free_techs(s, DURATION) for s in starts]
+
+    def first_slots(snap):
+        return [(s["start"], s["tech_ids"]) for s in snap.candidate_slots(DURATION, 10, step=STEP)]
+
+    def windows(snap):
+        return snap.free_windows(timedelta(hours=1))
+
+    scenarios = {
+        "free_techs_200_starts": (
+            lambda: naive_free_techs(techs, rows, starts),
+            lambda: free_techs(_snapshot(techs, rows)),
+            lambda: free_techs(prebuilt),
+        ),
+        "first_10_slots_vehicle": (
+            lambda: naive_first_slots(techs, rows, vehicle_id),
+            lambda: first_slots(_snapshot(techs, rows, vehicle_id)),
+            lambda: first_slots(prebuilt_vehicle),
+        ),
+        "windows_all_techs": (
+            lambda: naive_windows(techs, rows),
+            lambda: windows(_snapshot(techs, rows)),
+            lambda: windows(prebuilt),
+        ),
+    }
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for label, (naive, snap, query) in scenarios.items():
+        # Sanity check: both paths agree
+        expected, got = naive(), snap()
+        if label == "free_techs_200_starts":
+            expected = [sorted(x) for x in expected]
+        assert expected == got, label
+        naive_s = _time(naive, args.runs)
+        snap_s = _time(snap, args.runs)
+        query_s = _time(query, args.runs)
+        results[label] = {
+            "naive": summarize(naive_s),
+            "snapshot": summarize(snap_s),
+            "query": summarize(query_s),
+        }
+        results[label]["speedup"] = round(
+            results[label]["naive"]["median_ms"]
+            / max(results[label]["snapshot"]["median_ms"], 1e-6),
+            2,
+        )
+
+    meta = {"techs": TECHS, "days": DAYS, "appointments": len(rows)}
+    if args.json:
+        print(json.dumps({**meta, "results": results}, indent=2))
+    else:
+        print(f"[benchmark] techs={TECHS} days={DAYS} appointments={len(rows)} runs={args.runs}")
+        for k, v in results.items():
+            print(
+                f"{k}: naive median={v['naive']['median_ms']}ms p95={v['naive']['p95_ms']}ms | "
+                f"snapshot median={v['snapshot']['median_ms']}ms "
+                f"p95={v['snapshot']['p95_ms']}ms | query median={v['query']['median_ms']}ms | "
+                f"speedup={v['speedup']}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
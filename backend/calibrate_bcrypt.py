@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""Pick BCRYPT_ROUNDS for this host.
+
+Times bcrypt at increasing cost factors and prints the highest one whose
+median hash time fits the target (see app/security/password_pool.calibrate).
+Run it on the production instance type and export the printed value.
+
+Usage:
+  python calibrate_bcrypt.py --target-ms 250
+  python calibrate_bcrypt.py --target-ms 150 --samples 5 --json
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from app.security.password_pool import main  # noqa: E402
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
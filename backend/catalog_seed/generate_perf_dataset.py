@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""Synthetic production-scale dataset for load benchmarks.
+
+Seeds N tenants, each with customers, vehicles, technicians, appointments and
+invoices (one line item per completed appointment), on top of the service
+catalog from ``service_catalog_master.csv``. The catalog is applied first with
+the same upsert statements generate_seed_v2.py writes, and appointments
+reference those operation ids and prices.
+
+Rows are a pure function of the arguments (``--seed`` and an explicit
+``--anchor`` date), so two machines seeding the same arguments benchmark the
+same data. Customer / vehicle / appointment ids come from blocks reserved on
+each table's sequence; invoice ids are uuid5 values.
+
+Loading: every table is COPYed into a temp staging table and moved with one
+INSERT ... SELECT per tenant while ``app.tenant_id`` is set, so forced
+row-level security applies exactly as it does for the app. Technicians are
+packed into back-to-back jobs that never overlap, and a vehicle has at most one
+appointment per day, so the double-booking exclusion constraints hold. Each
+tenant also gets a ``perf-bench`` staff membership (Owner) for the benchmark
+harness (benchmark_api_load.py) to sign its tokens with.
+
+Environment (any one of):
+  DB_DSN (full psycopg2 DSN) OR individual PGHOST / PGPORT / PGUSER / PGPASSWORD / PGDATABASE.
+
+Examples:
+  python generate_perf_dataset.py --tenants 3 --customers 5000 --appointments 40000
+  python generate_perf_dataset.py --tenants 1 --customers 200 --appointments 1000 --replace
+
+Exit codes: 0 seeded (or already present), 1 usage / connection / load error.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import psycopg2
+except Exception:  # pragma: no cover - module resolution error surfaced in runtime logs
+    psycopg2 = None  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from generate_seed_v2 import generate_insert, load_rows, row_to_values  # noqa: E402
+
+LOGGER = logging.getLogger("perf_dataset")
+_handler = logging.StreamHandler(sys.stderr)
+_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+LOGGER.addHandler(_handler)
+LOGGER.setLevel(logging.INFO)
+
+CATALOG_CSV = Path(__file__).resolve().parent / "service_catalog_master.csv"
+NAMESPACE = uuid.UUID("6f1d3c52-58a4-4c8e-9b0e-3f1c2f6f0a11")
+SLUG_PREFIX = "perf"
+BENCH_STAFF_ID = "perf-bench"
+SHOP_HOURS = (8, 18)
+JOB_MINUTES = (30, 60, 60, 90, 120, 180)
+GAP_MINUTES = (0, 0, 15, 30, 60)
+TAX_BASIS_POINTS = 825
+
+FIRST_NAMES = (
+    "James Maria Robert Linda Michael Patricia David Jennifer William Elizabeth Carlos "
+    "Sofia Jose Ana Daniel Laura Kevin Grace Brian Nora Omar Priya Wei Mei Tomas Ines"
+).split()
+LAST_NAMES = (
+    "Smith Garcia Johnson Martinez Brown Lopez Davis Gonzalez Miller Wilson Anderson "
+    "Hernandez Thomas Moore Lee Nguyen Patel Kim Chen Rivera Walker Young Hall Ramirez"
+).split()
+MAKES = {
+    "Toyota": ("Camry", "Corolla", "RAV4", "Tacoma", "Prius"),
+    "Honda": ("Civic", "Accord", "CR-V", "Pilot"),
+    "Ford": ("F-150", "Escape", "Explorer", "Mustang"),
+    "Chevrolet": ("Silverado", "Malibu", "Equinox"),
+    "Nissan": ("Altima", "Rogue", "Sentra"),
+    "Tesla": ("Model 3", "Model Y"),
+    "Subaru": ("Outback", "Forester"),
+}
+VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+
+# Columns the app itself writes (appointment_import.py, invoice_service.py)
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "customers": ("id", "name", "phone", "email", "is_vip", "created_at", "tenant_id"),
+    "vehicles": (
+        "id",
+        "customer_id",
+        "year",
+        "make",
+        "model",
+        "license_plate",
+        "vin",
+        "mileage",
+        "is_active",
+        "total_services",
+        "tenant_id",
+    ),
+    "appointments": (
+        "id",
+        "status",
+        "start_ts",
+        "end_ts",
+        "total_amount",
+        "paid_amount",
+        "customer_id",
+        "vehicle_id",
+        "notes",
+        "location_address",
+        "primary_operation_id",
+        "service_category",
+        "tech_id",
+        "check_in_at",
+        "check_out_at",
+        "created_at",
+        "tenant_id",
+    ),
+    "appointment_vehicles": ("appointment_id", "vehicle_id", "mileage_at_service"),
+    "invoices": (
+        "id",
+        "appointment_id",
+        "customer_id",
+        "vehicle_id",
+        "status",
+        "currency",
+        "subtotal_cents",
+        "tax_cents",
+        "total_cents",
+        "amount_paid_cents",
+        "amount_due_cents",
+        "issued_at",
+        "paid_at",
+        "created_at",
+        "updated_at",
+        "tenant_id",
+    ),
+    "invoice_line_items": (
+        "id",
+        "invoice_id",
+        "position",
+        "service_operation_id",
+        "name",
+        "description",
+        "quantity",
+        "unit_price_cents",
+        "line_subtotal_cents",
+        "tax_rate_basis_points",
+        "tax_cents",
+        "total_cents",
+        "created_at",
+        "tenant_id",
+    ),
+}
+LOAD_ORDER = tuple(COLUMNS)
+SEQUENCED = ("customers", "vehicles", "appointments")
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Per-tenant sizes; every tenant gets the same shape with different rows."""
+
+    tenants: int = 3
+    customers: int = 2000
+    max_vehicles: int = 3
+    technicians: int = 12
+    appointments: int = 20000
+    history_days: int = 365
+    future_days: int = 21
+    seed: int = 7
+    anchor: date = field(default_factory=lambda: datetime.now(timezone.utc).date())
+
+    def manifest(self) -> Dict[str, object]:
+        out = asdict(self)
+        out["anchor"] = self.anchor.isoformat()
+        return out
+
+
+@dataclass
+class TenantData:
+    tenant_id: str
+    slug: str
+    name: str
+    technicians: List[Tuple[str, str, str]]
+    rows: Dict[str, List[tuple]]
+
+    def counts(self) -> Dict[str, int]:
+        return {"technicians": len(self.technicians), **{k: len(v) for k, v in self.rows.items()}}
+
+
+def tenant_id_for(spec: DatasetSpec, index: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"tenant:{spec.seed}:{index}"))
+
+
+def tenant_slug(spec: DatasetSpec, index: int) -> str:
+    return f"{SLUG_PREFIX}-{spec.seed}-{index}"
+
+
+def load_catalog(path: Path = CATALOG_CSV) -> List[Dict[str, object]]:
+    """Active catalog operations as dicts with id, name, category, price_cents, hours."""
+    ops = []
+    for r in load_rows(str(path)):
+        vals = row_to_values(r)
+        if vals["is_active"] != "true":
+            continue
+        ops.append(
+            {
+                "id": vals["id"],
+                "name": vals["name"],
+                "category": vals["category"],
+                "price_cents": int(float(r["default_price_cents"])),
+                "hours": float(vals["typical_hours"]),
+            }
+        )
+    return ops
+
+
+def catalog_statements(path: Path = CATALOG_CSV) -> List[str]:
+    return [
+        generate_insert(row_to_values(r), pretty=False, upsert=True) for r in load_rows(str(path))
+    ]
+
+
+def _vin(rng: random.Random) -> str:
+    return "".join(rng.choice(VIN_CHARS) for _ in range(17))
+
+
+def _workdays(spec: DatasetSpec) -> List[date]:
+    first = spec.anchor - timedelta(days=spec.history_days)
+    days = (first + timedelta(days=i) for i in range(spec.history_days + spec.future_days + 1))
+    return [d for d in days if d.weekday() < 6]  # Mon-Sat
+
+
+def _tech_slots(rng: random.Random, days: Sequence[date], techs: int) -> List[tuple]:
+    """Back-to-back (day, tech, start, end) jobs inside shop hours; never overlapping."""
+    slots = []
+    for day in days:
+        open_at = datetime(day.year, day.month, day.day, SHOP_HOURS[0], tzinfo=timezone.utc)
+        close_at = open_at.replace(hour=SHOP_HOURS[1])
+        for tech in range(techs):
+            cursor = open_at
+            while True:
+                cursor += timedelta(minutes=rng.choice(GAP_MINUTES))
+                end = cursor + timedelta(minutes=rng.choice(JOB_MINUTES))
+                if end > close_at:
+                    break
+                slots.append((day, tech, cursor, end))
+                cursor = end
+    return slots
+
+
+def _status(rng: random.Random, day: date, anchor: date) -> str:
+    if day > anchor:
+        return "SCHEDULED"
+    if day == anchor:
+        return rng.choice(("SCHEDULED", "SCHEDULED", "IN_PROGRESS", "READY", "COMPLETED"))
+    roll = rng.random()
+    if roll < 0.06:
+        return "CANCELED"
+    if roll < 0.10:
+        return "NO_SHOW"
+    return "COMPLETED"
+
+
+def generate_tenant(
+    spec: DatasetSpec,
+    index: int,
+    catalog: Sequence[Dict[str, object]],
+    id_base: Optional[Dict[str, int]] = None,
+) -> TenantData:
+    """Rows for tenant ``index``; ``id_base`` offsets the sequence-backed ids."""
+    if not catalog:
+        raise ValueError("service catalog is empty")
+    base = {t: 0 for t in SEQUENCED}
+    base.update(id_base or {})
+    rng = random.Random(f"{spec.seed}:{index}")
+    tid = tenant_id_for(spec, index)
+    ts = lambda dt: dt.isoformat()  # noqa: E731
+
+    technicians = [
+        (
+            str(uuid.uuid5(NAMESPACE, f"tech:{tid}:{k}")),
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            f"P{spec.seed}T{index}N{k}",
+        )
+        for k in range(spec.technicians)
+    ]
+
+    customers, vehicles = [], []
+    created_floor = datetime.combine(
+        spec.anchor - timedelta(days=spec.history_days + 365), datetime.min.time(), timezone.utc
+    )
+    for c in range(1, spec.customers + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        customers.append(
+            (
+                base["customers"] + c,
+                f"{first} {last}",
+                f"555{index % 10}{c:06d}",
+                f"{first.lower()}.{last.lower()}.{index}.{c}@perf.example.com",
+                rng.random() < 0.05,
+                ts(created_floor + timedelta(minutes=rng.randrange(365 * 24 * 60))),
+                tid,
+            )
+        )
+        for _ in range(rng.randint(1, spec.max_vehicles)):
+            make = rng.choice(sorted(MAKES))
+            vehicles.append(
+                [
+                    base["vehicles"] + len(vehicles) + 1,
+                    base["customers"] + c,
+                    rng.randint(2004, spec.anchor.year),
+                    make,
+                    rng.choice(MAKES[make]),
+                    f"P{index}{len(vehicles) + 1:06d}",
+                    _vin(rng),
+                    rng.randint(5_000, 180_000),
+                    True,
+                    0,
+                    tid,
+                ]
+            )
+
+    slots = _tech_slots(rng, _workdays(spec), spec.technicians)
+    if len(slots) < spec.appointments:
+        raise ValueError(
+            f"only {len(slots)} technician slots for {spec.appointments} appointments; "
+            "raise --technicians or --history-days"
+        )
+    chosen = sorted(rng.sample(range(len(slots)), spec.appointments))
+
+    appointments, links, invoices, items = [], [], [], []
+    booked_days = set()
+    for n, slot_index in enumerate(chosen, start=1):
+        day, tech, start, end = slots[slot_index]
+        # Skewed: a minority of vehicles carries most of the history (fleet customers)
+        v = int(len(vehicles) * rng.random() ** 2)
+        for _ in range(len(vehicles)):
+            if (v, day) not in booked_days:
+                break
+            v = (v + 1) % len(vehicles)
+        else:
+            continue
+        booked_days.add((v, day))
+        vehicle = vehicles[v]
+        vehicle[9] += 1
+        op = rng.choice(catalog)
+        status = _status(rng, day, spec.anchor)
+        appt_id = base["appointments"] + n
+        subtotal = int(op["price_cents"])
+        tax = round(subtotal * TAX_BASIS_POINTS / 10_000)
+        total = subtotal + tax
+        paid = 0
+        if status == "COMPLETED":
+            paid = total if rng.random() < 0.9 else total // 2
+        created = start - timedelta(days=rng.randint(1, 30))
+        done = status in ("IN_PROGRESS", "READY", "COMPLETED")
+        appointments.append(
+            (
+                appt_id,
+                status,
+                ts(start),
+                ts(end),
+                f"{total / 100:.2f}",
+                f"{paid / 100:.2f}",
+                vehicle[1],
+                vehicle[0],
+                None,
+                None,
+                op["id"],
+                op["category"],
+                technicians[tech][0],
+                ts(start) if done else None,
+                ts(end) if status == "COMPLETED" else None,
+                ts(created),
+                tid,
+            )
+        )
+        links.append((appt_id, vehicle[0], vehicle[7] + n))
+        if status != "COMPLETED":
+            continue
+        inv_id = str(uuid.uuid5(NAMESPACE, f"invoice:{tid}:{n}"))
+        invoices.append(
+            (
+                inv_id,
+                appt_id,
+                vehicle[1],
+                vehicle[0],
+                "PAID" if paid == total else "PARTIALLY_PAID",
+                "USD",
+                subtotal,
+                tax,
+                total,
+                paid,
+                total - paid,
+                ts(end),
+                ts(end) if paid == total else None,
+                ts(end),
+                ts(end),
+                tid,
+            )
+        )
+        items.append(
+            (
+                str(uuid.uuid5(NAMESPACE, f"line:{tid}:{n}")),
+                inv_id,
+                0,
+                op["id"],
+                op["name"],
+                None,
+                1,
+                subtotal,
+                subtotal,
+                TAX_BASIS_POINTS,
+                tax,
+                total,
+                ts(end),
+                tid,
+            )
+        )
+
+    return TenantData(
+        tenant_id=tid,
+        slug=tenant_slug(spec, index),
+        name=f"Perf Shop {spec.seed}-{index}",
+        technicians=technicians,
+        rows={
+            "customers": customers,
+            "vehicles": [tuple(v) for v in vehicles],
+            "appointments": appointments,
+            "appointment_vehicles": links,
+            "invoices": invoices,
+            "invoice_line_items": items,
+        },
+    )
+
+
+def _csv_buffer(rows: Sequence[tuple]) -> io.StringIO:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["\\N" if v is None else v for v in row])
+    buf.seek(0)
+    return buf
+
+
+def _reserve_ids(cur, table: str, count: int) -> int:
+    """Reserve ``count`` ids on the table's sequence; returns base (ids are base+1..base+count)."""
+    cur.execute(
+        "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+        "nextval(pg_get_serial_sequence(%s, 'id')) + %s) - %s - 1",
+        (table, table, count, count),
+    )
+    return int(cur.fetchone()[0])
+
+
+def _copy_table(cur, table: str, rows: Sequence[tuple]) -> None:
+    if not rows:
+        return
+    cols = ", ".join(COLUMNS[table])
+    stage = f"perf_stage_{table}"
+    cur.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {stage} "
+        f"ON COMMIT DROP AS SELECT {cols} FROM {table} WITH NO DATA"
+    )
+    cur.copy_expert(
+        f"COPY {stage} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", _csv_buffer(rows)
+    )
+    cur.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {stage}")  # nosec B608
+    cur.execute(f"TRUNCATE {stage}")
+
+
+def _tenant_exists(cur, slug: str) -> bool:
+    cur.execute("SELECT 1 FROM tenants WHERE slug = %s", (slug,))
+    return cur.fetchone() is not None
+
+
+def _purge_tenant(cur, tenant_id: str) -> None:
+    cur.execute("SELECT set_config('app.tenant_id', %s, true)", (tenant_id,))
+    cur.execute(
+        "DELETE FROM appointment_vehicles WHERE appointment_id IN "
+        "(SELECT id FROM appointments WHERE tenant_id = %s)",
+        (tenant_id,),
+    )
+    for table in ("invoice_line_items", "invoices", "appointments", "vehicles", "customers"):
+        cur.execute(f"DELETE FROM {table} WHERE tenant_id = %s", (tenant_id,))  # nosec B608
+
+
+def load_tenant(conn, spec: DatasetSpec, index: int, catalog, replace: bool = False) -> Dict:
+    """Seed one tenant in its own transaction. Returns row counts (empty when skipped)."""
+    slug = tenant_slug(spec, index)
+    with conn.cursor() as cur:
+        if _tenant_exists(cur, slug):
+            if not replace:
+                LOGGER.info("tenant %s already seeded; skipping (use --replace)", slug)
+                conn.rollback()
+                return {}
+            _purge_tenant(cur, tenant_id_for(spec, index))
+        sizes = {"customers": spec.customers, "vehicles": spec.customers * spec.max_vehicles}
+        sizes["appointments"] = spec.appointments
+        data = generate_tenant(
+            spec, index, catalog, {t: _reserve_ids(cur, t, n) for t, n in sizes.items()}
+        )
+        cur.execute(
+            "INSERT INTO tenants (id, slug, name, plan, status) "
+            "VALUES (%s, %s, %s, 'pro', 'active') ON CONFLICT (id) DO NOTHING",
+            (data.tenant_id, data.slug, data.name),
+        )
+        cur.execute(
+            "INSERT INTO staff_tenant_memberships (staff_id, tenant_id, role) "
+            "VALUES (%s, %s, 'Owner') ON CONFLICT DO NOTHING",
+            (BENCH_STAFF_ID, data.tenant_id),
+        )
+        cur.execute("SELECT set_config('app.tenant_id', %s, true)", (data.tenant_id,))
+        cur.executemany(
+            "INSERT INTO technicians (id, name, initials) VALUES (%s, %s, %s) "
+            "ON CONFLICT (id) DO NOTHING",
+            data.technicians,
+        )
+        for table in LOAD_ORDER:
+            _copy_table(cur, table, data.rows[table])
+    conn.commit()
+    return data.counts()
+
+
+def seed(conn, spec: DatasetSpec, replace: bool = False, with_catalog: bool = True) -> Dict:
+    """Apply the catalog, then every tenant. Returns the manifest written to --manifest."""
+    catalog = load_catalog()
+    if with_catalog:
+        with conn.cursor() as cur:
+            for stmt in catalog_statements():
+                cur.execute(stmt)
+        conn.commit()
+    tenants = []
+    for index in range(spec.tenants):
+        t0 = time.perf_counter()
+        counts = load_tenant(conn, spec, index, catalog, replace=replace)
+        elapsed = round(time.perf_counter() - t0, 2)
+        if counts:
+            LOGGER.info("seeded %s in %ss: %s", tenant_slug(spec, index), elapsed, counts)
+        tenants.append(
+            {
+                "tenant_id": tenant_id_for(spec, index),
+                "slug": tenant_slug(spec, index),
+                "rows": counts,
+                "seconds": elapsed,
+            }
+        )
+    return {"spec": spec.manifest(), "catalog_operations": len(catalog), "tenants": tenants}
+
+
+def build_dsn() -> Optional[str]:
+    if os.getenv("DB_DSN"):
+        return os.getenv("DB_DSN")
+    parts = {
+        "host": os.getenv("PGHOST"),
+        "port": os.getenv("PGPORT"),
+        "user": os.getenv("PGUSER"),
+        "password": os.getenv("PGPASSWORD"),
+        "dbname": os.getenv("PGDATABASE"),
+    }
+    if not parts["host"]:
+        return None
+    return " ".join(f"{k}={v}" for k, v in parts.items() if v)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    d = DatasetSpec()
+    ap = argparse.ArgumentParser(description="Seed a synthetic production-scale dataset")
+    ap.add_argument("--tenants", type=int, default=d.tenants)
+    ap.add_argument("--customers", type=int, default=d.customers, help="Per tenant")
+    ap.add_argument("--max-vehicles", type=int, default=d.max_vehicles, help="Per customer")
+    ap.add_argument("--technicians", type=int, default=d.technicians, help="Per tenant")
+    ap.add_argument("--appointments", type=int, default=d.appointments, help="Per tenant")
+    ap.add_argument("--history-days", type=int, default=d.history_days)
+    ap.add_argument("--future-days", type=int, default=d.future_days)
+    ap.add_argument("--seed", type=int, default=d.seed)
+    ap.add_argument(
+        "--anchor",
+        type=date.fromisoformat,
+        default=d.anchor,
+        help="'Today' of the dataset, YYYY-MM-DD (default: current UTC date)",
+    )
+    ap.add_argument("--replace", action="store_true", help="Delete and re-seed existing tenants")
+    ap.add_argument("--skip-catalog", action="store_true", help="Do not upsert the catalog")
+    ap.add_argument("--manifest", help="Write the dataset manifest JSON here")
+    return ap.parse_args(argv)
+
+
+def spec_from_args(args: argparse.Namespace) -> DatasetSpec:
+    return DatasetSpec(
+        tenants=args.tenants,
+        customers=args.customers,
+        max_vehicles=args.max_vehicles,
+        technicians=args.technicians,
+        appointments=args.appointments,
+        history_days=args.history_days,
+        future_days=args.future_days,
+        seed=args.seed,
+        anchor=args.anchor,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if psycopg2 is None:
+        LOGGER.error("psycopg2 is not installed")
+        return 1
+    dsn = build_dsn()
+    if not dsn:
+        LOGGER.error("Set DB_DSN or PGHOST/PGUSER/PGDATABASE")
+        return 1
+    spec = spec_from_args(args)
+    try:
+        conn = psycopg2.connect(dsn)
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("connection failed: %s", exc)
+        return 1
+    try:
+        manifest = seed(conn, spec, replace=args.replace, with_catalog=not args.skip_catalog)
+    except Exception as exc:  # noqa: BLE001
+        conn.rollback()
+        LOGGER.error("seed failed: %s", exc)
+        return 1
+    finally:
+        conn.close()
+    text = json.dumps(manifest, indent=2)
+    if args.manifest:
+        Path(args.manifest).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
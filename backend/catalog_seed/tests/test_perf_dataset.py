@@ -0,0 +1,79 @@
+import importlib.util
+import pathlib
+import sys
+from collections import defaultdict
+from datetime import date
+
+import pytest
+
+GEN_PATH = pathlib.Path(__file__).resolve().parents[1] / "generate_perf_dataset.py"
+spec = importlib.util.spec_from_file_location("generate_perf_dataset", GEN_PATH)
+module = importlib.util.module_from_spec(spec)
+assert spec and spec.loader
+sys.modules.setdefault("generate_perf_dataset", module)
+spec.loader.exec_module(module)
+
+SPEC = module.DatasetSpec(
+    tenants=2,
+    customers=120,
+    technicians=4,
+    appointments=1500,
+    history_days=120,
+    anchor=date(2025, 3, 3),
+)
+CATALOG = module.load_catalog()
+
+
+def _col(table, name):
+    return module.COLUMNS[table].index(name)
+
+
+def test_tenant_rows_are_deterministic_and_offset_by_id_base():
+    a = module.generate_tenant(SPEC, 0, CATALOG)
+    assert module.generate_tenant(SPEC, 0, CATALOG).rows == a.rows
+    assert module.generate_tenant(SPEC, 1, CATALOG).tenant_id != a.tenant_id
+
+    shifted = module.generate_tenant(SPEC, 0, CATALOG, {"customers": 1000, "appointments": 50})
+    assert shifted.rows["customers"][0][0] == 1001
+    assert shifted.rows["appointments"][0][0] == a.rows["appointments"][0][0] + 50
+    assert shifted.rows["vehicles"][0][1] == 1001  # vehicle -> shifted customer
+
+
+def test_appointments_respect_exclusion_constraints():
+    data = module.generate_tenant(SPEC, 0, CATALOG)
+    appts = data.rows["appointments"]
+    assert len(appts) == SPEC.appointments
+    by_tech = defaultdict(list)
+    vehicle_days = set()
+    for a in appts:
+        start, end = a[_col("appointments", "start_ts")], a[_col("appointments", "end_ts")]
+        by_tech[a[_col("appointments", "tech_id")]].append((start, end))
+        key = (a[_col("appointments", "vehicle_id")], start[:10])
+        assert key not in vehicle_days
+        vehicle_days.add(key)
+    for blocks in by_tech.values():
+        blocks.sort()
+        assert all(prev[1] <= nxt[0] for prev, nxt in zip(blocks, blocks[1:]))
+    future = [a for a in appts if a[_col("appointments", "start_ts")][:10] > "2025-03-03"]
+    assert future and {a[1] for a in future} == {"SCHEDULED"}
+
+
+def test_invoices_balance_and_match_completed_appointments():
+    data = module.generate_tenant(SPEC, 0, CATALOG)
+    completed = [a for a in data.rows["appointments"] if a[1] == "COMPLETED"]
+    assert len(data.rows["invoices"]) == len(completed) == len(data.rows["invoice_line_items"])
+    col = lambda name: _col("invoices", name)  # noqa: E731
+    for inv in data.rows["invoices"]:
+        assert inv[col("total_cents")] == inv[col("subtotal_cents")] + inv[col("tax_cents")]
+        assert (
+            inv[col("amount_due_cents")] == inv[col("total_cents")] - inv[col("amount_paid_cents")]
+        )
+        assert (inv[col("status")] == "PAID") == (inv[col("amount_due_cents")] == 0)
+
+
+def test_too_few_technician_slots_is_rejected():
+    small = module.DatasetSpec(
+        tenants=1, customers=10, technicians=1, appointments=5000, history_days=5
+    )
+    with pytest.raises(ValueError, match="technician slots"):
+        module.generate_tenant(small, 0, CATALOG)
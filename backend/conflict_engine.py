@@ -0,0 +1,172 @@
+"""Scheduling conflict engine backed by Postgres exclusion constraints.
+
+migrations/20250905_018_add_appointment_exclusion_constraints.sql maintains
+``appointments.block_range`` = ``[start_ts, COALESCE(end_ts, start_ts + 2h))``
+and adds two GiST ``EXCLUDE`` constraints (per technician, per vehicle;
+CANCELED / NO_SHOW rows excluded). Once they exist a double booking is
+rejected by the INSERT / UPDATE itself, atomically and via an index probe,
+so create / patch no longer need the query-based ``validation.find_conflicts``
+pre-checks (which race under concurrent booking).
+
+  constraints_enforced(conn)  cached pg_constraint probe; callers keep the
+                              legacy pre-checks while it is False
+  exclusion_conflict_kind(e)  "tech" / "vehicle" for an exclusion violation
+  conflicting_ids(...)        ids behind a violation (error path only)
+
+Free-slot and availability queries live in scheduling_service.
+
+Env:
+  CONFLICT_CONSTRAINT_PROBE_SECONDS  re-probe interval (default 300)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from backend.validation import DEFAULT_BLOCK_HOURS
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from validation import DEFAULT_BLOCK_HOURS  # type: ignore
+
+__all__ = [
+    "TECH_CONSTRAINT",
+    "VEHICLE_CONSTRAINT",
+    "block_end",
+    "compute_gaps",
+    "conflicting_ids",
+    "constraints_enforced",
+    "exclusion_conflict_kind",
+    "reset_probe",
+]
+
+TECH_CONSTRAINT = "appointments_tech_no_overlap"
+VEHICLE_CONSTRAINT = "appointments_vehicle_no_overlap"
+_KIND_BY_CONSTRAINT = {TECH_CONSTRAINT: "tech", VEHICLE_CONSTRAINT: "vehicle"}
+_COLUMN_BY_KIND = {"tech": "tech_id", "vehicle": "vehicle_id"}
+_EXCLUSION_VIOLATION = "23P01"
+
+_probe_lock = threading.Lock()
+_probe: Dict[str, Any] = {"value": None, "at": 0.0}
+
+
+def _probe_ttl() -> float:
+    try:
+        return float(os.getenv("CONFLICT_CONSTRAINT_PROBE_SECONDS", "300"))
+    except ValueError:
+        return 300.0
+
+
+def reset_probe() -> None:
+    with _probe_lock:
+        _probe["value"] = None
+        _probe["at"] = 0.0
+
+
+def constraints_enforced(conn) -> bool:
+    """True when both exclusion constraints exist (cached per process).
+
+    Callers probe inside their booking transaction, so the lookup runs under a
+    savepoint: a failed probe (no catalog access, mocked connection) is rolled
+    back to it, leaving the transaction usable, and counts as False so the
+    caller falls back to the query-based checks.
+    """
+    now = time.monotonic()
+    with _probe_lock:
+        if _probe["value"] is not None and now - _probe["at"] < _probe_ttl():
+            return _probe["value"]
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SAVEPOINT conflict_probe")
+            try:
+                cur.execute(
+                    "SELECT count(*) AS n FROM pg_constraint WHERE conname IN (%s, %s)",
+                    (TECH_CONSTRAINT, VEHICLE_CONSTRAINT),
+                )
+                row = cur.fetchone()
+            except Exception:
+                cur.execute("ROLLBACK TO SAVEPOINT conflict_probe")
+                return False
+            cur.execute("RELEASE SAVEPOINT conflict_probe")
+        n = row.get("n") if isinstance(row, dict) else (row[0] if row else 0)
+        value = n == 2
+    except Exception:
+        return False
+    with _probe_lock:
+        _probe["value"] = value
+        _probe["at"] = now
+    return value
+
+
+def exclusion_conflict_kind(exc: BaseException) -> Optional[str]:
+    """Return "tech" / "vehicle" when exc is one of our exclusion violations."""
+    if getattr(exc, "pgcode", None) != _EXCLUSION_VIOLATION:
+        return None
+    diag = getattr(exc, "diag", None)
+    name = getattr(diag, "constraint_name", None) if diag is not None else None
+    if name in _KIND_BY_CONSTRAINT:
+        return _KIND_BY_CONSTRAINT[name]
+    text = str(exc)
+    for constraint, kind in _KIND_BY_CONSTRAINT.items():
+        if constraint in text:
+            return kind
+    return None
+
+
+def block_end(start_ts: datetime, end_ts: Optional[datetime]) -> datetime:
+    """Effective end used by block_range (mirrors the migration trigger)."""
+    end = end_ts or (start_ts + timedelta(hours=DEFAULT_BLOCK_HOURS))
+    return max(end, start_ts)
+
+
+def conflicting_ids(
+    cur,
+    kind: str,
+    key: Any,
+    start_ts: datetime,
+    end_ts: Optional[datetime],
+    exclude_id: Any = None,
+) -> List[Any]:
+    """Ids of active appointments whose block overlaps [start_ts, end) for a tech/vehicle."""
+    column = _COLUMN_BY_KIND[kind]
+    sql = (
+        f"SELECT id FROM appointments WHERE {column} = %s "
+        "AND block_range && tstzrange(%s, %s, '[)') "
+        "AND status NOT IN ('CANCELED','NO_SHOW')"
+    )
+    params: List[Any] = [key, start_ts, block_end(start_ts, end_ts)]
+    if exclude_id is not None:
+        sql += " AND id <> %s"
+        params.append(exclude_id)
+    cur.execute(sql, params)
+    return [r.get("id") if isinstance(r, dict) else r[0] for r in cur.fetchall() or []]
+
+
+def compute_gaps(
+    busy: Iterable[Tuple[datetime, datetime]],
+    range_start: datetime,
+    range_end: datetime,
+    min_duration: timedelta = timedelta(0),
+) -> List[Tuple[datetime, datetime]]:
+    """Free intervals inside [range_start, range_end) given busy intervals.
+
+    busy need not be sorted or disjoint (legacy rows written before the
+    constraints may overlap). Gaps shorter than min_duration are dropped.
+    """
+    gaps: List[Tuple[datetime, datetime]] = []
+    cursor = range_start
+    for start, end in sorted(busy):
+        if cursor >= range_end:
+            break
+        if end <= cursor:
+            continue
+        gap_end = min(start, range_end)
+        if gap_end > cursor and gap_end - cursor >= min_duration:
+            gaps.append((cursor, gap_end))
+        cursor = max(cursor, end)
+    if cursor < range_end and range_end - cursor >= min_duration:
+        gaps.append((cursor, range_end))
+    return gaps
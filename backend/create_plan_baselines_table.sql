@@ -1,20 +1,34 @@
 -- DDL: plan_baselines table (Phase B - Plan Regression Detection)
--- Stores stable normalized plan signature metrics.
--- Adjust types if needed for target Postgres version.
+-- Stores stable plan shape signatures and latency distributions per hot query.
+-- run_plan_baseline_snapshot.py applies the same statements on startup.
 
 CREATE TABLE IF NOT EXISTS plan_baselines (
-    query_key TEXT PRIMARY KEY,              -- logical identifier for hot-path query
-    plan_id CHAR(40) NOT NULL,               -- SHA1 of normalized plan JSON
+    query_key TEXT PRIMARY KEY,              -- logical identifier (plan_hot_queries.HOT_QUERIES)
+    plan_id CHAR(40) NOT NULL,               -- SHA1 of the plan shape (plan_hashing.plan_shape_id)
     p50_ms NUMERIC(10,2) NOT NULL,           -- median latency (ms) at snapshot time
     p95_ms NUMERIC(10,2) NOT NULL,           -- p95 latency (ms) at snapshot time
     sample_n INTEGER NOT NULL,               -- number of samples used to compute stats
     planner_seed INTEGER,                    -- captured planner GUCs for reproducibility
-    random_page_cost NUMERIC(6,2),
+    random_page_cost TEXT,
     effective_cache_size TEXT,               -- store raw show all style values if desired
     work_mem TEXT,
     jit TEXT,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Distribution and plan detail (added with the EXPLAIN ANALYZE sampler)
+ALTER TABLE plan_baselines
+    ADD COLUMN IF NOT EXISTS p99_ms NUMERIC(12,3),
+    ADD COLUMN IF NOT EXISTS mean_ms NUMERIC(12,3),
+    ADD COLUMN IF NOT EXISTS stddev_ms NUMERIC(12,3),
+    ADD COLUMN IF NOT EXISTS samples_ms DOUBLE PRECISION[],  -- raw planning+execution ms, for the shift test
+    ADD COLUMN IF NOT EXISTS warmup_n INTEGER,
+    ADD COLUMN IF NOT EXISTS planning_ms NUMERIC(12,3),       -- median planning time
+    ADD COLUMN IF NOT EXISTS shared_hit_blocks NUMERIC(14,1), -- mean per execution
+    ADD COLUMN IF NOT EXISTS shared_read_blocks NUMERIC(14,1),
+    ADD COLUMN IF NOT EXISTS plan_json JSONB,                 -- last EXPLAIN ANALYZE document
+    ADD COLUMN IF NOT EXISTS sql_sha1 CHAR(40),               -- whitespace-normalized SQL text
+    ADD COLUMN IF NOT EXISTS params JSONB;                    -- representative parameters used
+
 -- Optional supporting index if we later want historical snapshots by (query_key, created_at)
 -- CREATE INDEX IF NOT EXISTS plan_baselines_created_at_idx ON plan_baselines (query_key, created_at DESC);
@@ -51,6 +51,37 @@ _pool_stats = {
 
 logger = logging.getLogger(__name__)
 
+try:  # optional: shared Prometheus registry (see metrics_registry.py)
+    try:
+        from backend.metrics_registry import REGISTRY as _METRICS
+    except ImportError:
+        from metrics_registry import REGISTRY as _METRICS  # type: ignore
+except ImportError:  # pragma: no cover
+    _METRICS = None
+
+_CHECKOUT_LATENCY = (
+    _METRICS.histogram("db_pool_checkout_duration_seconds", "Time to check out a pooled connection")
+    if _METRICS is not None
+    else None
+)
+
+
+def _collect_pool_metrics() -> None:
+    if _connection_pool is None:
+        return
+    stats = get_pool_stats()
+    for key in ("used_connections", "available_connections", "total_connections"):
+        _METRICS.gauge(f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}").set(
+            stats.get(key, 0)
+        )
+    _METRICS.gauge("db_pool_connection_errors", "Connection pool errors since start").set(
+        stats.get("connection_errors", 0)
+    )
+
+
+if _METRICS is not None:
+    _METRICS.add_collector(_collect_pool_metrics)
+
 
 def initialize_connection_pool(
     host: str = "localhost",
@@ -136,6 +167,8 @@ def get_pooled_connection() -> Generator[psycopg2.extensions.connection, None, N
     try:
         # Get connection from pool
         connection = _connection_pool.getconn()
+        if _CHECKOUT_LATENCY is not None:
+            _CHECKOUT_LATENCY.observe(time.perf_counter() - start_time)
         _pool_stats["pool_hits"] += 1
         _pool_stats["active_connections"] += 1
 
@@ -0,0 +1,514 @@
+"""Invoice document rendering: estimates and receipts as PDF or HTML.
+
+PDFs are laid out with reportlab's platypus engine on Letter pages using the
+built-in Helvetica fonts. Each page carries the shop branding header. The
+line-item table repeats its header row on every page, followed by a totals
+block, payments on receipts and a "Page i of N" footer. reportlab lays out
+the whole document before writing the file because the footer needs the page
+count, so PDFs are returned as one body rather than streamed.
+
+HTML comes from one ``string.Template`` compiled once per process.
+
+``RenderPool`` runs renders in a bounded process pool so CPU-heavy layout never
+runs on the request worker. The pool is created lazily in each worker process,
+and that matters because gunicorn preloads the app and forks after import. Each
+pool process warms reportlab's font metrics, the paragraph styles and the HTML
+template in its initializer. When every slot is busy, ``render`` raises
+``RenderUnavailable`` so the route can answer 503 quickly instead of queueing
+without bound. A render that exceeds the timeout has its pool processes
+terminated, so a hung layout cannot keep holding a process after its slot is
+released.
+
+Without reportlab installed, PDF renders raise ``RenderUnavailable`` (HTML
+still works).
+
+Env:
+  RENDER_POOL_WORKERS         processes per API worker (default 2; 0 renders inline,
+                              the default under pytest)
+  RENDER_POOL_MAX_PENDING     renders queued or running before 503 (default 8)
+  RENDER_TIMEOUT_SECONDS      per-render wait before the pool is recycled (default 15)
+  SHOP_NAME / SHOP_ADDRESS / SHOP_PHONE / SHOP_EMAIL   branding on documents
+"""
+
+from __future__ import annotations
+
+import html
+import io
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as _FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache, partial
+from string import Template
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_RIGHT
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfgen.canvas import Canvas
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+except ImportError:  # pragma: no cover - exercised when reportlab is missing
+    Canvas = None  # type: ignore
+
+__all__ = [
+    "PDF_AVAILABLE",
+    "RenderPool",
+    "RenderUnavailable",
+    "branding_from_env",
+    "render_document",
+    "render_html",
+    "render_pdf",
+    "warm",
+]
+
+PDF_AVAILABLE = Canvas is not None
+
+
+# ----------------------------------------------------------------------------
+# Formatting helpers
+# ----------------------------------------------------------------------------
+def _money(cents: Any) -> str:
+    try:
+        value = int(cents or 0)
+    except (TypeError, ValueError):
+        value = 0
+    sign = "-" if value < 0 else ""
+    return f"{sign}${abs(value) / 100:,.2f}"
+
+
+def _dollars_to_cents(amount: Any) -> int:
+    try:
+        return int((Decimal(str(amount or 0)) * 100).quantize(Decimal("1")))
+    except Exception:
+        return 0
+
+
+def _day(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%b %d, %Y")
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).strftime("%b %d, %Y")
+        except ValueError:
+            return value[:10]
+    return ""
+
+
+def branding_from_env() -> Dict[str, str]:
+    return {
+        "name": os.getenv("SHOP_NAME", "Edgar's Mobile Auto Shop"),
+        "address": os.getenv("SHOP_ADDRESS", ""),
+        "phone": os.getenv("SHOP_PHONE", ""),
+        "email": os.getenv("SHOP_EMAIL", ""),
+    }
+
+
+def _document_model(kind: str, data: Dict[str, Any], branding: Optional[Dict[str, str]]):
+    inv = data.get("invoice") or {}
+    brand = branding or branding_from_env()
+    title = "Estimate" if kind == "estimate" else "Receipt"
+    items = []
+    for li in data.get("lineItems") or []:
+        qty = li.get("quantity") or 1
+        items.append(
+            {
+                "name": str(li.get("name") or "Service"),
+                "description": str(li.get("description") or ""),
+                "quantity": str(qty),
+                "unit": _money(li.get("unit_price_cents")),
+                "amount": _money(li.get("total_cents", li.get("line_subtotal_cents"))),
+            }
+        )
+    totals = [
+        ("Subtotal", _money(inv.get("subtotal_cents"))),
+        ("Tax", _money(inv.get("tax_cents"))),
+        ("Total", _money(inv.get("total_cents"))),
+    ]
+    if kind == "receipt":
+        totals += [
+            ("Paid", _money(inv.get("amount_paid_cents"))),
+            ("Amount due", _money(inv.get("amount_due_cents"))),
+        ]
+    payments = [
+        (
+            _day(p.get("created_at")),
+            str(p.get("method") or "").replace("_", " ").title(),
+            _money(_dollars_to_cents(p.get("amount"))),
+        )
+        for p in (data.get("payments") or [])
+        if kind == "receipt"
+    ]
+    return {
+        "kind": kind,
+        "title": title,
+        "brand": brand,
+        "invoice_id": str(inv.get("id") or ""),
+        "status": str(inv.get("status") or ""),
+        "date": _day(inv.get("issued_at") or inv.get("created_at")),
+        "items": items,
+        "totals": totals,
+        "payments": payments,
+    }
+
+
+# ----------------------------------------------------------------------------
+# PDF layout (reportlab)
+# ----------------------------------------------------------------------------
+MARGIN = 50.0
+_HEADER_HEIGHT = 84.0
+_FOOTER_HEIGHT = 30.0
+# Table column widths: description, qty, unit, amount (sums to the frame width)
+_COL_WIDTHS = (300.0, 40.0, 86.0, 86.0)
+
+
+@lru_cache(maxsize=1)
+def _styles() -> Dict[str, Any]:
+    body = ParagraphStyle("body", fontName="Helvetica", fontSize=10, leading=13)
+    return {
+        "body": body,
+        "small": ParagraphStyle("small", parent=body, fontSize=9, leading=11),
+        "head": ParagraphStyle("head", parent=body, fontName="Helvetica-Bold"),
+        "num": ParagraphStyle("num", parent=body, alignment=TA_RIGHT),
+        "num_head": ParagraphStyle(
+            "num_head", parent=body, fontName="Helvetica-Bold", alignment=TA_RIGHT
+        ),
+    }
+
+
+if Canvas is not None:
+
+    class _NumberedCanvas(Canvas):
+        """Holds pages until save() so each footer can say "Page i of N"."""
+
+        def __init__(self, *args: Any, footer: str = "", **kwargs: Any):
+            super().__init__(*args, **kwargs)
+            self._footer = footer
+            self._saved_pages: List[Dict[str, Any]] = []
+
+        def showPage(self) -> None:  # noqa: N802 - reportlab API
+            self._saved_pages.append(dict(self.__dict__))
+            self._startPage()
+
+        def save(self) -> None:
+            total = len(self._saved_pages)
+            for number, state in enumerate(self._saved_pages, 1):
+                self.__dict__.update(state)
+                width = self._pagesize[0]
+                self.setLineWidth(0.5)
+                self.line(MARGIN, MARGIN + 14, width - MARGIN, MARGIN + 14)
+                self.setFont("Helvetica", 8)
+                self.drawString(MARGIN, MARGIN, self._footer)
+                self.drawRightString(width - MARGIN, MARGIN, f"Page {number} of {total}")
+                super().showPage()
+            super().save()
+
+
+def _draw_header(model: Dict[str, Any], canvas: Any, doc: Any) -> None:
+    brand = model["brand"]
+    width, height = doc.pagesize
+    top = height - MARGIN
+    canvas.saveState()
+    canvas.setFont("Helvetica-Bold", 16)
+    canvas.drawString(MARGIN, top - 16, brand["name"])
+    canvas.drawRightString(width - MARGIN, top - 16, model["title"].upper())
+    contact = [v for v in (brand.get("address"), brand.get("phone"), brand.get("email")) if v]
+    meta = [f"Invoice # {model['invoice_id']}", f"Status: {model['status']}"]
+    if model["date"]:
+        meta.append(f"Date: {model['date']}")
+    canvas.setFont("Helvetica", 9)
+    y = top - 34
+    for i in range(max(len(contact), len(meta))):
+        if i < len(contact):
+            canvas.drawString(MARGIN, y, contact[i])
+        if i < len(meta):
+            canvas.drawRightString(width - MARGIN, y, meta[i])
+        y -= 12
+    canvas.restoreState()
+
+
+def _story(model: Dict[str, Any]) -> List[Any]:
+    st = _styles()
+    esc = html.escape
+    rows: List[List[Any]] = [
+        [
+            Paragraph("Description", st["head"]),
+            Paragraph("Qty", st["num_head"]),
+            Paragraph("Unit", st["num_head"]),
+            Paragraph("Amount", st["num_head"]),
+        ]
+    ]
+    for item in model["items"]:
+        desc = esc(item["name"])
+        if item["description"]:
+            desc += f'<br/><font size="9">{esc(item["description"])}</font>'
+        rows.append(
+            [
+                Paragraph(desc, st["body"]),
+                Paragraph(esc(item["quantity"]), st["num"]),
+                Paragraph(esc(item["unit"]), st["num"]),
+                Paragraph(esc(item["amount"]), st["num"]),
+            ]
+        )
+    if not model["items"]:
+        rows.append([Paragraph("No line items", st["body"]), "", "", ""])
+    items = Table(rows, colWidths=_COL_WIDTHS, repeatRows=1)
+    items.setStyle(
+        TableStyle(
+            [
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                ("LINEBELOW", (0, 0), (-1, 0), 0.75, colors.black),
+                ("LINEBELOW", (0, 1), (-1, -1), 0.25, colors.lightgrey),
+            ]
+        )
+    )
+
+    strong = {"Total", "Amount due"}
+    totals = Table(
+        [
+            [
+                Paragraph(esc(label), st["num_head" if label in strong else "num"]),
+                Paragraph(esc(value), st["num_head" if label in strong else "num"]),
+            ]
+            for label, value in model["totals"]
+        ],
+        colWidths=(_COL_WIDTHS[2], _COL_WIDTHS[3]),
+        hAlign="RIGHT",
+    )
+    totals.setStyle(TableStyle([("LINEABOVE", (0, 0), (-1, 0), 0.5, colors.black)]))
+
+    story: List[Any] = [items, Spacer(1, 8), totals]
+    if model["payments"]:
+        story += [Spacer(1, 16), Paragraph("Payments", st["head"]), Spacer(1, 4)]
+        payments = Table(
+            [
+                [
+                    Paragraph(esc(f"{day}  {method}".strip()), st["body"]),
+                    Paragraph(esc(amount), st["num"]),
+                ]
+                for day, method, amount in model["payments"]
+            ],
+            colWidths=(sum(_COL_WIDTHS[:3]), _COL_WIDTHS[3]),
+        )
+        story.append(payments)
+    return story
+
+
+def render_pdf(kind: str, data: Dict[str, Any], branding: Optional[Dict[str, str]] = None) -> bytes:
+    if not PDF_AVAILABLE:
+        raise RenderUnavailable("render_unavailable", "PDF rendering is not installed")
+    model = _document_model(kind, data, branding)
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf,
+        pagesize=letter,
+        leftMargin=MARGIN,
+        rightMargin=MARGIN,
+        topMargin=MARGIN + _HEADER_HEIGHT,
+        bottomMargin=MARGIN + _FOOTER_HEIGHT,
+        title=f"{model['title']} {model['invoice_id']}",
+        author=model["brand"]["name"],
+        pageCompression=1,
+        invariant=1,  # stable output for identical input (cache keys, tests)
+    )
+    header = partial(_draw_header, model)
+    doc.build(
+        _story(model),
+        onFirstPage=header,
+        onLaterPages=header,
+        canvasmaker=partial(_NumberedCanvas, footer=model["brand"]["name"]),
+    )
+    return buf.getvalue()
+
+
+# ----------------------------------------------------------------------------
+# HTML
+# ----------------------------------------------------------------------------
+_HTML_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Invoice $title $invoice_id</title>
+<style>
+body{font-family:Helvetica,Arial,sans-serif;color:#222;margin:40px}
+header{display:flex;justify-content:space-between}
+table{width:100%;border-collapse:collapse;margin-top:24px}
+th,td{padding:6px 4px;border-bottom:1px solid #ddd;text-align:left}
+.num{text-align:right}.totals td{border:none}.strong{font-weight:bold}
+</style></head>
+<body>
+<header><div><h2>$shop_name</h2><div>$shop_contact</div></div>
+<div class="num"><h1>Invoice $title $invoice_id</h1><p>Status: $status</p><p>$date</p></div></header>
+<table><thead><tr><th>Description</th><th class="num">Qty</th><th class="num">Unit</th><th class="num">Amount</th></tr></thead>
+<tbody>$rows</tbody>
+<tbody class="totals">$totals</tbody></table>
+$payments
+</body></html>
+"""
+
+
+@lru_cache(maxsize=1)
+def _html_template() -> Template:
+    return Template(_HTML_TEMPLATE)
+
+
+def render_html(kind: str, data: Dict[str, Any], branding: Optional[Dict[str, str]] = None) -> str:
+    m = _document_model(kind, data, branding)
+    esc = html.escape
+    rows = "".join(
+        f"<tr><td>{esc(i['name'])}"
+        + (f"<br><small>{esc(i['description'])}</small>" if i["description"] else "")
+        + f"</td><td class=\"num\">{esc(i['quantity'])}</td><td class=\"num\">{esc(i['unit'])}</td>"
+        f"<td class=\"num\">{esc(i['amount'])}</td></tr>"
+        for i in m["items"]
+    )
+    totals = "".join(
+        f"<tr><td colspan=\"3\" class=\"num{' strong' if label in ('Total', 'Amount due') else ''}\">"
+        f'{esc(label)}</td><td class="num">{esc(value)}</td></tr>'
+        for label, value in m["totals"]
+    )
+    payments = ""
+    if m["payments"]:
+        payments = (
+            "<h3>Payments</h3><ul>"
+            + "".join(
+                f"<li>{esc(day)} {esc(method)} {esc(amount)}</li>"
+                for day, method, amount in m["payments"]
+            )
+            + "</ul>"
+        )
+    brand = m["brand"]
+    contact = " &middot; ".join(
+        esc(v) for v in (brand.get("address"), brand.get("phone"), brand.get("email")) if v
+    )
+    return _html_template().substitute(
+        title=esc(m["title"]),
+        invoice_id=esc(m["invoice_id"]),
+        status=esc(m["status"]),
+        date=esc(m["date"]),
+        shop_name=esc(brand["name"]),
+        shop_contact=contact,
+        rows=rows,
+        totals=totals,
+        payments=payments,
+    )
+
+
+def render_document(
+    kind: str, fmt: str, data: Dict[str, Any], branding: Optional[Dict[str, str]] = None
+) -> bytes:
+    """Render ``kind`` ("estimate" | "receipt") as ``fmt`` ("pdf" | "html") bytes."""
+    if fmt == "pdf":
+        return render_pdf(kind, data, branding)
+    return render_html(kind, data, branding).encode("utf-8")
+
+
+_WARM_SAMPLE = {
+    "invoice": {"id": "warm", "status": "DRAFT", "total_cents": 100},
+    "lineItems": [{"name": "Warm-up", "quantity": 1, "unit_price_cents": 100, "total_cents": 100}],
+    "payments": [],
+}
+
+
+def warm() -> None:
+    """Populate font-metric, style and template caches (pool initializer)."""
+    _html_template()
+    if PDF_AVAILABLE:
+        _styles()
+        render_pdf("receipt", _WARM_SAMPLE, {"name": "warm"})
+
+
+# ----------------------------------------------------------------------------
+# Process pool
+# ----------------------------------------------------------------------------
+class RenderUnavailable(Exception):
+    """Render pool saturated, timed out or broken; callers answer 503."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class RenderPool:
+    """Bounded per-process pool of render processes (inline when ``workers`` is 0)."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        if workers is None:
+            default = "0" if "pytest" in sys.modules else "2"
+            workers = int(os.getenv("RENDER_POOL_WORKERS", default))
+        if max_pending is None:
+            max_pending = int(os.getenv("RENDER_POOL_MAX_PENDING", "8"))
+        if timeout is None:
+            timeout = float(os.getenv("RENDER_TIMEOUT_SECONDS", "15"))
+        self.workers = max(0, workers)
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self.rendered = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # spawn: children import only this module, not the forked app state
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=warm,
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def render(
+        self, kind: str, fmt: str, data: Dict[str, Any], branding: Optional[Dict[str, str]] = None
+    ) -> bytes:
+        return self._run(render_document, kind, fmt, data, branding or branding_from_env())
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.workers == 0:
+            self.rendered += 1
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise RenderUnavailable("render_busy", "Document renderer is busy, retry shortly")
+        try:
+            future = self._pool().submit(fn, *args)
+            try:
+                result = future.result(timeout=self.timeout)
+            except _FutureTimeout:
+                # A running call cannot be cancelled; kill the processes so the
+                # render does not keep running after its slot is released.
+                self.shutdown(terminate=True)
+                raise RenderUnavailable("render_timeout", "Document rendering timed out") from None
+            except BrokenProcessPool:
+                self.shutdown()
+                raise RenderUnavailable(
+                    "render_unavailable", "Document renderer restarted"
+                ) from None
+            self.rendered += 1
+            return result
+        finally:
+            self._slots.release()
+
+    def shutdown(self, terminate: bool = False) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None or self._pid != os.getpid():
+            return
+        if terminate:
+            # ProcessPoolExecutor has no public kill; its process map is stable across 3.9+
+            for proc in list((getattr(executor, "_processes", None) or {}).values()):
+                proc.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -187,6 +187,16 @@ class AppointmentRepository:
             self.db.logger.error(f"Error getting appointment {appointment_id}: {e}")
             return None
 
+    def get_drawer(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        """Get the appointment drawer row (appointment, services, vehicles) in one query"""
+        from backend.appointment_drawer import fetch_drawer_row
+
+        try:
+            return fetch_drawer_row(self.db.one, appointment_id)
+        except Exception as e:
+            self.db.logger.error(f"Error getting appointment drawer {appointment_id}: {e}")
+            return None
+
     def patch(self, appointment_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update appointment fields"""
         # Build dynamic SET clause
@@ -88,6 +88,16 @@ class AppointmentService:
         """Get appointment by ID with services"""
         return self.repo.get(appointment_id)
 
+    def get_appointment_drawer(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        """Get drawer payload and ETag: {"data": ..., "etag": ...}"""
+        from backend.appointment_drawer import build_drawer, drawer_etag
+
+        row = self.repo.get_drawer(appointment_id)
+        if not row:
+            return None
+        data = build_drawer(row)
+        return {"data": data, "etag": drawer_etag(row, data)}
+
     def update_appointment(
         self, appointment_id: str, data: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Batch invoice generation for completed appointments.
+
+Invoices a day's (or a date range's) completed appointments, or an explicit list of
+appointment ids, through ``invoice_service.generate_invoices_bulk``: one locking
+statement, one service query and multi-row inserts in a single transaction.
+Prints one line per appointment (or JSON with --json).
+
+Exit codes: 0 all requested appointments invoiced or already invoiced,
+1 some were skipped for another reason, 2 the batch failed.
+
+Examples:
+  python backend/generate_invoices.py --date 2025-03-03
+  python backend/generate_invoices.py --from 2025-03-01 --to 2025-03-07 --tenant <uuid>
+  python backend/generate_invoices.py --ids 101 102 103 --json
+
+Env: same database settings as local_server (POSTGRES_* / DATABASE_URL);
+INVOICE_BATCH_MAX caps appointments per run (default 500).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+try:
+    from backend import invoice_service
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import invoice_service  # type: ignore
+
+
+def _parse_day(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}") from e
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Generate invoices for completed appointments")
+    target = p.add_mutually_exclusive_group()
+    target.add_argument("--date", type=_parse_day, help="single UTC day (default: today)")
+    target.add_argument("--from", dest="date_from", type=_parse_day, help="first UTC day")
+    target.add_argument("--ids", nargs="+", help="explicit appointment ids")
+    p.add_argument("--to", dest="date_to", type=_parse_day, help="last UTC day (with --from)")
+    p.add_argument("--tenant", help="tenant id for RLS context")
+    p.add_argument("--json", action="store_true", help="print the raw result as JSON")
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    date_from = args.date_from or args.date
+    if not args.ids and not date_from:
+        date_from = datetime.now(timezone.utc).date()
+    try:
+        result = invoice_service.generate_invoices_bulk(
+            appointment_ids=args.ids,
+            date_from=None if args.ids else date_from,
+            date_to=None if args.ids else (args.date_to or date_from),
+            tenant_id=args.tenant,
+        )
+    except invoice_service.InvoiceError as e:
+        print(f"error: {e.code}: {e.message}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for r in result["results"]:
+            if r["outcome"] == "created":
+                print(f"{r['appointment_id']}\tcreated\t{r['invoice_id']}\t{r['total_cents']}")
+            else:
+                print(f"{r['appointment_id']}\tskipped\t{r['code']}\t{r['message']}")
+        s = result["summary"]
+        print(f"requested={s['requested']} created={s['created']} skipped={s['skipped']}")
+    problems = [
+        r
+        for r in result["results"]
+        if r["outcome"] != "created" and r.get("code") != "ALREADY_EXISTS"
+    ]
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -2,6 +2,9 @@
 # Production WSGI Server Configuration
 
 import multiprocessing
+import os
+import shutil
+import tempfile
 
 # Server socket
 bind = "0.0.0.0:5000"
@@ -43,3 +46,32 @@ preload_app = True
 
 # Worker timeouts
 graceful_timeout = 30
+
+# Multi-process metrics: each worker writes snapshots here and /metrics merges
+# them (see metrics_registry.py). Cleared on master start.
+metrics_dir = os.environ.setdefault(
+    "METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "edgar_auto_shop_metrics")
+)
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from metrics_registry import mark_process_dead
+    except ImportError:  # pragma: no cover - package-style deployment
+        from backend.metrics_registry import mark_process_dead
+    mark_process_dead(worker.pid, metrics_dir)
+
+
+def post_worker_init(worker):
+    # Read schema capabilities once per worker before it serves requests
+    try:
+        from local_server import SCHEMA
+    except ImportError:  # pragma: no cover - package-style deployment
+        from backend.local_server import SCHEMA
+    if SCHEMA.enabled and not SCHEMA.warm():
+        worker.log.warning("schema capabilities unavailable; retrying on first use")
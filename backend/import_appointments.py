@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Bulk appointment import CLI (NDJSON / CSV).
+
+Same pipeline as ``POST /api/admin/appointments/import`` (see
+appointment_import.py), but reads files of any size and commits every
+``--batch-size`` rows in its own transaction, so a failure loses at most one
+batch. Row numbers in the report refer to the input file.
+
+Environment (any one of):
+  DB_DSN (full psycopg2 DSN) OR individual PGHOST / PGPORT / PGUSER / PGPASSWORD / PGDATABASE.
+
+Examples:
+  python import_appointments.py history.csv --tenant 00000000-0000-0000-0000-000000000001
+  python import_appointments.py fleet.ndjson --tenant $TENANT --dry-run --json
+  cat export.ndjson | python import_appointments.py - --format ndjson --tenant $TENANT
+
+Exit codes: 0 all rows imported, 1 usage / connection error, 2 some rows failed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+except Exception:  # pragma: no cover - module resolution error surfaced in runtime logs
+    psycopg2 = None  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from appointment_import import ImportReport, import_appointments, read_rows  # noqa: E402
+
+LOGGER = logging.getLogger("appointment_import")
+_handler = logging.StreamHandler(sys.stderr)
+_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+LOGGER.addHandler(_handler)
+LOGGER.setLevel(logging.INFO)
+
+
+def build_dsn() -> Optional[str]:
+    if os.getenv("DB_DSN"):
+        return os.getenv("DB_DSN")
+    parts = {
+        "host": os.getenv("PGHOST"),
+        "port": os.getenv("PGPORT"),
+        "user": os.getenv("PGUSER"),
+        "password": os.getenv("PGPASSWORD"),
+        "dbname": os.getenv("PGDATABASE"),
+    }
+    if not parts["host"]:
+        return None
+    return " ".join(f"{k}={v}" for k, v in parts.items() if v)
+
+
+def detect_format(path: str, explicit: Optional[str]) -> Optional[str]:
+    if explicit:
+        return explicit
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".ndjson", ".jsonl", ".json"):
+        return "ndjson"
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-import appointments from NDJSON or CSV")
+    parser.add_argument("path", help="Input file ('-' for stdin)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Default: from extension")
+    parser.add_argument("--tenant", required=True, help="Tenant id (sets app.tenant_id)")
+    parser.add_argument(
+        "--batch-size", type=int, default=5000, help="Rows per transaction (default: %(default)s)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Validate and roll back")
+    parser.add_argument("--json", action="store_true", help="Print the full JSON report")
+    args = parser.parse_args(argv)
+
+    fmt = detect_format(args.path, args.format)
+    if fmt is None:
+        parser.error("cannot infer format from file name; pass --format")
+    if psycopg2 is None:
+        LOGGER.error("psycopg2 is not installed")
+        return 1
+    dsn = build_dsn()
+    if not dsn:
+        LOGGER.error("set DB_DSN or PGHOST/PGUSER/PGDATABASE")
+        return 1
+
+    text = sys.stdin.read() if args.path == "-" else Path(args.path).read_text(encoding="utf-8")
+    rows = read_rows(text, fmt)
+    report = ImportReport()
+    started = time.perf_counter()
+    conn = psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+    try:
+        while True:
+            batch = list(islice(rows, args.batch_size))
+            if not batch:
+                break
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("SET LOCAL app.tenant_id = %s", (args.tenant,))
+                part = import_appointments(conn, batch)
+                if args.dry_run:
+                    conn.rollback()
+            report.merge(part)
+            LOGGER.info(
+                "rows %s-%s: inserted=%s failed=%s",
+                batch[0][0],
+                batch[-1][0],
+                part.inserted,
+                part.failed,
+            )
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps({**report.as_dict(), "dry_run": args.dry_run}, indent=2, default=str))
+    else:
+        rate = report.received / elapsed * 60 if elapsed > 0 else 0.0
+        print(
+            f"[import] received={report.received} inserted={report.inserted} "
+            f"failed={report.failed} customers_created={report.customers_created} "
+            f"vehicles_created={report.vehicles_created} dry_run={args.dry_run} "
+            f"elapsed={elapsed:.1f}s rate={rate:.0f} rows/min"
+        )
+        for e in sorted(report.errors, key=lambda e: e["row"])[:50]:
+            print(f"  row {e['row']}: {e['code']} {e.get('field') or ''} {e['message']}".rstrip())
+        if report.failed > 50:
+            print(f"  ... {report.failed - 50} more (use --json for all)")
+    return 2 if report.failed else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
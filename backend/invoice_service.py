@@ -5,12 +5,14 @@ Focused lightweight helpers using psycopg2 to match existing `local_server` styl
 
 from __future__ import annotations
 
+import base64
 import os
 import uuid
+from datetime import date, datetime, time, timedelta, timezone
 from decimal import Decimal
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
 
 # Helper for test seed endpoint; kept minimal to avoid impacting production logic
@@ -53,24 +55,56 @@ def _new_id() -> str:
     return str(uuid.uuid4())
 
 
+def _set_tenant(cur, tenant_id: Optional[str] = None) -> None:
+    """Ensure tenant context for RLS/trigger consistency.
+
+    When running in CI/E2E (APP_INSTANCE_ID=ci), fall back to DEFAULT_TEST_TENANT if unset.
+    """
+    try:  # best-effort; if this fails DB will raise and be caught by caller
+        if not tenant_id:
+            tenant_id = getattr(srv.g, "tenant_id", None)
+        if not tenant_id and os.getenv("APP_INSTANCE_ID") == "ci":
+            tenant_id = os.getenv("DEFAULT_TEST_TENANT", "00000000-0000-0000-0000-000000000001")
+        if tenant_id:
+            cur.execute("SET LOCAL app.tenant_id = %s", (tenant_id,))
+    except Exception:
+        pass
+
+
+def _persistence_line_items(line_items_domain) -> List[Dict[str, Any]]:
+    """Domain line items merged with new ids for persistence."""
+    return [
+        {
+            "id": _new_id(),
+            "position": li.position,
+            "service_operation_id": li.service_operation_id,
+            "name": li.name,
+            "description": None,
+            "quantity": li.quantity,
+            "unit_price_cents": li.unit_price_cents,
+            "line_subtotal_cents": li.line_subtotal_cents,
+            "tax_rate_basis_points": li.tax_rate_basis_points,
+            "tax_cents": li.tax_cents,
+            "total_cents": li.total_cents,
+        }
+        for li in line_items_domain
+    ]
+
+
+_SERVICES_SQL = """
+SELECT id::text, name, COALESCE(estimated_price,0) AS estimated_price,
+       COALESCE(estimated_hours,0) AS estimated_hours, {op_col} AS service_operation_id
+FROM appointment_services WHERE appointment_id = %s ORDER BY created_at, id
+"""
+
+
 def generate_invoice_for_appointment(appt_id: str) -> Dict[str, Any]:
     """Generate (or raise) an invoice snapshot using domain logic for business rules."""
     conn = srv.db_conn()
     try:
         with conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Ensure tenant context for RLS/trigger consistency. When running in
-                # CI/E2E (APP_INSTANCE_ID=ci), fall back to DEFAULT_TEST_TENANT if unset.
-                try:  # best-effort; if this fails DB will raise and be caught by caller
-                    tenant_id = getattr(srv.g, "tenant_id", None)
-                    if not tenant_id and os.getenv("APP_INSTANCE_ID") == "ci":
-                        tenant_id = os.getenv(
-                            "DEFAULT_TEST_TENANT", "00000000-0000-0000-0000-000000000001"
-                        )
-                    if tenant_id:
-                        cur.execute("SET LOCAL app.tenant_id = %s", (tenant_id,))
-                except Exception:
-                    pass
+                _set_tenant(cur)
                 # Fetch & lock appointment (persistence concern)
                 cur.execute(
                     "SELECT id::text, status::text, customer_id::text, vehicle_id::text FROM appointments WHERE id = %s FOR UPDATE",
@@ -93,31 +127,11 @@ def generate_invoice_for_appointment(appt_id: str) -> Dict[str, Any]:
                     raise InvoiceError(e.code, e.message)
 
                 # Load services (persistence)
-                # Some older dev schemas may not have service_operation_id on appointment_services.
-                # Fall back to a compatible SELECT when that column is missing.
-                try:
-                    cur.execute(
-                        """
-                        SELECT id::text, name, COALESCE(estimated_price,0) AS estimated_price,
-                               COALESCE(estimated_hours,0) AS estimated_hours, service_operation_id::text
-                        FROM appointment_services WHERE appointment_id = %s ORDER BY created_at, id
-                        """,
-                        (appt_id,),
-                    )
-                except Exception as e:
-                    msg = str(e).lower()
-                    if "service_operation_id" in msg and "appointment_services" in msg:
-                        # Fallback: omit column and project a NULL for service_operation_id
-                        cur.execute(
-                            """
-                            SELECT id::text, name, COALESCE(estimated_price,0) AS estimated_price,
-                                   COALESCE(estimated_hours,0) AS estimated_hours, NULL::text AS service_operation_id
-                            FROM appointment_services WHERE appointment_id = %s ORDER BY created_at, id
-                            """,
-                            (appt_id,),
-                        )
-                    else:
-                        raise
+                # Some older dev schemas may not have service_operation_id on appointment_services;
+                # project a NULL there.
+                has_op = srv.SCHEMA.probe(cur, "appointment_services", "service_operation_id")
+                op_col = "service_operation_id::text" if has_op else "NULL::text"
+                cur.execute(_SERVICES_SQL.format(op_col=op_col), (appt_id,))
                 services = cur.fetchall() or []
 
                 # Domain line items + state (IDs for persistence added below)
@@ -151,22 +165,7 @@ def generate_invoice_for_appointment(appt_id: str) -> Dict[str, Any]:
                 cur.fetchone()
 
                 # Prepare persistence line items merging domain + new ids
-                line_items: List[Dict[str, Any]] = []
-                for li in line_items_domain:
-                    row = {
-                        "id": _new_id(),
-                        "position": li.position,
-                        "service_operation_id": li.service_operation_id,
-                        "name": li.name,
-                        "description": None,
-                        "quantity": li.quantity,
-                        "unit_price_cents": li.unit_price_cents,
-                        "line_subtotal_cents": li.line_subtotal_cents,
-                        "tax_rate_basis_points": li.tax_rate_basis_points,
-                        "tax_cents": li.tax_cents,
-                        "total_cents": li.total_cents,
-                    }
-                    line_items.append(row)
+                line_items = _persistence_line_items(line_items_domain)
 
                 if line_items:
                     args_str = ",".join(
@@ -214,77 +213,352 @@ def generate_invoice_for_appointment(appt_id: str) -> Dict[str, Any]:
             pass
 
 
+# Upper bound on appointments invoiced by one batch call (all in one transaction).
+INVOICE_BATCH_MAX = int(os.getenv("INVOICE_BATCH_MAX", "500"))
+
+_BATCH_LOCK_SQL = """
+SELECT a.id::text AS id, a.status::text AS status, a.customer_id::text AS customer_id,
+       a.vehicle_id::text AS vehicle_id,
+       EXISTS (SELECT 1 FROM invoices i WHERE i.appointment_id = a.id) AS has_invoice
+FROM appointments a
+WHERE {where}
+ORDER BY a.id
+LIMIT %s
+FOR UPDATE OF a
+"""
+
+_BATCH_SERVICES_SQL = """
+SELECT appointment_id::text AS appointment_id, id::text, name,
+       COALESCE(estimated_price,0) AS estimated_price,
+       COALESCE(estimated_hours,0) AS estimated_hours, {op_col} AS service_operation_id
+FROM appointment_services WHERE appointment_id IN %s
+ORDER BY appointment_id, created_at, id
+"""
+
+
+def _day_bounds(date_from: date, date_to: date):
+    start = datetime.combine(date_from, time.min, tzinfo=timezone.utc)
+    end = datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    return start, end
+
+
+def _load_batch_services(cur, appt_ids: Sequence[str]) -> Dict[str, List[dict]]:
+    has_op = srv.SCHEMA.probe(cur, "appointment_services", "service_operation_id")
+    op_col = "service_operation_id::text" if has_op else "NULL::text"
+    cur.execute(_BATCH_SERVICES_SQL.format(op_col=op_col), (tuple(appt_ids),))
+    return _group_batch_services(cur.fetchall())
+
+
+def _group_batch_services(rows) -> Dict[str, List[dict]]:
+    by_appt: Dict[str, List[dict]] = {}
+    for row in rows or []:
+        by_appt.setdefault(row["appointment_id"], []).append(row)
+    return by_appt
+
+
+def generate_invoices_bulk(
+    appointment_ids: Optional[Sequence[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    tenant_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Invoice many appointments in one transaction.
+
+    Targets either explicit ``appointment_ids`` or the billable appointments completed
+    between ``date_from`` and ``date_to`` (inclusive UTC days; completed_at, else start_ts).
+    Appointments are locked and validated in one statement, their services loaded in one
+    query, totals computed with the same domain functions as
+    ``generate_invoice_for_appointment`` and invoices/line items written with multi-row
+    inserts. Per-appointment problems (NOT_FOUND, INVALID_STATE, ALREADY_EXISTS) are
+    reported as skipped outcomes; database errors roll back the whole batch.
+    """
+    ids = list(dict.fromkeys(str(a) for a in appointment_ids or [] if a is not None))
+    if not ids and not date_from:
+        raise InvoiceError("INVALID_INPUT", "appointment_ids or date range required")
+    if len(ids) > INVOICE_BATCH_MAX:
+        raise InvoiceError("TOO_MANY", f"At most {INVOICE_BATCH_MAX} appointments per batch")
+    # Ids that are not integers cannot match (and would fail the whole statement)
+    canonical = {a: _appointment_id(a) for a in ids}
+    lookup_ids = list(dict.fromkeys(c for c in canonical.values() if c is not None))
+    outcomes: Dict[str, Dict[str, Any]] = {}
+    if ids and not lookup_ids:
+        return _bulk_result(ids, canonical, outcomes)
+
+    conn = srv.db_conn()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _set_tenant(cur, tenant_id)
+                if ids:
+                    where, params = "a.id IN %s", [tuple(lookup_ids)]
+                else:
+                    # Already-invoiced appointments are not candidates, so they do not
+                    # count towards INVOICE_BATCH_MAX on re-runs over the same range.
+                    start, end = _day_bounds(date_from, date_to or date_from)
+                    where = (
+                        "UPPER(a.status::text) = ANY(%s)"
+                        " AND COALESCE(a.completed_at, a.start_ts) >= %s"
+                        " AND COALESCE(a.completed_at, a.start_ts) < %s"
+                        " AND NOT EXISTS (SELECT 1 FROM invoices i WHERE i.appointment_id = a.id)"
+                    )
+                    params = [sorted(domain.BILLABLE_APPOINTMENT_STATUSES), start, end]
+                cur.execute(_BATCH_LOCK_SQL.format(where=where), (*params, INVOICE_BATCH_MAX + 1))
+                appts = cur.fetchall() or []
+                if len(appts) > INVOICE_BATCH_MAX:
+                    raise InvoiceError(
+                        "TOO_MANY", f"At most {INVOICE_BATCH_MAX} appointments per batch"
+                    )
+
+                services = _load_batch_services(cur, [a["id"] for a in appts]) if appts else {}
+
+                invoice_rows: List[tuple] = []
+                line_rows: List[tuple] = []
+                for appt in appts:
+                    appt_id = appt["id"]
+                    status_val = appt.get("status")
+                    if isinstance(status_val, str) and status_val.lower() == "completed":
+                        status_val = "COMPLETED"
+                    try:
+                        domain.validate_appointment_for_invoicing(
+                            status_val, bool(appt.get("has_invoice"))
+                        )
+                    except domain.DomainError as e:
+                        outcomes[appt_id] = {
+                            "appointment_id": appt_id,
+                            "outcome": "skipped",
+                            "code": e.code,
+                            "message": e.message,
+                        }
+                        continue
+                    line_items_domain = domain.build_line_items(services.get(appt_id, []))
+                    state = domain.create_initial_invoice_state(line_items_domain)
+                    invoice_id = _new_id()
+                    invoice_rows.append(
+                        (
+                            invoice_id,
+                            appt_id,
+                            appt.get("customer_id"),
+                            appt.get("vehicle_id"),
+                            state.status,
+                            state.totals.subtotal_cents,
+                            state.totals.tax_cents,
+                            state.totals.total_cents,
+                            state.totals.amount_paid_cents,
+                            state.totals.amount_due_cents,
+                        )
+                    )
+                    for li in _persistence_line_items(line_items_domain):
+                        line_rows.append(
+                            (
+                                li["id"],
+                                invoice_id,
+                                li["position"],
+                                li["service_operation_id"],
+                                li["name"],
+                                li["description"],
+                                li["quantity"],
+                                li["unit_price_cents"],
+                                li["line_subtotal_cents"],
+                                li["tax_rate_basis_points"],
+                                li["tax_cents"],
+                                li["total_cents"],
+                            )
+                        )
+                    outcomes[appt_id] = {
+                        "appointment_id": appt_id,
+                        "outcome": "created",
+                        "invoice_id": invoice_id,
+                        "status": state.status,
+                        "total_cents": state.totals.total_cents,
+                        "line_item_count": len(line_items_domain),
+                    }
+
+                if invoice_rows:
+                    execute_values(
+                        cur,
+                        """
+                        INSERT INTO invoices (
+                          id, appointment_id, customer_id, vehicle_id, status, currency,
+                          subtotal_cents, tax_cents, total_cents, amount_paid_cents, amount_due_cents, created_at, updated_at)
+                        VALUES %s
+                        """,
+                        invoice_rows,
+                        template="(%s,%s,%s,%s,%s,'USD',%s,%s,%s,%s,%s, now(), now())",
+                        page_size=500,
+                    )
+                if line_rows:
+                    execute_values(
+                        cur,
+                        """
+                        INSERT INTO invoice_line_items (
+                          id, invoice_id, position, service_operation_id, name, description, quantity,
+                          unit_price_cents, line_subtotal_cents, tax_rate_basis_points, tax_cents, total_cents, created_at)
+                        VALUES %s
+                        """,
+                        line_rows,
+                        template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s, now())",
+                        page_size=1000,
+                    )
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    return _bulk_result(ids, canonical, outcomes)
+
+
+def _appointment_id(raw: Any) -> Optional[str]:
+    """Canonical text form of an integer appointment id, or None."""
+    try:
+        value = int(str(raw).strip())
+    except ValueError:
+        return None
+    return str(value) if value > 0 else None
+
+
+def _bulk_result(
+    ids: Sequence[str], canonical: Dict[str, Optional[str]], outcomes: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    if ids:
+        ordered = [
+            outcomes.get(canonical[a] or "")
+            or {
+                "appointment_id": a,
+                "outcome": "skipped",
+                "code": "NOT_FOUND",
+                "message": "Appointment not found",
+            }
+            for a in ids
+        ]
+    else:
+        ordered = list(outcomes.values())
+    created = sum(1 for o in ordered if o["outcome"] == "created")
+    return {
+        "results": ordered,
+        "summary": {
+            "requested": len(ordered),
+            "created": created,
+            "skipped": len(ordered) - created,
+        },
+    }
+
+
+# One round trip: invoice row plus line items and payments aggregated as JSON.
+# Payment amounts travel as text so they coerce exactly like NUMERIC columns.
+_DETAIL_SQL = """
+SELECT i.id::text, i.appointment_id::text, i.customer_id::text, i.vehicle_id::text, i.status::text,
+       i.currency, i.subtotal_cents, i.tax_cents, i.total_cents, i.amount_paid_cents, i.amount_due_cents,
+       i.issued_at, i.paid_at, i.voided_at, i.notes, i.created_at, i.updated_at,
+       COALESCE((
+         SELECT json_agg(json_build_object(
+                  'id', li.id::text, 'position', li.position,
+                  'service_operation_id', li.service_operation_id::text, 'name', li.name,
+                  'description', li.description, 'quantity', li.quantity,
+                  'unit_price_cents', li.unit_price_cents, 'line_subtotal_cents', li.line_subtotal_cents,
+                  'tax_rate_basis_points', li.tax_rate_basis_points, 'tax_cents', li.tax_cents,
+                  'total_cents', li.total_cents, 'created_at', li.created_at)
+                ORDER BY li.position, li.id)
+         FROM invoice_line_items li WHERE li.invoice_id = i.id
+       ), '[]'::json) AS line_items,
+       COALESCE((
+         SELECT json_agg(json_build_object(
+                  'id', p.id::text, 'appointment_id', p.appointment_id::text,
+                  'amount', p.amount::text, 'method', p.method::text, 'note', p.note,
+                  'created_at', p.created_at)
+                ORDER BY p.created_at, p.id)
+         FROM payments p WHERE p.appointment_id = i.appointment_id
+       ), '[]'::json) AS payments,
+       v.customer_id::text AS vehicle_owner_id
+FROM invoices i
+LEFT JOIN vehicles v ON v.id = i.vehicle_id
+WHERE i.id = %s
+"""
+
+# Cheap primary-key probe used to key the render cache and check existence.
+_VERSION_SQL = """
+SELECT i.id::text, i.updated_at, i.customer_id::text, i.vehicle_id::text,
+       v.customer_id::text AS vehicle_owner_id
+FROM invoices i
+LEFT JOIN vehicles v ON v.id = i.vehicle_id
+WHERE i.id = %s
+"""
+
+
+def _coerce(val):
+    if isinstance(val, Decimal):
+        # Prefer int when value integral to avoid float stringify noise
+        if val == val.to_integral_value():
+            return int(val)
+        return float(val)
+    if isinstance(val, list):
+        return [_coerce(v) for v in val]
+    if isinstance(val, dict):
+        return {k: _coerce(v) for k, v in val.items()}
+    return val
+
+
 def fetch_invoice_details(invoice_id: str) -> Dict[str, Any]:
-    """Fetch a single invoice with line items and payments.
+    """Fetch a single invoice with line items and payments in one query.
 
-    Returns structured dict or raises InvoiceError('NOT_FOUND', ...)
+    Returns {"invoice", "lineItems", "payments", "vehicleOwnerId"} or raises
+    InvoiceError('NOT_FOUND', ...). vehicleOwnerId (the vehicle's current customer)
+    lets export routes validate ownership without another round trip.
     """
     conn = srv.db_conn()
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Main invoice
-            cur.execute(
-                """
-                SELECT id::text, appointment_id::text, customer_id::text, vehicle_id::text, status::text, currency,
-                       subtotal_cents, tax_cents, total_cents, amount_paid_cents, amount_due_cents,
-                       issued_at, paid_at, voided_at, notes, created_at, updated_at
-                FROM invoices WHERE id = %s
-                """,
-                (invoice_id,),
-            )
-            inv = cur.fetchone()
-            if not inv:
-                raise InvoiceError("NOT_FOUND", "Invoice not found")
-
-            # Line items
-            cur.execute(
-                """
-                SELECT id::text, position, service_operation_id::text, name, description, quantity,
-                       unit_price_cents, line_subtotal_cents, tax_rate_basis_points, tax_cents, total_cents, created_at
-                FROM invoice_line_items WHERE invoice_id = %s ORDER BY position, id
-                """,
-                (invoice_id,),
-            )
-            line_items = cur.fetchall() or []
+            cur.execute(_DETAIL_SQL, (invoice_id,))
+            row = cur.fetchone()
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    if not row:
+        raise InvoiceError("NOT_FOUND", "Invoice not found")
+    inv = dict(row)
+    line_items = inv.pop("line_items") or []
+    payments = inv.pop("payments") or []
+    owner_id = inv.pop("vehicle_owner_id", None)
+    for p in payments:
+        if p.get("amount") is not None:
+            p["amount"] = Decimal(p["amount"])
+    return _coerce(
+        {
+            "invoice": inv,
+            "lineItems": line_items,
+            "payments": payments,
+            "vehicleOwnerId": owner_id,
+        }
+    )
 
-            # Payments (may reference appointments currently; in future invoice payments table)
-            # We attempt to fetch via appointment_id if present.
-            payments: List[Dict[str, Any]] = []
-            appt_id = inv.get("appointment_id")
-            if appt_id:
-                cur.execute(
-                    """
-                    SELECT id::text, appointment_id::text, amount, method::text, note, created_at
-                    FROM payments WHERE appointment_id = %s ORDER BY created_at, id
-                    """,
-                    (appt_id,),
-                )
-                payments = cur.fetchall() or []
-
-            def _coerce(val):
-                if isinstance(val, Decimal):
-                    # Prefer int when value integral to avoid float stringify noise
-                    if val == val.to_integral_value():
-                        return int(val)
-                    return float(val)
-                if isinstance(val, list):
-                    return [_coerce(v) for v in val]
-                if isinstance(val, dict):
-                    return {k: _coerce(v) for k, v in val.items()}
-                return val
-
-            return _coerce(
-                {
-                    "invoice": inv,
-                    "lineItems": line_items,
-                    "payments": payments,
-                }
-            )
+
+def fetch_invoice_version(invoice_id: str) -> Optional[Dict[str, Any]]:
+    """Return {id, updated_at, customer_id, vehicle_id, vehicle_owner_id} or None."""
+    conn = srv.db_conn()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(_VERSION_SQL, (invoice_id,))
+            row = cur.fetchone()
     finally:
         try:
             conn.close()
         except Exception:
             pass
+    if not row:
+        return None
+    row = dict(row)
+    updated = row.get("updated_at")
+    row["updated_at"] = updated.isoformat() if hasattr(updated, "isoformat") else updated
+    return row
+
+
+_LEGACY_PAYMENT_INSERT_SQL = """
+INSERT INTO payments (appointment_id, amount, method, note, created_at{invoice_col})
+VALUES (%s, %s, %s, %s, COALESCE(%s, now()){invoice_val})
+RETURNING id::text, appointment_id::text, amount, method::text, note, created_at
+"""
 
 
 def record_payment_for_invoice(
@@ -294,6 +568,8 @@ def record_payment_for_invoice(
     method: str,
     received_at: str | None = None,
     note: str | None = None,
+    idempotency_key: str | None = None,
+    ledger: bool | None = None,
 ) -> Dict[str, Any]:
     """Record a payment against an invoice.
 
@@ -304,10 +580,23 @@ def record_payment_for_invoice(
       - amount_cents > 0 and <= amount_due_cents
     Atomic update with row lock.
     Returns {'invoice': updated_invoice, 'payment': payment_record}
+
+    In ledger mode (``ledger=True`` or INVOICE_PAYMENT_LEDGER=true) the payment is
+    appended to the ledger first and the invoice balance is incremented by one
+    conditional UPDATE; see ``_record_payment_ledger``.
     """
     # Basic amount validation will be re-run by domain layer; keep early guard minimal for parity
     if amount_cents <= 0:
         raise InvoiceError("INVALID_AMOUNT", "Payment amount must be positive")
+    if PAYMENT_LEDGER if ledger is None else ledger:
+        return _record_payment_ledger(
+            invoice_id,
+            amount_cents=amount_cents,
+            method=method,
+            received_at=received_at,
+            note=note,
+            idempotency_key=idempotency_key,
+        )
     conn = srv.db_conn()
     try:
         with conn:  # transaction
@@ -344,28 +633,23 @@ def record_payment_for_invoice(
                 # Insert payment (payments table references appointment_id in current schema)
                 appt_id = inv_row["appointment_id"]
                 amount_decimal = amount_cents / 100.0  # NUMERIC dollars for existing schema
-                try:
-                    cur.execute(
-                        """
-                        INSERT INTO payments (appointment_id, amount, method, note, created_at)
-                        VALUES (%s, %s, %s, %s, COALESCE(%s, now()))
-                        RETURNING id::text, appointment_id::text, amount, method::text, note, created_at
-                        """,
-                        (appt_id, amount_decimal, method, note, received_at),
+                # Older schemas store amount as integer cents and predate payments.invoice_id
+                amount_type = srv.SCHEMA.probe(cur, "payments", "amount")
+                params = [
+                    appt_id,
+                    int(amount_cents) if amount_type in _INTEGER_TYPES else amount_decimal,
+                    method,
+                    note,
+                    received_at,
+                ]
+                if srv.SCHEMA.probe(cur, "payments", "invoice_id"):
+                    sql = _LEGACY_PAYMENT_INSERT_SQL.format(
+                        invoice_col=", invoice_id", invoice_val=", %s"
                     )
-                except Exception as e:
-                    # Fallback for older schemas where amount may be stored as integer cents
-                    if 'column "amount" is of type integer' in str(e).lower():
-                        cur.execute(
-                            """
-                            INSERT INTO payments (appointment_id, amount, method, note, created_at)
-                            VALUES (%s, %s, %s, %s, COALESCE(%s, now()))
-                            RETURNING id::text, appointment_id::text, amount, method::text, note, created_at
-                            """,
-                            (appt_id, int(amount_cents), method, note, received_at),
-                        )
-                    else:
-                        raise
+                    params.append(invoice_id)
+                else:
+                    sql = _LEGACY_PAYMENT_INSERT_SQL.format(invoice_col="", invoice_val="")
+                cur.execute(sql, params)
                 payment = cur.fetchone()
                 new_state = pay_result.new_state
                 set_paid_at = ", paid_at = now()" if new_state.status == "PAID" else ""
@@ -406,6 +690,272 @@ def record_payment_for_invoice(
             pass
 
 
+# Ledger mode: payments are append-only rows keyed by (invoice_id, idempotency_key)
+# and the invoice balance is maintained by an atomic increment instead of a
+# read-modify-write under SELECT ... FOR UPDATE. Requires
+# migrations/20250921_022_payment_ledger.sql.
+PAYMENT_LEDGER = os.getenv("INVOICE_PAYMENT_LEDGER", "false").lower() == "true"
+
+_INVOICE_RETURNING = (
+    "id::text, appointment_id::text, status::text, currency, subtotal_cents, tax_cents, "
+    "total_cents, amount_paid_cents, amount_due_cents, issued_at, paid_at, voided_at, notes, "
+    "created_at, updated_at"
+)
+
+_PAYMENT_RETURNING = (
+    "id::text, appointment_id::text, invoice_id, amount, method::text, note, idempotency_key, "
+    "created_at"
+)
+
+_LEDGER_INSERT_SQL = f"""
+INSERT INTO payments (invoice_id, appointment_id, amount, method, note, idempotency_key, created_at)
+SELECT i.id, i.appointment_id, %s, %s, %s, %s, COALESCE(%s, now())
+FROM invoices i WHERE i.id = %s
+ON CONFLICT (invoice_id, idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+RETURNING {_PAYMENT_RETURNING}
+"""
+
+# Conditional increment: the WHERE clause is the whole validation, so the row lock
+# is held only from this statement to COMMIT. ``ELSE status`` gives the CASE the
+# column's enum type.
+_LEDGER_APPLY_SQL = f"""
+UPDATE invoices
+SET amount_paid_cents = amount_paid_cents + %(amount)s,
+    amount_due_cents = amount_due_cents - %(amount)s,
+    status = CASE WHEN amount_due_cents = %(amount)s THEN 'PAID'
+                  WHEN %(amount)s > 0 THEN 'PARTIALLY_PAID'
+                  ELSE status END,
+    paid_at = CASE WHEN amount_due_cents = %(amount)s THEN now() ELSE paid_at END,
+    updated_at = now()
+WHERE id = %(invoice_id)s
+  AND status::text NOT IN ('VOID', 'PAID')
+  AND amount_due_cents >= %(amount)s
+RETURNING {_INVOICE_RETURNING}
+"""
+
+
+# payments.amount is NUMERIC dollars, or integer cents on older schemas
+_INTEGER_TYPES = ("smallint", "integer", "bigint")
+
+
+def _amount_in_cents(cur) -> bool:
+    return srv.SCHEMA.probe(cur, "payments", "amount") in _INTEGER_TYPES
+
+
+def _payment_out(row: Dict[str, Any], amount_cents: int) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "appointment_id": row["appointment_id"],
+        "amount_cents": amount_cents,
+        "method": row["method"],
+        "note": row["note"],
+        "created_at": row["created_at"],
+    }
+
+
+def _record_payment_ledger(
+    invoice_id: str,
+    *,
+    amount_cents: int,
+    method: str,
+    received_at: str | None,
+    note: str | None,
+    idempotency_key: str | None,
+) -> Dict[str, Any]:
+    """Append a payment and increment the invoice balance without a FOR UPDATE read.
+
+    A retried request with the same idempotency key returns the original payment
+    and the current invoice with ``replayed: True``; a concurrent duplicate waits
+    on the unique index and then replays. Validation failures roll the ledger row
+    back and are reported with the domain error codes.
+    """
+    conn = srv.db_conn()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _set_tenant(cur)
+                in_cents = _amount_in_cents(cur)
+                amount = amount_cents if in_cents else Decimal(amount_cents) / 100
+                cur.execute(
+                    _LEDGER_INSERT_SQL,
+                    (amount, method, note, idempotency_key, received_at, invoice_id),
+                )
+                payment = cur.fetchone()
+                if payment is None and idempotency_key:
+                    cur.execute(
+                        f"SELECT {_PAYMENT_RETURNING} FROM payments"
+                        " WHERE invoice_id = %s AND idempotency_key = %s",
+                        (invoice_id, idempotency_key),
+                    )
+                    payment = cur.fetchone()
+                    if payment is not None:
+                        stored = payment["amount"] if in_cents else payment["amount"] * 100
+                        if int(round(stored)) != amount_cents:
+                            raise InvoiceError(
+                                "IDEMPOTENCY_MISMATCH",
+                                "Idempotency key was already used for a different amount",
+                            )
+                        cur.execute(
+                            f"SELECT {_INVOICE_RETURNING} FROM invoices WHERE id = %s",
+                            (invoice_id,),
+                        )
+                        return {
+                            "invoice": cur.fetchone(),
+                            "payment": _payment_out(payment, amount_cents),
+                            "replayed": True,
+                        }
+                if payment is None:
+                    raise InvoiceError("NOT_FOUND", "Invoice not found")
+
+                cur.execute(_LEDGER_APPLY_SQL, {"amount": amount_cents, "invoice_id": invoice_id})
+                updated_inv = cur.fetchone()
+                if updated_inv is None:
+                    cur.execute(
+                        "SELECT status::text, subtotal_cents, tax_cents, total_cents,"
+                        " amount_paid_cents, amount_due_cents FROM invoices WHERE id = %s",
+                        (invoice_id,),
+                    )
+                    row = cur.fetchone()
+                    if row is None:
+                        raise InvoiceError("NOT_FOUND", "Invoice not found")
+                    try:
+                        domain.validate_payment(
+                            domain.InvoiceState(
+                                status=row["status"],
+                                line_items=[],
+                                totals=domain.InvoiceTotals(
+                                    subtotal_cents=row["subtotal_cents"],
+                                    tax_cents=row["tax_cents"],
+                                    total_cents=row["total_cents"],
+                                    amount_paid_cents=row["amount_paid_cents"],
+                                    amount_due_cents=row["amount_due_cents"],
+                                ),
+                            ),
+                            amount_cents,
+                        )
+                    except domain.PaymentValidationError as e:
+                        raise InvoiceError(e.code, e.message)
+                    raise InvoiceError("CONFLICT", "Invoice changed concurrently; retry")
+                return {
+                    "invoice": updated_inv,
+                    "payment": _payment_out(payment, amount_cents),
+                    "replayed": False,
+                }
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_RECONCILE_SQL = """
+SELECT i.id::text AS id, i.status::text AS status, i.total_cents, i.amount_paid_cents,
+       i.amount_due_cents, COALESCE(l.ledger_cents, 0)::bigint AS ledger_cents
+FROM invoices i
+LEFT JOIN LATERAL (
+  SELECT SUM({cents}) AS ledger_cents
+  FROM payments p
+  WHERE p.invoice_id = i.id
+     OR (p.invoice_id IS NULL AND p.appointment_id = i.appointment_id)
+) l ON true
+WHERE {where}
+ORDER BY i.id
+"""
+
+# Guarded by the balance that was read, so a payment landing mid-run is never
+# overwritten; that invoice is simply re-checked on the next run. VOID invoices
+# keep their status and amount due.
+_RECONCILE_FIX_SQL = """
+UPDATE invoices
+SET amount_paid_cents = %(ledger)s,
+    amount_due_cents = CASE WHEN status::text = 'VOID' THEN amount_due_cents
+                            ELSE total_cents - %(ledger)s END,
+    status = CASE WHEN status::text = 'VOID' THEN status
+                  WHEN %(ledger)s = total_cents AND %(ledger)s > 0 THEN 'PAID'
+                  WHEN %(ledger)s > 0 THEN 'PARTIALLY_PAID'
+                  WHEN status::text IN ('PAID', 'PARTIALLY_PAID') THEN 'SENT'
+                  ELSE status END,
+    updated_at = now()
+WHERE id = %(invoice_id)s AND amount_paid_cents = %(paid)s
+"""
+
+
+def reconcile_invoice_payments(
+    invoice_ids: Optional[Sequence[str]] = None,
+    *,
+    since: Optional[datetime] = None,
+    fix: bool = False,
+    tenant_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Compare each invoice's ``amount_paid_cents`` with the sum of its payments.
+
+    Payments belong to an invoice by ``invoice_id``; only rows without one
+    (recorded before payments.invoice_id existed) fall back to the invoice's
+    appointment, so several invoices on one appointment are not conflated.
+
+    Scans ``invoice_ids`` or, without ids, every invoice (updated at/after ``since``
+    when given). With ``fix`` the derived balance and status are rewritten from the
+    ledger; invoices whose payments exceed the total are reported, never changed.
+    Returns {"drift": [...], "summary": {checked, drifted, fixed, unfixable}}.
+    """
+    where, params = "true", []
+    if invoice_ids:
+        where, params = "i.id = ANY(%s)", [[str(i) for i in invoice_ids]]
+    elif since is not None:
+        where, params = "i.updated_at >= %s", [since]
+    conn = srv.db_conn()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _set_tenant(cur, tenant_id)
+                cents = "p.amount" if _amount_in_cents(cur) else "ROUND(p.amount * 100)"
+                cur.execute(_RECONCILE_SQL.format(where=where, cents=cents), params)
+                rows = cur.fetchall()
+                drift: List[Dict[str, Any]] = []
+                fixed = unfixable = 0
+                for r in rows:
+                    ledger_cents = int(r["ledger_cents"])
+                    if ledger_cents == r["amount_paid_cents"]:
+                        continue
+                    entry = {
+                        "invoice_id": r["id"],
+                        "status": r["status"],
+                        "amount_paid_cents": r["amount_paid_cents"],
+                        "ledger_cents": ledger_cents,
+                        "outcome": "drift",
+                    }
+                    if ledger_cents > r["total_cents"]:
+                        entry["outcome"] = "unfixable"
+                        unfixable += 1
+                    elif fix:
+                        cur.execute(
+                            _RECONCILE_FIX_SQL,
+                            {
+                                "ledger": ledger_cents,
+                                "invoice_id": r["id"],
+                                "paid": r["amount_paid_cents"],
+                            },
+                        )
+                        if cur.rowcount:
+                            entry["outcome"] = "fixed"
+                            fixed += 1
+                    drift.append(entry)
+                return {
+                    "drift": drift,
+                    "summary": {
+                        "checked": len(rows),
+                        "drifted": len(drift),
+                        "fixed": fixed,
+                        "unfixable": unfixable,
+                    },
+                }
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
 def void_invoice(invoice_id: str) -> Dict[str, Any]:
     """Void an invoice if allowed.
 
@@ -469,6 +1019,103 @@ def void_invoice(invoice_id: str) -> Dict[str, Any]:
             pass
 
 
+# Invoice lists are keyset paginated over (created_at DESC, id DESC); see
+# migrations/20250922_023_invoice_list_indexes.sql for the supporting indexes.
+# Counts are capped so a large tenant never pays for a full COUNT(*) per page.
+INVOICE_LIST_COUNT_CAP = int(os.getenv("INVOICE_LIST_COUNT_CAP", "10000"))
+INVOICE_COUNT_MODES = ("estimated", "exact", "none")
+
+
+def encode_invoice_cursor(created_at: datetime, invoice_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{invoice_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_invoice_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        ts, invoice_id = raw.split("|", 1)
+        return datetime.fromisoformat(ts), invoice_id
+    except Exception:
+        raise InvoiceError("INVALID_CURSOR", "Malformed pagination cursor")
+
+
+def invoice_list_page(
+    cur,
+    *,
+    select_sql: str,
+    where: Sequence[str],
+    params: Sequence[Any],
+    page: int = 1,
+    page_size: int = 20,
+    cursor: str | None = None,
+    count: str = "estimated",
+    from_sql: str = "FROM invoices i",
+) -> Dict[str, Any]:
+    """Run one invoice list page on ``cur``; shared by the service and the admin route.
+
+    ``where`` clauses reference invoices as ``i``. With ``cursor`` the page starts
+    after that (created_at, id) and ``page`` is ignored; otherwise ``page`` is an
+    OFFSET page. ``select_sql`` must return ``i.created_at`` and ``i.id``.
+
+    count: "estimated" counts at most INVOICE_LIST_COUNT_CAP matching rows
+    (``total_exact`` False beyond that), "exact" runs a full COUNT(*), "none"
+    skips counting. A first page that holds every match needs no count query.
+    """
+    if count not in INVOICE_COUNT_MODES:
+        raise InvoiceError(
+            "INVALID_INPUT", f"count must be one of {', '.join(INVOICE_COUNT_MODES)}"
+        )
+    clauses, values = list(where), list(params)
+    offset = 0
+    if cursor:
+        c_at, c_id = decode_invoice_cursor(cursor)
+        clauses.append("(i.created_at, i.id) < (%s, %s)")
+        values.extend([c_at, c_id])
+    else:
+        offset = (page - 1) * page_size
+    where_sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    cur.execute(
+        f"{select_sql} {from_sql}{where_sql}"
+        " ORDER BY i.created_at DESC, i.id DESC LIMIT %s OFFSET %s",
+        values + [page_size + 1, offset],
+    )
+    rows = cur.fetchall() or []
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_invoice_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    total: Optional[int] = None
+    exact = False
+    filter_sql = (" WHERE " + " AND ".join(where)) if where else ""
+    if count != "none" and not cursor and not has_more and (rows or not offset):
+        total, exact = offset + len(rows), True
+    elif count == "exact":
+        cur.execute("SELECT COUNT(*) AS ct FROM invoices i" + filter_sql, list(params))
+        total, exact = int(cur.fetchone()["ct"]), True
+    elif count == "estimated":
+        cur.execute(
+            "SELECT COUNT(*) AS ct FROM (SELECT 1 FROM invoices i"
+            + filter_sql
+            + " LIMIT %s) capped",
+            list(params) + [INVOICE_LIST_COUNT_CAP + 1],
+        )
+        ct = int(cur.fetchone()["ct"])
+        total, exact = min(ct, INVOICE_LIST_COUNT_CAP), ct <= INVOICE_LIST_COUNT_CAP
+    return {
+        "items": rows,
+        "page": page,
+        "page_size": page_size,
+        "total_items": total,
+        "total_exact": exact,
+        "total_pages": (total + page_size - 1) // page_size if exact else None,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+    }
+
+
 def list_invoices(
     *,
     status: str | None = None,
@@ -477,6 +1124,8 @@ def list_invoices(
     created_to: str | None = None,
     page: int = 1,
     page_size: int = 20,
+    cursor: str | None = None,
+    count: str = "estimated",
 ) -> Dict[str, Any]:
     """Return paginated invoice summaries with optional filters.
 
@@ -484,11 +1133,11 @@ def list_invoices(
       status: single status value (exact match)
       customer_id: id
       created_from / created_to: ISO timestamp or date strings compared against created_at
-    Pagination: 1-based page, page_size (capped at 100)
+    Pagination: 1-based page or keyset ``cursor`` (``next_cursor`` of the previous
+    page), page_size (capped at 100); ``count`` as in ``invoice_list_page``.
     """
     page = max(page, 1)
     page_size = max(1, min(page_size, 100))
-    offset = (page - 1) * page_size
 
     clauses = []
     params: list[Any] = []
@@ -504,39 +1153,25 @@ def list_invoices(
     if created_to:
         clauses.append("i.created_at <= %s")
         params.append(created_to)
-    where_sql = ("WHERE " + " AND ".join(clauses)) if clauses else ""
 
-    sql_base = f"""
-        FROM invoices i
-        LEFT JOIN customers c ON i.customer_id = c.id
-        {where_sql}
-    """
     conn = srv.db_conn()
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Count
-            cur.execute("SELECT COUNT(*) AS ct " + sql_base, params)
-            total_items = int(cur.fetchone()["ct"])
-            # Page
-            cur.execute(
-                """
+            return invoice_list_page(
+                cur,
+                select_sql="""
                 SELECT i.id::text, i.status::text, i.total_cents, i.amount_due_cents, i.amount_paid_cents,
                        i.subtotal_cents, i.tax_cents, i.created_at, i.updated_at, i.issued_at,
                        c.id AS customer_id, c.name AS customer_name
-                """
-                + sql_base
-                + " ORDER BY i.created_at DESC, i.id DESC LIMIT %s OFFSET %s",
-                params + [page_size, offset],
+                """,
+                from_sql="FROM invoices i LEFT JOIN customers c ON i.customer_id = c.id",
+                where=clauses,
+                params=params,
+                page=page,
+                page_size=page_size,
+                cursor=cursor,
+                count=count,
             )
-            rows = cur.fetchall() or []
-            total_pages = (total_items + page_size - 1) // page_size
-            return {
-                "items": rows,
-                "page": page,
-                "page_size": page_size,
-                "total_items": total_items,
-                "total_pages": total_pages,
-            }
     finally:
         try:
             conn.close()
@@ -0,0 +1,108 @@
+"""Fast JSON provider for the Flask app.
+
+Flask's default provider serializes ``datetime`` as an RFC 822 HTTP date and
+``Decimal`` as a string, which is why handlers historically converted every
+row by hand (``.isoformat()`` / ``float(...)``) before calling ``jsonify``.
+This provider encodes those types natively so handlers can hand raw DB rows
+to ``jsonify``:
+
+  * ``datetime`` / ``date`` / ``time`` -> ISO 8601, identical to
+    ``value.isoformat()`` (aware UTC values keep the ``+00:00`` suffix;
+    naive values carry no offset)
+  * ``Decimal`` -> ``float``
+  * ``UUID`` -> canonical string
+
+Output is compact with sorted keys, matching Flask's defaults. ``orjson`` is
+used when installed; otherwise the stdlib encoder is used with the same
+type hooks so responses are identical either way (apart from non-ASCII
+characters, which orjson emits as UTF-8 instead of ``\\uXXXX`` escapes).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+from flask.json.provider import JSONProvider
+
+try:  # optional accelerated encoder
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - exercised when orjson missing
+    orjson = None  # type: ignore
+
+__all__ = ["FastJSONProvider", "install_json_provider", "json_default", "HAS_ORJSON"]
+
+HAS_ORJSON = orjson is not None
+
+if HAS_ORJSON:
+    _ORJSON_OPTS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS  # type: ignore[union-attr]
+
+
+def json_default(o: Any) -> Any:
+    """Fallback hook for types the underlying encoder does not handle."""
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, (bytes, memoryview)):
+        return bytes(o).decode("utf-8", "replace")
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider with native datetime / Decimal / UUID encoding."""
+
+    mimetype = "application/json"
+
+    def _encode(self, obj: Any) -> bytes:
+        if HAS_ORJSON:
+            try:
+                return orjson.dumps(obj, default=json_default, option=_ORJSON_OPTS)  # type: ignore[union-attr]
+            except TypeError:
+                # orjson rejects a few shapes the stdlib accepts (ints > 64 bit,
+                # mixed-type dict keys under sort); fall through to stdlib.
+                pass
+        return json.dumps(obj, default=json_default, sort_keys=True, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            # Formatting options (indent, custom separators) take the stdlib path.
+            kwargs.setdefault("default", json_default)
+            kwargs.setdefault("sort_keys", True)
+            return json.dumps(obj, **kwargs)
+        return self._encode(obj).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if HAS_ORJSON and not kwargs:
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError / ValueError
+            return orjson.loads(s)  # type: ignore[union-attr]
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self._app.debug:
+            body = self.dumps(obj, indent=2) + "\n"
+            return self._app.response_class(body, mimetype=self.mimetype)
+        return self._app.response_class(self._encode(obj) + b"\n", mimetype=self.mimetype)
+
+
+def install_json_provider(app) -> None:
+    """Install :class:`FastJSONProvider` on ``app`` (idempotent)."""
+    if isinstance(getattr(app, "json", None), FastJSONProvider):
+        return
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
@@ -101,29 +101,32 @@ if not _early_profile_loaded:  # pragma: no cover - exercised via E2E race scena
         "[bootstrap-profile] Installed fallback /api/customers/profile alias (early module import failed)"
     )
 
+import atexit
 import csv
 import hashlib
+import hmac
 import importlib
 import io
 import json
 import logging
 import os
 import os as _os_mod_for_csrf
-import queue
 import re
 import sys
 import threading
 import time
 import traceback
 import uuid
+import weakref
 from datetime import datetime, timedelta, timezone
+from functools import wraps
 from http import HTTPStatus
 from typing import Any, Dict, List, Optional
 from urllib.parse import parse_qs, urlparse
 
 import jwt
 import psycopg2
-from flask import Flask, Response, g, jsonify, make_response, request
+from flask import Flask, Response, g, jsonify, make_response, request, request_started
 from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
 from werkzeug.exceptions import BadRequest, Forbidden, HTTPException, NotFound
@@ -259,6 +262,14 @@ if _existing_owner and _existing_owner not in {
     )
 app._OWNING_MODULE = __name__
 
+# Native datetime / Decimal / UUID encoding for jsonify (see json_provider.py).
+# Handlers may pass raw DB rows straight to jsonify instead of converting per row.
+try:
+    from backend.json_provider import install_json_provider
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from json_provider import install_json_provider  # type: ignore
+install_json_provider(app)
+
 # PHASE A STEP 4: Monolith Shimming
 # Optional factory component integration for gradual migration
 USE_FACTORY_COMPONENTS = os.getenv("USE_FACTORY_COMPONENTS", "false").lower() in ("true", "1")
@@ -389,7 +400,6 @@ def _add_cors_headers(resp):
 # API Consistency Middleware: Correlation IDs, Error Envelope, Response Envelope
 # ---------------------------------------------------------------------------
 try:
-    import json as _json_mod
     import math as _math
     import time as _time
     import uuid as _uuid_mod
@@ -534,7 +544,7 @@ try:
                 status = int(getattr(e, "code", 500) or 500)
                 msg = getattr(e, "description", msg) or msg
             payload = _wrap_envelope({"message": msg}, ok=False, status=status)
-            resp = make_response(_json_mod.dumps(payload), status)
+            resp = make_response(app.json.dumps(payload), status)
             resp.mimetype = "application/json"
             resp.headers["X-Correlation-Id"] = getattr(g, "correlation_id", "?")
             return resp
@@ -602,11 +612,11 @@ try:
                 if _already_enveloped(body):
                     if not body.get("correlation_id"):
                         body["correlation_id"] = getattr(g, "correlation_id", None)
-                        resp.set_data(_json_mod.dumps(body))
+                        resp.set_data(app.json.dumps(body))
                     return resp
                 ok = 200 <= (resp.status_code or 200) < 400
                 wrapped = _wrap_envelope(body, ok=ok, status=resp.status_code or 200, meta=meta)
-                resp.set_data(_json_mod.dumps(wrapped))
+                resp.set_data(app.json.dumps(wrapped))
                 resp.mimetype = "application/json"
                 try:
                     if request.method.upper() == "POST" and _critical_post_path(request.path):
@@ -845,113 +855,58 @@ except Exception:
     pass
 
 
-class _AsyncLogWorker(threading.Thread):  # pragma: no cover - infrastructure
-    """Very small async logger / circuit breaker used in tests for metrics."""
-
-    DAEMON_SLEEP = 0.05
-    FAIL_THRESHOLD = 5
-    COOLDOWN_SEC = 5.0
-
-    def __init__(self, logger: logging.Logger):
-        super().__init__(daemon=True)
-        self.logger = logger
-        self.q: queue.Queue[tuple[str, dict]] = queue.Queue(maxsize=1024)
-        self.emitted_count = 0
-        self.dropped_full_count = 0
-        self.failure_count = 0
-        self.breaker_trip_count = 0
-        self._breaker_until = 0.0
-        self._lock = threading.Lock()
-        # Allow tests to override thresholds via environment
-        try:
-            self.FAIL_THRESHOLD = int(
-                os.getenv("LOG_CIRCUIT_FAIL_THRESHOLD", str(self.FAIL_THRESHOLD))
-            )
-        except Exception:
-            pass
-        try:
-            self.COOLDOWN_SEC = float(
-                os.getenv("LOG_CIRCUIT_COOLDOWN_SECONDS", str(self.COOLDOWN_SEC))
-            )
-        except Exception:
-            pass
-        self.start()
+try:
+    from backend.log_pipeline import (
+        AsyncLogWorker,
+        DebugCategoryGate,
+        NdjsonBatchWriter,
+    )
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from log_pipeline import AsyncLogWorker, DebugCategoryGate, NdjsonBatchWriter  # type: ignore
 
-    # Internal helpers
-    def _breaker_open(self) -> bool:
-        return time.time() < self._breaker_until
+# Batching async shipper for api.request and debug records (see log_pipeline.py).
+# By default batches go through the "api" logger, so its handlers and formatter
+# (python-json-logger when configured) apply. API_LOG_FORMAT=ndjson opts into
+# writing NDJSON straight to stdout in one write() per batch, bypassing them.
+_AsyncLogWorker = AsyncLogWorker
 
-    def _trip_breaker(self):
-        self.breaker_trip_count += 1
-        # Support test overrides via env
-        try:
-            cooldown = float(os.getenv("LOG_CIRCUIT_COOLDOWN_SECONDS", str(self.COOLDOWN_SEC)))
-        except Exception:
-            cooldown = self.COOLDOWN_SEC
-        self._breaker_until = time.time() + cooldown
-        self.failure_count = 0
 
-    def run(self):  # pragma: no cover
-        while True:
-            try:
-                level, payload = self.q.get()
-                if level == "__stop__":
-                    break
-                try:
-                    # Emit message containing api.request + request id for tests searching log text
-                    rid = payload.get("request_id") if isinstance(payload, dict) else None
-                    msg = (
-                        f"api.request rid={rid}"
-                        if (payload.get("type") == "api.request" and rid)
-                        else "api.log"
-                    )
-                    getattr(self.logger, level, self.logger.info)(msg, extra={"payload": payload})
-                    self.emitted_count += 1
-                    self.failure_count = 0
-                except Exception:  # logging failure
-                    self.failure_count += 1
-                    if self.failure_count >= self.FAIL_THRESHOLD and not self._breaker_open():
-                        self._trip_breaker()
-                    continue
-            except Exception:
-                pass
+def _make_log_writer():
+    if os.getenv("API_LOG_FORMAT", "").lower() == "ndjson":
+        return NdjsonBatchWriter(sys.stdout, logger=log)
+    return None
 
-    def emit(self, level: str, payload: dict):
-        if self._breaker_open():
-            return
-        try:
-            self.q.put_nowait((level, payload))
-        except queue.Full:
-            try:
-                _ = self.q.get_nowait()
-            except Exception:
-                pass
-            try:
-                self.q.put_nowait((level, payload))
-            except Exception:
-                with self._lock:
-                    self.dropped_full_count += 1
 
-    def stats(self) -> dict:
-        with self._lock:
-            return {
-                "emitted": self.emitted_count,
-                "dropped_full": self.dropped_full_count,
-                "consecutive_failures": self.failure_count,
-                "breaker_open": self._breaker_open(),
-                "breaker_trip_count": self.breaker_trip_count,
-                "queue_size": self.q.qsize(),
-                "queue_max": self.q.maxsize,
-            }
+_async_log = _AsyncLogWorker(log, writer=_make_log_writer())
 
-    def stop(self):  # pragma: no cover
-        try:
-            self.q.put_nowait(("__stop__", {}))
-        except Exception:
-            pass
+# Categorized request-path diagnostics. Disabled categories cost one dict
+# lookup; enabled ones are queued to _async_log and formatted there.
+_DEBUG_LOG_GATE = DebugCategoryGate()
+try:  # pragma: no cover - environment/bootstrap concern
+    _api_log_level = os.getenv("API_LOG_LEVEL") or (
+        "DEBUG" if os.getenv("DEBUG_LOG_CATEGORIES") else ""
+    )
+    if _api_log_level:
+        log.setLevel(_api_log_level.upper())
+except Exception:
+    pass
 
 
-_async_log = _AsyncLogWorker(log)
+def _debug_log(category: str, msg: str, *args: Any, level: str = "debug") -> None:
+    """Queue a categorized diagnostic record; no-op unless the category is enabled."""
+    if not _DEBUG_LOG_GATE.allow(category):
+        return
+    if not log.isEnabledFor(logging.getLevelName(level.upper())):
+        return
+    try:
+        rid = request.environ.get("REQUEST_ID")
+    except RuntimeError:  # outside a request context
+        rid = None
+    _async_log.emit(
+        level,
+        {"type": "debug", "category": category, "msg": msg, "args": args, "request_id": rid},
+    )
+
 
 # In-memory fallback caches for simple E2E endpoints when DB schema is partial
 _MCP_VIN_MEM: set[str] = set()
@@ -992,18 +947,40 @@ except Exception:  # provide minimal shim for syntax/runtime safety in tests
             def fetch_invoice_details(invoice_id: str):  # pragma: no cover
                 raise _InvoiceServiceShim.InvoiceError("not_found", "invoice service unavailable")
 
+            @staticmethod
+            def fetch_invoice_version(invoice_id: str):  # pragma: no cover
+                raise _InvoiceServiceShim.InvoiceError("not_found", "invoice service unavailable")
+
             @staticmethod
             def generate_invoice_for_appointment(appt_id: str):  # pragma: no cover
                 raise _InvoiceServiceShim.InvoiceError(
                     "invoice_error", "invoice service unavailable"
                 )
 
+            @staticmethod
+            def generate_invoices_bulk(**kwargs):  # pragma: no cover
+                raise _InvoiceServiceShim.InvoiceError(
+                    "invoice_error", "invoice service unavailable"
+                )
+
             @staticmethod
             def record_payment_for_invoice(invoice_id: str, **kwargs):  # pragma: no cover
                 raise _InvoiceServiceShim.InvoiceError(
                     "invoice_error", "invoice service unavailable"
                 )
 
+            @staticmethod
+            def invoice_list_page(cur, **kwargs):  # pragma: no cover
+                raise _InvoiceServiceShim.InvoiceError(
+                    "invoice_error", "invoice service unavailable"
+                )
+
+            @staticmethod
+            def reconcile_invoice_payments(*args, **kwargs):  # pragma: no cover
+                raise _InvoiceServiceShim.InvoiceError(
+                    "invoice_error", "invoice service unavailable"
+                )
+
             @staticmethod
             def void_invoice(invoice_id: str):  # pragma: no cover
                 raise _InvoiceServiceShim.InvoiceError(
@@ -1013,15 +990,14 @@ except Exception:  # provide minimal shim for syntax/runtime safety in tests
         invoice_service = _InvoiceServiceShim()  # type: ignore
 
 
-def _render_invoice_html(kind: str, data: dict) -> str:  # pragma: no cover - simple stub
-    return f"<html><body><h1>{kind.title()} #{data.get('id','')}</h1></body></html>"
-
+try:
+    from backend import document_render as _document_render
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import document_render as _document_render  # type: ignore
 
-def _simple_pdf(lines: list[str]) -> bytes:  # pragma: no cover - stubbed minimal PDF
-    # Extremely naive PDF placeholder (tests likely don't parse actual PDF structure)
-    body = "\n".join(lines)
-    # Prepend minimal PDF signature so tests checking startswith(%PDF) pass
-    return ("%PDF-1.1\n" + body).encode("utf-8")
+# Estimate/receipt rendering runs in a bounded process pool (document_render.py)
+_DOCUMENT_RENDERER = _document_render.RenderPool()
+atexit.register(_DOCUMENT_RENDERER.shutdown)
 
 
 def get_log_worker_stats() -> dict:
@@ -1029,6 +1005,103 @@ def get_log_worker_stats() -> dict:
     return _async_log.stats()
 
 
+try:
+    from backend.request_metrics import RouteMetricsStore
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from request_metrics import RouteMetricsStore  # type: ignore
+
+# Per-route counters / latency histograms; each worker rolls its deltas up
+# into route_metrics_hourly so /api/admin/metrics/304-efficiency sees all workers.
+_ROUTE_METRICS = RouteMetricsStore(connect=lambda: db_conn())
+
+try:
+    from backend import metrics_registry as _metrics_mod
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import metrics_registry as _metrics_mod  # type: ignore
+
+# Prometheus exposition (/metrics); aggregated across gunicorn workers when
+# METRICS_MULTIPROC_DIR is set (see metrics_registry.py / gunicorn.conf.py).
+_METRICS = _metrics_mod.REGISTRY
+_HTTP_LATENCY = _METRICS.histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ("method", "route", "status"),
+)
+_DB_CONNECT_LATENCY = _METRICS.histogram(
+    "db_connect_duration_seconds", "Time to open a database connection"
+)
+_DB_QUERY_LATENCY = _METRICS.histogram(
+    "db_query_duration_seconds", "SQL execute time by statement name", ("statement",)
+)
+_CACHE_REQUESTS = _METRICS.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")
+)
+_DB_QUERIES_PER_REQUEST = _METRICS.histogram(
+    "http_request_db_queries",
+    "SQL statements issued per request by route template",
+    ("route",),
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+
+try:
+    from backend import query_stats as _query_stats
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import query_stats as _query_stats  # type: ignore
+
+
+def _open_query_stats(sender, **extra):
+    _query_stats.begin()
+
+
+# request_started fires before every before_request hook, so statements from
+# tenant resolution and auth lookups are counted too.
+request_started.connect(_open_query_stats, app)
+
+
+@app.teardown_request
+def _close_query_stats(exc=None):
+    try:
+        rule = request.url_rule
+        _query_stats.finish(f"{request.method} {rule.rule if rule is not None else request.path}")
+    except Exception:  # pragma: no cover
+        _query_stats.finish()
+
+
+try:
+    from backend.app.security import password_pool as _password_pool
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from app.security import password_pool as _password_pool  # type: ignore
+
+
+def _collect_process_metrics() -> None:
+    stats = _async_log.stats()
+    _METRICS.gauge("api_log_queue_depth", "Async log queue depth").set(stats["queue_size"])
+    _METRICS.gauge("api_log_queue_max", "Async log queue capacity").set(stats["queue_max"])
+    _METRICS.gauge("api_log_queue_high_water", "Async log queue high-water mark").set(
+        stats["queue_high_water"]
+    )
+    _METRICS.gauge("api_log_dropped", "Log records dropped or shed since worker start").set(
+        stats["dropped_full"] + sum(stats["shed_by_category"].values())
+    )
+    _METRICS.gauge("rate_limit_keys", "Tracked rate-limit keys").set(len(_RATE))
+    _METRICS.gauge("telemetry_events", "Telemetry events accepted this window").set(
+        _TELEMETRY_COUNT
+    )
+    pw = _password_pool.get_pool().stats()
+    _METRICS.gauge("password_pool_pending", "Password hash/verify jobs queued or running").set(
+        pw["pending"]
+    )
+    _METRICS.gauge("password_pool_rejected", "Password jobs shed with 503 since start").set(
+        pw["rejected"] + pw["timeouts"]
+    )
+    _METRICS.gauge("password_rehash_pending", "Deferred password rehashes queued").set(
+        pw["rehash_pending"]
+    )
+
+
+_METRICS.add_collector(_collect_process_metrics)
+
+
 # In-test capture buffer (not thread safe; only used in pytest single-thread client)
 API_REQUEST_LOG_TEST_BUFFER: list[dict] = []  # noqa: N816 (uppercase to signal constant-style)
 LAST_API_REQUEST_LOG: dict | None = None  # for deterministic test inspection
@@ -1063,6 +1136,8 @@ def before_request_hook():
     # Pre-compute cold/warm classification (process uptime <120s => cold)
     proc_uptime = time.time() - PROCESS_START_TIME
     request.environ["START_TYPE"] = "cold" if proc_uptime < COLD_START_SECONDS else "warm"
+    # Start this worker's metrics snapshot writer (no-op unless METRICS_MULTIPROC_DIR)
+    _METRICS.ensure_sync_thread()
 
 
 @app.after_request
@@ -1152,6 +1227,14 @@ def after_request_hook(resp):
             "request_id": rid,
             "actor_id": actor_id,
         }
+        qstats = _query_stats.current()
+        if qstats is not None:
+            payload["db"] = qstats.as_dict()
+            timing = qstats.server_timing()
+            if dur_ms is not None:
+                timing += f", app;dur={dur_ms}"
+            prior = resp.headers.get("Server-Timing")
+            resp.headers["Server-Timing"] = f"{prior}, {timing}" if prior else timing
         # For deterministic tests, also capture synchronously
         try:
             API_REQUEST_LOG_TEST_BUFFER.append(payload)
@@ -1163,6 +1246,27 @@ def after_request_hook(resp):
         except Exception:
             pass
         _async_log.emit("info", payload)
+        if start is not None:
+            rule = request.url_rule
+            now = time.perf_counter()
+            _ROUTE_METRICS.record(
+                rule.rule if rule is not None else "<unmatched>",
+                request.method,
+                resp.status_code,
+                (now - start) * 1000.0,
+                (first_byte - start) * 1000.0 if isinstance(first_byte, (int, float)) else None,
+                start_type,
+            )
+            _HTTP_LATENCY.observe(
+                now - start,
+                method=request.method,
+                route=rule.rule if rule is not None else "<unmatched>",
+                status=resp.status_code,
+            )
+            if qstats is not None:
+                _DB_QUERIES_PER_REQUEST.observe(
+                    qstats.queries, route=rule.rule if rule is not None else "<unmatched>"
+                )
     except Exception:  # pragma: no cover
         pass
     # Security headers (Priority 2)
@@ -1351,7 +1455,7 @@ def _resolve_tenant_context():
 
     try:
         tenant_header = request.headers.get("X-Tenant-Id")
-        print(f"SIMPLE_DEBUG: tenant_header = {tenant_header}")
+        _debug_log("tenant", "tenant_header = %s", tenant_header)
 
         # For catalog endpoints, avoid DB lookups so tests that mock the first
         # cursor.execute error (for projection fallback) are not consumed here.
@@ -1368,25 +1472,16 @@ def _resolve_tenant_context():
         # Parse auth payload if present (don't hard-fail)
         try:
             auth_payload = maybe_auth(None)
-            print(f"[DEBUG] maybe_auth result: {auth_payload}")
-            app.logger.error(f"maybe_auth result: {auth_payload}")
-
-            # Write debug info to a file that we can check
-            try:
-                with open("/tmp/debug_auth.log", "a") as f:
-                    auth_header = request.headers.get("Authorization", "")
-                    f.write(f"PATH: {request.path}\n")
-                    f.write(f"AUTH_HEADER: {auth_header[:50]}...\n")
-                    f.write(f"AUTH_PAYLOAD: {auth_payload}\n")
-                    f.write(f"TENANT_HEADER: {request.headers.get('X-Tenant-Id')}\n")
-                    f.write("---\n")
-            except Exception:
-                pass
-
+            _debug_log(
+                "tenant",
+                "maybe_auth result: %s path=%s tenant_header=%s",
+                auth_payload,
+                request.path,
+                tenant_header,
+            )
         except Exception as e:
             auth_payload = None
-            print(f"[DEBUG] maybe_auth failed: {e}")
-            app.logger.error(f"maybe_auth failed: {e}")
+            _debug_log("tenant", "maybe_auth failed: %s", e)
 
         conn, use_memory, err = safe_conn()
         if err or (conn is None and not use_memory):
@@ -1402,31 +1497,29 @@ def _resolve_tenant_context():
                 return None
             import re
 
-            app.logger.error("TENANT_DEBUG: Resolving tenant header: %s", value)
+            _debug_log("tenant", "Resolving tenant header: %s", value)
 
             uuid_pattern = r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
             if re.match(uuid_pattern, value, re.IGNORECASE):
-                app.logger.error("TENANT_DEBUG: Header matches UUID pattern, querying by id")
+                _debug_log("tenant", "Header matches UUID pattern, querying by id")
                 cur.execute("SELECT id::text AS id FROM tenants WHERE id = %s::uuid", (value,))
             else:
-                app.logger.error(
-                    "TENANT_DEBUG: Header doesn't match UUID pattern, querying by slug"
-                )
+                _debug_log("tenant", "Header doesn't match UUID pattern, querying by slug")
                 cur.execute("SELECT id::text AS id FROM tenants WHERE slug = %s", (value,))
             row = cur.fetchone()
-            app.logger.error("TENANT_DEBUG: Query result: %s", row)
+            _debug_log("tenant", "Query result: %s", row)
             if not row:
                 return None
             try:
                 # RealDictCursor path
                 result = row.get("id")  # type: ignore[attr-defined]
-                app.logger.error("TENANT_DEBUG: RealDictCursor result: %s", result)
+                _debug_log("tenant", "RealDictCursor result: %s", result)
                 return result
             except Exception:
                 try:
                     # Tuple/cursor path
                     result = row[0]
-                    app.logger.error("TENANT_DEBUG: Tuple cursor result: %s", result)
+                    _debug_log("tenant", "Tuple cursor result: %s", result)
                     return result
                 except Exception:
                     # Fallback: best-effort first value
@@ -1447,8 +1540,9 @@ def _resolve_tenant_context():
                 resolved_tenant = (
                     _resolve_header_to_tenant_id(cur, tenant_header) if tenant_header else None
                 )
-                app.logger.error(
-                    "TENANT_DEBUG: After resolution - tenant_header=%s, resolved_tenant=%s",
+                _debug_log(
+                    "tenant",
+                    "After resolution - tenant_header=%s, resolved_tenant=%s",
                     tenant_header,
                     resolved_tenant,
                 )
@@ -1495,31 +1589,32 @@ def _resolve_tenant_context():
                     app_instance_id = os.getenv("APP_INSTANCE_ID")
 
                     # Debug logging for E2E bypass troubleshooting
-                    print(f"[E2E_DEBUG] Path: {pth}")
-                    print(f"[E2E_DEBUG] tenant_header: '{tenant_header}'")
-                    print(f"[E2E_DEBUG] auth_header present: {bool(auth_header)}")
-                    print(
-                        f"[E2E_DEBUG] auth_header starts with Bearer: {auth_header.startswith('Bearer ')}"
+                    _debug_log("tenant", "Path: %s", pth)
+                    _debug_log("tenant", "tenant_header: '%s'", tenant_header)
+                    _debug_log("tenant", "auth_header present: %s", bool(auth_header))
+                    _debug_log(
+                        "tenant",
+                        "auth_header starts with Bearer: %s",
+                        auth_header.startswith("Bearer "),
                     )
-                    print(f"[E2E_DEBUG] APP_INSTANCE_ID: '{app_instance_id}'")
-                    print(f"[E2E_DEBUG] APP_INSTANCE_ID == 'ci': {app_instance_id == 'ci'}")
+                    _debug_log("tenant", "APP_INSTANCE_ID: '%s'", app_instance_id)
+                    _debug_log("tenant", "APP_INSTANCE_ID == 'ci': %s", app_instance_id == "ci")
 
                     is_e2e_bypass = (
                         tenant_header == "00000000-0000-0000-0000-000000000001"
                         and auth_header.startswith("Bearer ")
                         and app_instance_id == "ci"
                     )
-                    print(f"[E2E_DEBUG] is_e2e_bypass: {is_e2e_bypass}")
+                    _debug_log("tenant", "is_e2e_bypass: %s", is_e2e_bypass)
 
                     if is_e2e_bypass:
-                        print(f"[DEBUG] E2E bypass activated for path {pth}")
-                        app.logger.error(f"E2E bypass activated for path {pth}")
+                        _debug_log("tenant", "E2E bypass activated for path %s", pth)
                         # In E2E mode, if the tenant header is our known test tenant
                         # but it doesn't resolve via DB (fresh init schema), trust the header.
                         g.tenant_id = resolved_tenant or tenant_header
                         return None
                 except Exception as e:
-                    print(f"[E2E_DEBUG] Exception in E2E bypass: {e}")
+                    _debug_log("tenant", "Exception in E2E bypass: %s", e)
                     pass
                 # Certain unit-test-only endpoints use fake DBs and should not enforce
                 # tenant membership (e.g., customer history with monkeypatched connections).
@@ -1542,11 +1637,12 @@ def _resolve_tenant_context():
                 ):
                     try:
                         user_sub = str(auth_payload.get("sub"))
-                        print(
-                            f"[DEBUG] user_sub extracted: '{user_sub}', tenant_header: '{tenant_header}', resolved_tenant: '{resolved_tenant}'"
-                        )
-                        app.logger.error(
-                            f"user_sub extracted: '{user_sub}', tenant_header: '{tenant_header}', resolved_tenant: '{resolved_tenant}'"
+                        _debug_log(
+                            "tenant",
+                            "user_sub extracted: '%s', tenant_header: '%s', resolved_tenant: '%s'",
+                            user_sub,
+                            tenant_header,
+                            resolved_tenant,
                         )
                     except Exception:
                         return _error(HTTPStatus.FORBIDDEN, "forbidden", "invalid_user_id")
@@ -1576,11 +1672,14 @@ def _resolve_tenant_context():
 
                         # IMMEDIATE E2E BYPASS for dev-user
                         if user_sub == "dev-user" and app.config.get("APP_INSTANCE_ID") == "ci":
-                            print(
-                                f"[E2E_DEBUG] IMMEDIATE dev-user bypass for user_sub='{user_sub}'"
+                            _debug_log(
+                                "tenant", "IMMEDIATE dev-user bypass for user_sub='%s'", user_sub
                             )
-                            app.logger.error(
-                                f"E2E bypass triggered for dev-user! user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
+                            _debug_log(
+                                "tenant",
+                                "E2E bypass triggered for dev-user! user_sub='%s', resolved_tenant='%s'",
+                                user_sub,
+                                resolved_tenant,
                             )
                             _row = True
                         else:
@@ -1592,49 +1691,48 @@ def _resolve_tenant_context():
                                 or user_sub == "dev-user"
                             ) and resolved_tenant == "00000000-0000-0000-0000-000000000001":
                                 # E2E bypass: allow advisor access to test tenant
-                                print(
-                                    f"[DEBUG] E2E bypass triggered! user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
-                                )
-                                app.logger.error(
-                                    f"E2E bypass triggered! user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
+                                _debug_log(
+                                    "tenant",
+                                    "E2E bypass triggered! user_sub='%s', resolved_tenant='%s'",
+                                    user_sub,
+                                    resolved_tenant,
                                 )
                                 _row = True
                             else:
                                 # Standard membership check: simple UUID comparison
-                                print(
-                                    f"[DEBUG] Checking staff membership for user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
-                                )
-                                app.logger.error(
-                                    f"Checking staff membership for user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
+                                _debug_log(
+                                    "tenant",
+                                    "Checking staff membership for user_sub='%s', resolved_tenant='%s'",
+                                    user_sub,
+                                    resolved_tenant,
                                 )
                                 cur.execute(
                                     "SELECT 1 FROM staff_tenant_memberships WHERE staff_id = %s AND tenant_id = %s::uuid",
                                     (user_sub, resolved_tenant),
                                 )
                                 _row = cur.fetchone()
-                                print(f"[DEBUG] Staff membership query result: {_row}")
-                                app.logger.error(f"Staff membership query result: {_row}")
+                                _debug_log("tenant", "Staff membership query result: %s", _row)
 
                         if not _row:
-                            print(
-                                f"[DEBUG] ACCESS DENIED: No staff membership found for user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
-                            )
-                            app.logger.error(
-                                f"ACCESS DENIED: No staff membership found for user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
+                            _debug_log(
+                                "tenant",
+                                "ACCESS DENIED: No staff membership found for user_sub='%s', resolved_tenant='%s'",
+                                user_sub,
+                                resolved_tenant,
                             )
                             return _error(HTTPStatus.FORBIDDEN, "forbidden", "tenant_access_denied")
                         else:
-                            print(
-                                f"[DEBUG] ACCESS GRANTED: Staff membership confirmed for user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
-                            )
-                            app.logger.error(
-                                f"ACCESS GRANTED: Staff membership confirmed for user_sub='{user_sub}', resolved_tenant='{resolved_tenant}'"
+                            _debug_log(
+                                "tenant",
+                                "ACCESS GRANTED: Staff membership confirmed for user_sub='%s', resolved_tenant='%s'",
+                                user_sub,
+                                resolved_tenant,
                             )
 
         g.tenant_id = resolved_tenant
         try:
             if g.tenant_id:
-                app.logger.debug(f"Tenant context set: {str(g.tenant_id)[:8]}...")
+                _debug_log("tenant", "Tenant context set: %s...", str(g.tenant_id)[:8])
         except Exception:
             pass
         # Test-mode default: if no tenant resolved and we're running under pytest,
@@ -1781,59 +1879,121 @@ if "metrics_304_efficiency" not in app.view_functions:
 
     @app.route("/api/admin/metrics/304-efficiency", methods=["GET"])
     def metrics_304_efficiency():
-        """Compute 304 efficiency for key cacheable GET routes over recent log buffer.
+        """Per-route 304 efficiency, status mix and latency percentiles.
 
-        Since we do not persist logs long-term yet, this derives percentages from the
-        in-memory API_REQUEST_LOG_TEST_BUFFER (best-effort, bounded). Once a durable
-        store is available, replace this with a 7-day query. For now it provides
-        immediate feedback for development / CI.
+        Aggregates the route_metrics_hourly rollup (all workers) over the last
+        ``days`` (default 7, max 30) plus this worker's unflushed deltas. Keys
+        are ``"<METHOD> <route template>"``; efficiency_pct is 304 / (200 + 304)
+        for GET routes. Falls back to this process's counters when the
+        database is unavailable.
         """
         # Enforce Advisor-level auth for admin metrics endpoint
         require_auth_role("Advisor")
-        # Define route templates of interest (simplified patterns)
-        tracked = [
-            "/api/customer/profile",  # example canonicalized path
-            "/api/vehicle/profile",  # example canonicalized path
-        ]
-        counts: dict[str, dict[str, int]] = {r: {"total": 0, "hits_304": 0} for r in tracked}
-        # Iterate over buffered logs (in reverse for recency weighting not required here)
-        for rec in API_REQUEST_LOG_TEST_BUFFER[-2000:]:  # limit scanning cost
-            try:
-                if rec.get("type") != "api.request":
-                    continue
-                method = rec.get("method")
-                if method != "GET":
-                    continue
-                path = rec.get("path") or ""
-                status = int(rec.get("status") or 0)
-                # Match simple prefixes to map to template (placeholder logic)
-                template = None
-                if "/customer" in path and "profile" in path:
-                    template = "/api/customer/profile"
-                elif "/vehicles" in path and "profile" in path:
-                    template = "/api/vehicle/profile"
-                if template and template in counts:
-                    counts[template]["total"] += 1
-                    if status == 304:
-                        counts[template]["hits_304"] += 1
-            except Exception:
-                continue
-        result = {}
-        for tpl, c in counts.items():
-            total = c["total"]
-            hits = c["hits_304"]
-            pct = (hits / total * 100.0) if total else None
-            result[tpl] = {
-                "total": total,
-                "hits_304": hits,
-                "efficiency_pct": round(pct, 2) if pct is not None else None,
-            }
-        return jsonify({"routes": result})
+        try:
+            days = min(max(int(request.args.get("days", 7)), 1), 30)
+        except ValueError:
+            return _error(HTTPStatus.BAD_REQUEST, "INVALID_INPUT", "days must be an integer")
+        conn, _use_memory, _err = safe_conn()
+        try:
+            if conn is not None:
+                # Push this worker's deltas first so the window is current
+                _ROUTE_METRICS.flush(conn)
+            summary = _ROUTE_METRICS.summary(days=days, conn=conn)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        return _ok(summary)
 
 else:  # pragma: no cover - reload path
     metrics_304_efficiency = app.view_functions["metrics_304_efficiency"]  # type: ignore
 
 
+if "debug_log_categories" not in app.view_functions:
+
+    @app.route("/api/admin/debug-log/categories", methods=["GET", "PATCH"])
+    def debug_log_categories():
+        """Inspect or toggle categorized debug logging for this worker process.
+
+        PATCH body: {"categories": {"tenant": {"enabled": true, "sample_rate": 0.1}},
+        "level": "DEBUG"}. Changes are per process and reset on restart; use
+        DEBUG_LOG_CATEGORIES for fleet-wide settings.
+        """
+        require_auth_role("Owner")
+        if request.method == "PATCH":
+            body = request.get_json(silent=True) or {}
+            cats = body.get("categories") or {}
+            if not isinstance(cats, dict):
+                return _error(
+                    HTTPStatus.BAD_REQUEST, "INVALID_INPUT", "categories must be an object"
+                )
+            for name, cfg in cats.items():
+                if isinstance(cfg, bool):
+                    cfg = {"enabled": cfg}
+                if not isinstance(cfg, dict):
+                    return _error(
+                        HTTPStatus.BAD_REQUEST, "INVALID_INPUT", f"invalid config for {name}"
+                    )
+                try:
+                    rate = float(cfg.get("sample_rate", 1.0))
+                except (TypeError, ValueError):
+                    return _error(
+                        HTTPStatus.BAD_REQUEST, "INVALID_INPUT", "sample_rate must be a number"
+                    )
+                _DEBUG_LOG_GATE.set(str(name), bool(cfg.get("enabled", True)), rate)
+            level = body.get("level")
+            if level:
+                if str(level).upper() not in ("DEBUG", "INFO", "WARNING", "ERROR"):
+                    return _error(HTTPStatus.BAD_REQUEST, "INVALID_INPUT", "invalid level")
+                log.setLevel(str(level).upper())
+        snap = _DEBUG_LOG_GATE.snapshot()
+        snap["level"] = logging.getLevelName(log.getEffectiveLevel())
+        return _ok(snap)
+
+else:  # pragma: no cover - reload path
+    debug_log_categories = app.view_functions["debug_log_categories"]  # type: ignore
+
+
+if "metrics_log_pipeline" not in app.view_functions:
+
+    @app.route("/api/admin/metrics/log-pipeline", methods=["GET"])
+    def metrics_log_pipeline():
+        """Async log shipper counters for sizing LOG_QUEUE_MAX / LOG_BATCH_MAX.
+
+        Per-process numbers (batch sizes, flush latency, queue high-water mark,
+        drop and shed counts per category) since worker start.
+        """
+        require_auth_role("Advisor")
+        return _ok({"pid": os.getpid(), **get_log_worker_stats()})
+
+else:  # pragma: no cover - reload path
+    metrics_log_pipeline = app.view_functions["metrics_log_pipeline"]  # type: ignore
+
+
+if "prometheus_metrics" not in app.view_functions:
+
+    @app.route("/metrics", methods=["GET"])
+    def prometheus_metrics():
+        """Prometheus text exposition for all workers.
+
+        Requires ``Authorization: Bearer <METRICS_AUTH_TOKEN>``. Without a
+        configured token the endpoint is disabled (403) rather than public.
+        """
+        token = os.getenv("METRICS_AUTH_TOKEN")
+        if not token:
+            return Response("metrics disabled\n", status=403, mimetype="text/plain")
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+        _METRICS.ensure_sync_thread()
+        return Response(_METRICS.render(), mimetype=None, content_type=_metrics_mod.CONTENT_TYPE)
+
+else:  # pragma: no cover - reload path
+    prometheus_metrics = app.view_functions["prometheus_metrics"]  # type: ignore
+
+
 def _ok(data: Any, status: int = HTTPStatus.OK):
     """Build final success envelope without legacy errors key."""
     if status == HTTPStatus.NO_CONTENT:
@@ -1881,17 +2041,169 @@ def _lookup_cached_etag(cur, entity_kind: str, entity_id: Any) -> Optional[str]:
     entity_kind values used here must align with trigger upsert prefixes (customer:, vehicle:, vehicle_profile:).
     Returns the weak_etag or None if missing/stale.
     """
+    etag = None
     try:
         key = f"{entity_kind}:{entity_id}"
         cur.execute("SELECT weak_etag FROM page_signature WHERE entity_id=%s", (key,))
         row = cur.fetchone()
         if row and isinstance(row, (list, tuple)):
-            return row[0]
-        if row and isinstance(row, dict):
-            return row.get("weak_etag")
+            etag = row[0]
+        elif row and isinstance(row, dict):
+            etag = row.get("weak_etag")
     except Exception:
         pass
-    return None
+    _CACHE_REQUESTS.inc(cache="page_signature", result="hit" if etag else "miss")
+    return etag
+
+
+try:
+    from backend.page_signatures import signature_validator
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from page_signatures import signature_validator  # type: ignore
+
+
+# ----------------------------------------------------------------------------
+# Conditional GET layer: answer If-None-Match from page_signature before the
+# handler runs. Signature rows are maintained by triggers (see
+# create_page_signature_table.sql and migrations/*_extend_page_signatures.sql).
+# ----------------------------------------------------------------------------
+
+_CONDITIONAL_GET = _METRICS.counter(
+    "conditional_get_total",
+    "Pre-handler conditional GET outcomes (hit/miss/no_signature/skipped)",
+    ("route", "result"),
+)
+
+
+def _fetch_page_signatures(keys: List[str]) -> Optional[Dict[str, str]]:
+    """Return {entity_id: weak_etag} for keys in one indexed lookup (None when no DB)."""
+    conn, _use_memory, _err = safe_conn()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT entity_id, weak_etag FROM page_signature WHERE entity_id = ANY(%s)",
+                (list(keys),),
+            )
+            rows = cur.fetchall() or []
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    found: Dict[str, str] = {}
+    for row in rows:
+        if isinstance(row, dict):
+            key, etag = row.get("entity_id"), row.get("weak_etag")
+        elif isinstance(row, (list, tuple)) and len(row) == 2:
+            key, etag = row
+        else:
+            continue
+        if key in keys and isinstance(etag, str):
+            found[key] = etag
+    return found
+
+
+def _conditional_validator(keys: List[str], vary: tuple) -> Optional[str]:
+    """Combine the signatures for keys (plus tenant and vary args) into a weak validator.
+
+    Returns None when any signature row is missing: the data behind it has never been
+    written through a trigger, so there is nothing safe to validate against.
+    """
+    try:
+        found = _fetch_page_signatures(keys)
+    except Exception as e:  # missing table / mocked cursor -> fall through to handler
+        _debug_log("cache", "page_signature lookup failed: %s", e)
+        return None
+    if found is None:
+        return None
+    return signature_validator(
+        g.get("tenant_id"),
+        {k: found.get(k) for k in keys},
+        [(name, request.args.get(name, "")) for name in vary],
+    )
+
+
+def conditional_get(
+    keys,
+    role: str = "Advisor",
+    vary: tuple = (),
+    authorize=None,
+    cache_control: str = "private, max-age=30",
+):
+    """Declarative pre-handler conditional GET driven by page_signature.
+
+    keys(view_kwargs, tenant_id) -> list of page_signature entity ids (or None to skip).
+    The validator is computed from those rows before the handler runs; a matching
+    If-None-Match returns 304 without touching the heavy queries. Whenever a
+    validator exists it is the response ETag, replacing any ETag the handler set,
+    so a client can only ever revalidate against the signature rows. The computed
+    validator is exposed to the handler as g.conditional_etag.
+    """
+
+    def decorator(fn):
+        route = fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            g.conditional_etag = None
+            inm = request.headers.get("If-None-Match")
+            if request.method != "GET" or "test_error" in request.args:
+                return fn(*args, **kwargs)
+            payload = require_auth_role(role)
+            if authorize and not authorize(payload or {}, kwargs):
+                _CONDITIONAL_GET.inc(route=route, result="skipped")
+                return fn(*args, **kwargs)
+            entity_keys = keys(kwargs, g.get("tenant_id"))
+            if not entity_keys:
+                _CONDITIONAL_GET.inc(route=route, result="skipped")
+                return fn(*args, **kwargs)
+            validator = _conditional_validator(list(entity_keys), vary)
+            if not validator:
+                _CONDITIONAL_GET.inc(route=route, result="no_signature")
+                return fn(*args, **kwargs)
+            g.conditional_etag = validator
+            if inm and validator in {t.strip() for t in inm.split(",")}:
+                _CONDITIONAL_GET.inc(route=route, result="hit")
+                resp = make_response("", 304)
+                resp.headers["ETag"] = validator
+                resp.headers["Cache-Control"] = cache_control
+                return resp
+            _CONDITIONAL_GET.inc(route=route, result="miss")
+            resp = make_response(fn(*args, **kwargs))
+            if resp.status_code == 200:
+                resp.headers["ETag"] = validator
+                resp.headers.setdefault("Cache-Control", cache_control)
+            return resp
+
+        return wrapper
+
+    return decorator
+
+
+def _board_signature_keys(_kwargs, tenant_id) -> Optional[List[str]]:
+    if not tenant_id or request.args.get("from") or request.args.get("to"):
+        return None
+    day = shop_day_window(request.args.get("date"))[0].date()
+    keys = [
+        f"board:{tenant_id}:{day.isoformat()}",
+        f"board_meta:{tenant_id}",
+        "service_catalog:global",
+    ]
+    if request.args.get("includeCarryover", "true").lower() != "false":
+        # Carryover lane is only bumped for days before today (UTC)
+        if day > datetime.now(timezone.utc).date():
+            return None
+        keys.append(f"board_carryover:{tenant_id}")
+    return keys
+
+
+def _customer_profile_authorized(payload: Dict[str, Any], kwargs: Dict[str, Any]) -> bool:
+    role = payload.get("role")
+    if role == "Customer":
+        return str(payload.get("sub")) == str(kwargs.get("cust_id"))
+    return role in ("Owner", "Advisor", "Accountant")
 
 
 def _strong_etag(kind: str, row: Dict[str, Any], editable_fields: list[str]) -> str:
@@ -2255,16 +2567,16 @@ if "patch_customer" not in app.view_functions:
                 sql_params = params + [cid_int]
 
                 # Debug logging
-                print(f"DEBUG PATCH SQL: {sql_query}")
-                print(f"DEBUG PATCH PARAMS: {sql_params}")
+                _debug_log("customer", "PATCH SQL: %s", sql_query)
+                _debug_log("customer", "PATCH PARAMS: %s", sql_params)
 
                 cur.execute(sql_query, sql_params)
 
                 # Debug: check if update affected any rows
-                print(f"DEBUG PATCH ROWCOUNT: {cur.rowcount}")
+                _debug_log("customer", "PATCH ROWCOUNT: %s", cur.rowcount)
 
                 row2 = _get_customer_row(cur, cid_int)
-                print(f"DEBUG PATCH ROW2: {dict(row2) if row2 else None}")
+                _debug_log("customer", "PATCH ROW2: %s", dict(row2) if row2 else None)
                 new_etag = _strong_etag(
                     "customer",
                     row2,
@@ -2324,26 +2636,26 @@ if "create_vehicle" not in app.view_functions:
         # Enforce Advisor-level auth for vehicle creation
         user = require_auth_role("Advisor")
         try:
-            app.logger.info("Vehicle creation endpoint hit")
+            _debug_log("vehicle", "Vehicle creation endpoint hit")
 
             # Simple auth check
             user = user  # already authenticated above
             if not user:
-                app.logger.info("Auth failed")
+                _debug_log("vehicle", "Auth failed")
                 return jsonify({"error": {"code": "forbidden", "message": "Not authorized"}}), 403
 
-            app.logger.info("Auth passed")
+            _debug_log("vehicle", "Auth passed")
 
             # Get request data
             data = request.get_json()
             if not data:
-                app.logger.info("No request data")
+                _debug_log("vehicle", "No request data")
                 return (
                     jsonify({"error": {"code": "bad_request", "message": "Request body required"}}),
                     400,
                 )
 
-            app.logger.info(f"Got data: {data}")
+            _debug_log("vehicle", "Got data: %s", data)
 
             # Simple validation
             customer_id = data.get("customer_id")
@@ -2417,13 +2729,7 @@ if "create_vehicle" not in app.view_functions:
                         pass
                     # Check VIN uniqueness if provided (tolerate missing vin column in older schemas)
                     if vin:
-                        try:
-                            cur.execute(
-                                "SELECT 1 FROM information_schema.columns WHERE table_name = 'vehicles' AND column_name = 'vin'"
-                            )
-                            has_vin_col = bool(cur.fetchone())
-                        except Exception:
-                            has_vin_col = False
+                        has_vin_col = _has_column(cur, "vehicles", "vin")
                         if has_vin_col:
                             cur.execute("SELECT id FROM vehicles WHERE vin = %s", (vin,))
                             if cur.fetchone():
@@ -2461,17 +2767,11 @@ if "create_vehicle" not in app.view_functions:
                             # If schema differs, skip uniqueness enforcement to avoid 500s in tests
                             pass
 
-                    app.logger.info("About to insert vehicle")
+                    _debug_log("vehicle", "About to insert vehicle")
                     # Build column list dynamically to support schemas without a vin column
                     columns = ["customer_id", "make", "model", "year", "license_plate", "notes"]
                     values = [customer_id, make, model, year, license_plate, notes]
-                    try:
-                        cur.execute(
-                            "SELECT 1 FROM information_schema.columns WHERE table_name = 'vehicles' AND column_name = 'vin'"
-                        )
-                        has_vin_col = bool(cur.fetchone())
-                    except Exception:
-                        has_vin_col = False
+                    has_vin_col = _has_column(cur, "vehicles", "vin")
                     if vin and has_vin_col:
                         columns.insert(4, "vin")  # after year
                         values.insert(4, vin)
@@ -2484,7 +2784,7 @@ if "create_vehicle" not in app.view_functions:
                     )
 
                     result = cur.fetchone()
-                    app.logger.info(f"Insert result: {result}")
+                    _debug_log("vehicle", "Insert result: %s", result)
 
                     if result:
                         # Handle both tuple and dict-like results
@@ -3169,7 +3469,7 @@ if "customer_lookup_by_phone" not in app.view_functions:
 
         except Exception as e:
             # Log error but return proper response
-            print(f"Customer lookup error: {e}")
+            log.error("Customer lookup error: %s", e)
             return jsonify({"error": "Database query failed"}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 else:  # pragma: no cover - reload path
@@ -3185,9 +3485,11 @@ if "list_invoices" not in app.view_functions:
         Query params:
           page (int, default 1)
           pageSize (int, default 20 <= 100)
+          cursor (str optional; next_cursor of the previous page, replaces page)
+          count (estimated|exact|none; default estimated, none with cursor)
           customerId (int optional)
           status (str optional exact match)
-        Response envelope: data { page, page_size, total_items, items: [ { id, customer_id, status, subtotal_cents, total_cents, amount_paid_cents, amount_due_cents } ] }
+        Response envelope: data { page, page_size, total_items, total_exact, has_more, next_cursor, items: [ { id, customer_id, status, subtotal_cents, total_cents, amount_paid_cents, amount_due_cents, created_at } ] }
         """
         # STEP 1: Enforce Advisor-level authentication
         require_auth_role("Advisor")
@@ -3219,6 +3521,8 @@ if "list_invoices" not in app.view_functions:
             page_size = 100
         customer_id = request.args.get("customerId")
         status_filter = request.args.get("status")
+        cursor = request.args.get("cursor") or None
+        count_mode = request.args.get("count") or ("none" if cursor else "estimated")
 
         # STEP 3: Wrap database operations in tenant context
         conn, use_memory, err = safe_conn()
@@ -3229,97 +3533,170 @@ if "list_invoices" not in app.view_functions:
                 "Database unavailable for invoice listing",
             )
 
-        offset = (page - 1) * page_size
         where = []
         params: List[Any] = []  # type: ignore
         if customer_id and customer_id.isdigit():
-            where.append("customer_id = %s")
+            where.append("i.customer_id = %s")
             params.append(int(customer_id))
         if status_filter:
-            where.append("status = %s")
+            where.append("i.status = %s")
             params.append(status_filter)
-        # where_sql removed; using composed where_clause below
 
         try:
             with conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:  # type: ignore
                     # Set tenant context for RLS policies
                     cur.execute("SELECT set_config('app.tenant_id', %s, true)", (tenant_id,))
-
-                    # Now execute tenant-isolated queries (safe composition to avoid SQLi)
-                    from psycopg2 import sql as _sql
-
-                    base_select = _sql.SQL(
-                        "SELECT id::text, customer_id, status::text, subtotal_cents, total_cents, amount_paid_cents, amount_due_cents FROM invoices"
-                    )
-                    where_clause = _sql.SQL(" WHERE ").join([])
-                    if where:
-                        where_clause = _sql.SQL(" WHERE ") + _sql.SQL(" AND ").join(
-                            [_sql.SQL(w) for w in where]
-                        )
-                    order_limit = _sql.SQL(" ORDER BY created_at DESC, id DESC LIMIT %s OFFSET %s")
-                    query = base_select + where_clause + order_limit
-                    cur.execute(query, params + [page_size, offset])
-                    rows = cur.fetchall() or []
-                    count_query = _sql.SQL("SELECT COUNT(*) AS cnt FROM invoices") + (
-                        _sql.SQL("")
-                        if not where
-                        else _sql.SQL(" WHERE ")
-                        + _sql.SQL(" AND ").join([_sql.SQL(w) for w in where])
+                    data = invoice_service.invoice_list_page(
+                        cur,
+                        select_sql=(
+                            "SELECT i.id::text, i.customer_id, i.status::text, i.subtotal_cents,"
+                            " i.total_cents, i.amount_paid_cents, i.amount_due_cents, i.created_at"
+                        ),
+                        where=where,
+                        params=params,
+                        page=page,
+                        page_size=page_size,
+                        cursor=cursor,
+                        count=count_mode,
                     )
-                    cur.execute(count_query, params)
-                    total = cur.fetchone()["cnt"] if cur.rowcount != -1 else len(rows)
         except Exception as e:
+            code = getattr(e, "code", None)
+            if code in ("INVALID_CURSOR", "INVALID_INPUT"):
+                return _error(HTTPStatus.BAD_REQUEST, code.lower(), e.message)  # type: ignore[attr-defined]
             return jsonify({"error": f"Database operation failed: {e}"}), 500
-        data = {
-            "page": page,
-            "page_size": page_size,
-            "total_items": total,
-            "items": rows,
-        }
         return _ok(data)
 
 else:  # pragma: no cover - reload path
     list_invoices = app.view_functions["list_invoices"]  # type: ignore
 
 
-if "invoice_estimate_pdf" not in app.view_functions:
-
-    @app.route("/api/admin/invoices/<invoice_id>/estimate.pdf", methods=["GET"])
-    def invoice_estimate_pdf(invoice_id: str):
-        forced = request.args.get("test_error")
-        if forced:
-            mapping = {
-                "bad_request": (HTTPStatus.BAD_REQUEST, "bad_request", "Bad request (test)"),
-                "forbidden": (HTTPStatus.FORBIDDEN, "forbidden", "Forbidden (test)"),
-                "not_found": (HTTPStatus.NOT_FOUND, "not_found", "Not found (test)"),
-                "internal": (
-                    HTTPStatus.INTERNAL_SERVER_ERROR,
-                    "internal",
-                    "Internal server error (test)",
-                ),
-            }
-            if forced in mapping:
-                st, code, msg = mapping[forced]
-                return _error(st, code, msg)
+try:
+    from backend.render_cache import DiskRenderCache, render_key
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from render_cache import DiskRenderCache, render_key  # type: ignore
 
-        # Step 1: Enforce authentication with role requirement
-        require_auth_role("Advisor")
+# Rendered estimate/receipt bytes keyed by invoice id + updated_at (render_cache.py)
+_INVOICE_RENDER_CACHE = DiskRenderCache()
 
-        # Step 2: Resolve active tenant from request context
-        if not g.tenant_id:
-            resp, _ = _error(HTTPStatus.BAD_REQUEST, "MISSING_TENANT", "Tenant context required")
-            return resp, 400
 
-        # Step 3: Set tenant context for database operations (invoice service)
+def _invoice_vehicle_owner(data: dict):
+    """Vehicle owner from the invoice read model; older fetchers fall back to a lookup."""
+    if "vehicleOwnerId" in data:
+        return data["vehicleOwnerId"]
+    veh_id = (data.get("invoice") or {}).get("vehicle_id")
+    if not veh_id:
+        return None
+    try:
+        conn = db_conn()
         try:
-            conn = db_conn()
             with conn.cursor() as cur:
-                cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
+                cur.execute("SELECT customer_id FROM vehicles WHERE id = %s", (int(veh_id),))
+                row = cur.fetchone()
+        finally:
             conn.close()
-        except Exception:
-            pass
-
+    except Exception:
+        return None
+    if isinstance(row, dict):
+        return row.get("customer_id")
+    return row[0] if row else None
+
+
+def _invoice_owner_error(inv: dict, owner_id):
+    """400 response when the invoice's vehicle belongs to another customer, else None."""
+    inv_cust = inv.get("customer_id")
+    if not (inv.get("vehicle_id") and inv_cust) or owner_id is None:
+        return None
+    if str(inv_cust) != str(owner_id):
+        return _error(HTTPStatus.BAD_REQUEST, "bad_request", "vehicle does not belong to customer")
+    return None
+
+
+def _invoice_document_response(body: bytes, invoice_id: str, kind: str):
+    name, ext = kind.split(".")
+    resp = make_response(body, HTTPStatus.OK)
+    if ext == "pdf":
+        resp.headers["Content-Type"] = "application/pdf"
+        resp.headers["Content-Disposition"] = f"inline; filename=invoice-{invoice_id}-{name}.pdf"
+        resp.headers["Cache-Control"] = "private, max-age=60"
+    else:
+        resp.headers["Content-Type"] = "text/html; charset=utf-8"
+    return resp
+
+
+def _cached_invoice_document(invoice_id: str, kind: str):
+    """Serve a previously rendered document after one primary-key probe, or None."""
+    if not _INVOICE_RENDER_CACHE.enabled:
+        return None
+    try:
+        import importlib as _imp
+
+        version = _imp.import_module("backend.invoice_service").fetch_invoice_version(invoice_id)
+    except Exception:
+        return None
+    if not version:
+        return None  # the full path reports NOT_FOUND
+    body = _INVOICE_RENDER_CACHE.get(render_key(invoice_id, version["updated_at"], kind))
+    if body is None:
+        _CACHE_REQUESTS.inc(cache="invoice_render", result="miss")
+        return None
+    _CACHE_REQUESTS.inc(cache="invoice_render", result="hit")
+    # Ownership can change without touching the invoice, so re-check on every hit.
+    err = _invoice_owner_error(version, version.get("vehicle_owner_id"))
+    if err:
+        return err
+    return _invoice_document_response(body, invoice_id, kind)
+
+
+def _render_invoice_document(data: dict, kind: str):
+    """Render through the pool, store in the render cache and build the response."""
+    inv = data.get("invoice") or {}
+    name, fmt = kind.split(".")
+    try:
+        body = _DOCUMENT_RENDERER.render(name, fmt, data)
+    except _document_render.RenderUnavailable as e:
+        resp, status = _error(HTTPStatus.SERVICE_UNAVAILABLE, e.code, e.message)
+        resp.headers["Retry-After"] = "2"
+        return resp, status
+    updated = inv.get("updated_at")
+    if _INVOICE_RENDER_CACHE.enabled and inv.get("id") and updated:
+        updated = updated.isoformat() if hasattr(updated, "isoformat") else str(updated)
+        _INVOICE_RENDER_CACHE.set(render_key(inv["id"], updated, kind), body)
+    return _invoice_document_response(body, inv.get("id"), kind)
+
+
+if "invoice_estimate_pdf" not in app.view_functions:
+
+    @app.route("/api/admin/invoices/<invoice_id>/estimate.pdf", methods=["GET"])
+    def invoice_estimate_pdf(invoice_id: str):
+        forced = request.args.get("test_error")
+        if forced:
+            mapping = {
+                "bad_request": (HTTPStatus.BAD_REQUEST, "bad_request", "Bad request (test)"),
+                "forbidden": (HTTPStatus.FORBIDDEN, "forbidden", "Forbidden (test)"),
+                "not_found": (HTTPStatus.NOT_FOUND, "not_found", "Not found (test)"),
+                "internal": (
+                    HTTPStatus.INTERNAL_SERVER_ERROR,
+                    "internal",
+                    "Internal server error (test)",
+                ),
+            }
+            if forced in mapping:
+                st, code, msg = mapping[forced]
+                return _error(st, code, msg)
+
+        # Step 1: Enforce authentication with role requirement
+        require_auth_role("Advisor")
+
+        # Step 2: Resolve active tenant from request context
+        if not g.tenant_id:
+            resp, _ = _error(HTTPStatus.BAD_REQUEST, "MISSING_TENANT", "Tenant context required")
+            return resp, 400
+
+        cached = _cached_invoice_document(invoice_id, "estimate.pdf")
+        if cached is not None:
+            return cached
+
         try:
             import importlib as _imp
 
@@ -3332,42 +3709,10 @@ if "invoice_estimate_pdf" not in app.view_functions:
                 HTTPStatus.BAD_REQUEST, getattr(e, "code", "invoice_error").lower(), e.message
             )
         inv = data.get("invoice") or {}
-        # Ownership validation (deduplicated to single pass)
-        try:
-            veh_id = inv.get("vehicle_id")
-            inv_cust = inv.get("customer_id")
-            if veh_id and inv_cust:
-                with db_conn().cursor() as cur:  # type: ignore
-                    # Set tenant context for ownership validation
-                    cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
-                    cur.execute("SELECT customer_id FROM vehicles WHERE id = %s", (int(veh_id),))
-                    row = cur.fetchone()
-                owner_id = (
-                    row[0]
-                    if row and isinstance(row, tuple)
-                    else (row.get("customer_id") if row else None)
-                )
-                if owner_id is not None and int(inv_cust) != owner_id:
-                    return _error(
-                        HTTPStatus.BAD_REQUEST,
-                        "bad_request",
-                        "vehicle does not belong to customer",
-                    )
-        except Exception:
-            pass
-        lines = [
-            f"Estimate Invoice ID: {inv.get('id')}",
-            f"Status: {inv.get('status')}",
-            f"Total: ${(inv.get('total_cents') or 0)/100:.2f}",
-        ]
-        pdf_bytes = _simple_pdf(lines)
-        resp = make_response(pdf_bytes, HTTPStatus.OK)
-        resp.headers["Content-Type"] = "application/pdf"
-        resp.headers["Content-Disposition"] = (
-            f"inline; filename=invoice-{inv.get('id')}-estimate.pdf"
-        )
-        resp.headers["Cache-Control"] = "private, max-age=60"
-        return resp
+        err = _invoice_owner_error(inv, _invoice_vehicle_owner(data))
+        if err:
+            return err
+        return _render_invoice_document(data, "estimate.pdf")
 
 else:  # pragma: no cover - reload path
     invoice_estimate_pdf = app.view_functions["invoice_estimate_pdf"]  # type: ignore
@@ -3399,14 +3744,9 @@ def invoice_receipt_pdf(invoice_id: str):
         resp, _ = _error(HTTPStatus.BAD_REQUEST, "MISSING_TENANT", "Tenant context required")
         return resp, 400
 
-    # Step 3: Set tenant context for database operations (invoice service)
-    try:
-        conn = db_conn()
-        with conn.cursor() as cur:
-            cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
-        conn.close()
-    except Exception:
-        pass
+    cached = _cached_invoice_document(invoice_id, "receipt.pdf")
+    if cached is not None:
+        return cached
 
     try:
         import importlib as _imp
@@ -3419,38 +3759,10 @@ def invoice_receipt_pdf(invoice_id: str):
             return _error(HTTPStatus.NOT_FOUND, code, getattr(e, "message", str(e)))
         return _error(HTTPStatus.BAD_REQUEST, code, getattr(e, "message", str(e)))
     inv = data.get("invoice") or {}
-    # Inline vehicle ownership validation (receipt.pdf)
-    try:  # ownership validation
-        veh_id = inv.get("vehicle_id")
-        inv_cust = inv.get("customer_id")
-        if veh_id and inv_cust:
-            with db_conn().cursor() as cur:  # type: ignore
-                # Set tenant context for ownership validation
-                cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
-                cur.execute("SELECT customer_id FROM vehicles WHERE id = %s", (int(veh_id),))
-                row = cur.fetchone()
-            owner_id = (
-                row[0]
-                if row and isinstance(row, tuple)
-                else (row.get("customer_id") if isinstance(row, dict) else None)
-            )
-            if owner_id is not None and int(inv_cust) != owner_id:
-                return _error(
-                    HTTPStatus.BAD_REQUEST, "bad_request", "vehicle does not belong to customer"
-                )
-    except Exception:
-        pass
-    lines = [
-        f"Receipt Invoice ID: {inv.get('id')}",
-        f"Status: {inv.get('status')}",
-        f"Total: ${(inv.get('total_cents') or 0)/100:.2f}",
-    ]
-    pdf_bytes = _simple_pdf(lines)
-    resp = make_response(pdf_bytes, HTTPStatus.OK)
-    resp.headers["Content-Type"] = "application/pdf"
-    resp.headers["Content-Disposition"] = f"inline; filename=invoice-{inv.get('id')}-receipt.pdf"
-    resp.headers["Cache-Control"] = "private, max-age=60"
-    return resp
+    err = _invoice_owner_error(inv, _invoice_vehicle_owner(data))
+    if err:
+        return err
+    return _render_invoice_document(data, "receipt.pdf")
 
 
 @app.route("/api/admin/invoices/<invoice_id>/estimate.html", methods=["GET"])
@@ -3472,6 +3784,9 @@ def invoice_estimate_html(invoice_id: str):
             return _error(st, code, msg)
     # Enforce strict auth for export HTML
     require_auth_role("Advisor")
+    cached = _cached_invoice_document(invoice_id, "estimate.html")
+    if cached is not None:
+        return cached
     try:
         import importlib as _imp
 
@@ -3483,29 +3798,10 @@ def invoice_estimate_html(invoice_id: str):
             return _error(HTTPStatus.NOT_FOUND, code, getattr(e, "message", str(e)))
         return _error(HTTPStatus.BAD_REQUEST, code, getattr(e, "message", str(e)))
     inv = data.get("invoice") or {}
-    # Inline vehicle ownership validation (estimate.html)
-    try:  # ownership validation
-        veh_id = inv.get("vehicle_id")
-        inv_cust = inv.get("customer_id")
-        if veh_id and inv_cust:
-            with db_conn().cursor() as cur:  # type: ignore
-                cur.execute("SELECT customer_id FROM vehicles WHERE id = %s", (int(veh_id),))
-                row = cur.fetchone()
-            owner_id = (
-                row[0]
-                if row and isinstance(row, tuple)
-                else (row.get("customer_id") if isinstance(row, dict) else None)
-            )
-            if owner_id is not None and int(inv_cust) != owner_id:
-                return _error(
-                    HTTPStatus.BAD_REQUEST, "bad_request", "vehicle does not belong to customer"
-                )
-    except Exception:
-        pass
-    html = f"<html><body><h1>Invoice Estimate {inv.get('id')}</h1><p>Status: {inv.get('status')}</p></body></html>"
-    resp = make_response(html, HTTPStatus.OK)
-    resp.headers["Content-Type"] = "text/html; charset=utf-8"
-    return resp
+    err = _invoice_owner_error(inv, _invoice_vehicle_owner(data))
+    if err:
+        return err
+    return _render_invoice_document(data, "estimate.html")
 
 
 @app.route("/api/admin/invoices/<invoice_id>/receipt.html", methods=["GET"])
@@ -3527,6 +3823,9 @@ def invoice_receipt_html(invoice_id: str):
             return _error(st, code, msg)
     # Enforce strict auth for export HTML
     require_auth_role("Advisor")
+    cached = _cached_invoice_document(invoice_id, "receipt.html")
+    if cached is not None:
+        return cached
     try:
         import importlib as _imp
 
@@ -3538,29 +3837,10 @@ def invoice_receipt_html(invoice_id: str):
             return _error(HTTPStatus.NOT_FOUND, code, getattr(e, "message", str(e)))
         return _error(HTTPStatus.BAD_REQUEST, code, getattr(e, "message", str(e)))
     inv = data.get("invoice") or {}
-    # Inline vehicle ownership validation (receipt.html)
-    try:  # ownership validation
-        veh_id = inv.get("vehicle_id")
-        inv_cust = inv.get("customer_id")
-        if veh_id and inv_cust:
-            with db_conn().cursor() as cur:  # type: ignore
-                cur.execute("SELECT customer_id FROM vehicles WHERE id = %s", (int(veh_id),))
-                row = cur.fetchone()
-            owner_id = (
-                row[0]
-                if row and isinstance(row, tuple)
-                else (row.get("customer_id") if isinstance(row, dict) else None)
-            )
-            if owner_id is not None and int(inv_cust) != owner_id:
-                return _error(
-                    HTTPStatus.BAD_REQUEST, "bad_request", "vehicle does not belong to customer"
-                )
-    except Exception:
-        pass
-    html = f"<html><body><h1>Invoice Receipt {inv.get('id')}</h1><p>Status: {inv.get('status')}</p></body></html>"
-    resp = make_response(html, HTTPStatus.OK)
-    resp.headers["Content-Type"] = "text/html; charset=utf-8"
-    return resp
+    err = _invoice_owner_error(inv, _invoice_vehicle_owner(data))
+    if err:
+        return err
+    return _render_invoice_document(data, "receipt.html")
 
 
 @app.route("/api/admin/invoices/<invoice_id>/send", methods=["POST"])
@@ -3601,17 +3881,10 @@ def invoice_send_stub(invoice_id: str):
     if send_type not in ("receipt", "estimate"):
         return _error(HTTPStatus.BAD_REQUEST, "INVALID_TYPE", "Unsupported send type")
 
-    # Step 3: Set tenant context for database operations (invoice service)
-    try:
-        conn = db_conn()
-        with conn.cursor() as cur:
-            cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
-        conn.close()
-    except Exception:
-        pass
-
     try:
-        invoice_service.fetch_invoice_details(invoice_id)  # existence check
+        # Existence check: primary-key probe, not the full detail read
+        if not invoice_service.fetch_invoice_version(invoice_id):
+            raise invoice_service.InvoiceError("NOT_FOUND", "Invoice not found")
     except invoice_service.InvoiceError as e:
         if e.code == "NOT_FOUND":
             return _error(HTTPStatus.NOT_FOUND, e.code, e.message)
@@ -3854,6 +4127,40 @@ def _issue_customer_token(cust_id: str) -> str:
     return token
 
 
+def _password_pool_busy(exc: _password_pool.PasswordPoolBusy):
+    resp, status = _error(
+        HTTPStatus.SERVICE_UNAVAILABLE, "unavailable", "Authentication busy, retry shortly"
+    )
+    resp.headers["Retry-After"] = str(exc.retry_after)
+    return resp, status
+
+
+def _schedule_password_rehash(customer_id: Any, old_hash: str, password: str) -> None:
+    """Store a fresh bcrypt hash after the response (legacy SHA256 or stale cost).
+
+    The UPDATE only applies while the row still holds old_hash, so a password
+    change that lands in between wins.
+    """
+
+    def _store(new_hash: str) -> None:
+        conn = db_conn()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE customer_auth SET password_hash=%s "
+                        "WHERE customer_id=%s AND password_hash=%s",
+                        (new_hash, customer_id, old_hash),
+                    )
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    _password_pool.get_pool().rehash_later(password, _store)
+
+
 @app.route("/api/customers/register", methods=["POST"])
 def customer_register():
     """Register a new customer (minimal fields) and issue a JWT.
@@ -3909,6 +4216,15 @@ def customer_register():
             "unavailable",
             "Memory mode not supported for customer auth",
         )
+    # Hash in the password pool before the transaction opens so bcrypt never
+    # holds locks; keep salt column for legacy compatibility (unused for bcrypt)
+    salt = uuid.uuid4().hex
+    try:
+        pw_hash = _password_pool.get_pool().hash(password)
+    except _password_pool.PasswordPoolBusy as exc:
+        return _password_pool_busy(exc)
+    except Exception:
+        pw_hash = _hash_password(password, salt)
     with conn:  # autocommit context
         with conn.cursor() as cur:
             # Resolve target tenant for this registration
@@ -3987,14 +4303,6 @@ def customer_register():
                 cust_id = _row.get("id") if hasattr(_row, "get") else None
             if not cust_id:
                 raise Exception("failed_to_create_customer")
-            # Store bcrypt by default; keep salt column for legacy compatibility (unused for bcrypt)
-            salt = uuid.uuid4().hex
-            try:
-                from backend.app.security.passwords import hash_password as _bcrypt_hash
-
-                pw_hash = _bcrypt_hash(password)
-            except Exception:
-                pw_hash = _hash_password(password, salt)
             cur.execute(
                 "INSERT INTO customer_auth(customer_id,email,password_hash,salt) VALUES (%s,%s,%s,%s)",
                 (cust_id, email, pw_hash, salt),
@@ -4095,24 +4403,17 @@ def customer_login():
     if not row:
         return _error(HTTPStatus.UNAUTHORIZED, "invalid_credentials", "Invalid email or password")
     try:
-        from backend.app.security.passwords import hash_password as _bcrypt_hash
-        from backend.app.security.passwords import verify_password_with_salt
-
-        ok, needs_migration = verify_password_with_salt(password, row["password_hash"], row["salt"])
+        ok, needs_rehash = _password_pool.get_pool().verify(
+            password, row["password_hash"], row["salt"]
+        )
+    except _password_pool.PasswordPoolBusy as exc:
+        return _password_pool_busy(exc)
     except Exception:
-        ok, needs_migration = False, False
+        ok, needs_rehash = False, False
     if not ok:
         return _error(HTTPStatus.UNAUTHORIZED, "invalid_credentials", "Invalid email or password")
-    if needs_migration:
-        try:
-            with conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "UPDATE customer_auth SET password_hash=%s WHERE customer_id=%s",
-                        (_bcrypt_hash(password), row["customer_id"]),
-                    )
-        except Exception:
-            pass
+    if needs_rehash:
+        _schedule_password_rehash(row["customer_id"], row["password_hash"], password)
     cust_id = row["customer_id"]
     name = row.get("name")
     token = _issue_customer_token(cust_id)
@@ -4203,7 +4504,7 @@ def _raw_db_connect():
             # Store immutable reference for later stability
             if not cache_disabled:
                 _DB_CONN_CONFIG_CACHE = dict(cfg)  # type: ignore
-        return psycopg2.connect(**cfg)
+        return psycopg2.connect(connection_factory=_TracedConnection, **cfg)
     except Exception:
         # On any failure, clear cache so recovery attempts can rebuild with new env
         if "_DB_CONN_CONFIG_CACHE" in globals():
@@ -4249,7 +4550,9 @@ def db_conn():
                     return patched()
                 finally:
                     _DB_CONN_TLS.in_call = False
+        t0 = time.perf_counter()
         conn = _raw_db_connect()
+        _DB_CONNECT_LATENCY.observe(time.perf_counter() - t0)
         # Enable diagnostic SQL logging when E2E or explicit flag
         if os.getenv("E2E_SQL_TRACE", "true").lower() == "true" or os.getenv("PYTEST_CURRENT_TEST"):
             conn = _wrap_connection_for_logging(conn)
@@ -4265,42 +4568,96 @@ def db_conn():
 # Diagnostics: lightweight cursor wrapper to log executed SQL for tracing
 # ----------------------------------------------------------------------------
 class _LoggingCursorProxy:
-    __slots__ = ("_cur",)
+    __slots__ = ("_cur", "_conn_serial")
 
-    def __init__(self, cur):
+    def __init__(self, cur, conn_serial=None):
         self._cur = cur
+        self._conn_serial = conn_serial
 
-    def execute(self, query, vars=None):  # pragma: no cover (diagnostic aid)
+    def _account(self, query, elapsed):
         try:
-            q = query if isinstance(query, str) else str(query)
-            q_single = " ".join(q.split())
-            if len(q_single) > 500:
-                q_single = q_single[:497] + "..."
-            log.debug(
-                "sql.execute",
-                extra={
-                    "sql": q_single,
-                    "vars": repr(vars)[:400],
-                },
-            )
+            sql = query if isinstance(query, str) else str(query)
+            _DB_QUERY_LATENCY.observe(elapsed, statement=_metrics_mod.statement_name(sql))
+            rows = self._cur.rowcount if self._cur.description is not None else 0
+            _query_stats.record(self._conn_serial, sql, elapsed, rows or 0)
         except Exception:
             pass
-        return self._cur.execute(query, vars)
+
+    def execute(self, query, vars=None):  # pragma: no cover (diagnostic aid)
+        # Normalizing the statement is the expensive part; skip it unless the
+        # "sql" debug category is enabled.
+        if _DEBUG_LOG_GATE.enabled("sql"):
+            try:
+                q = query if isinstance(query, str) else str(query)
+                q_single = " ".join(q.split())
+                if len(q_single) > 500:
+                    q_single = q_single[:497] + "..."
+                _debug_log("sql", "execute sql=%s vars=%s", q_single, repr(vars)[:400])
+            except Exception:
+                pass
+        t0 = time.perf_counter()
+        try:
+            return self._cur.execute(query, vars)
+        finally:
+            self._account(query, time.perf_counter() - t0)
+
+    def executemany(self, query, vars_list):  # pragma: no cover (diagnostic aid)
+        t0 = time.perf_counter()
+        try:
+            return self._cur.executemany(query, vars_list)
+        finally:
+            self._account(query, time.perf_counter() - t0)
+
+    # Special methods bypass __getattr__; ``with conn.cursor() as cur`` and
+    # ``for row in cur`` need them spelled out.
+    def __enter__(self):
+        self._cur.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cur.__exit__(*exc)
+
+    def __iter__(self):
+        return iter(self._cur)
 
     # delegate common cursor attributes
     def __getattr__(self, item):  # pragma: no cover simple delegation
         return getattr(self._cur, item)
 
 
+class _TracedConnection(psycopg2.extensions.connection):
+    """psycopg2 connection whose cursors can be wrapped for SQL logging.
+
+    cursor() is a method rather than a per-instance closure: a closure stored
+    on the connection would reference the connection's own bound method, and
+    that cycle keeps the connection (and its server session) open until the
+    cyclic GC runs instead of closing it when the last reference goes away.
+    """
+
+    _sql_logging_wrapped = False
+
+    def cursor(self, *a, **kw):
+        real = super().cursor(*a, **kw)
+        if not self._sql_logging_wrapped:
+            return real
+        return _LoggingCursorProxy(real, _query_stats.connection_serial(self))
+
+
 def _wrap_connection_for_logging(conn):
     try:
         if getattr(conn, "_sql_logging_wrapped", False):
             return conn
-        orig_cursor = conn.cursor
+        if isinstance(conn, _TracedConnection):
+            conn._sql_logging_wrapped = True
+            return conn
+        # Other connection objects (test doubles): patch the instance, holding the
+        # connection weakly so the patch does not create a reference cycle.
+        serial = _query_stats.connection_serial(conn)
+        ref = weakref.ref(conn)
+        orig_cursor = type(conn).cursor
 
         def cursor(*a, **kw):  # pragma: no cover debugging helper
-            real = orig_cursor(*a, **kw)
-            return _LoggingCursorProxy(real)
+            return _LoggingCursorProxy(orig_cursor(ref(), *a, **kw), serial)
 
         conn.cursor = cursor  # type: ignore
         conn._sql_logging_wrapped = True  # type: ignore
@@ -4332,6 +4689,73 @@ def safe_conn():
         return None, False, e
 
 
+try:
+    from backend.schema_capabilities import SchemaCapabilities
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from schema_capabilities import SchemaCapabilities  # type: ignore
+
+
+def _load_schema_columns():
+    conn = db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT table_name, column_name, data_type FROM information_schema.columns"
+                " WHERE table_schema = current_schema()"
+            )
+            rows = cur.fetchall() or []
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    tables: Dict[str, Dict[str, str]] = {}
+    for r in rows:
+        table, column, data_type = (
+            (r["table_name"], r["column_name"], r["data_type"]) if isinstance(r, dict) else r
+        )
+        tables.setdefault(table, {})[column] = data_type
+    return tables
+
+
+def _schema_migration_version() -> Optional[str]:
+    """run_sql_migrations history plus the alembic head; None when neither exists."""
+    conn = db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT to_regclass('migration_sql_history') IS NOT NULL,"
+                " to_regclass('alembic_version') IS NOT NULL"
+            )
+            row = cur.fetchone()
+            has_sql, has_alembic = row.values() if isinstance(row, dict) else row
+            parts = []
+            if has_sql:
+                cur.execute("SELECT count(*), max(filename) FROM migration_sql_history")
+                row = cur.fetchone()
+                parts.append(":".join(map(str, row.values() if isinstance(row, dict) else row)))
+            if has_alembic:
+                cur.execute("SELECT string_agg(version_num, ',') FROM alembic_version")
+                row = cur.fetchone()
+                parts.append(str(next(iter(row.values())) if isinstance(row, dict) else row[0]))
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    return "|".join(parts) or None
+
+
+# Column capabilities for handlers that support several schema generations; they
+# choose SQL from this instead of running the newest query and retrying on error.
+SCHEMA = SchemaCapabilities(load=_load_schema_columns, fetch_version=_schema_migration_version)
+
+
+def _has_column(cur, table: str, column: str) -> bool:
+    """Registry answer, or a savepoint-guarded probe on cur while the schema is unknown."""
+    return SCHEMA.probe(cur, table, column) is not None
+
+
 _STATUS_ALIASES = {
     "scheduled": "SCHEDULED",
     "in_progress": "IN_PROGRESS",
@@ -4383,11 +4807,11 @@ def require_auth_role(required: Optional[str] = None) -> Dict[str, Any]:
     import time
 
     timestamp = time.time()
-    print(f"[DEBUG] {timestamp} require_auth_role called with required={required}")
+    _debug_log("auth", "%s require_auth_role called with required=%s", timestamp, required)
     try:
-        print(f"[DEBUG] {timestamp} request.path: {request.path}")
+        _debug_log("auth", "%s request.path: %s", timestamp, request.path)
     except Exception as e:
-        print(f"[DEBUG] {timestamp} Error accessing request.path: {e}")
+        _debug_log("auth", "%s Error accessing request.path: %s", timestamp, e)
     # E2E bypass: if we're in CI mode with proper tenant header and auth, return test payload
     try:
         tenant_header = request.headers.get("X-Tenant-Id", "")
@@ -4401,8 +4825,7 @@ def require_auth_role(required: Optional[str] = None) -> Dict[str, Any]:
         )
 
         if is_e2e_bypass:
-            print(f"[E2E_DEBUG] require_auth_role E2E bypass activated for path {request.path}")
-            app.logger.error(f"require_auth_role E2E bypass activated for path {request.path}")
+            _debug_log("auth", "require_auth_role E2E bypass activated for path %s", request.path)
             # Return test payload with required role
             return {
                 "sub": "test-user-e2e",
@@ -4410,7 +4833,7 @@ def require_auth_role(required: Optional[str] = None) -> Dict[str, Any]:
                 "email": "test@example.com",
             }
     except Exception as e:
-        print(f"[E2E_DEBUG] Exception in require_auth_role E2E bypass: {e}")
+        _debug_log("auth", "Exception in require_auth_role E2E bypass: %s", e)
         pass
 
     # DEV_NO_AUTH bypass for development environment
@@ -4424,11 +4847,13 @@ def require_auth_role(required: Optional[str] = None) -> Dict[str, Any]:
         dev_bypass = os.getenv("DEV_NO_AUTH", "true").lower() == "true"
 
     if dev_bypass:
-        print(f"[DEV_DEBUG] require_auth_role DEV_NO_AUTH bypass activated for path {request.path}")
+        _debug_log(
+            "auth", "require_auth_role DEV_NO_AUTH bypass activated for path %s", request.path
+        )
         # Also set tenant context for development mode
         if not hasattr(g, "tenant_id") or not g.tenant_id:
             g.tenant_id = os.getenv("DEFAULT_TEST_TENANT", "00000000-0000-0000-0000-000000000001")
-            print(f"[DEV_DEBUG] Set tenant_id for development: {g.tenant_id}")
+            _debug_log("auth", "Set tenant_id for development: %s", g.tenant_id)
         return {"sub": "dev-user", "role": required or "Owner"}
 
     auth = request.headers.get("Authorization", "")
@@ -4450,7 +4875,7 @@ def require_auth_role(required: Optional[str] = None) -> Dict[str, Any]:
     try:
         try:
             if app.config.get("TESTING"):
-                log.info("DEBUG_TOKEN_RAW %s", token[:40])
+                _debug_log("auth", "DEBUG_TOKEN_RAW %s", token[:40])
         except Exception:
             pass
         # Increase leeway for test mode to avoid clock skew issues in fast test environments
@@ -4464,8 +4889,11 @@ def require_auth_role(required: Optional[str] = None) -> Dict[str, Any]:
         )
         try:
             if app.config.get("TESTING"):
-                log.info(
-                    "DEBUG_TOKEN_DECODE role=%s sub=%s", payload.get("role"), payload.get("sub")
+                _debug_log(
+                    "auth",
+                    "DEBUG_TOKEN_DECODE role=%s sub=%s",
+                    payload.get("role"),
+                    payload.get("sub"),
                 )
         except Exception:
             pass
@@ -4486,7 +4914,13 @@ def require_auth_role(required: Optional[str] = None) -> Dict[str, Any]:
     role = payload.get("role", "Advisor")
     try:
         if app.config.get("TESTING") and request.path.endswith("/history"):
-            log.info("AUTH_HISTORY path=%s role=%s sub=%s", request.path, role, payload.get("sub"))
+            _debug_log(
+                "auth",
+                "AUTH_HISTORY path=%s role=%s sub=%s",
+                request.path,
+                role,
+                payload.get("sub"),
+            )
     except Exception:
         pass
     # Allow Accountant to access Advisor-gated endpoints (read/report style)
@@ -4513,8 +4947,7 @@ def maybe_auth(required: Optional[str] = None) -> Optional[Dict[str, Any]]:
         )
 
         if is_e2e_bypass:
-            print(f"[E2E_DEBUG] maybe_auth E2E bypass activated for path {request.path}")
-            app.logger.error(f"maybe_auth E2E bypass activated for path {request.path}")
+            _debug_log("auth", "maybe_auth E2E bypass activated for path %s", request.path)
             # Return test payload with required role
             return {
                 "sub": "test-user-e2e",
@@ -4522,7 +4955,7 @@ def maybe_auth(required: Optional[str] = None) -> Optional[Dict[str, Any]]:
                 "email": "test@example.com",
             }
     except Exception as e:
-        print(f"[E2E_DEBUG] Exception in maybe_auth E2E bypass: {e}")
+        _debug_log("auth", "Exception in maybe_auth E2E bypass: %s", e)
         pass
 
     try:
@@ -4551,7 +4984,9 @@ def rate_limit(key: str, limit: int = RATE_LIMIT_PER_MINUTE, window: int = 60):
     now = time.time()
     with _RATE_LOCK:
         if app.config.get("TESTING"):
-            log.info("DEBUG_RATE_PRE key=%s state=%s limit=%s", key, _RATE.get(key), limit)
+            _debug_log(
+                "rate_limit", "DEBUG_RATE_PRE key=%s state=%s limit=%s", key, _RATE.get(key), limit
+            )
         count, start = _RATE.get(key, (0, now))
         # Special-case tests that seed start=0 to force immediate block when at/over limit
         if start == 0 and count >= limit:
@@ -4566,7 +5001,7 @@ def rate_limit(key: str, limit: int = RATE_LIMIT_PER_MINUTE, window: int = 60):
         _RATE[key] = (count + 1, start)
         if app.config.get("TESTING"):
             try:
-                log.info("DEBUG_RATE_POST key=%s new_state=%s", key, _RATE.get(key))
+                _debug_log("rate_limit", "DEBUG_RATE_POST key=%s new_state=%s", key, _RATE.get(key))
             except Exception:
                 pass
 
@@ -4671,13 +5106,17 @@ def generate_invoice(appt_id: str):
     global _MEM_INVOICES, _MEM_INVOICE_SEQ  # mutate module globals we increment/assign here
     # Explicit debug to verify route registration and execution
     try:
-        print(
-            f"[INVOICE DEBUG] Route hit for appointment={appt_id} method={request.method} path={request.path}"
+        _debug_log(
+            "invoice",
+            "Route hit for appointment=%s method=%s path=%s",
+            appt_id,
+            request.method,
+            request.path,
         )
         # Log key headers that may affect auth/tenant routing
         auth_hdr = request.headers.get("Authorization")
         ten_hdr = request.headers.get("X-Tenant-Id")
-        print(f"[INVOICE DEBUG] Authorization present={bool(auth_hdr)} X-Tenant-Id={ten_hdr}")
+        _debug_log("invoice", "Authorization present=%s X-Tenant-Id=%s", bool(auth_hdr), ten_hdr)
     except Exception:
         pass
     # If DB is down, provide minimal in-memory fallback so slim E2E can proceed
@@ -4715,7 +5154,7 @@ def generate_invoice(appt_id: str):
             "amount_due_cents": total,
         }
         _MEM_INVOICES[inv_id] = data  # type: ignore
-        print(f"[INVOICE DEBUG] Memory path -> created invoice id={inv_id} total_cents={total}")
+        _debug_log("invoice", "Memory path -> created invoice id=%s total_cents=%s", inv_id, total)
         return _ok(data, status=HTTPStatus.CREATED)
     # Lightweight default: always emit a minimal invoice snapshot to keep UI flows testable.
     # Domain-backed generation is exercised in backend tests; here we prefer resilience.
@@ -4736,7 +5175,7 @@ def generate_invoice(appt_id: str):
                 subtotal = int(round(float(row.get("total") or 0) * 100))
     except Exception as e:
         try:
-            print(f"[INVOICE DEBUG] DB subtotal lookup failed: {e}")
+            _debug_log("invoice", "DB subtotal lookup failed: %s", e)
         except Exception:
             pass
         pass
@@ -4752,13 +5191,54 @@ def generate_invoice(appt_id: str):
         "amount_due_cents": subtotal,
     }
     _MEM_INVOICES[inv_id] = data  # type: ignore
-    print(
-        f"[INVOICE DEBUG] DB-backed lightweight path -> created invoice id={inv_id} subtotal_cents={subtotal}"
+    _debug_log(
+        "invoice",
+        "DB-backed lightweight path -> created invoice id=%s subtotal_cents=%s",
+        inv_id,
+        subtotal,
     )
     return _ok(data, status=HTTPStatus.CREATED)
 
 
+@app.route("/api/admin/invoices/batch", methods=["POST"])
+def generate_invoices_batch():
+    """Invoice many appointments at once (end-of-day runs).
+
+    Body: {"appointment_ids": [...]} or {"from": "YYYY-MM-DD", "to": "YYYY-MM-DD"}.
+    Returns per-appointment outcomes (created / skipped with a reason code).
+    """
+    require_auth_role("Advisor")
+    body = request.get_json(silent=True) or {}
+    ids = body.get("appointment_ids")
+    if ids is not None and not isinstance(ids, list):
+        return _error(HTTPStatus.BAD_REQUEST, "invalid_input", "appointment_ids must be a list")
+    try:
+        date_from = datetime.strptime(body["from"], "%Y-%m-%d").date() if body.get("from") else None
+        date_to = datetime.strptime(body["to"], "%Y-%m-%d").date() if body.get("to") else None
+    except (TypeError, ValueError):
+        return _error(HTTPStatus.BAD_REQUEST, "invalid_input", "from/to must be YYYY-MM-DD")
+    if date_from and date_to and date_to < date_from:
+        return _error(HTTPStatus.BAD_REQUEST, "invalid_input", "to must not be before from")
+    try:
+        data = invoice_service.generate_invoices_bulk(
+            appointment_ids=ids, date_from=date_from, date_to=date_to, tenant_id=g.tenant_id
+        )
+    except invoice_service.InvoiceError as e:
+        code = e.code.lower()
+        if code in {"invalid_input", "too_many"}:
+            return _error(HTTPStatus.BAD_REQUEST, code, e.message)
+        log.exception("batch invoice generation failed code=%s", code)
+        return _error(HTTPStatus.INTERNAL_SERVER_ERROR, code, "Batch invoice generation failed")
+    except Exception:
+        log.exception("batch invoice generation failed")
+        return _error(
+            HTTPStatus.INTERNAL_SERVER_ERROR, "invoice_error", "Batch invoice generation failed"
+        )
+    return _ok(data)
+
+
 @app.route("/api/admin/invoices/<invoice_id>", methods=["GET"])
+@conditional_get(lambda kw, _tenant: [f"invoice:{kw['invoice_id']}"])
 def get_invoice(invoice_id: str):
     # Enforce Advisor-level auth for invoice retrieval
     require_auth_role("Advisor")
@@ -5003,9 +5483,19 @@ def create_invoice_payment(invoice_id: str):
             },
             status=HTTPStatus.CREATED,
         )
+    idempotency_key = (
+        request.headers.get("Idempotency-Key")
+        or request.headers.get("X-Idempotency-Key")
+        or body.get("idempotencyKey")
+        or None
+    )
     try:
         data = invoice_service.record_payment_for_invoice(
-            invoice_id, amount_cents=amount_cents, method=method, note=note
+            invoice_id,
+            amount_cents=amount_cents,
+            method=method,
+            note=note,
+            idempotency_key=idempotency_key,
         )
     except Exception as e:
         code = getattr(e, "code", "payment_error").lower()
@@ -5014,8 +5504,10 @@ def create_invoice_payment(invoice_id: str):
             return _error(HTTPStatus.NOT_FOUND, code, msg)
         if code in {"already_paid", "overpayment", "invalid_amount", "invalid_state"}:
             return _error(HTTPStatus.BAD_REQUEST, code, msg)
+        if code in {"conflict", "idempotency_mismatch"}:
+            return _error(HTTPStatus.CONFLICT, code, msg)
         return _error(HTTPStatus.INTERNAL_SERVER_ERROR, code, msg)
-    return _ok(data, status=HTTPStatus.CREATED)
+    return _ok(data, status=HTTPStatus.OK if data.get("replayed") else HTTPStatus.CREATED)
 
 
 @app.route("/api/admin/invoices/<invoice_id>/void", methods=["POST"])
@@ -5193,6 +5685,7 @@ def health():
 # Board
 # ----------------------------------------------------------------------------
 @app.route("/api/admin/appointments/board", methods=["GET"])
+@conditional_get(_board_signature_keys, vary=("techId", "includeCarryover"))
 def get_board():
     # Step 1: Enforce authentication with role requirement
     require_auth_role("Advisor")
@@ -5275,7 +5768,7 @@ def get_board():
                             "year": None,
                             "license_plate": a.get("vehicle_id"),
                             "vin": a.get("vehicle_id"),
-                            "price": a.get("total_amount", 0),
+                            "price": float(a.get("total_amount") or 0),
                         }
                     )
             except NameError:
@@ -5289,7 +5782,7 @@ def get_board():
                 rows = []
                 params: list[Any] = []
                 # If explicit from/to provided, use them; otherwise, use shop-local day window
-                print(f"[DEBUG] frm={frm}, to={to}, condition={bool(frm or to)}")
+                _debug_log("board", "frm=%s, to=%s, condition=%s", frm, to, bool(frm or to))
                 if frm or to:
                     where = ["1=1"]
                     if frm:
@@ -5456,20 +5949,21 @@ def get_board():
                 "id": r["id"],
                 "customerName": customer_out,
                 "vehicle": veh_out,
-                "price": float(r.get("price") or 0),
+                "price": r.get("price") or 0.0,
                 # Phase 1 service catalog linkage (optional)
                 "primaryOperationId": r.get("primary_operation_id"),
                 "primaryOperationName": r.get("primary_operation_name"),
                 "serviceCategory": r.get("service_category"),
                 "status": status,
                 "position": position_by_status[status],
-                "start": r.get("start_ts").isoformat() if r.get("start_ts") else None,
-                "end": r.get("end_ts").isoformat() if r.get("end_ts") else None,
-                "startedAt": r.get("started_at").isoformat() if r.get("started_at") else None,
-                "completedAt": r.get("completed_at").isoformat() if r.get("completed_at") else None,
+                # datetimes are encoded by the app JSON provider (json_provider.py)
+                "start": r.get("start_ts"),
+                "end": r.get("end_ts"),
+                "startedAt": r.get("started_at"),
+                "completedAt": r.get("completed_at"),
                 # expose check-in/out to drive on-prem indicators and days-on-lot
-                "checkInAt": r.get("check_in_at").isoformat() if r.get("check_in_at") else None,
-                "checkOutAt": r.get("check_out_at").isoformat() if r.get("check_out_at") else None,
+                "checkInAt": r.get("check_in_at"),
+                "checkOutAt": r.get("check_out_at"),
                 "techAssigned": r.get("tech_id"),
                 "techInitials": r.get("tech_initials"),
                 "techName": r.get("tech_name"),
@@ -5749,25 +6243,19 @@ def appointment_message_detail(appt_id: str, message_id: str):
 # ----------------------------------------------------------------------------
 # Message Templates (Increment 4) — dynamic CRUD for SMS/Email templates
 # ----------------------------------------------------------------------------
+try:
+    from backend import message_template_registry as _message_templates
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import message_template_registry as _message_templates  # type: ignore
+
+
 def _extract_variables_from_body(body: str) -> list[str]:
-    """Lightweight server-side variable extractor to mirror frontend logic.
+    """Variable paths of a template body, mirroring the frontend extractor.
 
-    Matches {{ path.to.value }} ignoring escaped \{{ }} tokens. Only accepts a-zA-Z0-9_. paths.
+    Matches {{ path.to.value }} ignoring escaped \\{{ }} tokens. Only accepts a-zA-Z0-9_. paths.
+    Delegates to the compiled render plan so each distinct body is parsed once.
     """
-    import re
-
-    token_re = re.compile(r"\\?{{\s*([^{}]+?)\s*}}")
-    vars_set: set[str] = set()
-    for m in token_re.finditer(body or ""):
-        full = m.group(0)
-        inner = m.group(1).strip()
-        if full.startswith("\\{{"):
-            continue  # escaped literal
-        pipe_index = inner.find("|")
-        path = inner[:pipe_index].strip() if pipe_index != -1 else inner
-        if path and all(c.isalnum() or c in "._" for c in path):
-            vars_set.add(path)
-    return sorted(vars_set)
+    return _message_templates.extract_variables(body)
 
 
 def _row_to_template(r: dict) -> dict:
@@ -5785,49 +6273,74 @@ def _row_to_template(r: dict) -> dict:
     }
 
 
-@app.route("/api/admin/message-templates", methods=["GET"])
-def list_message_templates():
-    """List active message templates. Advisors can view; Owners manage."""
-    require_auth_role("Advisor")
-    include_inactive = request.args.get("includeInactive", "false").lower() == "true"
-    channel = request.args.get("channel")
-    category = request.args.get("category")
-    q = request.args.get("q")
-    appt_status_raw = request.args.get("appointment_status")  # optional heuristic input
+def _load_message_templates(_tenant_id) -> list[dict]:
     conn = db_conn()
-    sql = [
-        "SELECT id, slug, label, channel, category, body, variables, is_active, created_at, updated_at FROM message_templates WHERE 1=1"
-    ]
-    params: list = []
-    if not include_inactive:
-        sql.append("AND is_active IS TRUE")
-    if channel:
-        sql.append("AND channel = %s")
-        params.append(channel)
-    if category:
-        sql.append("AND category = %s")
-        params.append(category)
-    if q:
-        sql.append(
-            "AND (LOWER(label) LIKE %s OR LOWER(body) LIKE %s OR LOWER(COALESCE(category,'')) LIKE %s)"
-        )
-        like = f"%{q.lower()}%"
-        params.extend([like, like, like])
-    sql.append("ORDER BY category NULLS LAST, label ASC LIMIT 500")
     with conn:
         with conn.cursor() as cur:
-            cur.execute(" ".join(sql), params)
+            cur.execute(
+                "SELECT id, slug, label, channel, category, body, variables, is_active, created_at, updated_at FROM message_templates ORDER BY category NULLS LAST, label ASC"
+            )
             rows = cur.fetchall()
-    templates = [_row_to_template(r) for r in rows]
+    return [_row_to_template(r) for r in rows]
 
-    # ------------------------------------------------------------------
-    # Suggestions (heuristic: appointment_status -> ordered slug list)
-    # ------------------------------------------------------------------
-    suggested_payload = None
-    if appt_status_raw:
-
-        def _norm_status(s: str) -> str:
-            return re.sub(r"[^A-Z0-9]+", "_", s.strip().upper()) if s else ""
+
+def _message_templates_version(_tenant_id) -> Optional[str]:
+    conn = db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT weak_etag FROM page_signature WHERE entity_id = %s",
+                ("message_templates:global",),
+            )
+            row = cur.fetchone()
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    if isinstance(row, dict):
+        return row.get("weak_etag")
+    return row[0] if row else None
+
+
+_MESSAGE_TEMPLATES = _message_templates.TemplateRegistry(
+    load=_load_message_templates, fetch_version=_message_templates_version
+)
+
+
+def _message_templates_changed() -> None:
+    _MESSAGE_TEMPLATES.bump()
+    _TEMPLATE_MAP.invalidate()
+
+
+@app.route("/api/admin/message-templates", methods=["GET"])
+def list_message_templates():
+    """List active message templates. Advisors can view; Owners manage."""
+    require_auth_role("Advisor")
+    include_inactive = request.args.get("includeInactive", "false").lower() == "true"
+    channel = request.args.get("channel")
+    category = request.args.get("category")
+    q = request.args.get("q")
+    appt_status_raw = request.args.get("appointment_status")  # optional heuristic input
+    entry, cached = _MESSAGE_TEMPLATES.get(g.tenant_id or "global")
+    _CACHE_REQUESTS.inc(cache="message_templates", result="hit" if cached else "miss")
+    etag = entry.etag(g.tenant_id, (include_inactive, channel, category, q, appt_status_raw))
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and etag in {t.strip() for t in if_none_match.split(",")}:
+        resp = make_response("", 304)
+        resp.headers["ETag"] = etag
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+    templates = entry.query(include_inactive, channel=channel, category=category, q=q)
+
+    # ------------------------------------------------------------------
+    # Suggestions (heuristic: appointment_status -> ordered slug list)
+    # ------------------------------------------------------------------
+    suggested_payload = None
+    if appt_status_raw:
+
+        def _norm_status(s: str) -> str:
+            return re.sub(r"[^A-Z0-9]+", "_", s.strip().upper()) if s else ""
 
         status_norm = _norm_status(appt_status_raw)
         # Mapping (extendable). Slugs must match message_templates.slug values.
@@ -5855,7 +6368,10 @@ def list_message_templates():
     if appt_status_raw and suggested_payload is not None:
         # Always include suggested (possibly empty list) when appointment_status provided
         resp["suggested"] = suggested_payload
-    return _ok(resp)
+    out, status = _ok(resp)
+    out.headers["ETag"] = etag
+    out.headers["Cache-Control"] = "private, no-cache"
+    return out, status
 
 
 @app.route("/api/admin/message-templates", methods=["POST"])
@@ -5900,6 +6416,7 @@ def create_message_template():
             )
             row = cur.fetchone()
             audit(conn, user.get("sub"), "CREATE", "message_template", row["id"], {}, row)
+    _message_templates_changed()
     return _ok(_row_to_template(row), status=HTTPStatus.CREATED)
 
 
@@ -5961,6 +6478,7 @@ def update_message_template(tid: str):
             audit(
                 conn, user.get("sub"), "UPDATE", "message_template", existing["id"], before, updated
             )
+    _message_templates_changed()
     return _ok(_row_to_template(updated))
 
 
@@ -6003,6 +6521,7 @@ def delete_message_template(tid: str):
                     existing,
                     {},
                 )
+    _message_templates_changed()
     return _ok({"deleted": True, "soft": soft})
 
 
@@ -6014,6 +6533,16 @@ _TELEMETRY_COUNT = 0
 TELEMETRY_SOFT_LIMIT = 100_000
 TELEMETRY_HARD_LIMIT = 200_000
 _TELEMETRY_SOFT_WARN_EMITTED = False  # internal flag to aid deterministic testing
+# TELEMETRY_QUOTA_ENABLED=1 enforces the quota outside tests, counted in the
+# shared store (telemetry_quota.py) so the limit holds across workers.
+TELEMETRY_QUOTA_ENABLED = os.getenv("TELEMETRY_QUOTA_ENABLED", "0").lower() in ("1", "true", "yes")
+
+try:
+    from backend.telemetry_quota import SharedDailyQuota
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from telemetry_quota import SharedDailyQuota  # type: ignore
+
+_TELEMETRY_QUOTA = SharedDailyQuota(connect=lambda: db_conn())
 
 
 def _telemetry_increment(kind: str) -> bool:
@@ -6024,11 +6553,29 @@ def _telemetry_increment(kind: str) -> bool:
     """
     # Quota enforcement only active when explicit flag enabled.
     # During pytest runs (PYTEST_CURRENT_TEST), always enable logic to ensure deterministic tests
-    if not (getattr(app, "ENABLE_TELEMETRY_QUOTA_TEST", False) or os.getenv("PYTEST_CURRENT_TEST")):
+    test_quota = getattr(app, "ENABLE_TELEMETRY_QUOTA_TEST", False) or os.getenv(
+        "PYTEST_CURRENT_TEST"
+    )
+    if not (test_quota or TELEMETRY_QUOTA_ENABLED):
         return True
     global _TELEMETRY_DAY, _TELEMETRY_COUNT, _TELEMETRY_SOFT_WARN_EMITTED
     from datetime import datetime, timezone
 
+    if not test_quota:
+        # Shared across workers (telemetry_quota_daily); per-process count if the DB is down.
+        try:
+            allowed, crossed_soft = _TELEMETRY_QUOTA.take(
+                kind, TELEMETRY_HARD_LIMIT, TELEMETRY_SOFT_LIMIT
+            )
+        except Exception as e:
+            log.debug("telemetry quota store unavailable, counting locally: %s", e)
+        else:
+            if crossed_soft:
+                app.logger.warning(
+                    "telemetry_soft_limit_exceeded",
+                    extra={"kind": kind, "soft_limit": TELEMETRY_SOFT_LIMIT},
+                )
+            return allowed
     today = datetime.now(timezone.utc).date()
     if _TELEMETRY_DAY != today:
         _TELEMETRY_DAY = today
@@ -6056,6 +6603,108 @@ def _test_reset_telemetry_counters():  # pragma: no cover - test helper
     _TELEMETRY_SOFT_WARN_EMITTED = False
 
 
+try:
+    from backend import template_usage_ingest as _template_usage_ingest
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import template_usage_ingest as _template_usage_ingest  # type: ignore
+
+# Buffered template-usage ingestion (template_usage_ingest.py): templates are
+# resolved from memory and events reach the database in multi-row batches.
+_TEMPLATE_MAP = _template_usage_ingest.TemplateMap(connect=lambda: db_conn())
+_TEMPLATE_USAGE_BUFFER = _template_usage_ingest.UsageBuffer(connect=lambda: db_conn())
+atexit.register(_TEMPLATE_USAGE_BUFFER.close)
+
+
+def _enqueue_template_usage(
+    raw_tid: str,
+    tpl_slug: str,
+    channel: str,
+    appt_id: Any,
+    delivery_ms: Any,
+    was_automated: bool,
+    idempotency_key: str,
+    user_id: Optional[str],
+):
+    """Validate one usage event in-request and hand it to the ingest buffer.
+
+    Answers 202 (queued) or 200 (idempotency key already seen by this worker);
+    duplicates across workers are dropped by the batch INSERT.
+    """
+    tpl = _TEMPLATE_MAP.resolve(raw_tid or tpl_slug, slug_only=not raw_tid)
+    if not tpl:
+        return _error(HTTPStatus.NOT_FOUND, "TEMPLATE_NOT_FOUND", "Template not found")
+    if tpl_slug and tpl_slug != tpl["slug"]:
+        return _error(
+            HTTPStatus.BAD_REQUEST, "SLUG_MISMATCH", "Provided slug does not match template"
+        )
+    if channel and channel not in ("sms", "email"):
+        return _error(HTTPStatus.BAD_REQUEST, "INVALID_CHANNEL", "channel must be sms or email")
+    channel_final = channel or tpl["channel"]
+    if delivery_ms is not None:
+        try:
+            delivery_ms = int(delivery_ms)
+            if delivery_ms < 0:
+                raise ValueError
+        except Exception:
+            return _error(
+                HTTPStatus.BAD_REQUEST,
+                "INVALID_DELIVERY_MS",
+                "delivery_ms must be non-negative integer",
+            )
+    if appt_id is not None:
+        try:
+            appt_id = int(appt_id)
+        except (TypeError, ValueError):
+            return _error(
+                HTTPStatus.BAD_REQUEST, "INVALID_APPOINTMENT_ID", "appointment_id must be integer"
+            )
+    # A batch row must not fail on a malformed value: non-UUID subjects are stored as NULL.
+    try:
+        user_uuid = str(uuid.UUID(str(user_id))) if user_id else None
+    except ValueError:
+        user_uuid = None
+    row_hash = None
+    if idempotency_key:
+        row_hash = hashlib.sha256(
+            (str(tpl["id"]) + "|" + idempotency_key + "|" + channel_final).encode("utf-8")
+        ).hexdigest()
+    event = {
+        "id": str(uuid.uuid4()),
+        "template_id": tpl["id"],
+        "template_slug": tpl["slug"],
+        "channel": channel_final,
+        "appointment_id": appt_id,
+        "user_id": user_uuid,
+        "sent_at": datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+        "delivery_ms": delivery_ms,
+        "was_automated": was_automated,
+        "hash": row_hash,
+    }
+    outcome = _TEMPLATE_USAGE_BUFFER.enqueue(event)
+    if outcome == "full":
+        resp, status = _error(
+            HTTPStatus.SERVICE_UNAVAILABLE, "ingest_backlog", "telemetry buffer full"
+        )
+        resp.headers["Retry-After"] = "1"
+        return resp, status
+    if outcome == "duplicate":
+        return _ok(
+            {
+                "template_usage_event": {
+                    "template_id": tpl["id"],
+                    "template_slug": tpl["slug"],
+                    "channel": channel_final,
+                    "hash": row_hash,
+                    "idempotent": True,
+                }
+            }
+        )
+    return _ok(
+        {"template_usage_event": {**event, "idempotent": False, "queued": True}},
+        status=HTTPStatus.ACCEPTED,
+    )
+
+
 @app.route("/api/admin/template-usage", methods=["POST"])
 def log_template_usage():
     """Log a template usage event.
@@ -6104,6 +6753,18 @@ def log_template_usage():
             HTTPStatus.BAD_REQUEST, "MISSING_TEMPLATE", "template_id or template_slug required"
         )
 
+    if _template_usage_ingest.buffered_ingest_enabled():
+        return _enqueue_template_usage(
+            raw_tid,
+            tpl_slug,
+            channel,
+            appt_id,
+            delivery_ms,
+            was_automated,
+            idempotency_key,
+            explicit_user_id,
+        )
+
     conn = db_conn()
     with conn:
         with conn.cursor() as cur:
@@ -6229,6 +6890,23 @@ def log_template_usage():
     )
 
 
+# Deterministic minimal memory-mode technicians for smoke tests
+_MEM_TECHNICIANS = (
+    {
+        "id": "11111111-1111-1111-1111-111111111111",
+        "name": "Alice Wrench",
+        "initials": "AW",
+        "is_active": True,
+    },
+    {
+        "id": "22222222-2222-2222-2222-222222222222",
+        "name": "Bob Socket",
+        "initials": "BS",
+        "is_active": True,
+    },
+)
+
+
 @app.route("/api/admin/technicians", methods=["GET"])
 def technicians_list():
     """List technicians (active by default) for UI selection.
@@ -6257,24 +6935,8 @@ def technicians_list():
                 )
                 rows = cur.fetchall() or []
     elif use_memory:
-        # Deterministic minimal memory-mode technicians for smoke tests
         rows = [
-            {
-                "id": "11111111-1111-1111-1111-111111111111",
-                "name": "Alice Wrench",
-                "initials": "AW",
-                "is_active": True,
-                "created_at": datetime.utcnow(),
-                "updated_at": None,
-            },
-            {
-                "id": "22222222-2222-2222-2222-222222222222",
-                "name": "Bob Socket",
-                "initials": "BS",
-                "is_active": True,
-                "created_at": datetime.utcnow(),
-                "updated_at": None,
-            },
+            {**t, "created_at": datetime.utcnow(), "updated_at": None} for t in _MEM_TECHNICIANS
         ]
     else:
         return _error(HTTPStatus.INTERNAL_SERVER_ERROR, "db_unavailable", "Database unavailable")
@@ -6293,26 +6955,278 @@ def technicians_list():
     return jsonify({"technicians": technicians})
 
 
+def _parse_slot_ts(raw: Optional[str]) -> Optional[datetime]:
+    if not raw:
+        return None
+    try:
+        dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+_FREE_SLOTS_MAX_RANGE = timedelta(days=31)
+
+
+def _scheduling_args(start_arg: str, end_arg: Optional[str]):
+    """Parse tech_id (repeatable / comma-separated) and an ISO range.
+
+    Returns (tech_ids, range_start, range_end, error_response_or_None).
+    """
+    tech_ids: list[str] = []
+    for raw in request.args.getlist("tech_id"):
+        tech_ids.extend(t.strip() for t in raw.split(",") if t.strip())
+    tech_ids = list(dict.fromkeys(tech_ids))
+    for tid in tech_ids:
+        try:
+            uuid.UUID(tid)
+        except ValueError:
+            bad = _error(HTTPStatus.BAD_REQUEST, "invalid_request", f"Invalid tech_id: {tid}")
+            return tech_ids, None, None, bad
+    range_start = _parse_slot_ts(request.args.get(start_arg))
+    range_end = _parse_slot_ts(request.args.get(end_arg)) if end_arg else None
+    if range_start is None or (end_arg and (range_end is None or range_end <= range_start)):
+        msg = f"{start_arg} and {end_arg} must be ISO timestamps, {start_arg} < {end_arg}"
+        if not end_arg:
+            msg = f"{start_arg} must be an ISO timestamp"
+        return tech_ids, None, None, _error(HTTPStatus.BAD_REQUEST, "invalid_request", msg)
+    if range_end is not None and range_end - range_start > _FREE_SLOTS_MAX_RANGE:
+        bad = _error(HTTPStatus.BAD_REQUEST, "invalid_request", "Range may not exceed 31 days")
+        return tech_ids, None, None, bad
+    return tech_ids, range_start, range_end, None
+
+
+try:
+    from backend import scheduling_service as _scheduling
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import scheduling_service as _scheduling  # type: ignore
+
+
+def _schedule_snapshot(range_start, range_end, tech_ids, vehicle_id):
+    """Load a ScheduleSnapshot (DB or memory mode); returns (snapshot, error_response)."""
+    hours = _scheduling.shop_hours()
+    conn, use_memory, err = safe_conn()
+    if conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
+            snapshot = _scheduling.load_snapshot(
+                conn, range_start, range_end, tech_ids or None, vehicle_id, hours=hours
+            )
+        return snapshot, None
+    if use_memory:
+        techs = [t for t in _MEM_TECHNICIANS if not tech_ids or t["id"] in tech_ids]
+        rows = [
+            {
+                **a,
+                "start_ts": _parse_slot_ts(a.get("start_ts")),
+                "end_ts": _parse_slot_ts(a.get("end_ts")),
+            }
+            for a in globals().get("_MEM_APPTS") or []
+        ]
+        snapshot = _scheduling.ScheduleSnapshot(
+            range_start, range_end, techs, rows, vehicle_id=vehicle_id, hours=hours
+        )
+        return snapshot, None
+    return None, _error(HTTPStatus.INTERNAL_SERVER_ERROR, "db_unavailable", "Database unavailable")
+
+
+def _positive_int_arg(name: str, default: int, maximum: int) -> Optional[int]:
+    try:
+        value = int(request.args.get(name, str(default)))
+    except ValueError:
+        return None
+    return value if 0 < value <= maximum else None
+
+
+def _tech_payload(snapshot, tech_ids: list) -> list:
+    return [
+        {
+            "id": tid,
+            "name": snapshot.technicians[tid].get("name"),
+            "initials": snapshot.technicians[tid].get("initials"),
+        }
+        for tid in tech_ids
+    ]
+
+
+@app.route("/api/admin/scheduling/free-slots", methods=["GET"])
+def scheduling_free_slots():
+    """Free intervals per active technician over a time range.
+
+    Same availability model as /api/admin/scheduling/slots (scheduling_service):
+    inactive technicians are omitted, carryover jobs hold their tech and gaps are
+    clipped to shop hours.
+
+    Query Parameters:
+        tech_id: technician UUID; repeat or comma-separate for several
+        from, to: ISO-8601 range bounds (max 31 days)
+        min_minutes: shortest gap to return (default 30)
+
+    Response:
+        200 JSON { from, to, min_minutes, techs: { <tech_id>: [ { start, end, minutes } ] } }
+    """
+    require_auth_role("Advisor")
+    tech_ids, range_start, range_end, bad = _scheduling_args("from", "to")
+    if bad is not None:
+        return bad
+    if not tech_ids:
+        return _error(HTTPStatus.BAD_REQUEST, "invalid_request", "tech_id is required")
+    try:
+        min_minutes = int(request.args.get("min_minutes", "30"))
+    except ValueError:
+        min_minutes = -1
+    if min_minutes < 0:
+        return _error(HTTPStatus.BAD_REQUEST, "invalid_request", "min_minutes must be >= 0")
+    snapshot, bad = _schedule_snapshot(range_start, range_end, tech_ids, None)
+    if bad is not None:
+        return bad
+    windows = snapshot.free_windows(timedelta(minutes=min_minutes), tech_ids)
+    return _ok(
+        {
+            "from": range_start.isoformat(),
+            "to": range_end.isoformat(),
+            "min_minutes": min_minutes,
+            "techs": {
+                tid: [
+                    {
+                        "start": s.isoformat(),
+                        "end": e.isoformat(),
+                        "minutes": int((e - s).total_seconds() // 60),
+                    }
+                    for s, e in gaps
+                ]
+                for tid, gaps in windows.items()
+            },
+        }
+    )
+
+
+@app.route("/api/admin/scheduling/availability", methods=["GET"])
+def scheduling_availability():
+    """Which active technicians are free for a job starting at a given time.
+
+    Query Parameters:
+        start: ISO-8601 start
+        duration_minutes: job length (default 120)
+        tech_id: optional technician UUID filter (repeatable / comma-separated)
+        vehicle_id: optional; returns no techs when the vehicle is already booked
+
+    Response:
+        200 JSON { start, end, technicians: [ { id, name, initials } ] }
+    """
+    require_auth_role("Advisor")
+    tech_ids, start, _, bad = _scheduling_args("start", None)
+    if bad is not None:
+        return bad
+    minutes = _positive_int_arg("duration_minutes", 120, 24 * 60)
+    if minutes is None:
+        return _error(HTTPStatus.BAD_REQUEST, "invalid_request", "duration_minutes must be 1..1440")
+    duration = timedelta(minutes=minutes)
+    vehicle_id = request.args.get("vehicle_id") or None
+    snapshot, bad = _schedule_snapshot(start, start + duration, tech_ids, vehicle_id)
+    if bad is not None:
+        return bad
+    free = snapshot.free_techs(start, duration)
+    return _ok(
+        {
+            "start": start.isoformat(),
+            "end": (start + duration).isoformat(),
+            "technicians": _tech_payload(snapshot, free),
+        }
+    )
+
+
+@app.route("/api/admin/scheduling/slots", methods=["GET"])
+def scheduling_slots():
+    """Free windows per technician and the first N bookable slots in one call.
+
+    Query Parameters:
+        from, to: ISO-8601 range (max 31 days); slots are clipped to shop hours
+        duration_minutes: job length (default 120)
+        limit: number of distinct start times to return (default 10, max 100)
+        step_minutes: start time granularity (default 15)
+        tech_id: optional technician UUID filter (repeatable / comma-separated)
+        vehicle_id: optional; slots also avoid this vehicle's bookings
+
+    Response:
+        200 JSON { from, to, duration_minutes, technicians,
+                   windows: { <tech_id>: [ { start, end, minutes } ] },
+                   slots: [ { start, end, techIds } ] }
+    """
+    require_auth_role("Advisor")
+    tech_ids, range_start, range_end, bad = _scheduling_args("from", "to")
+    if bad is not None:
+        return bad
+    minutes = _positive_int_arg("duration_minutes", 120, 24 * 60)
+    limit = _positive_int_arg("limit", 10, 100)
+    step = _positive_int_arg("step_minutes", 15, 24 * 60)
+    if minutes is None or limit is None or step is None:
+        return _error(
+            HTTPStatus.BAD_REQUEST,
+            "invalid_request",
+            "duration_minutes, limit and step_minutes must be positive integers",
+        )
+    duration = timedelta(minutes=minutes)
+    vehicle_id = request.args.get("vehicle_id") or None
+    snapshot, bad = _schedule_snapshot(range_start, range_end, tech_ids, vehicle_id)
+    if bad is not None:
+        return bad
+    windows = snapshot.free_windows(duration)
+    slots = snapshot.candidate_slots(duration, limit=limit, step=timedelta(minutes=step))
+    return _ok(
+        {
+            "from": range_start.isoformat(),
+            "to": range_end.isoformat(),
+            "duration_minutes": minutes,
+            "technicians": _tech_payload(snapshot, sorted(snapshot.technicians)),
+            "windows": {
+                tid: [
+                    {
+                        "start": s.isoformat(),
+                        "end": e.isoformat(),
+                        "minutes": int((e - s).total_seconds() // 60),
+                    }
+                    for s, e in gaps
+                ]
+                for tid, gaps in windows.items()
+            },
+            "slots": [
+                {
+                    "start": slot["start"].isoformat(),
+                    "end": slot["end"].isoformat(),
+                    "techIds": slot["tech_ids"],
+                }
+                for slot in slots
+            ],
+        }
+    )
+
+
 # ----------------------------------------------------------------------------
 # Analytics: Template Usage
 # ----------------------------------------------------------------------------
-_TEMPLATE_ANALYTICS_CACHE: dict[str, tuple[float, dict]] = {}
-_TEMPLATE_ANALYTICS_TTL_SECONDS = 60
+try:
+    from backend import template_analytics as _template_analytics
+except ImportError:  # pragma: no cover
+    import template_analytics as _template_analytics  # type: ignore
+
+# Serialized cache-hit bodies (meta.cache.hit = true), served without a copy.
+_TEMPLATE_ANALYTICS_CACHE = _template_analytics.ResponseCache(
+    ttl_seconds=float(os.getenv("TEMPLATE_ANALYTICS_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("TEMPLATE_ANALYTICS_CACHE_MAX", "256")),
+)
 
 
-def _cache_get(key: str):
-    now = time.time()
-    entry = _TEMPLATE_ANALYTICS_CACHE.get(key)
-    if not entry:
-        return None
-    if now - entry[0] > _TEMPLATE_ANALYTICS_TTL_SECONDS:
-        _TEMPLATE_ANALYTICS_CACHE.pop(key, None)
-        return None
-    return entry[1]
+def _cache_get(key: str) -> Optional[bytes]:
+    body = _TEMPLATE_ANALYTICS_CACHE.get(key)
+    _CACHE_REQUESTS.inc(cache="template_analytics", result="hit" if body is not None else "miss")
+    return body
 
 
 def _cache_set(key: str, value: dict):
-    _TEMPLATE_ANALYTICS_CACHE[key] = (time.time(), value)
+    hit = {**value, "meta": {**value["meta"], "cache": {"hit": True}}}
+    _TEMPLATE_ANALYTICS_CACHE.set(key, app.json.dumps(hit).encode("utf-8"))
 
 
 def _parse_range(range_param: str | None):
@@ -6354,17 +7268,11 @@ def analytics_templates():
     # Cache key
     cache_key = f"v1:{days}:{granularity}:{channel_filter}:{limit}:{','.join(sorted(include_parts))}"  # stable order
     if flush:
-        _TEMPLATE_ANALYTICS_CACHE.pop(cache_key, None)
+        _TEMPLATE_ANALYTICS_CACHE.pop(cache_key)
     else:
         cached = _cache_get(cache_key)
-        if cached:
-            # Return a shallow copy with cache.hit = True
-            cached_copy = json.loads(json.dumps(cached))  # deep copy via JSON for safety
-            try:
-                cached_copy["meta"]["cache"]["hit"] = True
-            except Exception:
-                pass
-            return jsonify(cached_copy)
+        if cached is not None:
+            return app.response_class(cached, mimetype="application/json")
     conn, use_memory, err = safe_conn()
     if err and not use_memory:
         raise err
@@ -6392,67 +7300,19 @@ def analytics_templates():
         }
         _cache_set(cache_key, empty)
         return jsonify(empty)
-    # Build dynamic SQL
-    params = [start_utc, now_utc]
-    chan_where = ""
-    if channel_filter in ("sms", "email"):
-        chan_where = "AND channel = %s"
-        params.append(channel_filter)
-    bucket_expr = (
-        "date_trunc('week', sent_at)" if granularity == "week" else "date_trunc('day', sent_at)"
+    channel_filtered = channel_filter in ("sms", "email")
+    params = _template_analytics.query_params(
+        start_utc, now_utc, channel_filter if channel_filtered else None, limit
     )
     with conn:
+        # Complete days come from the daily rollups, today from raw events;
+        # the raw range scan is only used until the rollup migration has run.
+        if _template_analytics.rollups_available(conn):
+            sql = _template_analytics.rollup_sql(granularity, channel_filtered)
+        else:
+            sql = _template_analytics.raw_sql(granularity, channel_filtered)
         with conn.cursor() as cur:
-            # Base filtered set CTE
-            cur.execute(
-                f"""
-                WITH base AS (
-                  SELECT template_id, channel, sent_at, user_id
-                    FROM template_usage_events
-                   WHERE sent_at BETWEEN %s AND %s
-                     {chan_where}
-                ), agg AS (
-                  SELECT template_id, channel, {bucket_expr} AS bucket_start, count(*) AS cnt
-                    FROM base
-                   GROUP BY template_id, channel, bucket_start
-                ), totals AS (
-                  SELECT count(*) AS events,
-                         COUNT(DISTINCT template_id) AS unique_templates,
-                         COUNT(DISTINCT user_id) FILTER (WHERE user_id IS NOT NULL) AS unique_users
-                    FROM base
-                ), by_channel AS (
-                  SELECT channel, count(*) AS events
-                    FROM base
-                   GROUP BY channel
-                                ), template_totals AS (
-                                    SELECT b.template_id,
-                                                 MIN(b.sent_at) AS first_used,
-                                                 MAX(b.sent_at) AS last_used,
-                                                 COUNT(*) AS total_count,
-                                                 COUNT(DISTINCT b.user_id) FILTER (WHERE b.user_id IS NOT NULL) AS unique_users,
-                                                 COALESCE(mt.label, b.template_id::text) AS template_label
-                                        FROM base b
-                                        LEFT JOIN message_templates mt ON mt.id = b.template_id
-                                     GROUP BY b.template_id, template_label
-                ), recent_slice AS (
-                  SELECT template_id, {bucket_expr} AS bucket_start, count(*) AS cnt
-                    FROM base
-                   WHERE sent_at >= %s - INTERVAL '7 days'
-                   GROUP BY template_id, bucket_start
-                )
-                SELECT
-                  (SELECT row_to_json(t) FROM totals t) AS totals,
-                  (SELECT json_agg(row_to_json(b)) FROM by_channel b) AS by_channel,
-                  (SELECT json_agg(row_to_json(a)) FROM agg a) AS agg_rows,
-            (SELECT json_agg(row_to_json(tt)) FROM (
-                SELECT * FROM template_totals
-                ORDER BY total_count DESC
-                LIMIT %s
-             ) tt) AS template_totals,
-                  (SELECT json_agg(row_to_json(r)) FROM recent_slice r) AS slice_rows
-            """,
-                params + [start_utc, limit],
-            )
+            cur.execute(sql, params)
             row = cur.fetchone()
     totals_row = row["totals"] or {}
     by_channel_rows = row["by_channel"] or []
@@ -6562,7 +7422,7 @@ def analytics_templates():
 # ----------------------------------------------------------------------------
 @app.route("/api/admin/appointments/<appt_id>/move", methods=["PATCH"])
 def move_card(appt_id: str):
-    print(f"[MOVE_DEBUG] move_card called with appt_id='{appt_id}'")
+    _debug_log("move", "move_card called with appt_id='%s'", appt_id)
     # Step 1: Enforce Advisor-level authentication
     auth_payload = require_auth_role("Advisor")
 
@@ -6689,7 +7549,38 @@ def move_card(appt_id: str):
 # ----------------------------------------------------------------------------
 # Drawer
 # ----------------------------------------------------------------------------
+try:
+    from backend.appointment_drawer import (
+        build_drawer,
+        drawer_etag,
+        drawer_signature_keys,
+        fetch_drawer_row,
+        parse_appointment_id,
+    )
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from appointment_drawer import (  # type: ignore
+        build_drawer,
+        drawer_etag,
+        drawer_signature_keys,
+        fetch_drawer_row,
+        parse_appointment_id,
+    )
+
+
+# Drawer data moves with the board; always revalidate (cheap 304 via page_signature)
+_DRAWER_CACHE_CONTROL = "private, max-age=0, must-revalidate"
+
+
+def _drawer_keys(kwargs, _tenant_id):
+    appt_id = str(kwargs.get("appt_id") or "")
+    # Seed aliases resolve (and may create rows) inside the handler
+    if not appt_id or appt_id.startswith("seed-appt-"):
+        return None
+    return drawer_signature_keys(appt_id)
+
+
 @app.route("/api/appointments/<appt_id>", methods=["GET", "PATCH"])
+@conditional_get(_drawer_keys, cache_control=_DRAWER_CACHE_CONTROL)
 def appointment_handler(appt_id: str):
     appt_id = _resolve_seed_appt_id(appt_id)
     if request.method == "GET":
@@ -6700,6 +7591,7 @@ def appointment_handler(appt_id: str):
 
 # Provide admin namespace alias for same handler (consistency with board endpoint under /api/admin)
 @app.route("/api/admin/appointments/<appt_id>", methods=["GET", "PATCH"])
+@conditional_get(_drawer_keys, cache_control=_DRAWER_CACHE_CONTROL)
 def admin_appointment_handler(appt_id: str):
     require_auth_role("Advisor")
     appt_id = _resolve_seed_appt_id(appt_id)
@@ -7087,8 +7979,46 @@ def appointment_service_detail(appt_id: str, service_id: str):
     return jsonify({"service": service, "appointment_total": total})
 
 
+try:
+    from backend import conflict_engine as _conflict_engine
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import conflict_engine as _conflict_engine  # type: ignore
+
+
+def _exclusion_conflict_response(
+    conn, exc, *, tech_id, vehicle_id, start_ts, end_ts, exclude_id=None
+):
+    """409 for an appointments_*_no_overlap violation (None for any other error).
+
+    The failed statement aborted the transaction; roll back and look up the
+    conflicting ids (error path only) so the payload matches find_conflicts().
+    """
+    kind = _conflict_engine.exclusion_conflict_kind(exc)
+    if kind is None:
+        return None
+    conflicts: Dict[str, list] = {"tech": [], "vehicle": []}
+    key = tech_id if kind == "tech" else vehicle_id
+    try:
+        conn.rollback()
+        if key is not None and start_ts is not None:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
+                conflicts[kind] = _conflict_engine.conflicting_ids(
+                    cur, kind, key, start_ts, end_ts, exclude_id=exclude_id
+                )
+    except Exception as lookup_error:
+        _debug_log("appt", "conflict id lookup failed: %s", lookup_error)
+    _debug_log("appt", "RETURN 409 exclusion constraint kind=%s", kind)
+    return _error(
+        HTTPStatus.CONFLICT,
+        "CONFLICT",
+        "Scheduling conflict detected",
+        details={"conflicts": conflicts},
+    )
+
+
 def get_appointment(appt_id: str):
-    """Gets full appointment details."""
+    """Gets full appointment details (drawer read model, one round-trip)."""
     # Step 1: Enforce authentication with role requirement
     require_auth_role("Advisor")
 
@@ -7101,48 +8031,26 @@ def get_appointment(appt_id: str):
     original_requested_id = appt_id
     appt_id = _resolve_seed_appt_id(appt_id)
     resolved_via_alias = appt_id != original_requested_id
+    # a.id is compared as an integer (PK index); anything else cannot exist.
+    # Unresolved seed aliases fall through to the retry below.
+    if parse_appointment_id(appt_id) is None and not original_requested_id.startswith("seed-appt-"):
+        raise NotFound("Appointment not found")
     conn = db_conn()
     with conn:
         with conn.cursor() as cur:
             # Step 3: Set tenant context for database operations
             cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
 
-            # Use text comparison to avoid invalid input syntax errors when callers pass
-            # seed-alias values that failed to resolve (rare) and to ensure we can detect
-            # absence and optionally retry resolution one more time.
-            cur.execute(
-                """
-          SELECT a.id::text,
-                 a.status::text,
-                 a.start_ts,
-                 a.end_ts,
-                 a.total_amount,
-                 a.paid_amount,
-                 a.location_address,
-                 a.notes,
-                 a.check_in_at,
-                 a.check_out_at,
-                 a.created_at,
-                 a.updated_at,
-                 a.tech_id::text AS tech_id,
-                 c.id::text AS customer_id,
-                 c.name AS customer_name,
-                 c.email,
-                 c.phone,
-                 v.id::text AS vehicle_id,
-                 v.year,
-                 v.make,
-                 v.model,
-                 v.license_plate AS license_plate,
-                 v.license_plate AS vin
-            FROM appointments a
-            LEFT JOIN customers c ON c.id = a.customer_id
-            LEFT JOIN vehicles  v ON v.id = a.vehicle_id
-            WHERE a.id::text = %s
-                """,
-                (str(appt_id),),
-            )
-            row = cur.fetchone()
+            def _execute(sql_text, params):
+                cur.execute(sql_text, params)
+                return cur.fetchone()
+
+            def _rollback():
+                conn.rollback()
+                cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
+
+            # Seed aliases that failed to resolve (rare) match no row; retry resolution once.
+            row = fetch_drawer_row(_execute, appt_id, rollback=_rollback)
             if not row:
                 # If we originally received a seed alias but first resolution produced
                 # no row (possible race where creation failed), attempt a second
@@ -7161,217 +8069,36 @@ def get_appointment(appt_id: str):
                             )
                         except Exception:
                             pass
-                        appt_id = second_resolved
-                        cur.execute(
-                            """
-                  SELECT a.id::text,
-                         a.status::text,
-                         a.start_ts,
-                         a.end_ts,
-                         a.total_amount,
-                         a.paid_amount,
-                         a.location_address,
-                         a.notes,
-                         a.check_in_at,
-                         a.check_out_at,
-                         a.created_at,
-                         a.updated_at,
-                         a.tech_id::text AS tech_id,
-                         c.id::text AS customer_id,
-                         c.name AS customer_name,
-                         c.email,
-                         c.phone,
-                         v.id::text AS vehicle_id,
-                         v.year,
-                         v.make,
-                         v.model,
-                         v.license_plate AS license_plate,
-                         v.license_plate AS vin
-                    FROM appointments a
-                    LEFT JOIN customers c ON c.id = a.customer_id
-                    LEFT JOIN vehicles  v ON v.id = a.vehicle_id
-                    WHERE a.id::text = %s
-                            """,
-                            (str(appt_id),),
-                        )
-                        row = cur.fetchone()
-                if not row:
-                    try:
-                        app.logger.debug(
-                            "appointment_lookup_not_found",
-                            extra={
-                                "requested": original_requested_id,
-                                "resolved": appt_id,
-                                "resolved_via_alias": resolved_via_alias,
-                            },
-                        )
-                    except Exception:
-                        pass
-                    raise NotFound("Appointment not found")
-
-            cur.execute(
-                """
-                SELECT s.id::text, s.name, s.notes, s.estimated_hours, s.estimated_price, s.service_operation_id,
-                       op.default_price AS op_default_price, op.category AS op_category
-                FROM appointment_services s
-                LEFT JOIN service_operations op ON op.id = s.service_operation_id
-                WHERE s.appointment_id = %s ORDER BY s.created_at
-                """,
-                (appt_id,),
-            )
-            services = cur.fetchall()
-
-            # Fetch all customer vehicles for vehicle switcher (if customer present)
-            vehicles_for_customer: list[dict[str, Any]] = []
-            if row.get("customer_id"):
-                # Some deployed schemas lack a created_at column on vehicles; ordering by it raises
-                # an error causing downstream 500s when opening the appointment drawer. For robustness
-                # (and because ordering is non-critical for the drawer vehicle switcher) fall back to id.
-                try:
-                    cur.execute(
-                        """
-                        SELECT id::text AS id, year, make, model, license_plate, license_plate AS vin
-                        FROM vehicles WHERE customer_id = %s ORDER BY created_at
-                        """,
-                        (row.get("customer_id"),),
-                    )
-                except Exception as e:  # narrow handling below
-                    import psycopg2  # local import to avoid circulars at module import time
-
-                    undefined_col = getattr(psycopg2, "errors", None) and isinstance(
-                        e, psycopg2.errors.UndefinedColumn
-                    )
-                    if undefined_col or "created_at" in str(e):
-                        # After a failed statement psycopg2 marks transaction aborted; rollback then retry with safe ORDER BY id
-                        try:
-                            cur.connection.rollback()
-                        except Exception:
-                            try:
-                                conn.rollback()
-                            except Exception:
-                                pass
-                        try:
-                            cur.execute(
-                                """
-                                SELECT id::text AS id, year, make, model, license_plate, license_plate AS vin
-                                FROM vehicles WHERE customer_id = %s ORDER BY id
-                                """,
-                                (row.get("customer_id"),),
-                            )
-                        except Exception as e2:
-                            # If fallback also fails, log and continue with empty list
-                            try:
-                                log.warning(
-                                    "vehicle_query_fallback_failed customer=%s err=%s",
-                                    row.get("customer_id"),
-                                    e2,
-                                )
-                            except Exception:
-                                pass
-                    else:
-                        # Re-raise unrelated exceptions to avoid masking logic errors
-                        raise
-                vehicles_for_customer = cur.fetchall() or []
-
-    def iso(dt):
-        return dt.isoformat() if dt else None
-
-    # Build customer vehicles list
-    customer_vehicles = [
-        {
-            "id": v.get("id"),
-            "plate": v.get("license_plate"),
-            "year": v.get("year"),
-            "make": v.get("make"),
-            "model": v.get("model"),
-            "vin": v.get("vin"),
-            "display": (
-                f"{v.get('year')} {v.get('make')} {v.get('model')}".strip()
-                if v.get("year") or v.get("make") or v.get("model")
-                else (v.get("license_plate") or "Vehicle")
-            ),
-        }
-        for v in vehicles_for_customer
-    ]
-
-    services_list = [
-        {
-            "id": s["id"],
-            "name": s["name"],
-            "notes": s.get("notes"),
-            "estimated_hours": (
-                float(s["estimated_hours"]) if s.get("estimated_hours") is not None else None
-            ),
-            "estimated_price": (
-                float(s["estimated_price"]) if s.get("estimated_price") is not None else None
-            ),
-            "service_operation_id": s.get("service_operation_id"),
-            "operation": (
-                {
-                    "id": s.get("service_operation_id"),
-                    "default_price": (
-                        float(s.get("op_default_price"))
-                        if s.get("op_default_price") is not None
-                        else None
-                    ),
-                    "category": s.get("op_category"),
-                }
-                if s.get("service_operation_id")
-                else None
-            ),
-        }
-        for s in services
-    ]
+                        appt_id = second_resolved
+                        row = fetch_drawer_row(_execute, appt_id, rollback=_rollback)
+                if not row:
+                    try:
+                        app.logger.debug(
+                            "appointment_lookup_not_found",
+                            extra={
+                                "requested": original_requested_id,
+                                "resolved": appt_id,
+                                "resolved_via_alias": resolved_via_alias,
+                            },
+                        )
+                    except Exception:
+                        pass
+                    raise NotFound("Appointment not found")
 
-    appointment_data = {
-        "appointment": {
-            "id": row["id"],
-            "status": row["status"],
-            "start": iso(row.get("start_ts")),
-            "end": iso(row.get("end_ts")),
-            "total_amount": float(row.get("total_amount") or 0),
-            "paid_amount": float(row.get("paid_amount") or 0),
-            "location_address": row.get("location_address"),
-            "notes": row.get("notes"),
-            "check_in_at": iso(row.get("check_in_at")),
-            "check_out_at": iso(row.get("check_out_at")),
-            "tech_id": row.get("tech_id"),
-            "customer_id": row.get("customer_id"),
-            "vehicle_id": row.get("vehicle_id"),
-            "created_at": iso(row.get("created_at")),
-            "updated_at": iso(row.get("updated_at")),
-            "service_operation_ids": [
-                s.get("service_operation_id") for s in services if s.get("service_operation_id")
-            ],
-        },
-        "customer": {
-            "id": row.get("customer_id"),
-            "name": row.get("customer_name"),
-            "email": row.get("email"),
-            "phone": row.get("phone"),
-            "vehicles": customer_vehicles,
-        },
-        "vehicle": {
-            "id": row.get("vehicle_id"),
-            "plate": row.get("license_plate"),
-            "year": row.get("year"),
-            "make": row.get("make"),
-            "model": row.get("model"),
-            "vin": row.get("vin"),
-            "display": (
-                f"{row.get('year')} {row.get('make')} {row.get('model')}".strip()
-                if row.get("year") or row.get("make") or row.get("model")
-                else row.get("license_plate")
-            ),
-        },
-        "services": services_list,
-        "meta": {"version": 1},
-    }
-    return _ok(appointment_data)
+    appointment_data = build_drawer(row)
+    etag = drawer_etag(row, appointment_data, g.tenant_id)
+    if etag in {t.strip() for t in (request.headers.get("If-None-Match") or "").split(",")}:
+        resp = make_response("", 304)
+    else:
+        data, status = _ok(appointment_data)
+        resp = make_response(data, status)
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = _DRAWER_CACHE_CONTROL
+    return resp
 
 
 def patch_appointment(appt_id: str):
-    print(f"[PATCH_DEBUG] patch_appointment called with appt_id='{appt_id}'")
+    _debug_log("appt", "patch_appointment called with appt_id='%s'", appt_id)
     try:
         # Step 1: Enforce authentication with role requirement
         auth_payload = require_auth_role("Advisor")
@@ -7587,6 +8314,7 @@ def patch_appointment(appt_id: str):
                     find_conflicts
                     and result.cleaned.get("start_ts")
                     and (body.get("tech_id") or old.get("tech_id"))
+                    and not _conflict_engine.constraints_enforced(conn)
                 ):
                     try:
                         # typed id conversion if numeric ids used
@@ -7612,14 +8340,22 @@ def patch_appointment(appt_id: str):
                         exclude_id=exclude_int,
                     )
                     try:
-                        print(
-                            f"[CONFLICT DEBUG] PATCH check appt_id={appt_id} start={result.cleaned.get('start_ts')} end={result.cleaned.get('end_ts')} tech_id={body.get('tech_id') or old.get('tech_id')} vehicle_id={body.get('vehicle_id') or old.get('vehicle_id')} -> tech={len(conflicts.get('tech') or [])} vehicle={len(conflicts.get('vehicle') or [])}"
+                        _debug_log(
+                            "appt",
+                            "PATCH check appt_id=%s start=%s end=%s tech_id=%s vehicle_id=%s -> tech=%s vehicle=%s",
+                            appt_id,
+                            result.cleaned.get("start_ts"),
+                            result.cleaned.get("end_ts"),
+                            body.get("tech_id") or old.get("tech_id"),
+                            body.get("vehicle_id") or old.get("vehicle_id"),
+                            len(conflicts.get("tech") or []),
+                            len(conflicts.get("vehicle") or []),
                         )
                     except Exception:
                         pass
                     if conflicts.get("tech") or conflicts.get("vehicle"):
                         try:
-                            print("[CONFLICT DEBUG] RETURN 409 Scheduling conflict detected")
+                            _debug_log("appt", "RETURN 409 Scheduling conflict detected")
                         except Exception:
                             pass
                         return _error(
@@ -7632,7 +8368,22 @@ def patch_appointment(appt_id: str):
             if sets:
                 params.append(appt_id)
                 # nosec B608: column identifiers come from a strict whitelist; values are %s-bound
-                cur.execute(f"UPDATE appointments SET {', '.join(sets)} WHERE id = %s", params)
+                try:
+                    cur.execute(f"UPDATE appointments SET {', '.join(sets)} WHERE id = %s", params)
+                except Exception as e:
+                    cleaned = result.cleaned if validate_appointment_payload else {}
+                    conflict = _exclusion_conflict_response(
+                        conn,
+                        e,
+                        tech_id=body.get("tech_id") or old.get("tech_id"),
+                        vehicle_id=body.get("vehicle_id") or old.get("vehicle_id"),
+                        start_ts=cleaned.get("start_ts") or old.get("start_ts"),
+                        end_ts=cleaned.get("end_ts") or old.get("end_ts"),
+                        exclude_id=appt_id,
+                    )
+                    if conflict is None:
+                        raise
+                    return conflict
                 updated_keys.extend([k for (k, _) in fields if k in body and body[k] is not None])
             if wants_vehicle_update:
                 license_plate = body.get("license_plate") or body.get("vin")
@@ -8070,14 +8821,7 @@ def get_admin_appointments():
             HTTPStatus.INTERNAL_SERVER_ERROR, "INTERNAL_SERVER_ERROR", "Database unavailable"
         )
 
-    for appt in appointments:
-        if appt.get("start_ts"):
-            appt["start_ts"] = appt["start_ts"].isoformat()
-        if appt.get("end_ts"):
-            appt["end_ts"] = appt["end_ts"].isoformat()
-        if "total_amount" in appt:
-            appt["total_amount"] = float(appt["total_amount"] or 0)
-
+    # start_ts / end_ts / total_amount are encoded natively by the app JSON provider
     # Legacy tests expect nextCursor key (None when using offset pagination)
     return _ok({"appointments": appointments, "nextCursor": None})
 
@@ -8086,30 +8830,22 @@ def get_admin_appointments():
 def create_appointment():
     # CRITICAL DEBUG: Add logging at the very start before any operations
     try:
-        print("[APPT_DEBUG] create_appointment called - entry point")
-        app.logger.error("[APPT_DEBUG] create_appointment called - entry point")
+        _debug_log("appt", "create_appointment called - entry point")
 
-        print(f"[APPT_DEBUG] request.method={request.method}, request.path={request.path}")
-        app.logger.error(
-            f"[APPT_DEBUG] request.method={request.method}, request.path={request.path}"
-        )
+        _debug_log("appt", "request.method=%s, request.path=%s", request.method, request.path)
 
-        print("[APPT_DEBUG] About to call require_auth_role('Advisor')")
-        app.logger.error("[APPT_DEBUG] About to call require_auth_role('Advisor')")
+        _debug_log("appt", "About to call require_auth_role('Advisor')")
 
         # Enforce Advisor-level authentication
         user = require_auth_role("Advisor")
 
-        print(f"[APPT_DEBUG] require_auth_role succeeded, user={user}")
-        app.logger.error(f"[APPT_DEBUG] require_auth_role succeeded, user={user}")
+        _debug_log("appt", "require_auth_role succeeded, user=%s", user)
 
     except Exception as e:
-        print(f"[APPT_DEBUG] EXCEPTION in auth/setup: {str(e)}")
-        app.logger.error(f"[APPT_DEBUG] EXCEPTION in auth/setup: {str(e)}")
+        _debug_log("appt", "EXCEPTION in auth/setup: %s", str(e))
         import traceback
 
-        print(f"[APPT_DEBUG] TRACEBACK: {traceback.format_exc()}")
-        app.logger.error(f"[APPT_DEBUG] TRACEBACK: {traceback.format_exc()}")
+        _debug_log("appt", "TRACEBACK: %s", traceback.format_exc())
         # Re-raise to let global handler catch it
         raise
     body = request.get_json(silent=True) or {}
@@ -8157,28 +8893,20 @@ def create_appointment():
         except Exception as e:
             return _error(HTTPStatus.BAD_REQUEST, "invalid_request", str(e))
 
-    print(f"[APPT_DEBUG] user: {user}, body keys: {list(body.keys()) if body else 'None'}")
-    app.logger.error(
-        f"[APPT_DEBUG] user: {user}, body keys: {list(body.keys()) if body else 'None'}"
-    )
+    _debug_log("appt", "user: %s, body keys: %s", user, list(body.keys()) if body else "None")
 
     # Integrated validation + conflict detection (Phase 1)
     try:
         from backend.validation import find_conflicts, validate_appointment_payload
 
-        print("[APPT_DEBUG] Successfully imported validation functions (backend.pkg)")
-        app.logger.error("[APPT_DEBUG] Successfully imported validation functions (backend.pkg)")
+        _debug_log("appt", "Successfully imported validation functions (backend.pkg)")
     except Exception:
         try:
             from validation import find_conflicts, validate_appointment_payload  # type: ignore
 
-            print("[APPT_DEBUG] Successfully imported validation functions (flat module)")
-            app.logger.error(
-                "[APPT_DEBUG] Successfully imported validation functions (flat module)"
-            )
+            _debug_log("appt", "Successfully imported validation functions (flat module)")
         except Exception as e2:
-            print(f"[APPT_DEBUG] Failed to import validation: {e2}")
-            app.logger.error(f"[APPT_DEBUG] Failed to import validation: {e2}")
+            _debug_log("appt", "Failed to import validation: %s", e2)
             validate_appointment_payload = None  # type: ignore
             find_conflicts = None  # type: ignore
     # start_ts is already normalized via Pydantic model above
@@ -8235,17 +8963,17 @@ def create_appointment():
     service_category = body.get("service_category") or body.get("serviceCategory")
     tech_id = body.get("tech_id") or body.get("techId")
 
-    print("[APPT_DEBUG] About to call safe_conn()")
-    app.logger.error("[APPT_DEBUG] About to call safe_conn()")
+    _debug_log("appt", "About to call safe_conn()")
 
     # Memory mode fallback: fabricate deterministic appointment when DB unavailable
     conn, use_memory, err = safe_conn()
 
-    print(
-        f"[APPT_DEBUG] safe_conn result: conn={conn is not None}, use_memory={use_memory}, err={err}"
-    )
-    app.logger.error(
-        f"[APPT_DEBUG] safe_conn result: conn={conn is not None}, use_memory={use_memory}, err={err}"
+    _debug_log(
+        "appt",
+        "safe_conn result: conn=%s, use_memory=%s, err=%s",
+        conn is not None,
+        use_memory,
+        err,
     )
 
     # If DB unavailable but tests/dev expect graceful memory fallback, enable it even if safe_conn didn't.
@@ -8287,8 +9015,14 @@ def create_appointment():
                     veh_conf_ids.append(a.get("id"))
             if tech_conf_ids or veh_conf_ids:
                 try:
-                    print(
-                        f"[CONFLICT DEBUG] CREATE(memory) start={start_iso} tech_id={tech_id} vehicle_plate={license_plate} -> tech={len(tech_conf_ids)} vehicle={len(veh_conf_ids)}"
+                    _debug_log(
+                        "appt",
+                        "CREATE(memory) start=%s tech_id=%s vehicle_plate=%s -> tech=%s vehicle=%s",
+                        start_iso,
+                        tech_id,
+                        license_plate,
+                        len(tech_conf_ids),
+                        len(veh_conf_ids),
                     )
                 except Exception:
                     pass
@@ -8340,6 +9074,7 @@ def create_appointment():
                 and validation_result
                 and validation_result.cleaned.get("start_ts")
                 and "end_ts" not in body
+                and not _conflict_engine.constraints_enforced(conn)
             ):
                 start_ts_v = validation_result.cleaned.get("start_ts") or start_dt
                 end_ts_v = validation_result.cleaned.get("end_ts")
@@ -8371,8 +9106,12 @@ def create_appointment():
                     except Exception:
                         veh_id_candidate = None
                 try:
-                    print(
-                        f"[CONFLICT DEBUG] PRECHECK body.vehicle_id={body.get('vehicle_id')} license_plate={license_plate} veh_id_candidate={veh_id_candidate}"
+                    _debug_log(
+                        "appt",
+                        "PRECHECK body.vehicle_id=%s license_plate=%s veh_id_candidate=%s",
+                        body.get("vehicle_id"),
+                        license_plate,
+                        veh_id_candidate,
                     )
                 except Exception:
                     pass
@@ -8404,8 +9143,14 @@ def create_appointment():
                         end_ts=None,
                     )
                     try:
-                        print(
-                            f"[CONFLICT DEBUG] CREATE check start={start_ts_v} tech_id={tech_id} vehicle_id={veh_id_candidate} -> tech={len(conflicts.get('tech') or [])} vehicle={len(conflicts.get('vehicle') or [])}"
+                        _debug_log(
+                            "appt",
+                            "CREATE check start=%s tech_id=%s vehicle_id=%s -> tech=%s vehicle=%s",
+                            start_ts_v,
+                            tech_id,
+                            veh_id_candidate,
+                            len(conflicts.get("tech") or []),
+                            len(conflicts.get("vehicle") or []),
                         )
                     except Exception:
                         pass
@@ -8512,8 +9257,11 @@ def create_appointment():
                     vrow = cur.fetchone()
                     if vrow:
                         resolved_vehicle_id = vrow["id"]
-                        print(
-                            f"[VEHICLE_DEBUG] Found existing vehicle by VIN: {vehicle_vin} -> vehicle_id: {resolved_vehicle_id}"
+                        _debug_log(
+                            "appt",
+                            "Found existing vehicle by VIN: %s -> vehicle_id: %s",
+                            vehicle_vin,
+                            resolved_vehicle_id,
                         )
                         # Update service metadata
                         cur.execute(
@@ -8541,8 +9289,11 @@ def create_appointment():
                     vrow = cur.fetchone()
                     if vrow:
                         resolved_vehicle_id = vrow["id"]
-                        print(
-                            f"[VEHICLE_DEBUG] Found existing vehicle by license plate: {license_plate} -> vehicle_id: {resolved_vehicle_id}"
+                        _debug_log(
+                            "appt",
+                            "Found existing vehicle by license plate: %s -> vehicle_id: %s",
+                            license_plate,
+                            resolved_vehicle_id,
                         )
                         # If VIN was provided but vehicle doesn't have one, update it (handle data improvement)
                         if vehicle_vin and not vrow.get("vin"):
@@ -8551,11 +9302,14 @@ def create_appointment():
                                     "UPDATE vehicles SET vin = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
                                     (vehicle_vin, resolved_vehicle_id),
                                 )
-                                print(
-                                    f"[VEHICLE_DEBUG] Updated vehicle {resolved_vehicle_id} with VIN: {vehicle_vin}"
+                                _debug_log(
+                                    "appt",
+                                    "Updated vehicle %s with VIN: %s",
+                                    resolved_vehicle_id,
+                                    vehicle_vin,
                                 )
                             except Exception as e:
-                                print(f"[VEHICLE_DEBUG] Warning: Could not update VIN: {e}")
+                                _debug_log("appt", "Warning: Could not update VIN: %s", e)
                         # Update service metadata
                         cur.execute(
                             """
@@ -8570,9 +9324,7 @@ def create_appointment():
 
                 # Step 2C: Create new vehicle if no match found
                 if not resolved_vehicle_id and (license_plate or vehicle_make or vehicle_model):
-                    print(
-                        f"[VEHICLE_DEBUG] Creating new vehicle for customer {resolved_customer_id}"
-                    )
+                    _debug_log("appt", "Creating new vehicle for customer %s", resolved_customer_id)
                     cur.execute(
                         """
                         INSERT INTO vehicles (
@@ -8592,7 +9344,7 @@ def create_appointment():
                         ),
                     )
                     resolved_vehicle_id = (cur.fetchone() or {}).get("id")
-                    print(f"[VEHICLE_DEBUG] Created new vehicle with ID: {resolved_vehicle_id}")
+                    _debug_log("appt", "Created new vehicle with ID: %s", resolved_vehicle_id)
 
                 # Step 2D: Legacy fallback for existing vehicles without customer linkage
                 elif not resolved_vehicle_id and license_plate:
@@ -8613,12 +9365,15 @@ def create_appointment():
                                     "UPDATE vehicles SET customer_id = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
                                     (resolved_customer_id, resolved_vehicle_id),
                                 )
-                                print(
-                                    f"[VEHICLE_DEBUG] Linked existing vehicle {resolved_vehicle_id} to customer {resolved_customer_id}"
+                                _debug_log(
+                                    "appt",
+                                    "Linked existing vehicle %s to customer %s",
+                                    resolved_vehicle_id,
+                                    resolved_customer_id,
                                 )
                             except Exception as e:
-                                print(
-                                    f"[VEHICLE_DEBUG] Warning: Could not link vehicle to customer: {e}"
+                                _debug_log(
+                                    "appt", "Warning: Could not link vehicle to customer: %s", e
                                 )
                         # Update service metadata
                         cur.execute(
@@ -8652,7 +9407,7 @@ def create_appointment():
                     raise BadRequest("tech_id not found or inactive (tech_id)")
 
             # Post-resolution vehicle conflict check (skip when explicit end_ts provided to avoid false positives in multi-stage edit tests)
-            if "end_ts" not in body:
+            if "end_ts" not in body and not _conflict_engine.constraints_enforced(conn):
                 try:
                     cur.execute(
                         "SELECT start_ts FROM appointments WHERE id = %s",
@@ -8689,52 +9444,67 @@ def create_appointment():
                                 )
 
             # Insert appointment (extended columns always present; None if absent)
-            print(
-                f"[APPT_DEBUG] About to INSERT appointment with values: status={status}, customer_id={resolved_customer_id}, vehicle_id={resolved_vehicle_id}"
-            )
-            app.logger.error(
-                f"[APPT_DEBUG] About to INSERT appointment with values: status={status}, customer_id={resolved_customer_id}, vehicle_id={resolved_vehicle_id}"
+            _debug_log(
+                "appt",
+                "About to INSERT appointment with values: status=%s, customer_id=%s, vehicle_id=%s",
+                status,
+                resolved_customer_id,
+                resolved_vehicle_id,
             )
 
-            cur.execute(
-                """
-                INSERT INTO appointments (status, start_ts, total_amount, paid_amount, customer_id, vehicle_id, notes, location_address, primary_operation_id, service_category, tech_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id::text
-                """,
-                (
-                    status,
-                    start_dt,
-                    total_amount,
-                    paid_amount,
-                    resolved_customer_id,
-                    resolved_vehicle_id,
-                    notes,
-                    location_address,
-                    primary_operation_id,
-                    service_category,
-                    tech_id,
-                ),
-            )
+            # Double booking is rejected here by the exclusion constraints (conflict_engine)
+            try:
+                cur.execute(
+                    """
+                    INSERT INTO appointments (status, start_ts, total_amount, paid_amount, customer_id, vehicle_id, notes, location_address, primary_operation_id, service_category, tech_id)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    RETURNING id::text
+                    """,
+                    (
+                        status,
+                        start_dt,
+                        total_amount,
+                        paid_amount,
+                        resolved_customer_id,
+                        resolved_vehicle_id,
+                        notes,
+                        location_address,
+                        primary_operation_id,
+                        service_category,
+                        tech_id,
+                    ),
+                )
+            except Exception as e:
+                conflict = _exclusion_conflict_response(
+                    conn,
+                    e,
+                    tech_id=tech_id,
+                    vehicle_id=resolved_vehicle_id,
+                    start_ts=start_dt,
+                    end_ts=None,
+                )
+                if conflict is None:
+                    raise
+                return conflict
 
-            print("[APPT_DEBUG] INSERT executed, fetching result...")
-            app.logger.error("[APPT_DEBUG] INSERT executed, fetching result...")
+            _debug_log("appt", "INSERT executed, fetching result...")
 
             row = cur.fetchone()
             if not row:
-                print("[APPT_DEBUG] ERROR: No row returned from INSERT")
-                app.logger.error("[APPT_DEBUG] ERROR: No row returned from INSERT")
+                _debug_log("appt", "ERROR: No row returned from INSERT")
                 raise RuntimeError("Failed to create appointment, no ID returned.")
             new_id = row["id"]
 
-            print(f"[APPT_DEBUG] Appointment created successfully with ID: {new_id}")
-            app.logger.error(f"[APPT_DEBUG] Appointment created successfully with ID: {new_id}")
+            _debug_log("appt", "Appointment created successfully with ID: %s", new_id)
 
             # CUSTOMER PROFILE OVERHAUL: Link appointment to vehicle in junction table
             if resolved_vehicle_id:
                 try:
-                    print(
-                        f"[APPT_DEBUG] Creating appointment_vehicles link: appointment_id={new_id}, vehicle_id={resolved_vehicle_id}"
+                    _debug_log(
+                        "appt",
+                        "Creating appointment_vehicles link: appointment_id=%s, vehicle_id=%s",
+                        new_id,
+                        resolved_vehicle_id,
                     )
                     cur.execute(
                         """
@@ -8744,20 +9514,27 @@ def create_appointment():
                         """,
                         (new_id, resolved_vehicle_id, body.get("mileage_at_service")),
                     )
-                    print(
-                        f"[APPT_DEBUG] Successfully linked appointment {new_id} to vehicle {resolved_vehicle_id}"
+                    _debug_log(
+                        "appt",
+                        "Successfully linked appointment %s to vehicle %s",
+                        new_id,
+                        resolved_vehicle_id,
+                    )
+                    _debug_log(
+                        "appt", "Linked appointment %s to vehicle %s", new_id, resolved_vehicle_id
                     )
-                    app.logger.info(f"Linked appointment {new_id} to vehicle {resolved_vehicle_id}")
                 except Exception as junction_error:
-                    print(
-                        f"[APPT_DEBUG] WARNING: Failed to create appointment_vehicles link: {junction_error}"
+                    _debug_log(
+                        "appt",
+                        "WARNING: Failed to create appointment_vehicles link: %s",
+                        junction_error,
                     )
                     app.logger.warning(
                         f"Failed to create appointment_vehicles link: {junction_error}"
                     )
                     # Don't fail the entire appointment creation for junction table errors
             else:
-                print("[APPT_DEBUG] No vehicle ID resolved, skipping appointment_vehicles link")
+                _debug_log("appt", "No vehicle ID resolved, skipping appointment_vehicles link")
 
             # CUSTOMER PROFILE OVERHAUL: Ensure vehicle is linked to customer if not already
             if resolved_vehicle_id and resolved_customer_id:
@@ -8774,22 +9551,28 @@ def create_appointment():
                             "UPDATE vehicles SET customer_id = %s WHERE id = %s",
                             (resolved_customer_id, resolved_vehicle_id),
                         )
-                        print(
-                            f"[APPT_DEBUG] Linked orphaned vehicle {resolved_vehicle_id} to customer {resolved_customer_id}"
+                        _debug_log(
+                            "appt",
+                            "Linked orphaned vehicle %s to customer %s",
+                            resolved_vehicle_id,
+                            resolved_customer_id,
                         )
                         app.logger.info(
                             f"Linked orphaned vehicle {resolved_vehicle_id} to customer {resolved_customer_id}"
                         )
                     elif vehicle_row and vehicle_row.get("customer_id") != resolved_customer_id:
-                        print(
-                            f"[APPT_DEBUG] Vehicle {resolved_vehicle_id} already belongs to different customer {vehicle_row.get('customer_id')}"
+                        _debug_log(
+                            "appt",
+                            "Vehicle %s already belongs to different customer %s",
+                            resolved_vehicle_id,
+                            vehicle_row.get("customer_id"),
                         )
                         app.logger.info(
                             f"Vehicle {resolved_vehicle_id} already belongs to customer {vehicle_row.get('customer_id')}"
                         )
                 except Exception as link_error:
-                    print(
-                        f"[APPT_DEBUG] WARNING: Failed to ensure vehicle-customer link: {link_error}"
+                    _debug_log(
+                        "appt", "WARNING: Failed to ensure vehicle-customer link: %s", link_error
                     )
                     app.logger.warning(f"Failed to ensure vehicle-customer link: {link_error}")
 
@@ -8823,9 +9606,9 @@ def create_appointment():
                                 else None
                             ),
                         }
-                        print(f"[VEHICLE_DEBUG] Vehicle details for response: {vehicle_details}")
+                        _debug_log("appt", "Vehicle details for response: %s", vehicle_details)
                 except Exception as e:
-                    print(f"[VEHICLE_DEBUG] Error fetching vehicle details: {e}")
+                    _debug_log("appt", "Error fetching vehicle details: %s", e)
                     vehicle_details = {"id": resolved_vehicle_id}
 
             # Construct the appointment dict from the data we inserted
@@ -8847,20 +9630,23 @@ def create_appointment():
                 "title": (body.get("title") or body.get("name") or None),
             }
 
-            print(f"[APPT_DEBUG] Created appointment dict: {appointment_dict}")
-            app.logger.error(f"[APPT_DEBUG] Created appointment dict: {appointment_dict}")
+            _debug_log("appt", "Created appointment dict: %s", appointment_dict)
 
             # Enhanced logging for Vehicle Management System
-            print(f"[VEHICLE_SUMMARY] Appointment {new_id} successfully linked:")
-            print(f"  - Customer ID: {resolved_customer_id}")
-            print(f"  - Vehicle ID: {resolved_vehicle_id}")
+            _debug_log("appt", "[VEHICLE_SUMMARY] Appointment %s successfully linked:", new_id)
+            _debug_log("appt", "  - Customer ID: %s", resolved_customer_id)
+            _debug_log("appt", "  - Vehicle ID: %s", resolved_vehicle_id)
             if vehicle_details:
-                print(
-                    f"  - Vehicle: {vehicle_details.get('year')} {vehicle_details.get('make')} {vehicle_details.get('model')}"
+                _debug_log(
+                    "appt",
+                    "  - Vehicle: %s %s %s",
+                    vehicle_details.get("year"),
+                    vehicle_details.get("make"),
+                    vehicle_details.get("model"),
                 )
-                print(f"  - License Plate: {vehicle_details.get('license_plate')}")
-                print(f"  - VIN: {vehicle_details.get('vin')}")
-                print(f"  - Total Services: {vehicle_details.get('total_services')}")
+                _debug_log("appt", "  - License Plate: %s", vehicle_details.get("license_plate"))
+                _debug_log("appt", "  - VIN: %s", vehicle_details.get("vin"))
+                _debug_log("appt", "  - Total Services: %s", vehicle_details.get("total_services"))
             app.logger.info(
                 f"Vehicle Management: Appointment {new_id} linked to customer {resolved_customer_id} and vehicle {resolved_vehicle_id}"
             )
@@ -8883,10 +9669,7 @@ def create_appointment():
             # Process service_operation_ids to create appointment_services entries
             service_operation_ids = body.get("service_operation_ids", [])
             if service_operation_ids:
-                print(f"[APPT_DEBUG] Processing service_operation_ids: {service_operation_ids}")
-                app.logger.error(
-                    f"[APPT_DEBUG] Processing service_operation_ids: {service_operation_ids}"
-                )
+                _debug_log("appt", "Processing service_operation_ids: %s", service_operation_ids)
 
                 for service_op_id in service_operation_ids:
                     try:
@@ -8921,17 +9704,22 @@ def create_appointment():
                                     "Service added during appointment creation",
                                 ),
                             )
-                            print(
-                                f"[APPT_DEBUG] Created appointment_service for service_operation_id: {service_op_id}"
+                            _debug_log(
+                                "appt",
+                                "Created appointment_service for service_operation_id: %s",
+                                service_op_id,
                             )
                         else:
-                            print(
-                                f"[APPT_DEBUG] WARNING: service_operation_id not found: {service_op_id}"
+                            _debug_log(
+                                "appt", "WARNING: service_operation_id not found: %s", service_op_id
                             )
                             app.logger.warning(f"service_operation_id not found: {service_op_id}")
                     except Exception as service_error:
-                        print(
-                            f"[APPT_DEBUG] Error processing service_operation_id {service_op_id}: {service_error}"
+                        _debug_log(
+                            "appt",
+                            "Error processing service_operation_id %s: %s",
+                            service_op_id,
+                            service_error,
                         )
                         app.logger.error(
                             f"Error processing service_operation_id {service_op_id}: {service_error}"
@@ -8946,10 +9734,10 @@ def create_appointment():
     # middleware), construct the final envelope explicitly and log it for diagnostics.
     response_payload = {"appointment": appointment_dict, "id": new_id}
     try:
-        print(
-            f"[APPT_DEBUG] Final create_appointment payload keys: {list(response_payload.keys())}"
+        _debug_log(
+            "appt", "Final create_appointment payload keys: %s", list(response_payload.keys())
         )
-        app.logger.error(f"[APPT_DEBUG] Final create_appointment payload: {response_payload}")
+        _debug_log("appt", "Final create_appointment payload: %s", response_payload)
     except Exception:
         pass
     # Manually build the standard success envelope instead of using _ok to avoid any
@@ -8960,6 +9748,92 @@ def create_appointment():
     )
 
 
+try:
+    from backend import appointment_import as _appointment_import
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import appointment_import as _appointment_import  # type: ignore
+
+
+_IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "ndjson",
+}
+
+
+@app.route("/api/admin/appointments/import", methods=["POST"])
+def import_appointments():
+    """Bulk-import appointments from an NDJSON or CSV request body.
+
+    Rows use create_appointment's fields (start_ts, customer_*, license_plate,
+    vin, vehicle_*, tech_id, primary_operation_id, ...). Valid rows are
+    inserted in one transaction and invalid or conflicting rows are reported
+    per row (see appointment_import).
+
+    Query Parameters:
+        format: 'csv' | 'ndjson' (default from Content-Type)
+        dryRun: 'true' to validate and resolve without committing
+        includeIds: 'true' to return the new appointment id per row
+
+    Response:
+        200 JSON { received, inserted, failed, customers_created, vehicles_created,
+                   errors: [ { row, code, message, field?, conflicts? } ], appointments? }
+    """
+    require_auth_role("Owner")
+    fmt = (request.args.get("format") or _IMPORT_FORMATS.get(request.mimetype) or "").lower()
+    if fmt not in ("csv", "ndjson"):
+        return _error(
+            HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            "unsupported_format",
+            "Send text/csv or application/x-ndjson (or ?format=csv|ndjson)",
+        )
+    dry_run = request.args.get("dryRun", "false").lower() == "true"
+    include_ids = request.args.get("includeIds", "false").lower() == "true"
+    rows = list(_appointment_import.read_rows(request.get_data(as_text=True), fmt))
+    if not rows:
+        return _error(HTTPStatus.BAD_REQUEST, "invalid_request", "No rows to import")
+    max_rows = int(os.getenv("APPOINTMENT_IMPORT_MAX_ROWS", "50000"))
+    if len(rows) > max_rows:
+        return _error(
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            "too_many_rows",
+            f"At most {max_rows} rows per request; split the file or use import_appointments.py",
+        )
+
+    conn, use_memory, err = safe_conn()
+    if not conn:
+        return _error(HTTPStatus.SERVICE_UNAVAILABLE, "db_unavailable", "Database unavailable")
+    started = time.perf_counter()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
+            report = _appointment_import.import_appointments(conn, rows, include_ids=include_ids)
+            if dry_run:
+                conn.rollback()
+    except Exception as e:
+        # A booking committed concurrently can still trip the exclusion constraints
+        if _conflict_engine.exclusion_conflict_kind(e) is None:
+            raise
+        return _error(
+            HTTPStatus.CONFLICT,
+            "CONFLICT",
+            "Scheduling conflict with a concurrent booking; retry the import",
+        )
+    log.info(
+        "appointments.import rows=%s inserted=%s failed=%s dry_run=%s ms=%.1f",
+        report.received,
+        report.inserted,
+        report.failed,
+        dry_run,
+        (time.perf_counter() - started) * 1000.0,
+    )
+    payload = report.as_dict(include_ids=include_ids)
+    payload["dry_run"] = dry_run
+    return _ok(payload)
+
+
 @app.route("/api/admin/appointments/<appt_id>", methods=["DELETE"])
 def delete_appointment(appt_id: str):
     """
@@ -9058,71 +9932,313 @@ def get_customer_history(customer_id: str):
     appointments = []
     if conn:
         try:
-            with conn:
-                with conn.cursor() as cur:
-                    # Some test/UI fallback states may surface synthetic ids like 'cust-fallback';
-                    # treat any non-integer id as not found early to avoid SQL type errors.
-                    try:
-                        int(customer_id)
-                    except (TypeError, ValueError):
-                        return _error(HTTPStatus.NOT_FOUND, "NOT_FOUND", "Customer not found")
-                    cur.execute("SELECT id, name FROM customers WHERE id = %s", (customer_id,))
-                    exists = cur.fetchone()
-                    if not exists:
-                        return _error(HTTPStatus.NOT_FOUND, "NOT_FOUND", "Customer not found")
-                    cur.execute(
-                        """
-                        SELECT a.id::text, a.status::text, a.start_ts AS start, a.total_amount, a.paid_amount,
-                               COALESCE(
-                                   JSON_AGG(
-                                       JSON_BUILD_OBJECT('id', p.id::text, 'amount', p.amount, 'method', p.method, 'created_at', p.created_at)
-                                       ORDER BY p.created_at DESC
-                                   ) FILTER (WHERE p.id IS NOT NULL), '[]'::json
-                               ) as payments
-                        FROM appointments a
-                        LEFT JOIN payments p ON p.appointment_id = a.id
-                        WHERE a.customer_id = %s AND a.status IN ('COMPLETED', 'NO_SHOW', 'CANCELED')
-                        GROUP BY a.id
-                        ORDER BY start DESC, a.id DESC, a.start_ts DESC, a.id DESC
-                        -- Legacy test assertion helper: ORDER BY a.start DESC, a.id DESC
-                        """,
-                        (customer_id,),
-                    )
-                    appointments = cur.fetchall() or []
-        except Exception as e:
-            log.error("Failed to get customer history for %s: %s", customer_id, e)
-            raise
+            with conn:
+                with conn.cursor() as cur:
+                    # Some test/UI fallback states may surface synthetic ids like 'cust-fallback';
+                    # treat any non-integer id as not found early to avoid SQL type errors.
+                    try:
+                        int(customer_id)
+                    except (TypeError, ValueError):
+                        return _error(HTTPStatus.NOT_FOUND, "NOT_FOUND", "Customer not found")
+                    cur.execute("SELECT id, name FROM customers WHERE id = %s", (customer_id,))
+                    exists = cur.fetchone()
+                    if not exists:
+                        return _error(HTTPStatus.NOT_FOUND, "NOT_FOUND", "Customer not found")
+                    cur.execute(
+                        """
+                        SELECT a.id::text, a.status::text, a.start_ts AS start, a.total_amount, a.paid_amount,
+                               COALESCE(
+                                   JSON_AGG(
+                                       JSON_BUILD_OBJECT('id', p.id::text, 'amount', p.amount, 'method', p.method, 'created_at', p.created_at)
+                                       ORDER BY p.created_at DESC
+                                   ) FILTER (WHERE p.id IS NOT NULL), '[]'::json
+                               ) as payments
+                        FROM appointments a
+                        LEFT JOIN payments p ON p.appointment_id = a.id
+                        WHERE a.customer_id = %s AND a.status IN ('COMPLETED', 'NO_SHOW', 'CANCELED')
+                        GROUP BY a.id
+                        ORDER BY start DESC, a.id DESC, a.start_ts DESC, a.id DESC
+                        -- Legacy test assertion helper: ORDER BY a.start DESC, a.id DESC
+                        """,
+                        (customer_id,),
+                    )
+                    appointments = cur.fetchall() or []
+        except Exception as e:
+            log.error("Failed to get customer history for %s: %s", customer_id, e)
+            raise
+    else:
+        # memory mode: fabricate empty history if customer id ends with 999 -> not found
+        if customer_id.endswith("999"):
+            return _error(HTTPStatus.NOT_FOUND, "NOT_FOUND", "Customer not found")
+        appointments = []
+
+    payments_flat: list[dict[str, Any]] = []
+    past_appointments = [
+        {
+            "id": appt["id"],
+            "status": appt["status"],
+            "start": appt.get("start_ts").isoformat() if appt.get("start_ts") else None,
+            "total_amount": float(appt.get("total_amount") or 0.0),
+            "paid_amount": float(appt.get("paid_amount") or 0.0),
+            "payments": appt.get("payments") or [],
+        }
+        for appt in appointments
+    ]
+    for appt in past_appointments:
+        for p in appt.get("payments", []) or []:
+            payments_flat.append(p)
+
+    base_payload = {"pastAppointments": past_appointments, "payments": payments_flat}
+    # Tests in multiple variants expect nested payload json['data']['data']
+    # Provide both: top-level data plus nested copy for backward compatibility.
+    return _ok({"data": base_payload, **base_payload})
+
+
+# ----------------------------------------------------------------------------
+# CSV Exports
+# ----------------------------------------------------------------------------
+try:
+    from backend.service_catalog_cache import ServiceCatalogCache
+    from backend.service_packages import build_package
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from service_catalog_cache import ServiceCatalogCache  # type: ignore
+    from service_packages import build_package  # type: ignore
+
+
+def _coerce_service_operation(row):
+    return {
+        "id": row["id"],
+        "internal_code": row.get("internal_code"),
+        "name": row["name"],
+        "category": row["category"],
+        "subcategory": row.get("subcategory"),
+        "skill_level": row.get("skill_level"),
+        "default_hours": (
+            float(row["default_hours"]) if row["default_hours"] is not None else None
+        ),
+        # Support either legacy default_price or new base_labor_rate column names
+        "base_labor_rate": (
+            (lambda v: float(v) if v is not None else None)(
+                row.get("base_labor_rate", row.get("default_price"))
+            )
+        ),
+        "keywords": row.get("keywords"),
+        "is_active": row.get("is_active"),
+        "display_order": row.get("display_order"),
+        "flags": row.get("flags"),
+    }
+
+
+class _CatalogLoadError(Exception):
+    pass
+
+
+_CATALOG_COLUMNS = (
+    "id, name, category, subcategory, internal_code, skill_level, default_hours, "
+    "{price}, keywords, flags, is_active, display_order"
+)
+_CATALOG_MINIMAL_COLUMNS = "id, name, category, default_hours, default_price, is_active"
+
+
+def _catalog_projection():
+    """(columns, handler_variant) for the deployed schema; None while it is unknown.
+
+    columns is None when service_operations does not exist yet.
+    """
+    snap = SCHEMA.snapshot()
+    if snap is None:
+        return None
+    if not snap.has_table("service_operations"):
+        return None, "v2-empty"
+    full = [c.strip() for c in _CATALOG_COLUMNS.split(",") if "{" not in c]
+    if all(snap.has_column("service_operations", c) for c in full):
+        if snap.has_column("service_operations", "default_price"):
+            return _CATALOG_COLUMNS.format(price="default_price"), "v2-flat"
+        if snap.has_column("service_operations", "base_labor_rate"):
+            return _CATALOG_COLUMNS.format(price="base_labor_rate"), "v2-flat-newcol"
+    return _CATALOG_MINIMAL_COLUMNS, "v1-fallback"
+
+
+def _load_service_catalog(tenant_id):
+    """Read the full active catalog -> (rows, handler_variant) for _SERVICE_CATALOG.
+
+    Filtering, sorting and limits are applied in memory (service_catalog_cache), so the
+    query has no search predicate or LIMIT. The projection comes from SCHEMA; the
+    retry ladder below only runs while the schema is unknown.
+    """
+    base_sql = "FROM service_operations WHERE is_active IS TRUE ORDER BY id ASC"
+    known = _catalog_projection()
+    if known is not None:
+        columns, handler_variant = known
+        if columns is None:
+            return [], handler_variant
+        conn = db_conn()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("SET LOCAL app.tenant_id = %s", (tenant_id,))
+                    cur.execute(f"SELECT {columns} {base_sql}")
+                    rows = cur.fetchall()
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        return [_coerce_service_operation(r) for r in rows], handler_variant
+
+    # Primary projection attempts legacy column name default_price. If it no longer exists
+    # (renamed to base_labor_rate) we will retry with the new name automatically.
+    projection_legacy = _CATALOG_COLUMNS.format(price="default_price")
+    projection_new = _CATALOG_COLUMNS.format(price="base_labor_rate")
+
+    rows = []
+    handler_variant = "v2-flat"
+    tried_new_projection = False
+
+    conn = db_conn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                # Set tenant context for database operations
+                cur.execute("SET LOCAL app.tenant_id = %s", (tenant_id,))
+
+                cur.execute(f"SELECT {projection_legacy} {base_sql}")
+                rows = cur.fetchall()
+    except Exception as e:  # pragma: no cover - defensive runtime hardening
+        # Production hotfix path: if new columns not yet deployed, fall back to legacy minimal column set
+        msg = str(e).lower()
+        missing_table = "service_operations" in msg and (
+            "does not exist" in msg or "undefined" in msg
+        )
+        # Some Postgres variants omit the table name in undefined column errors; also match "undefined column"
+        missing_column = ("column" in msg and "does not exist" in msg) or (
+            "undefined column" in msg
+        )
+        # Specific retry: default_price renamed to base_labor_rate
+        if ("default_price" in msg or "defaultprice" in msg) and not missing_table:
+            tried_new_projection = True
+            try:
+                with conn:
+                    with conn.cursor() as cur:
+                        cur.execute(f"SELECT {projection_new} {base_sql}")
+                        rows = cur.fetchall()
+                        handler_variant = "v2-flat-newcol"
+            except Exception as e2:  # fall back after failed retry
+                msg2 = str(e2).lower()
+                missing_column = missing_column or (
+                    ("column" in msg2 and "does not exist" in msg2) or ("undefined column" in msg2)
+                )
+                # proceed to generic fallback paths below
+        if tried_new_projection and rows:
+            # Successful retry with new projection; proceed without triggering fallback/raise.
+            pass
+        elif missing_table:
+            rows = []  # empty catalog in brand‑new DB is acceptable (frontend handles gracefully)
+            handler_variant = "v2-empty"
+        elif missing_column and not rows:
+            # Retry with minimal legacy-safe projection (columns very unlikely to change)
+            fallback_sql = f"SELECT {_CATALOG_MINIMAL_COLUMNS} {base_sql}"
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(fallback_sql)
+                    rows = cur.fetchall()
+                    handler_variant = "v1-fallback"
+            log.warning(
+                "service_operations fallback projection active (missing column); original error=%s",
+                msg,
+            )
+        elif not rows:  # Unknown error condition with no data retrieved
+            raise _CatalogLoadError(str(e)) from e
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    return [_coerce_service_operation(r) for r in rows], handler_variant
+
+
+def _service_catalog_version(_tenant_id) -> Optional[str]:
+    conn = db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT weak_etag FROM page_signature WHERE entity_id = %s",
+                ("service_catalog:global",),
+            )
+            row = cur.fetchone()
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    if isinstance(row, dict):
+        return row.get("weak_etag")
+    return row[0] if row else None
+
+
+_SERVICE_CATALOG = ServiceCatalogCache(
+    load=_load_service_catalog, fetch_version=_service_catalog_version
+)
+
+
+def _load_service_packages(tenant_id):
+    """Every package with its ordered children in one query -> (rows, variant).
+
+    While SCHEMA is unknown the current schema (is_package, no base_labor_rate) is assumed.
+    """
+    rate = (
+        "COALESCE(c.base_labor_rate, c.default_price)"
+        if SCHEMA.has_column("service_operations", "base_labor_rate")
+        else "c.default_price"
+    )
+    if SCHEMA.has_column("service_operations", "is_package") is not False:
+        where, variant = "p.is_package IS TRUE", "packages"
     else:
-        # memory mode: fabricate empty history if customer id ends with 999 -> not found
-        if customer_id.endswith("999"):
-            return _error(HTTPStatus.NOT_FOUND, "NOT_FOUND", "Customer not found")
-        appointments = []
+        # Older schemas: packages are the ids referenced by package_items.service_id
+        where, variant = "p.id IN (SELECT DISTINCT service_id FROM package_items)", "inferred"
+    sql = f"""
+        SELECT p.id::text AS id, p.name, p.category, p.display_order, p.is_active, p.default_price,
+               COALESCE(json_agg(json_build_object(
+                   'child_id', pi.child_id::text, 'qty', pi.qty, 'name', c.name,
+                   'default_hours', c.default_hours, 'default_price', c.default_price,
+                   'base_labor_rate', {rate})
+                 ORDER BY pi.sort_order ASC, c.name ASC, pi.child_id ASC)
+                 FILTER (WHERE pi.child_id IS NOT NULL), '[]'::json) AS children
+        FROM service_operations p
+        LEFT JOIN package_items pi ON pi.service_id = p.id
+        LEFT JOIN service_operations c ON c.id = pi.child_id
+        WHERE {where}
+        GROUP BY p.id
+        ORDER BY p.id
+    """
+    conn = db_conn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                if tenant_id:
+                    cur.execute("SET LOCAL app.tenant_id = %s", (tenant_id,))
+                cur.execute(sql)
+                rows = cur.fetchall() or []
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    return [build_package(r, r["children"] or []) for r in rows], variant
 
-    payments_flat: list[dict[str, Any]] = []
-    past_appointments = [
-        {
-            "id": appt["id"],
-            "status": appt["status"],
-            "start": appt.get("start_ts").isoformat() if appt.get("start_ts") else None,
-            "total_amount": float(appt.get("total_amount") or 0.0),
-            "paid_amount": float(appt.get("paid_amount") or 0.0),
-            "payments": appt.get("payments") or [],
-        }
-        for appt in appointments
-    ]
-    for appt in past_appointments:
-        for p in appt.get("payments", []) or []:
-            payments_flat.append(p)
 
-    base_payload = {"pastAppointments": past_appointments, "payments": payments_flat}
-    # Tests in multiple variants expect nested payload json['data']['data']
-    # Provide both: top-level data plus nested copy for backward compatibility.
-    return _ok({"data": base_payload, **base_payload})
+# Package composition (list payloads + scaled invoice line templates), keyed by
+# the same catalog signature as _SERVICE_CATALOG (package_items triggers bump it).
+_SERVICE_PACKAGES = ServiceCatalogCache(
+    load=_load_service_packages, fetch_version=_service_catalog_version
+)
+
+
+def _service_catalog_changed() -> None:
+    _SERVICE_CATALOG.bump()
+    _SERVICE_PACKAGES.bump()
 
 
-# ----------------------------------------------------------------------------
-# CSV Exports
-# ----------------------------------------------------------------------------
 @app.route("/api/admin/service-operations", methods=["GET"])
 def list_service_operations():
     """List active service operations.
@@ -9130,6 +10246,8 @@ def list_service_operations():
     Default shape: a flat JSON array of objects.
     Legacy shape: {"service_operations": [...]} when ?legacy=1 supplied.
     Supports simple substring search across name/category/keywords when q>=2.
+    Served from the per-tenant catalog cache (_SERVICE_CATALOG); If-None-Match is
+    answered from the cached entry's version without querying service_operations.
     """
     # Step 1: Enforce authentication with role requirement
     require_auth_role("Advisor")
@@ -9158,7 +10276,6 @@ def list_service_operations():
         if forced in forced_map:
             st, code, msg = forced_map[forced]
             return _error(st, code, msg)
-    conn = db_conn()
     q = request.args.get("q", "").strip()
     legacy = request.args.get("legacy") == "1"
     sort_col = request.args.get("sort", "display_order")
@@ -9181,165 +10298,34 @@ def list_service_operations():
     if sort_col not in sortable:
         return _error(HTTPStatus.BAD_REQUEST, "BAD_REQUEST", "Invalid sort column")
 
-    # Primary projection attempts legacy column name default_price. If it no longer exists
-    # (renamed to base_labor_rate) we will retry with the new name automatically.
-    projection_legacy = (
-        "id, name, category, subcategory, internal_code, skill_level, default_hours, "
-        "default_price, keywords, flags, is_active, display_order"
-    )
-    projection_new = (
-        "id, name, category, subcategory, internal_code, skill_level, default_hours, "
-        "base_labor_rate, keywords, flags, is_active, display_order"
-    )
-
-    sql = [
-        f"SELECT {projection_legacy}",
-        "FROM service_operations",
-        "WHERE is_active IS TRUE",
-    ]
-    params = []
-    if len(q) >= 2:
-        sql.append("AND (name ILIKE %s OR category ILIKE %s OR %s = ANY(keywords))")
-        like = f"%{q}%"
-        params.extend([like, like, q])
-    sql.append(f"ORDER BY {sort_col} {sort_dir} NULLS LAST, id ASC")  # deterministic
-    sql.append("LIMIT %s")
-    params.append(limit)
-
-    final_sql = "\n".join(sql)
-    rows = []
-    handler_variant = "v2-flat"
-    tried_new_projection = False
-
-    conn = db_conn()
+    params = (q if len(q) >= 2 else "", legacy, sort_col, sort_dir, limit)
     try:
-        with conn:
-            with conn.cursor() as cur:
-                # Step 3: Set tenant context for database operations
-                cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
-
-                cur.execute(final_sql, params)
-                rows = cur.fetchall()
-    except Exception as e:  # pragma: no cover - defensive runtime hardening
-        # Production hotfix path: if new columns not yet deployed, fall back to legacy minimal column set
-        msg = str(e).lower()
-        missing_table = "service_operations" in msg and (
-            "does not exist" in msg or "undefined" in msg
-        )
-        # Some Postgres variants omit the table name in undefined column errors; also match "undefined column"
-        missing_column = ("column" in msg and "does not exist" in msg) or (
-            "undefined column" in msg
+        entry, cached = _SERVICE_CATALOG.get(g.tenant_id)
+    except _CatalogLoadError as e:
+        details = {"reason": str(e)} if app.config.get("TESTING") else None
+        return _error(
+            HTTPStatus.INTERNAL_SERVER_ERROR, "INTERNAL", "Internal server error", details
         )
-        # Specific retry: default_price renamed to base_labor_rate
-        if ("default_price" in msg or "defaultprice" in msg) and not missing_table:
-            # Rebuild SQL with new projection and retry once
-            tried_new_projection = True
-            sql_new = [
-                f"SELECT {projection_new}",
-                "FROM service_operations",
-                "WHERE is_active IS TRUE",
-            ]
-            if len(q) >= 2:
-                sql_new.append("AND (name ILIKE %s OR category ILIKE %s OR %s = ANY(keywords))")
-            sql_new.append(f"ORDER BY {sort_col} {sort_dir} NULLS LAST, id ASC")
-            sql_new.append("LIMIT %s")
-            final_sql_new = "\n".join(sql_new)
-            try:
-                with conn:
-                    with conn.cursor() as cur:
-                        cur.execute(final_sql_new, params)
-                        rows = cur.fetchall()
-                        handler_variant = "v2-flat-newcol"
-            except Exception as e2:  # fall back after failed retry
-                msg2 = str(e2).lower()
-                missing_column = missing_column or (
-                    ("column" in msg2 and "does not exist" in msg2) or ("undefined column" in msg2)
-                )
-                # proceed to generic fallback paths below
-        if tried_new_projection and rows:
-            # Successful retry with new projection; proceed without triggering fallback/raise.
-            pass
-        elif missing_table:
-            rows = []  # empty catalog in brand‑new DB is acceptable (frontend handles gracefully)
-            handler_variant = "v2-empty"
-        elif missing_column and not rows:
-            # Retry with minimal legacy-safe projection (columns very unlikely to change)
-            fallback_sql = (
-                "SELECT id, name, category, default_hours, default_price, is_active "
-                "FROM service_operations WHERE is_active IS TRUE ORDER BY id ASC LIMIT %s"
-            )
-            try:
-                with conn:
-                    with conn.cursor() as cur:
-                        cur.execute(fallback_sql, [limit])
-                        rows = cur.fetchall()
-                        handler_variant = "v1-fallback"
-                        try:
-                            import logging
-
-                            logging.getLogger("edgar.api").warning(
-                                "service_operations fallback projection active (missing column); original error=%s",
-                                msg,
-                            )
-                        except Exception:
-                            pass
-            except Exception:
-                # Re-raise original exception to preserve stack for observability
-                raise
-        elif not rows:  # Unknown error condition with no data retrieved
-            details = {"reason": str(e)} if app.config.get("TESTING") else None
-            return _error(
-                HTTPStatus.INTERNAL_SERVER_ERROR, "INTERNAL", "Internal server error", details
-            )
-
-    def _coerce(row):
-        return {
-            "id": row["id"],
-            "internal_code": row.get("internal_code"),
-            "name": row["name"],
-            "category": row["category"],
-            "subcategory": row.get("subcategory"),
-            "skill_level": row.get("skill_level"),
-            "default_hours": (
-                float(row["default_hours"]) if row["default_hours"] is not None else None
-            ),
-            # Support either legacy default_price or new base_labor_rate column names
-            "base_labor_rate": (
-                (lambda v: float(v) if v is not None else None)(
-                    row.get("base_labor_rate", row.get("default_price"))
-                )
-            ),
-            "keywords": row.get("keywords"),
-            "is_active": row.get("is_active"),
-            "display_order": row.get("display_order"),
-            "flags": row.get("flags"),
-        }
+    _CACHE_REQUESTS.inc(cache="service_catalog", result="hit" if cached else "miss")
 
-    payload = [_coerce(r) for r in rows]
-
-    # Generate ETag based on data hash for caching
-    if payload:
-        import hashlib
-
-        data_str = str(sorted(payload, key=lambda x: x.get("id", "")))
-        etag = hashlib.md5(data_str.encode()).hexdigest()[:16]
-
-        # Check If-None-Match header for 304 response
-        if_none_match = request.headers.get("If-None-Match")
-        if if_none_match and if_none_match.strip('"') == etag:
-            return "", 304
-    else:
-        etag = "empty"
+    etag = entry.etag(g.tenant_id, params)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and etag in {t.strip() for t in if_none_match.split(",")}:
+        resp = make_response("", 304)
+        resp.headers["ETag"] = etag
+        resp.headers["Cache-Control"] = "private, max-age=300"
+        return resp
 
+    payload = entry.query(q, sort_col=sort_col, desc=sort_dir == "desc", limit=limit)
     if legacy:
         resp = jsonify({"service_operations": payload})
     else:
         resp = jsonify(payload)
 
     # Enhanced caching and debug headers
-    resp.headers["ETag"] = f'"{etag}"'
+    resp.headers["ETag"] = etag
     resp.headers["Cache-Control"] = "private, max-age=300"  # 5 min cache
-    resp.headers["X-Catalog-Handler"] = handler_variant
+    resp.headers["X-Catalog-Handler"] = entry.variant
     resp.headers["X-Total-Results"] = str(len(payload))
     try:  # pragma: no cover
         import inspect
@@ -9368,7 +10354,7 @@ def create_service_operation():
     if not body:
         return _error(HTTPStatus.BAD_REQUEST, "INVALID_JSON", "Request body must be valid JSON")
     try:
-        app.logger.error(f"[SERVICE DEBUG] Raw body: {body}")
+        _debug_log("catalog", "Raw body: %s", body)
     except Exception:
         pass
 
@@ -9451,7 +10437,7 @@ def create_service_operation():
     if not allowed_fields.get("internal_code"):
         allowed_fields["internal_code"] = allowed_fields["id"]
     try:
-        app.logger.error(f"[SERVICE DEBUG] Allowed fields after mapping: {allowed_fields}")
+        _debug_log("catalog", "Allowed fields after mapping: %s", allowed_fields)
     except Exception:
         pass
 
@@ -9484,12 +10470,13 @@ def create_service_operation():
                 field_names = ", ".join(fields)
                 values = [allowed_fields[k] for k in fields]
                 try:
-                    app.logger.error(f"[SERVICE DEBUG] Fields to insert: {fields}")
-                    app.logger.error(
-                        f"[SERVICE DEBUG] Values to insert (ordered by fields): {values}"
-                    )
-                    app.logger.error(
-                        f"[SERVICE DEBUG] SQL: INSERT INTO service_operations ({field_names}) VALUES ({placeholders})"
+                    _debug_log("catalog", "Fields to insert: %s", fields)
+                    _debug_log("catalog", "Values to insert (ordered by fields): %s", values)
+                    _debug_log(
+                        "catalog",
+                        "SQL: INSERT INTO service_operations (%s) VALUES (%s)",
+                        field_names,
+                        placeholders,
                     )
                 except Exception:
                     pass
@@ -9526,6 +10513,7 @@ def create_service_operation():
                 "updated_at": row["updated_at"].isoformat() if row.get("updated_at") else None,
             }
 
+        _service_catalog_changed()
         return jsonify(_coerce_single(row)), 201
 
     except Exception as e:
@@ -9674,6 +10662,7 @@ def update_service_operation(service_id: str):
                 "updated_at": row["updated_at"].isoformat() if row.get("updated_at") else None,
             }
 
+        _service_catalog_changed()
         return jsonify(_coerce_single(row)), 200
 
     except Exception as e:
@@ -9731,6 +10720,7 @@ def delete_service_operation(service_id: str):
                     (service_id,),
                 )
 
+        _service_catalog_changed()
         return jsonify({"message": "Service operation deleted successfully", "id": service_id}), 200
 
     except Exception as e:
@@ -9779,7 +10769,6 @@ def list_service_packages():
     if not g.tenant_id:
         return _error(HTTPStatus.BAD_REQUEST, "MISSING_TENANT", "Tenant context required")
 
-    conn = db_conn()
     # Simple filters: ?q substring across package name/category; ?category exact; limit
     q = request.args.get("q", "").strip()
     category_filter = request.args.get("category", "").strip()
@@ -9790,108 +10779,15 @@ def list_service_packages():
         limit = 250
     limit = max(1, min(limit, 500))
 
-    # Some test schemas may not yet include is_package; detect and degrade to packages inferred by presence in package_items
-    has_is_package = True
-    with conn.cursor() as cur_chk:
-        try:
-            cur_chk.execute("SELECT is_package FROM service_operations LIMIT 1")
-            cur_chk.fetchall()
-        except Exception:
-            has_is_package = False
-    if has_is_package:
-        pkg_sql = [
-            "SELECT id, name, category, display_order FROM service_operations WHERE is_package IS TRUE AND is_active IS TRUE",
-        ]
-    else:
-        # Infer package ids from package_items.service_id (legacy naming) and join for projection
-        pkg_sql = [
-            "SELECT so.id, so.name, so.category, so.display_order FROM service_operations so",
-            "WHERE so.is_active IS TRUE AND so.id IN (SELECT DISTINCT service_id FROM package_items)",
-        ]
-    params = []
-    if category_filter:
-        pkg_sql.append("AND category = %s")
-        params.append(category_filter)
-    if len(q) >= 2:
-        like = f"%{q}%"
-        pkg_sql.append("AND (name ILIKE %s OR category ILIKE %s)")
-        params.extend([like, like])
-    pkg_sql.append("ORDER BY display_order ASC NULLS LAST, id ASC")
-    pkg_sql.append("LIMIT %s")
-    params.append(limit)
-    pkg_rows = []
-    with conn:
-        with conn.cursor() as cur:
-            # Step 3: Set tenant context for database operations
-            cur.execute("SET LOCAL app.tenant_id = %s", (g.tenant_id,))
-
-            cur.execute("\n".join(pkg_sql), params)
-            pkg_rows = cur.fetchall()
-
-    # Fetch children per package (small N; simple iteration acceptable)
-    def _fetch_children(pid: str):
-        # Fallback if base_labor_rate column not present
-        child_sql_primary = (
-            "SELECT pi.child_id, pi.qty, pi.sort_order, so.name, so.category, so.default_hours, "
-            "COALESCE(so.base_labor_rate, so.default_price) AS base_labor_rate "
-            "FROM package_items pi JOIN service_operations so ON so.id = pi.child_id "
-            "WHERE pi.service_id = %s ORDER BY pi.sort_order ASC, so.name ASC, pi.child_id ASC"
-        )
-        child_sql_fallback = (
-            "SELECT pi.child_id, pi.qty, pi.sort_order, so.name, so.category, so.default_hours, "
-            "so.default_price AS base_labor_rate "
-            "FROM package_items pi JOIN service_operations so ON so.id = pi.child_id "
-            "WHERE pi.service_id = %s ORDER BY pi.sort_order ASC, so.name ASC, pi.child_id ASC"
-        )
-        # Use a dedicated cursor/transaction boundary so a failed primary attempt doesn't poison subsequent queries.
-        with conn.cursor() as c2:
-            try:
-                c2.execute(child_sql_primary, [pid])
-                rows = c2.fetchall()
-                return rows
-            except Exception:
-                try:
-                    conn.rollback()
-                except Exception:
-                    pass
-                with conn.cursor() as c3:
-                    c3.execute(child_sql_fallback, [pid])
-                    return c3.fetchall()
-
-    payload = []
-    fingerprint_parts: list[str] = []
-    for r in pkg_rows:
-        children = _fetch_children(r["id"])  # rows as dict RealDictRow
-        items = []
-        total = 0.0
-        for ch in children:
-            rate = ch.get("base_labor_rate")
-            qty = float(ch.get("qty") or 1)
-            if rate is not None:
-                try:
-                    total += float(rate) * qty
-                except Exception:
-                    pass
-            items.append(
-                {
-                    "child_id": ch["child_id"],
-                    "name": ch.get("name"),
-                    "qty": qty,
-                    "base_labor_rate": (float(rate) if rate is not None else None),
-                    "default_hours": (
-                        float(ch["default_hours"]) if ch.get("default_hours") is not None else None
-                    ),
-                }
-            )
-            fingerprint_parts.append(f"{r['id']}::{ch['child_id']}::{qty}")
-        pkg_obj = {
-            "id": r["id"],
-            "name": r["name"],
-            "category": r.get("category"),
-            "price_preview": {"sum_child_base_labor_rate": round(total, 2)},
-            "package_items": items,
-        }
-        payload.append(pkg_obj)
+    # Composition, price previews and ordering come precomputed from _SERVICE_PACKAGES
+    entry, _cached = _SERVICE_PACKAGES.get(g.tenant_id)
+    rows = [
+        r
+        for r in entry.query(q, "display_order", False, limit=len(entry.rows))
+        if r["is_active"] and (not category_filter or r.get("category") == category_filter)
+    ][:limit]
+    payload = [r["payload"] for r in rows]
+    fingerprint_parts: list[str] = [part for r in rows for part in r["fingerprint"]]
     # ETag generation (weak SHA1 over ordered parts). Weak acceptable for cache validation only.
     digest_src = f"v1|{len(payload)}|" + "|".join(sorted(fingerprint_parts))
     # nosec B324 - non-crypto requirement
@@ -9924,6 +10820,8 @@ def add_package_to_invoice(invoice_id: str):
         non-null default_price > 0 and differs from child sum, proportionally scale child prices to match.
         (Child precedence retained; scaling is a lossless reallocation under existing schema constraints.)
       - Updates invoice totals (subtotal/total/amount_due) preserving amount_paid.
+    Package composition and scaled line amounts come from _SERVICE_PACKAGES; the write is
+    one totals UPDATE plus one INSERT ... SELECT for every child line.
     Returns: { invoice: <updated>, added_line_items: [...], package_id, package_name, added_subtotal_cents }
     """
     require_auth_role("Advisor")
@@ -9931,177 +10829,86 @@ def add_package_to_invoice(invoice_id: str):
     package_id = body.get("packageId") or body.get("package_id")
     if not package_id or not isinstance(package_id, str):
         return _error(HTTPStatus.BAD_REQUEST, "INVALID_PACKAGE_ID", "packageId required")
-    conn = db_conn()
     try:
+        # Children, prices and override scaling are precomputed per catalog version
+        entry, _cached = _SERVICE_PACKAGES.get(getattr(g, "tenant_id", None))
+        pkg = entry.get(package_id)
+        lines = pkg["lines"] if pkg else []
+        conn = db_conn()
         with conn:
             with conn.cursor() as cur:
-                # Lock invoice
-                cur.execute(
-                    "SELECT id::text, status, subtotal_cents, tax_cents, total_cents, amount_paid_cents, amount_due_cents FROM invoices WHERE id = %s FOR UPDATE",
-                    (invoice_id,),
-                )
-                inv = cur.fetchone()
-                if not inv:
-                    return _error(HTTPStatus.NOT_FOUND, "NOT_FOUND", "Invoice not found")
-                status = inv["status"]
-                if status in ("VOID", "PAID"):
-                    return _error(
-                        HTTPStatus.BAD_REQUEST, "INVALID_STATE", f"Cannot modify {status} invoice"
-                    )
-                # Fetch package meta
-                cur.execute(
-                    "SELECT id::text, name, default_price FROM service_operations WHERE id = %s AND is_package IS TRUE",
-                    (package_id,),
-                )
-                pkg = cur.fetchone()
-                if not pkg:
-                    return _error(
-                        HTTPStatus.NOT_FOUND, "NOT_A_PACKAGE", "Package not found or not a package"
-                    )
-                package_name = pkg["name"]
-                package_override_price = pkg.get("default_price")
-                # Fetch children
-                cur.execute(
-                    """
-                    SELECT pi.child_id::text, pi.qty, so.name, so.default_price
-                    FROM package_items pi
-                    JOIN service_operations so ON so.id = pi.child_id
-                    WHERE pi.service_id = %s
-                    ORDER BY pi.sort_order ASC, so.name ASC, pi.child_id ASC
-                    """,
-                    (package_id,),
-                )
-                children = cur.fetchall() or []
-                if not children:
-                    return _error(HTTPStatus.CONFLICT, "EMPTY_PACKAGE", "Package has no children")
-                # Build child price list in cents
-                child_prices_cents: list[int] = []
-                base_child_rows: list[dict] = []
-                total_child_cents = 0
-                for ch in children:
-                    qty = float(ch["qty"] or 1)
-                    raw_price = ch.get("default_price") or 0
-                    price_cents = int(round(float(raw_price) * 100))
-                    extended_cents = int(round(price_cents * qty))
-                    total_child_cents += extended_cents
-                    child_prices_cents.append(extended_cents)
-                    base_child_rows.append(
-                        {
-                            "child_id": ch["child_id"],
-                            "name": ch.get("name"),
-                            "qty": qty,
-                            "extended_cents": extended_cents,
-                        }
-                    )
-                final_child_cents = total_child_cents
-                # Apply override scaling if applicable
-                if (
-                    package_override_price is not None
-                    and package_override_price > 0
-                    and total_child_cents > 0
-                ):
-                    override_cents = int(round(float(package_override_price) * 100))
-                    if override_cents != total_child_cents:
-                        # Scale proportionally; allocate remainders to last child
-                        scaled: list[int] = []
-                        running = 0
-                        for idx, row in enumerate(base_child_rows):
-                            if idx < len(base_child_rows) - 1:
-                                proportion = (
-                                    row["extended_cents"] / total_child_cents
-                                    if total_child_cents
-                                    else 0
-                                )
-                                new_val = int(proportion * override_cents)
-                                scaled.append(new_val)
-                                running += new_val
-                            else:
-                                scaled.append(override_cents - running)
-                        # Replace extended_cents
-                        for row, new_val in zip(base_child_rows, scaled):
-                            row["extended_cents"] = new_val
-                        final_child_cents = override_cents
-                # Determine starting position
-                cur.execute(
-                    "SELECT COALESCE(MAX(position), -1) AS max_pos FROM invoice_line_items WHERE invoice_id = %s",
-                    (invoice_id,),
-                )
-                max_pos_row = cur.fetchone() or {"max_pos": -1}
-                start_pos = (max_pos_row.get("max_pos") or -1) + 1
-                added_line_items = []
-                # Insert each child as line item
-                for offset, row in enumerate(base_child_rows):
-                    cents = row["extended_cents"]
+                updated_inv = None
+                if lines:
+                    # Totals first: takes the invoice row lock and checks its state in one statement
                     cur.execute(
                         """
-                        INSERT INTO invoice_line_items (
-                          id, invoice_id, position, service_operation_id, name, description, quantity,
-                          unit_price_cents, line_subtotal_cents, tax_rate_basis_points, tax_cents, total_cents, created_at)
-                        VALUES (gen_random_uuid(), %s, %s, %s, %s, NULL, %s, %s, %s, 0, 0, %s, now())
-                        RETURNING id::text, position, service_operation_id::text, name, quantity, unit_price_cents, line_subtotal_cents, total_cents
+                        UPDATE invoices
+                        SET subtotal_cents = subtotal_cents + %(cents)s,
+                            total_cents = total_cents + %(cents)s,
+                            amount_due_cents = amount_due_cents + %(cents)s,
+                            updated_at = now()
+                        WHERE id = %(invoice_id)s AND status::text NOT IN ('VOID', 'PAID')
+                        RETURNING id::text, appointment_id::text, status::text, currency, subtotal_cents, tax_cents, total_cents, amount_paid_cents, amount_due_cents, issued_at, paid_at, voided_at, notes, created_at, updated_at
                         """,
-                        (
-                            invoice_id,
-                            start_pos + offset,
-                            row["child_id"],
-                            row["name"],
-                            1,
-                            cents,  # unit_price_cents (already extended since qty always 1 here)
-                            cents,
-                            cents,
-                        ),
+                        {"cents": pkg["lines_cents"], "invoice_id": invoice_id},
+                    )
+                    updated_inv = cur.fetchone()
+                if updated_inv is None:
+                    cur.execute(
+                        "SELECT status::text AS status FROM invoices WHERE id = %s", (invoice_id,)
                     )
-                    added_line_items.append(cur.fetchone())
-                # Update invoice totals
-                new_subtotal = (inv.get("subtotal_cents") or 0) + final_child_cents
-                new_total = (inv.get("total_cents") or 0) + final_child_cents  # no tax yet
-                new_due = (inv.get("amount_due_cents") or 0) + final_child_cents
+                    inv = cur.fetchone()
+                    if not inv:
+                        return _error(HTTPStatus.NOT_FOUND, "NOT_FOUND", "Invoice not found")
+                    status = inv["status"]
+                    if status in ("VOID", "PAID"):
+                        return _error(
+                            HTTPStatus.BAD_REQUEST,
+                            "INVALID_STATE",
+                            f"Cannot modify {status} invoice",
+                        )
+                    if not pkg:
+                        return _error(
+                            HTTPStatus.NOT_FOUND,
+                            "NOT_A_PACKAGE",
+                            "Package not found or not a package",
+                        )
+                    return _error(HTTPStatus.CONFLICT, "EMPTY_PACKAGE", "Package has no children")
+                package_name = pkg["name"]
+                final_child_cents = pkg["lines_cents"]
+                # All children in one INSERT ... SELECT, appended after the current last position
                 cur.execute(
                     """
-                    UPDATE invoices
-                    SET subtotal_cents = %s, total_cents = %s, amount_due_cents = %s, updated_at = now()
-                    WHERE id = %s
-                    RETURNING id::text, appointment_id::text, status::text, currency, subtotal_cents, tax_cents, total_cents, amount_paid_cents, amount_due_cents, issued_at, paid_at, voided_at, notes, created_at, updated_at
+                    INSERT INTO invoice_line_items (
+                      id, invoice_id, position, service_operation_id, name, description, quantity,
+                      unit_price_cents, line_subtotal_cents, tax_rate_basis_points, tax_cents, total_cents, created_at)
+                    SELECT gen_random_uuid(), %(invoice_id)s, base.max_pos + t.ord, t.child_id, t.name, NULL, 1,
+                           t.cents, t.cents, 0, 0, t.cents, now()
+                    FROM (SELECT COALESCE(MAX(position), -1) AS max_pos FROM invoice_line_items WHERE invoice_id = %(invoice_id)s) base,
+                         unnest(%(child_ids)s::text[], %(names)s::text[], %(cents)s::int[]) WITH ORDINALITY AS t(child_id, name, cents, ord)
+                    RETURNING id::text, position, service_operation_id::text, name, quantity, unit_price_cents, line_subtotal_cents, total_cents
                     """,
-                    (new_subtotal, new_total, new_due, invoice_id),
-                )
-                updated_inv = cur.fetchone()
-                # Convert any Decimal quantities to JSON-friendly primitives (Flask default encoder can't handle Decimal)
-                from decimal import (
-                    Decimal,  # local import to avoid global dependency if not needed elsewhere
+                    {
+                        "invoice_id": invoice_id,
+                        "child_ids": [ln[0] for ln in lines],
+                        "names": [ln[1] for ln in lines],
+                        "cents": [ln[2] for ln in lines],
+                    },
                 )
-
-                def _jsonify_val(v):
-                    if isinstance(v, Decimal):
-                        # Quantity is only decimal field expected; cast to float. Monetary cent values are ints already.
-                        try:
-                            iv = int(v)
-                            # Preserve integer form when it is mathematically an integer (e.g., 1.00)
-                            if iv == v:
-                                return iv
-                        except Exception:  # pragma: no cover - fallback path
-                            pass
-                        return float(v)
-                    return v
-
-                def _convert(obj):
-                    if isinstance(obj, list):
-                        return [_convert(o) for o in obj]
-                    if isinstance(obj, dict):
-                        return {k: _convert(v) for k, v in obj.items()}
-                    return _jsonify_val(obj)
-
+                added_line_items = sorted(cur.fetchall() or [], key=lambda li: li["position"])
                 payload = {
-                    "invoice": _convert(updated_inv),
-                    "added_line_items": _convert(added_line_items),
+                    "invoice": updated_inv,
+                    "added_line_items": added_line_items,
                     "package_id": package_id,
                     "package_name": package_name,
                     "added_subtotal_cents": final_child_cents,
                 }
                 return _ok(payload)
-    except Exception as e:  # pragma: no cover
+    except Exception:  # pragma: no cover
         log.exception("add_package_failed invoice_id=%s package_id=%s", invoice_id, package_id)
-        return _error(HTTPStatus.INTERNAL_SERVER_ERROR, "INTERNAL_ERROR", str(e))
+        return _error(
+            HTTPStatus.INTERNAL_SERVER_ERROR, "INTERNAL_ERROR", "Failed to add package to invoice"
+        )
 
 
 ## (moved) Entrypoint will be appended at absolute end of file after all route registrations
@@ -10395,7 +11202,7 @@ def root():
 
 @app.route("/api/admin/dashboard/stats", methods=["GET"])
 def admin_dashboard_stats():
-    print("[DEBUG] admin_dashboard_stats route hit")
+    _debug_log("dashboard", "admin_dashboard_stats route hit")
     # Step 1: Enforce authentication with role requirement
     require_auth_role("Advisor")
 
@@ -10538,7 +11345,7 @@ def admin_search_customers():
     tying a customer to a car.
     """
     # Nuclear debugging for E2E customer search issues
-    log.error(f"[CUSTOMER_SEARCH_DEBUG] Called with args: {dict(request.args)}")
+    _debug_log("customer_search", "Called with args: %s", dict(request.args))
 
     # Step 1: Enforce authentication with role requirement
     require_auth_role("Advisor")
@@ -10549,9 +11356,9 @@ def admin_search_customers():
         return resp, 400
 
     q = (request.args.get("q") or "").strip()
-    log.error(f"[CUSTOMER_SEARCH_DEBUG] Query: '{q}', tenant_id: {g.tenant_id}")
+    _debug_log("customer_search", "Query: '%s', tenant_id: %s", q, g.tenant_id)
     if not q:
-        log.error("[CUSTOMER_SEARCH_DEBUG] Empty query, returning empty items")
+        _debug_log("customer_search", "Empty query, returning empty items")
         return _ok({"items": []})
     limit = min(int(request.args.get("limit", 25)), 100)
     flt = (request.args.get("filter") or "").strip().lower()
@@ -10687,8 +11494,8 @@ def admin_search_customers():
             }
         )
 
-    log.error(
-        f"[CUSTOMER_SEARCH_DEBUG] Returning {len(items)} items: {[item['name'] for item in items]}"
+    _debug_log(
+        "customer_search", "Returning %s items: %s", len(items), [item["name"] for item in items]
     )
     return _ok({"items": items})
 
@@ -11497,6 +12304,11 @@ def add_customer_note(cust_id: str):
 # Unified Customer Profile Endpoint (Phase A1)
 # ----------------------------------------------------------------------------
 @app.route("/api/admin/customers/<cust_id>/profile", methods=["GET"])
+@conditional_get(
+    lambda kw, _tenant: [f"customer:{kw['cust_id']}", f"customer_profile:{kw['cust_id']}"],
+    vary=("limit_appointments", "vehicle_id", "include_invoices", "cursor", "from", "to"),
+    authorize=_customer_profile_authorized,
+)
 def unified_customer_profile(cust_id: str):
     """Return unified customer profile with stats, vehicles, and recent appointments.
 
@@ -12003,11 +12815,11 @@ def _visits_rows_to_payload(rows):
         visit = {
             "id": r["id"],
             "status": r["status"],
-            "start": r.get("start_ts").isoformat() if r.get("start_ts") else None,
-            "end": r.get("end_ts").isoformat() if r.get("end_ts") else None,
-            "price": float(r.get("total_amount") or 0),
-            "checkInAt": r.get("check_in_at").isoformat() if r.get("check_in_at") else None,
-            "checkOutAt": r.get("check_out_at").isoformat() if r.get("check_out_at") else None,
+            "start": r.get("start_ts"),
+            "end": r.get("end_ts"),
+            "price": r.get("total_amount") or 0.0,
+            "checkInAt": r.get("check_in_at"),
+            "checkOutAt": r.get("check_out_at"),
             "vehicle": " ".join(str(x) for x in [r.get("year"), r.get("make"), r.get("model")] if x)
             or "Vehicle",
             "plate": r.get("license_plate"),
@@ -12151,6 +12963,10 @@ except Exception:  # pragma: no cover
 
 @app.route("/api/admin/vehicles/<vehicle_id>/profile", methods=["GET"])
 @vehicle_ownership_required(vehicle_arg="vehicle_id", customer_query_arg="customer_id")
+@conditional_get(
+    lambda kw, _tenant: [f"vehicle:{kw['vehicle_id']}", f"vehicle_profile:{kw['vehicle_id']}"],
+    vary=("cursor", "from", "to", "page_size", "include_invoices"),
+)
 def vehicle_profile(vehicle_id: str):
     """Return read-only vehicle profile: header, stats, timeline page.
 
@@ -12187,17 +13003,9 @@ def vehicle_profile(vehicle_id: str):
     if not header:
         return _error(HTTPStatus.NOT_FOUND, "not_found", "Vehicle not found")
 
-    # Fast cached weak etag lookup (vehicle_profile:<vehicle_id>)
-    cached_etag = None
-    try:
-        conn = db_conn()
-        with conn.cursor() as cur:
-            cached_etag = _lookup_cached_etag(
-                cur, "vehicle_profile", header.get("id") or vehicle_id
-            )
-    except Exception:
-        cached_etag = None
-    etag = cached_etag or compute_vehicle_profile_etag(vehicle_id)
+    # Validator from @conditional_get (page_signature) when available; a matching
+    # If-None-Match never reaches this point.
+    etag = g.get("conditional_etag") or compute_vehicle_profile_etag(vehicle_id)
     inm = request.headers.get("If-None-Match")
     if inm and inm == etag:
         resp = make_response("", 304)
@@ -12772,7 +13580,7 @@ def get_csrf_token():
 
 @app.before_request
 def _csrf_protect():
-    print(f"[DEBUG] _csrf_protect called for {request.method} {request.path}")
+    _debug_log("csrf", "_csrf_protect called for %s %s", request.method, request.path)
     try:
         # E2E/CI bypass: disable CSRF enforcement when running in CI test instance
         if os.getenv("APP_INSTANCE_ID") == "ci":
@@ -12912,7 +13720,6 @@ def reset_password():
         tenant_header = "00000000-0000-0000-0000-000000000001"
 
     from backend.app.security import reset_tokens as rt
-    from backend.app.security.passwords import hash_password as _bcrypt_hash
 
     with conn:
         with conn.cursor() as cur:
@@ -12942,10 +13749,14 @@ def reset_password():
         if not rt.validate_reset_token(str(user_id), token, tenant_id_val, conn):
             return _error(HTTPStatus.BAD_REQUEST, "invalid_request", "Invalid token or request")
         # Update password
+        try:
+            new_hash = _password_pool.get_pool().hash(new_password)
+        except _password_pool.PasswordPoolBusy as exc:
+            return _password_pool_busy(exc)
         with conn.cursor() as cur:
             cur.execute(
                 "UPDATE customer_auth SET password_hash=%s WHERE customer_id=%s",
-                (_bcrypt_hash(new_password), user_id),
+                (new_hash, user_id),
             )
         # Mark token used
         try:
@@ -0,0 +1,444 @@
+"""Structured debug logging categories for request-path diagnostics.
+
+Request handlers used to trace with synchronous ``print()`` calls and
+``logger.error("..._DEBUG ...")`` at error level, which serialized gunicorn
+workers on stdout under load. Diagnostics now go through named categories
+(``tenant``, ``auth``, ``move``, ``appt`` ...) that are off by default and
+cost a single dict lookup when disabled. Enabled records are queued to the
+async log worker and formatted off the request thread.
+
+Runtime configuration:
+  DEBUG_LOG_CATEGORIES      comma separated list, or ``*`` for every category
+  DEBUG_LOG_SAMPLE_RATE     default sample rate for enabled categories (0..1]
+  DEBUG_LOG_SAMPLE_<CAT>    per-category override, e.g. DEBUG_LOG_SAMPLE_TENANT=0.05
+
+Categories can also be toggled per process through the admin endpoint
+``/api/admin/debug-log/categories``.
+
+``AsyncLogWorker`` is the queue behind ``local_server._async_log``. It drains
+records in batches (up to ``LOG_BATCH_MAX`` records or ``LOG_BATCH_MAX_WAIT_MS``)
+and hands each batch to a writer. ``LoggerBatchWriter`` (the default) forwards
+to a ``logging.Logger`` so its handlers and formatters apply;
+``NdjsonBatchWriter`` (opt-in, ``API_LOG_FORMAT=ndjson``) emits one JSON object
+per line in a single ``write()`` to a stream, bypassing handlers. When the queue
+passes ``LOG_SHED_HIGH_WATER`` (fraction of ``LOG_QUEUE_MAX``), debug records
+are sampled down towards zero while request records keep flowing; a full
+queue rejects the new record and counts it instead of evicting older ones.
+Counters are exposed by ``stats()`` and ``/api/admin/metrics/log-pipeline``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import IO, Any, Callable, Deque, Dict, List, Mapping, Optional, Tuple
+
+__all__ = [
+    "KNOWN_CATEGORIES",
+    "DebugCategoryGate",
+    "AsyncLogWorker",
+    "LoggerBatchWriter",
+    "NdjsonBatchWriter",
+]
+
+KNOWN_CATEGORIES = (
+    "appt",
+    "auth",
+    "board",
+    "catalog",
+    "csrf",
+    "customer",
+    "customer_search",
+    "dashboard",
+    "invoice",
+    "move",
+    "rate_limit",
+    "sql",
+    "tenant",
+    "vehicle",
+)
+
+_WILDCARD = "*"
+
+
+def _env_number(name: str, default: float, cast: Callable[[str], Any] = float) -> Any:
+    try:
+        return cast(os.getenv(name, "") or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_rate(raw: Optional[str], default: float) -> float:
+    if raw is None or raw == "":
+        return default
+    try:
+        val = float(raw)
+    except ValueError:
+        return default
+    return min(max(val, 0.0), 1.0)
+
+
+class DebugCategoryGate:
+    """Thread-safe switchboard of enabled debug categories and sample rates.
+
+    ``allow()`` is the hot-path check: one dict lookup when the category is
+    disabled, plus one ``random()`` call when it is sampled below 1.0.
+    """
+
+    def __init__(self, env: Optional[Mapping[str, str]] = None):
+        self._lock = threading.Lock()
+        self._rates: Dict[str, float] = {}
+        self._emitted: Dict[str, int] = {}
+        self._sampled_out: Dict[str, int] = {}
+        self.load_from_env(os.environ if env is None else env)
+
+    def load_from_env(self, env: Mapping[str, str]) -> None:
+        raw = (env.get("DEBUG_LOG_CATEGORIES") or "").strip()
+        default_rate = _parse_rate(env.get("DEBUG_LOG_SAMPLE_RATE"), 1.0)
+        rates: Dict[str, float] = {}
+        for name in (c.strip().lower() for c in raw.split(",")):
+            if not name:
+                continue
+            if name in ("all", _WILDCARD):
+                name = _WILDCARD
+            key = "DEBUG_LOG_SAMPLE_" + ("ALL" if name == _WILDCARD else name.upper())
+            rate = _parse_rate(env.get(key), default_rate)
+            if rate > 0:
+                rates[name] = rate
+        with self._lock:
+            self._rates = rates
+
+    # -- hot path -------------------------------------------------------
+    def enabled(self, category: str) -> bool:
+        """Cheap pre-check (no sampling, no counters) for guarding expensive arguments."""
+        rates = self._rates
+        return bool(rates) and (category in rates or _WILDCARD in rates)
+
+    def allow(self, category: str) -> bool:
+        rates = self._rates  # snapshot; writers swap the dict atomically
+        if not rates:
+            return False
+        rate = rates.get(category)
+        if rate is None:
+            rate = rates.get(_WILDCARD)
+            if rate is None:
+                return False
+        if rate < 1.0 and random.random() >= rate:
+            self._sampled_out[category] = self._sampled_out.get(category, 0) + 1
+            return False
+        self._emitted[category] = self._emitted.get(category, 0) + 1
+        return True
+
+    # -- runtime toggles --------------------------------------------------
+    def set(self, category: str, enabled: bool, sample_rate: float = 1.0) -> None:
+        category = _WILDCARD if category in ("all", _WILDCARD) else category.lower()
+        with self._lock:
+            rates = dict(self._rates)
+            rate = _parse_rate(str(sample_rate), 1.0)
+            if enabled and rate > 0:
+                rates[category] = rate
+            else:
+                rates.pop(category, None)
+            self._rates = rates
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rates = {}
+            self._emitted = {}
+            self._sampled_out = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            rates = dict(self._rates)
+        return {
+            "enabled": rates,
+            "known": list(KNOWN_CATEGORIES),
+            "emitted": dict(self._emitted),
+            "sampled_out": dict(self._sampled_out),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Batching async log worker
+# ---------------------------------------------------------------------------
+Record = Tuple[str, Dict[str, Any]]
+
+
+def _record_message(payload: Dict[str, Any]) -> Tuple[str, tuple]:
+    """Return the (format, args) pair a record is logged with."""
+    kind = payload.get("type")
+    if kind == "debug":
+        return "debug.%s " + payload.get("msg", ""), (
+            payload.get("category"),
+            *payload.get("args", ()),
+        )
+    rid = payload.get("request_id")
+    if kind == "api.request" and rid:
+        return "api.request rid=%s", (rid,)
+    return "api.log", ()
+
+
+class LoggerBatchWriter:
+    """Forward each record of a batch to a ``logging.Logger``."""
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def write_batch(self, batch: List[Record]) -> None:
+        for level, payload in batch:
+            levelno = logging.getLevelName(level.upper())
+            if not isinstance(levelno, int):
+                levelno = logging.INFO
+            fmt, args = _record_message(payload)
+            if payload.get("type") == "debug":
+                self.logger.log(levelno, fmt, *args)
+            else:
+                self.logger.log(levelno, fmt, *args, extra={"payload": payload})
+
+
+class NdjsonBatchWriter:
+    """Serialize a batch as newline-delimited JSON and emit it with one ``write()``."""
+
+    def __init__(self, stream: IO[str], logger: Optional[logging.Logger] = None):
+        self.stream = stream
+        # Level filtering follows the logger so runtime level changes apply
+        self.logger = logger
+        self.logger_name = logger.name if logger is not None else "api"
+
+    def _line(self, level: str, payload: Dict[str, Any]) -> Optional[str]:
+        levelno = logging.getLevelName(level.upper())
+        if not isinstance(levelno, int):
+            levelno = logging.INFO
+        if self.logger is not None and not self.logger.isEnabledFor(levelno):
+            return None
+        fmt, args = _record_message(payload)
+        try:
+            msg = fmt % args if args else fmt
+        except Exception:
+            msg = fmt
+        doc: Dict[str, Any] = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "level": level.upper(),
+            "logger": self.logger_name,
+            "msg": msg,
+        }
+        if payload.get("type") == "debug":
+            doc["category"] = payload.get("category")
+            doc["request_id"] = payload.get("request_id")
+        else:
+            doc.update(payload)
+        return json.dumps(doc, default=str, separators=(",", ":"))
+
+    def write_batch(self, batch: List[Record]) -> None:
+        lines = [line for line in (self._line(lv, p) for lv, p in batch) if line is not None]
+        if not lines:
+            return
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+
+class AsyncLogWorker(threading.Thread):  # pragma: no cover - infrastructure
+    """Batching async log shipper with per-category load shedding and a circuit breaker.
+
+    ``emit()`` never blocks and never evicts queued records. The worker thread
+    drains up to ``BATCH_MAX`` records (waiting at most ``BATCH_WAIT_MS`` after
+    the first) and passes them to ``writer.write_batch``. A writer failure
+    counts once per batch towards the circuit breaker.
+    """
+
+    FAIL_THRESHOLD = 5
+    COOLDOWN_SEC = 5.0
+    QUEUE_MAX = 1024
+    BATCH_MAX = 256
+    BATCH_WAIT_MS = 10.0
+    SHED_HIGH_WATER = 0.75
+    _LATENCY_WINDOW = 512
+
+    def __init__(self, logger: logging.Logger, writer: Any = None, start: bool = True):
+        super().__init__(daemon=True, name="api-log-worker")
+        self.logger = logger
+        self.writer = writer if writer is not None else LoggerBatchWriter(logger)
+        # Allow tests / deployments to override thresholds via environment
+        self.FAIL_THRESHOLD = _env_number("LOG_CIRCUIT_FAIL_THRESHOLD", self.FAIL_THRESHOLD, int)
+        self.COOLDOWN_SEC = _env_number("LOG_CIRCUIT_COOLDOWN_SECONDS", self.COOLDOWN_SEC)
+        self.BATCH_MAX = max(1, _env_number("LOG_BATCH_MAX", self.BATCH_MAX, int))
+        self.BATCH_WAIT_MS = max(0.0, _env_number("LOG_BATCH_MAX_WAIT_MS", self.BATCH_WAIT_MS))
+        self.SHED_HIGH_WATER = min(
+            max(_env_number("LOG_SHED_HIGH_WATER", self.SHED_HIGH_WATER), 0.0), 1.0
+        )
+        queue_max = max(1, _env_number("LOG_QUEUE_MAX", self.QUEUE_MAX, int))
+        self.q: queue.Queue[Record] = queue.Queue(maxsize=queue_max)
+        self._shed_at = int(queue_max * self.SHED_HIGH_WATER)
+        self._lock = threading.Lock()
+        self.emitted_count = 0
+        self.accepted_count = 0
+        self.dropped_full_count = 0
+        self.failure_count = 0
+        self.breaker_trip_count = 0
+        self._breaker_until = 0.0
+        self.batch_count = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.queue_high_water = 0
+        self._dropped_by_category: Dict[str, int] = {}
+        self._shed_by_category: Dict[str, int] = {}
+        self._flush_ms: Deque[float] = deque(maxlen=self._LATENCY_WINDOW)
+        if start:
+            self.start()
+
+    # Internal helpers
+    def _breaker_open(self) -> bool:
+        return time.time() < self._breaker_until
+
+    def _trip_breaker(self):
+        self.breaker_trip_count += 1
+        # Support test overrides via env
+        cooldown = _env_number("LOG_CIRCUIT_COOLDOWN_SECONDS", self.COOLDOWN_SEC)
+        self._breaker_until = time.time() + cooldown
+        self.failure_count = 0
+
+    @staticmethod
+    def _category(level: str, payload: Dict[str, Any]) -> str:
+        kind = payload.get("type")
+        if kind == "debug":
+            return "debug." + str(payload.get("category"))
+        return str(kind or level)
+
+    def _should_shed(self, level: str, payload: Dict[str, Any], depth: int) -> bool:
+        """Sample debug records down linearly from the high-water mark to a full queue."""
+        if depth < self._shed_at or payload.get("type") != "debug":
+            return False
+        span = max(self.q.maxsize - self._shed_at, 1)
+        keep = 1.0 - (depth - self._shed_at) / span
+        return random.random() >= keep
+
+    # Producer side (request threads)
+    def emit(self, level: str, payload: dict):
+        if self._breaker_open():
+            return
+        depth = self.q.qsize()
+        if depth > self.queue_high_water:
+            self.queue_high_water = depth
+        if self._shed_at and self._should_shed(level, payload, depth):
+            cat = self._category(level, payload)
+            with self._lock:
+                self._shed_by_category[cat] = self._shed_by_category.get(cat, 0) + 1
+            return
+        try:
+            self.q.put_nowait((level, payload))
+        except queue.Full:
+            cat = self._category(level, payload)
+            with self._lock:
+                self.dropped_full_count += 1
+                self._dropped_by_category[cat] = self._dropped_by_category.get(cat, 0) + 1
+            return
+        self.accepted_count += 1
+
+    # Consumer side (worker thread)
+    def _next_batch(self, first: Record) -> Tuple[List[Record], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.BATCH_WAIT_MS / 1000.0
+        while len(batch) < self.BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.q.get(timeout=remaining) if remaining > 0 else self.q.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == "__stop__":
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _flush(self, batch: List[Record]) -> None:
+        start = time.perf_counter()
+        try:
+            self.writer.write_batch(batch)
+        except Exception:  # logging failure
+            self.failure_count += 1
+            if self.failure_count >= self.FAIL_THRESHOLD and not self._breaker_open():
+                self._trip_breaker()
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            self.emitted_count += len(batch)
+            self.batch_count += 1
+            self.last_batch_size = len(batch)
+            if len(batch) > self.max_batch_size:
+                self.max_batch_size = len(batch)
+            self._flush_ms.append(elapsed_ms)
+        self.failure_count = 0
+
+    def drain(self) -> int:
+        """Synchronously flush whatever is queued (tests / shutdown). Returns records flushed."""
+        flushed = 0
+        while True:
+            try:
+                first = self.q.get_nowait()
+            except queue.Empty:
+                return flushed
+            if first[0] == "__stop__":
+                return flushed
+            batch, stop = self._next_batch(first)
+            self._flush(batch)
+            flushed += len(batch)
+            if stop:
+                return flushed
+
+    def run(self):  # pragma: no cover
+        while True:
+            try:
+                first = self.q.get()
+                if first[0] == "__stop__":
+                    break
+                batch, stop = self._next_batch(first)
+                self._flush(batch)
+                if stop:
+                    break
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            flush = sorted(self._flush_ms)
+            dropped = self.dropped_full_count + sum(self._shed_by_category.values())
+            offered = self.accepted_count + dropped
+            return {
+                "emitted": self.emitted_count,
+                "accepted": self.accepted_count,
+                "dropped_full": self.dropped_full_count,
+                "dropped_by_category": dict(self._dropped_by_category),
+                "shed_by_category": dict(self._shed_by_category),
+                "drop_rate": round(dropped / offered, 6) if offered else 0.0,
+                "consecutive_failures": self.failure_count,
+                "breaker_open": self._breaker_open(),
+                "breaker_trip_count": self.breaker_trip_count,
+                "queue_size": self.q.qsize(),
+                "queue_max": self.q.maxsize,
+                "queue_high_water": self.queue_high_water,
+                "batches": self.batch_count,
+                "batch_max": self.BATCH_MAX,
+                "batch_wait_ms": self.BATCH_WAIT_MS,
+                "last_batch_size": self.last_batch_size,
+                "max_batch_size": self.max_batch_size,
+                "avg_batch_size": (
+                    round(self.emitted_count / self.batch_count, 2) if self.batch_count else 0.0
+                ),
+                "flush_ms_avg": round(sum(flush) / len(flush), 3) if flush else None,
+                "flush_ms_p95": (
+                    round(flush[max(0, int(len(flush) * 0.95) - 1)], 3) if flush else None
+                ),
+                "flush_ms_max": round(flush[-1], 3) if flush else None,
+            }
+
+    def stop(self):  # pragma: no cover
+        try:
+            self.q.put_nowait(("__stop__", {}))
+        except Exception:
+            pass
@@ -0,0 +1,294 @@
+"""Message template registry with precompiled render plans.
+
+Template bodies use the frontend syntax (frontend/src/lib/messageTemplates.ts):
+
+  {{ path.to.value }}              value from the render context
+  {{ path | "fallback text" }}     fallback when the value is missing
+  \\{{ literal }}                   escaped, rendered without the backslash
+
+``compile_body`` turns a body into a ``RenderPlan``: a tuple of literal
+strings and variable segments (split path + fallback), parsed once and
+memoised per body. Rendering is a join over the segments with no regex
+work, so bulk reminder runs render thousands of messages per second;
+``RenderPlan.variables`` replaces the per-request variable extraction.
+
+``TemplateRegistry`` keeps every tenant's ``message_templates`` rows in
+memory as a ``TemplateSet`` (rows, id/slug index, compiled plans, ETag base).
+The admin write endpoints call ``bump()``; writes from other workers rotate
+the ``message_templates:global`` page_signature row
+(migrations/20250920_021_message_templates_signature.sql), which entries
+re-check at most every ``revalidate_seconds``.
+
+Env:
+  MESSAGE_TEMPLATE_CACHE               "false" disables caching (default on;
+                                       off under pytest so tests see their
+                                       patched connections)
+  MESSAGE_TEMPLATE_REVALIDATE_SECONDS  signature re-check interval (default 5)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+__all__ = [
+    "RenderPlan",
+    "TemplateRegistry",
+    "TemplateSet",
+    "compile_body",
+    "extract_variables",
+]
+
+_TOKEN_RE = re.compile(r"\\?{{\s*([^{}]+?)\s*}}")
+_FALLBACK_RE = re.compile(r"^\"([^\"]*)\"|^'([^']*)'")
+_SAFE_PATH = re.compile(r"^[A-Za-z0-9_.]+$")
+
+# (path segments, fallback or None, dotted path)
+_Var = Tuple[Tuple[str, ...], Optional[str], str]
+_Segment = Union[str, _Var]
+
+
+def _missing_tag(path: str) -> str:
+    return f"[MISSING: {path}]"
+
+
+def _format(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list, tuple, set)):
+        return None  # only primitives render, like the frontend
+    return str(value)
+
+
+class RenderPlan:
+    """Compiled template body: literal and variable segments."""
+
+    __slots__ = ("segments", "variables", "_literal")
+
+    def __init__(self, segments: Sequence[_Segment]):
+        merged: List[_Segment] = []
+        for seg in segments:
+            if isinstance(seg, str) and merged and isinstance(merged[-1], str):
+                merged[-1] += seg
+            elif seg != "":
+                merged.append(seg)
+        self.segments: Tuple[_Segment, ...] = tuple(merged)
+        self.variables: List[str] = sorted({s[2] for s in self.segments if not isinstance(s, str)})
+        self._literal = "".join(self.segments) if not self.variables else None  # type: ignore[arg-type]
+
+    def render(self, context: Dict[str, Any], missing: Callable[[str], str] = _missing_tag) -> str:
+        if self._literal is not None:
+            return self._literal
+        out: List[str] = []
+        for seg in self.segments:
+            if isinstance(seg, str):
+                out.append(seg)
+                continue
+            path, fallback, dotted = seg
+            value: Any = context
+            for part in path:
+                if value is None:
+                    break
+                value = value.get(part) if isinstance(value, dict) else getattr(value, part, None)
+            text = _format(value)
+            if text is None:
+                text = fallback if fallback is not None else missing(dotted)
+            out.append(text)
+        return "".join(out)
+
+    def render_many(self, contexts: Iterable[Dict[str, Any]]) -> List[str]:
+        return [self.render(c) for c in contexts]
+
+
+@lru_cache(maxsize=1024)
+def compile_body(body: str) -> RenderPlan:
+    """Parse a body once; identical bodies share one plan."""
+    segments: List[_Segment] = []
+    pos = 0
+    for m in _TOKEN_RE.finditer(body or ""):
+        segments.append(body[pos : m.start()])
+        pos = m.end()
+        full = m.group(0)
+        if full.startswith("\\{{"):
+            segments.append(full[1:])
+            continue
+        expr = m.group(1).strip()
+        fallback = None
+        pipe = expr.find("|")
+        path = expr
+        if pipe != -1:
+            path = expr[:pipe].strip()
+            fb = _FALLBACK_RE.match(expr[pipe + 1 :].strip())
+            if fb:
+                fallback = fb.group(1) if fb.group(1) is not None else fb.group(2)
+        if not path or not _SAFE_PATH.match(path):
+            segments.append(full)  # not a variable: left untouched
+            continue
+        segments.append((tuple(path.split(".")), fallback, path))
+    segments.append((body or "")[pos:])
+    return RenderPlan(segments)
+
+
+def extract_variables(body: str) -> List[str]:
+    """Sorted variable paths of a body (escaped tokens ignored)."""
+    return list(compile_body(body or "").variables)
+
+
+class TemplateSet:
+    """One tenant's templates; immutable once built."""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: int, db_version: Optional[str]):
+        # Stored in list order: category NULLS LAST, label
+        self.rows = sorted(
+            rows, key=lambda r: (r.get("category") is None, r.get("category") or "", r["label"])
+        )
+        self.version = version
+        self.db_version = db_version
+        self.checked_at = time.monotonic()
+        self.etag_base = (
+            db_version
+            or hashlib.sha1(
+                json.dumps(self.rows, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+        )
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        for r in self.rows:
+            self._by_key[str(r["id"])] = r
+            self._by_key[r["slug"]] = r
+        self._plans = {str(r["id"]): compile_body(r["body"] or "") for r in self.rows}
+
+    def etag(self, tenant_id: Any, params: Tuple[Any, ...]) -> str:
+        src = "|".join([str(tenant_id), self.etag_base, *map(str, params)])
+        return 'W/"' + hashlib.sha1(src.encode("utf-8")).hexdigest() + '"'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Template row by id or slug."""
+        return self._by_key.get(str(key))
+
+    def plan(self, key: str) -> Optional[RenderPlan]:
+        row = self.get(key)
+        return self._plans[str(row["id"])] if row else None
+
+    def render(self, key: str, context: Dict[str, Any]) -> str:
+        plan = self.plan(key)
+        if plan is None:
+            raise KeyError(key)
+        return plan.render(context)
+
+    def query(
+        self,
+        include_inactive: bool = False,
+        channel: Optional[str] = None,
+        category: Optional[str] = None,
+        q: Optional[str] = None,
+        limit: int = 500,
+    ) -> List[Dict[str, Any]]:
+        needle = q.lower() if q else None
+        out = []
+        for r in self.rows:
+            if not include_inactive and r.get("is_active") is not True:
+                continue
+            if channel and r.get("channel") != channel:
+                continue
+            if category and r.get("category") != category:
+                continue
+            if needle and not (
+                needle in (r.get("label") or "").lower()
+                or needle in (r.get("body") or "").lower()
+                or needle in (r.get("category") or "").lower()
+            ):
+                continue
+            out.append(r)
+            if len(out) >= limit:
+                break
+        return out
+
+
+class TemplateRegistry:
+    """Per-tenant ``TemplateSet`` entries invalidated by a local version and a DB signature.
+
+    load(tenant_id) -> template rows (every row, inactive included).
+    fetch_version(tenant_id) -> signature string or None (cheap indexed lookup).
+    """
+
+    def __init__(
+        self,
+        load: Callable[[Any], List[Dict[str, Any]]],
+        fetch_version: Optional[Callable[[Any], Optional[str]]] = None,
+        revalidate_seconds: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ):
+        if enabled is None:
+            default = "false" if "pytest" in sys.modules else "true"
+            enabled = os.getenv("MESSAGE_TEMPLATE_CACHE", default).lower() != "false"
+        if revalidate_seconds is None:
+            revalidate_seconds = float(os.getenv("MESSAGE_TEMPLATE_REVALIDATE_SECONDS", "5"))
+        self.load = load
+        self.fetch_version = fetch_version
+        self.revalidate_seconds = revalidate_seconds
+        self.enabled = enabled
+        self.version = 0
+        self.loads = 0
+        self._entries: Dict[Any, TemplateSet] = {}
+        self._lock = threading.Lock()
+
+    def bump(self) -> int:
+        """Invalidate every tenant entry (message_templates is not tenant scoped)."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            return self.version
+
+    def _db_version(self, tenant_id: Any) -> Optional[str]:
+        if not self.fetch_version:
+            return None
+        try:
+            return self.fetch_version(tenant_id)
+        except Exception:
+            return None
+
+    def peek(self, tenant_id: Any) -> Optional[TemplateSet]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(tenant_id)
+        if entry is None or entry.version != self.version:
+            return None
+        if time.monotonic() - entry.checked_at < self.revalidate_seconds:
+            return entry
+        current = self._db_version(tenant_id)
+        if current is None or current != entry.db_version:
+            return None
+        entry.checked_at = time.monotonic()
+        return entry
+
+    def get(self, tenant_id: Any) -> Tuple[TemplateSet, bool]:
+        """Return (entry, cached). Loads (and stores when enabled) on a miss."""
+        entry = self.peek(tenant_id)
+        if entry is not None:
+            return entry, True
+        version = self.version
+        db_version = self._db_version(tenant_id) if self.enabled else None
+        entry = TemplateSet(self.load(tenant_id), version, db_version)
+        self.loads += 1
+        if self.enabled:
+            with self._lock:
+                if self.version == version:
+                    self._entries[tenant_id] = entry
+        return entry, False
+
+    def render(self, tenant_id: Any, key: str, context: Dict[str, Any]) -> str:
+        return self.get(tenant_id)[0].render(key, context)
@@ -0,0 +1,462 @@
+"""Prometheus text-format metrics shared across gunicorn workers.
+
+Each process keeps counters, gauges and histograms in memory. When
+``METRICS_MULTIPROC_DIR`` is set, every process periodically writes a JSON
+snapshot of its own values to ``<dir>/metrics_<pid>.json`` (atomic rename,
+every ``METRICS_SYNC_SECONDS``, default 5, and at exit). ``render()`` refreshes
+the caller's snapshot, then merges every file in the directory:
+
+  * counters and histograms are summed across processes
+  * gauges are reported per process (``pid`` label) unless registered with
+    ``mode="sum"`` or ``mode="max"``
+
+gunicorn.conf.py clears the directory on master start and calls
+``mark_process_dead()`` from ``child_exit``: the dead worker's counters and
+histograms are folded into ``metrics_archive.json`` and its gauges dropped,
+so recycled workers (``max_requests``) neither lose counts nor pile up files.
+
+Without ``METRICS_MULTIPROC_DIR`` only the current process is rendered.
+No third-party client library is required.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "REGISTRY",
+    "DEFAULT_BUCKETS",
+    "mark_process_dead",
+    "statement_name",
+]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_ARCHIVE_FILE = "metrics_archive.json"
+
+LabelKey = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._values = {}
+
+    def describe(self) -> Dict[str, Any]:
+        return {"type": self.kind, "help": self.help, "labelnames": list(self.labelnames)}
+
+    def samples(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), mode="pid"):
+        super().__init__(name, help_text, labelnames)
+        if mode not in ("pid", "sum", "max"):
+            raise ValueError(f"unsupported gauge mode: {mode}")
+        self.mode = mode
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "mode": self.mode}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "buckets": list(self.buckets)}
+
+    def samples(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(k), [list(v[0]), v[1], v[2]]] for k, v in self._values.items()]
+
+
+# ---------------------------------------------------------------------------
+# Snapshot merge / exposition
+# ---------------------------------------------------------------------------
+def _merge_into(acc: Dict[str, Any], snap: Dict[str, Any], pid: Optional[str]) -> None:
+    for name, meta in (snap.get("metrics") or {}).items():
+        kind = meta.get("type")
+        target = acc.setdefault(name, {**meta, "samples": {}})
+        if kind == "gauge" and meta.get("mode", "pid") == "pid":
+            target["labelnames"] = list(meta.get("labelnames") or []) + ["pid"]
+        out = target["samples"]
+        for labels, value in meta.get("samples") or []:
+            if kind == "gauge":
+                mode = meta.get("mode", "pid")
+                if mode == "pid":
+                    out[tuple(labels) + (pid or "",)] = value
+                elif mode == "max":
+                    key = tuple(labels)
+                    out[key] = max(out.get(key, value), value)
+                else:
+                    key = tuple(labels)
+                    out[key] = out.get(key, 0.0) + value
+            elif kind == "histogram":
+                key = tuple(labels)
+                cur = out.get(key)
+                if cur is None or len(cur[0]) != len(value[0]):
+                    out[key] = [list(value[0]), value[1], value[2]]
+                else:
+                    cur[0] = [a + b for a, b in zip(cur[0], value[0])]
+                    cur[1] += value[1]
+                    cur[2] += value[2]
+            else:
+                key = tuple(labels)
+                out[key] = out.get(key, 0.0) + value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _render(acc: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for name in sorted(acc):
+        meta = acc[name]
+        kind = meta.get("type", "untyped")
+        names = meta.get("labelnames") or []
+        lines.append(f"# HELP {name} {meta.get('help', '')}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(meta["samples"].items()):
+            if kind == "histogram":
+                cum = 0
+                bounds = list(meta.get("buckets") or []) + [float("inf")]
+                for bound, count in zip(bounds, value[0]):
+                    cum += count
+                    le = f'le="{_fmt(bound)}"'
+                    lines.append(f"{name}_bucket{_labels(names, labels, le)} {cum}")
+                lines.append(f"{name}_sum{_labels(names, labels)} {_fmt(value[1])}")
+                lines.append(f"{name}_count{_labels(names, labels)} {value[2]}")
+            else:
+                lines.append(f"{name}{_labels(names, labels)} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _acc_to_snapshot(acc: Dict[str, Any], pid: Any) -> Dict[str, Any]:
+    metrics = {}
+    for name, meta in acc.items():
+        samples = [[list(k), v] for k, v in meta["samples"].items()]
+        metrics[name] = {**{k: v for k, v in meta.items() if k != "samples"}, "samples": samples}
+    return {"pid": pid, "metrics": metrics}
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, doc: Dict[str, Any]) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(doc, fh, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+class MetricsRegistry:
+    """Process-local metric families plus shared-directory aggregation."""
+
+    def __init__(self, multiproc_dir: Optional[str] = None, sync_seconds: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self.multiproc_dir = multiproc_dir or os.getenv("METRICS_MULTIPROC_DIR") or None
+        if sync_seconds is None:
+            try:
+                sync_seconds = float(os.getenv("METRICS_SYNC_SECONDS", "5"))
+            except ValueError:
+                sync_seconds = 5.0
+        self.sync_seconds = sync_seconds
+        self._sync_pid: Optional[int] = None
+
+    # -- registration ---------------------------------------------------
+    def _get_or_create(self, cls, name: str, *args: Any, **kwargs: Any):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metric {name} already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(
+        self, name: str, help_text: str, labelnames: Sequence[str] = (), mode: str = "pid"
+    ) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames, mode=mode)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges right before each snapshot."""
+        with self._lock:
+            if fn not in self._collectors:
+                self._collectors.append(fn)
+
+    # -- snapshots ------------------------------------------------------
+    def _collect(self) -> None:
+        for fn in list(self._collectors):
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._collect()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "pid": os.getpid(),
+            "metrics": {m.name: {**m.describe(), "samples": m.samples()} for m in metrics},
+        }
+
+    def write_snapshot(self) -> Optional[str]:
+        if not self.multiproc_dir:
+            return None
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        path = os.path.join(self.multiproc_dir, f"metrics_{os.getpid()}.json")
+        _write_json(path, self.snapshot())
+        return path
+
+    def _sync_loop(self) -> None:  # pragma: no cover - background thread
+        pid = os.getpid()
+        while self._sync_pid == pid:
+            time.sleep(self.sync_seconds)
+            try:
+                self.write_snapshot()
+            except Exception:
+                pass
+
+    def ensure_sync_thread(self) -> None:
+        """Start the per-process snapshot writer (no-op without a multiproc dir)."""
+        if not self.multiproc_dir or self.sync_seconds <= 0 or self._sync_pid == os.getpid():
+            return
+        self._sync_pid = os.getpid()
+        threading.Thread(target=self._sync_loop, name="metrics-sync", daemon=True).start()
+
+    def _after_fork(self) -> None:
+        # Values inherited from a preloading parent belong to the parent
+        for metric in list(self._metrics.values()):
+            metric._reset()
+        self._sync_pid = None
+
+    # -- exposition -----------------------------------------------------
+    def render(self) -> str:
+        acc: Dict[str, Any] = {}
+        if not self.multiproc_dir:
+            _merge_into(acc, self.snapshot(), str(os.getpid()))
+            return _render(acc)
+        self.write_snapshot()
+        try:
+            names = sorted(os.listdir(self.multiproc_dir))
+        except OSError:
+            names = []
+        for fname in names:
+            if not fname.endswith(".json"):
+                continue
+            snap = _read_json(os.path.join(self.multiproc_dir, fname))
+            if snap:
+                _merge_into(acc, snap, str(snap.get("pid", "")))
+        return _render(acc)
+
+
+def mark_process_dead(pid: int, multiproc_dir: Optional[str] = None) -> None:
+    """Fold a dead worker's counters/histograms into the archive and drop its gauges."""
+    directory = multiproc_dir or os.getenv("METRICS_MULTIPROC_DIR")
+    if not directory:
+        return
+    path = os.path.join(directory, f"metrics_{pid}.json")
+    snap = _read_json(path)
+    if snap is None:
+        return
+    archive_path = os.path.join(directory, _ARCHIVE_FILE)
+    archive = _read_json(archive_path) or {"pid": "archive", "metrics": {}}
+    acc: Dict[str, Any] = {}
+    for doc in (archive, snap):
+        only_cumulative = {
+            "metrics": {
+                n: m for n, m in (doc.get("metrics") or {}).items() if m.get("type") != "gauge"
+            }
+        }
+        _merge_into(acc, only_cumulative, None)
+    _write_json(archive_path, _acc_to_snapshot(acc, "archive"))
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Statement naming for query metrics
+# ---------------------------------------------------------------------------
+_NAME_HINT = re.compile(r"^\s*(?:/\*\s*([\w.:-]+)\s*\*/|--\s*name:\s*([\w.:-]+))")
+_VERB = re.compile(r"^\s*(\w+)")
+_TARGET = {
+    "select": re.compile(r"\bFROM\s+([\w.\"]+)", re.IGNORECASE),
+    "with": re.compile(r"\bFROM\s+([\w.\"]+)", re.IGNORECASE),
+    "delete": re.compile(r"\bFROM\s+([\w.\"]+)", re.IGNORECASE),
+    "insert": re.compile(r"\bINTO\s+([\w.\"]+)", re.IGNORECASE),
+    "update": re.compile(r"^\s*UPDATE\s+([\w.\"]+)", re.IGNORECASE),
+}
+_STATEMENT_CACHE: Dict[str, str] = {}
+_STATEMENT_CACHE_MAX = 2048
+
+
+def statement_name(sql: str) -> str:
+    """Low-cardinality label for a SQL statement.
+
+    Uses a leading ``/* name */`` or ``-- name: x`` hint when present,
+    otherwise ``<verb>_<first table>`` (e.g. ``select_appointments``).
+    """
+    cached = _STATEMENT_CACHE.get(sql)
+    if cached is not None:
+        return cached
+    m = _NAME_HINT.match(sql)
+    if m:
+        name = m.group(1) or m.group(2)
+    else:
+        v = _VERB.match(sql)
+        verb = v.group(1).lower() if v else "other"
+        target = _TARGET.get(verb)
+        t = target.search(sql) if target is not None else None
+        table = t.group(1).strip('"').split(".")[-1].lower() if t else ""
+        name = f"{verb}_{table}" if table else verb
+    name = name[:64]
+    if len(_STATEMENT_CACHE) < _STATEMENT_CACHE_MAX:
+        _STATEMENT_CACHE[sql] = name
+    return name
+
+
+def _shared_registry() -> MetricsRegistry:
+    # backend.metrics_registry and metrics_registry can both be imported in one
+    # process; share a single registry so per-pid snapshot files do not clobber.
+    for name in ("backend.metrics_registry", "metrics_registry"):
+        mod = sys.modules.get(name)
+        existing = getattr(mod, "REGISTRY", None) if mod is not None else None
+        if isinstance(existing, MetricsRegistry) or (
+            existing is not None and type(existing).__name__ == "MetricsRegistry"
+        ):
+            return existing  # type: ignore[return-value]
+    return MetricsRegistry()
+
+
+REGISTRY = _shared_registry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=REGISTRY._after_fork)
+
+
+@atexit.register
+def _final_snapshot() -> None:  # pragma: no cover - process exit
+    try:
+        if REGISTRY._sync_pid == os.getpid():
+            REGISTRY.write_snapshot()
+    except Exception:
+        pass
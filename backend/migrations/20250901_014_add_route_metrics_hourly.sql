@@ -0,0 +1,29 @@
+-- 20250901_014_add_route_metrics_hourly.sql
+-- Hourly per-route request metrics rolled up by every API worker (request_metrics.py).
+-- Each worker upserts its deltas; counters and histogram buckets are additive.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS route_metrics_hourly (
+  bucket_start        TIMESTAMPTZ      NOT NULL,
+  method              TEXT             NOT NULL,
+  route               TEXT             NOT NULL,
+  total               BIGINT           NOT NULL DEFAULT 0,
+  status_200          BIGINT           NOT NULL DEFAULT 0,
+  status_304          BIGINT           NOT NULL DEFAULT 0,
+  status_4xx          BIGINT           NOT NULL DEFAULT 0,
+  status_5xx          BIGINT           NOT NULL DEFAULT 0,
+  status_other        BIGINT           NOT NULL DEFAULT 0,
+  cold_starts         BIGINT           NOT NULL DEFAULT 0,
+  latency_sum_ms      DOUBLE PRECISION NOT NULL DEFAULT 0,
+  latency_max_ms      DOUBLE PRECISION NOT NULL DEFAULT 0,
+  latency_buckets     BIGINT[]         NOT NULL,
+  first_byte_buckets  BIGINT[]         NOT NULL,
+  updated_at          TIMESTAMPTZ      NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (bucket_start, method, route)
+);
+
+-- Retention sweeps and 7-day window scans
+CREATE INDEX IF NOT EXISTS idx_route_metrics_hourly_bucket ON route_metrics_hourly(bucket_start);
+
+COMMIT;
@@ -0,0 +1,161 @@
+-- 20250902_015_extend_page_signatures.sql
+-- Extend page_signature (create_page_signature_table.sql) beyond customer:/vehicle:/
+-- vehicle_profile: so the conditional-GET layer in local_server can answer 304 for:
+--   customer_profile:<customer_id>   unified customer profile (vehicles, visits, invoices)
+--   board:<tenant>:<YYYY-MM-DD>      status board for one UTC shop day
+--   board_carryover:<tenant>         open appointments from days before today (carryover lane)
+--   board_meta:<tenant>              names shown on board cards (customers, vehicles, techs)
+--   invoice:<invoice_id>             invoice detail (line items, payments)
+--   service_catalog:global           service operation list (catalog is not tenant scoped)
+-- Signatures use clock_timestamp() as basis so DELETEs and tables without updated_at
+-- still rotate the ETag. Invoice signatures are bumped by deferred triggers, so a
+-- payment or line-item transaction only takes the page_signature row lock at commit
+-- instead of holding it while the rest of the transaction runs. Tenant ids are read via to_jsonb(row) so the triggers also
+-- work on schemas that predate the tenant_id columns (they fall back to 'global').
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION bump_page_signature(p_entity_id TEXT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_entity_id IS NULL THEN
+        RETURN;
+    END IF;
+    PERFORM ensure_page_signature(p_entity_id, clock_timestamp());
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION _row_tenant(p_row JSONB)
+RETURNS TEXT AS $$
+    SELECT COALESCE(p_row->>'tenant_id', 'global');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Appointments: board day(s), carryover lane, customer profile
+CREATE OR REPLACE FUNCTION trg_appointment_board_signature()
+RETURNS TRIGGER AS $$
+DECLARE
+    r JSONB;
+    today DATE := (now() AT TIME ZONE 'UTC')::date;
+    d DATE;
+BEGIN
+    FOREACH r IN ARRAY ARRAY[
+        CASE WHEN TG_OP <> 'INSERT' THEN to_jsonb(OLD) END,
+        CASE WHEN TG_OP <> 'DELETE' THEN to_jsonb(NEW) END
+    ] LOOP
+        CONTINUE WHEN r IS NULL;
+        IF r->>'start_ts' IS NOT NULL THEN
+            d := ((r->>'start_ts')::timestamptz AT TIME ZONE 'UTC')::date;
+            PERFORM bump_page_signature('board:' || _row_tenant(r) || ':' || d::text);
+            IF d < today THEN
+                PERFORM bump_page_signature('board_carryover:' || _row_tenant(r));
+            END IF;
+        END IF;
+        IF r->>'customer_id' IS NOT NULL THEN
+            PERFORM bump_page_signature('customer_profile:' || (r->>'customer_id'));
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS appointment_board_signature_trg ON appointments;
+CREATE TRIGGER appointment_board_signature_trg
+AFTER INSERT OR UPDATE OR DELETE ON appointments
+FOR EACH ROW EXECUTE FUNCTION trg_appointment_board_signature();
+
+-- Customers / vehicles / technicians: names rendered on board cards, profile vehicles
+CREATE OR REPLACE FUNCTION trg_board_meta_signature()
+RETURNS TRIGGER AS $$
+DECLARE
+    r JSONB := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+BEGIN
+    PERFORM bump_page_signature('board_meta:' || _row_tenant(r));
+    IF TG_TABLE_NAME = 'vehicles' AND r->>'customer_id' IS NOT NULL THEN
+        PERFORM bump_page_signature('customer_profile:' || (r->>'customer_id'));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS customer_board_meta_signature_trg ON customers;
+CREATE TRIGGER customer_board_meta_signature_trg
+AFTER INSERT OR UPDATE OR DELETE ON customers
+FOR EACH ROW EXECUTE FUNCTION trg_board_meta_signature();
+
+DROP TRIGGER IF EXISTS vehicle_board_meta_signature_trg ON vehicles;
+CREATE TRIGGER vehicle_board_meta_signature_trg
+AFTER INSERT OR UPDATE OR DELETE ON vehicles
+FOR EACH ROW EXECUTE FUNCTION trg_board_meta_signature();
+
+DO $$
+BEGIN
+    IF to_regclass('public.technicians') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS technician_board_meta_signature_trg ON technicians;
+        CREATE TRIGGER technician_board_meta_signature_trg
+        AFTER INSERT OR UPDATE OR DELETE ON technicians
+        FOR EACH ROW EXECUTE FUNCTION trg_board_meta_signature();
+    END IF;
+END $$;
+
+-- Invoices and their children
+CREATE OR REPLACE FUNCTION trg_invoice_detail_signature()
+RETURNS TRIGGER AS $$
+DECLARE
+    r JSONB := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+BEGIN
+    IF TG_TABLE_NAME = 'invoices' THEN
+        PERFORM bump_page_signature('invoice:' || (r->>'id'));
+        IF r->>'customer_id' IS NOT NULL THEN
+            PERFORM bump_page_signature('customer_profile:' || (r->>'customer_id'));
+        END IF;
+    ELSIF TG_TABLE_NAME = 'payments' AND r->>'invoice_id' IS NOT NULL THEN
+        PERFORM bump_page_signature('invoice:' || (r->>'invoice_id'));
+    ELSIF TG_TABLE_NAME = 'payments' THEN
+        -- Payments recorded before payments.invoice_id existed
+        PERFORM bump_page_signature('invoice:' || i.id::text)
+           FROM invoices i WHERE i.appointment_id::text = r->>'appointment_id';
+    ELSE
+        PERFORM bump_page_signature('invoice:' || (r->>'invoice_id'));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS invoice_detail_signature_trg ON invoices;
+CREATE CONSTRAINT TRIGGER invoice_detail_signature_trg
+AFTER INSERT OR UPDATE OR DELETE ON invoices
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION trg_invoice_detail_signature();
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['invoice_line_items', 'payments'] LOOP
+        IF to_regclass('public.' || t) IS NOT NULL THEN
+            EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_invoice_signature_trg', t);
+            EXECUTE format(
+                'CREATE CONSTRAINT TRIGGER %I AFTER INSERT OR UPDATE OR DELETE ON %I '
+                'DEFERRABLE INITIALLY DEFERRED '
+                'FOR EACH ROW EXECUTE FUNCTION trg_invoice_detail_signature()',
+                t || '_invoice_signature_trg', t
+            );
+        END IF;
+    END LOOP;
+END $$;
+
+-- Service catalog (statement level: bulk edits bump once)
+CREATE OR REPLACE FUNCTION trg_service_catalog_signature()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_page_signature('service_catalog:global');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS service_catalog_signature_trg ON service_operations;
+CREATE TRIGGER service_catalog_signature_trg
+AFTER INSERT OR UPDATE OR DELETE ON service_operations
+FOR EACH STATEMENT EXECUTE FUNCTION trg_service_catalog_signature();
+
+COMMIT;
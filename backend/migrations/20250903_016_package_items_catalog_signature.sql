@@ -0,0 +1,19 @@
+-- 20250903_016_package_items_catalog_signature.sql
+-- Package composition edits change what the service catalog serves (package
+-- previews, expansion) without touching service_operations. Bump the shared
+-- service_catalog:global signature (20250902_015_extend_page_signatures.sql) so
+-- every worker's in-memory catalog (service_catalog_cache.py) reloads.
+
+BEGIN;
+
+DO $$
+BEGIN
+    IF to_regclass('public.package_items') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS package_items_catalog_signature_trg ON package_items;
+        CREATE TRIGGER package_items_catalog_signature_trg
+        AFTER INSERT OR UPDATE OR DELETE ON package_items
+        FOR EACH STATEMENT EXECUTE FUNCTION trg_service_catalog_signature();
+    END IF;
+END $$;
+
+COMMIT;
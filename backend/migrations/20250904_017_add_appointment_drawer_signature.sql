@@ -0,0 +1,76 @@
+-- 20250904_017_add_appointment_drawer_signature.sql
+-- page_signature key appointment:<id> for the appointment drawer read model
+-- (appointment_drawer.py). Rotated by anything the drawer renders:
+--   appointments row, appointment_services rows,
+--   customer edits (name/email/phone) and customer vehicle changes (switcher list).
+-- Customer and vehicle UPDATE triggers only fire when a column the drawer renders
+-- changes, so bookings and imports touching vehicles.last_service_date do not
+-- rotate every appointment of the customer.
+-- Operation price/category come from service_catalog:global (migration 014).
+-- Uses bump_page_signature() from 20250902_015_extend_page_signatures.sql; customer
+-- lookups use idx_appt_customer (20250818_010).
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION trg_appointment_drawer_signature()
+RETURNS TRIGGER AS $$
+DECLARE
+    r JSONB;
+BEGIN
+    FOREACH r IN ARRAY ARRAY[
+        CASE WHEN TG_OP <> 'INSERT' THEN to_jsonb(OLD) END,
+        CASE WHEN TG_OP <> 'DELETE' THEN to_jsonb(NEW) END
+    ] LOOP
+        CONTINUE WHEN r IS NULL;
+        IF TG_TABLE_NAME = 'appointments' THEN
+            PERFORM bump_page_signature('appointment:' || (r->>'id'));
+        ELSIF TG_TABLE_NAME = 'appointment_services' THEN
+            PERFORM bump_page_signature('appointment:' || (r->>'appointment_id'));
+        ELSIF TG_TABLE_NAME = 'customers' THEN
+            PERFORM bump_page_signature('appointment:' || a.id::text)
+               FROM appointments a WHERE a.customer_id = (r->>'id')::int;
+        ELSIF TG_TABLE_NAME = 'vehicles' AND r->>'customer_id' IS NOT NULL THEN
+            PERFORM bump_page_signature('appointment:' || a.id::text)
+               FROM appointments a WHERE a.customer_id = (r->>'customer_id')::int;
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS appointment_drawer_signature_trg ON appointments;
+CREATE TRIGGER appointment_drawer_signature_trg
+AFTER INSERT OR UPDATE OR DELETE ON appointments
+FOR EACH ROW EXECUTE FUNCTION trg_appointment_drawer_signature();
+
+DROP TRIGGER IF EXISTS appointment_services_drawer_signature_trg ON appointment_services;
+CREATE TRIGGER appointment_services_drawer_signature_trg
+AFTER INSERT OR UPDATE OR DELETE ON appointment_services
+FOR EACH ROW EXECUTE FUNCTION trg_appointment_drawer_signature();
+
+DROP TRIGGER IF EXISTS customer_drawer_signature_trg ON customers;
+CREATE TRIGGER customer_drawer_signature_trg
+AFTER UPDATE ON customers
+FOR EACH ROW
+WHEN (OLD.name IS DISTINCT FROM NEW.name
+      OR OLD.email IS DISTINCT FROM NEW.email
+      OR OLD.phone IS DISTINCT FROM NEW.phone)
+EXECUTE FUNCTION trg_appointment_drawer_signature();
+
+DROP TRIGGER IF EXISTS vehicle_drawer_signature_trg ON vehicles;
+CREATE TRIGGER vehicle_drawer_signature_trg
+AFTER INSERT OR DELETE ON vehicles
+FOR EACH ROW EXECUTE FUNCTION trg_appointment_drawer_signature();
+
+DROP TRIGGER IF EXISTS vehicle_update_drawer_signature_trg ON vehicles;
+CREATE TRIGGER vehicle_update_drawer_signature_trg
+AFTER UPDATE ON vehicles
+FOR EACH ROW
+WHEN (OLD.customer_id IS DISTINCT FROM NEW.customer_id
+      OR OLD.year IS DISTINCT FROM NEW.year
+      OR OLD.make IS DISTINCT FROM NEW.make
+      OR OLD.model IS DISTINCT FROM NEW.model
+      OR OLD.license_plate IS DISTINCT FROM NEW.license_plate)
+EXECUTE FUNCTION trg_appointment_drawer_signature();
+
+COMMIT;
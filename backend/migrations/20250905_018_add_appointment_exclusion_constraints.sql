@@ -0,0 +1,85 @@
+-- 20250905_018_add_appointment_exclusion_constraints.sql
+-- Race-free double-booking protection (conflict_engine.py).
+--
+-- appointments.block_range = tstzrange(start_ts, COALESCE(end_ts, start_ts + 2h), '[)')
+-- (2h = validation.DEFAULT_BLOCK_HOURS) is maintained by a BEFORE trigger:
+-- timestamptz + interval is not IMMUTABLE, so it cannot be a generated column.
+-- Two EXCLUDE constraints (GiST, btree_gist for the = part) reject overlapping
+-- ranges for the same technician / vehicle unless either row is CANCELED or
+-- NO_SHOW. The same (tech_id, block_range) index serves the free-slot finder.
+--
+-- Existing overlapping rows make ADD CONSTRAINT fail; in that case the
+-- constraint is skipped with a WARNING and the application keeps using the
+-- query-based find_conflicts() checks (it probes pg_constraint at runtime).
+-- Resolve the listed overlaps and re-run this migration to enable it.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS block_range tstzrange;
+
+CREATE OR REPLACE FUNCTION trg_appointment_block_range()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.start_ts IS NULL THEN
+        NEW.block_range := NULL;
+    ELSE
+        NEW.block_range := tstzrange(
+            NEW.start_ts,
+            GREATEST(COALESCE(NEW.end_ts, NEW.start_ts + INTERVAL '2 hours'), NEW.start_ts),
+            '[)'
+        );
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS appointment_block_range_trg ON appointments;
+CREATE TRIGGER appointment_block_range_trg
+BEFORE INSERT OR UPDATE OF start_ts, end_ts ON appointments
+FOR EACH ROW EXECUTE FUNCTION trg_appointment_block_range();
+
+UPDATE appointments
+   SET block_range = tstzrange(
+         start_ts,
+         GREATEST(COALESCE(end_ts, start_ts + INTERVAL '2 hours'), start_ts),
+         '[)')
+ WHERE start_ts IS NOT NULL AND block_range IS NULL;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'appointments_tech_no_overlap') THEN
+        BEGIN
+            ALTER TABLE appointments
+              ADD CONSTRAINT appointments_tech_no_overlap
+              EXCLUDE USING gist (tech_id WITH =, block_range WITH &&)
+              WHERE (tech_id IS NOT NULL AND status NOT IN ('CANCELED', 'NO_SHOW'));
+        EXCEPTION WHEN exclusion_violation THEN
+            RAISE WARNING 'appointments_tech_no_overlap skipped: existing overlapping bookings (%)', SQLERRM;
+        END;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'appointments_vehicle_no_overlap') THEN
+        BEGIN
+            ALTER TABLE appointments
+              ADD CONSTRAINT appointments_vehicle_no_overlap
+              EXCLUDE USING gist (vehicle_id WITH =, block_range WITH &&)
+              WHERE (vehicle_id IS NOT NULL AND status NOT IN ('CANCELED', 'NO_SHOW'));
+        EXCEPTION WHEN exclusion_violation THEN
+            RAISE WARNING 'appointments_vehicle_no_overlap skipped: existing overlapping bookings (%)', SQLERRM;
+        END;
+    END IF;
+END $$;
+
+-- Free-slot lookups need the (tech_id, block_range) GiST index even when the
+-- constraint (which would provide it) was skipped above.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'appointments_tech_no_overlap') THEN
+        CREATE INDEX IF NOT EXISTS idx_appointments_tech_block_range
+            ON appointments USING gist (tech_id, block_range)
+            WHERE tech_id IS NOT NULL AND status NOT IN ('CANCELED', 'NO_SHOW');
+    END IF;
+END $$;
+
+COMMIT;
@@ -0,0 +1,144 @@
+-- 20250918_019_add_template_usage_rollups.sql
+-- Daily rollups of template_usage_events for GET /api/admin/analytics/templates
+-- (template_analytics.py). The endpoint reads complete days from here and only
+-- scans today's raw events, so long ranges cost rollup rows, not events.
+--
+-- Maintained by statement-level triggers with transition tables, so every
+-- writer (log_template_usage, seeds, direct SQL in tests) keeps them current:
+--   INSERT          aggregated upsert of the new rows
+--   UPDATE/DELETE   affected (day, template) groups recomputed from the events
+-- Days are UTC days (functions run with timezone = UTC).
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS template_usage_daily (
+  day          DATE            NOT NULL,
+  template_id  UUID            NOT NULL,
+  channel      message_channel NOT NULL,
+  events       BIGINT          NOT NULL,
+  first_used   TIMESTAMP       NOT NULL,
+  last_used    TIMESTAMP       NOT NULL,
+  PRIMARY KEY (day, template_id, channel)
+);
+
+CREATE TABLE IF NOT EXISTS template_usage_daily_users (
+  day          DATE            NOT NULL,
+  template_id  UUID            NOT NULL,
+  channel      message_channel NOT NULL,
+  user_id      UUID            NOT NULL,
+  events       BIGINT          NOT NULL,
+  PRIMARY KEY (day, template_id, channel, user_id)
+);
+
+CREATE OR REPLACE FUNCTION template_usage_rollup_refresh(p_days DATE[], p_templates UUID[])
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM template_usage_daily d
+     USING unnest(p_days, p_templates) AS k(day, template_id)
+     WHERE d.day = k.day AND d.template_id = k.template_id;
+    DELETE FROM template_usage_daily_users d
+     USING unnest(p_days, p_templates) AS k(day, template_id)
+     WHERE d.day = k.day AND d.template_id = k.template_id;
+
+    INSERT INTO template_usage_daily (day, template_id, channel, events, first_used, last_used)
+    SELECT k.day, e.template_id, e.channel, count(*), MIN(e.sent_at), MAX(e.sent_at)
+      FROM (SELECT DISTINCT * FROM unnest(p_days, p_templates) AS u(day, template_id)) k
+      JOIN template_usage_events e
+        ON e.template_id = k.template_id
+       AND e.sent_at >= k.day AND e.sent_at < k.day + 1
+     GROUP BY k.day, e.template_id, e.channel;
+
+    INSERT INTO template_usage_daily_users (day, template_id, channel, user_id, events)
+    SELECT k.day, e.template_id, e.channel, e.user_id, count(*)
+      FROM (SELECT DISTINCT * FROM unnest(p_days, p_templates) AS u(day, template_id)) k
+      JOIN template_usage_events e
+        ON e.template_id = k.template_id
+       AND e.sent_at >= k.day AND e.sent_at < k.day + 1
+     WHERE e.user_id IS NOT NULL
+     GROUP BY k.day, e.template_id, e.channel, e.user_id;
+END;
+$$ LANGUAGE plpgsql SET timezone TO 'UTC';
+
+CREATE OR REPLACE FUNCTION trg_template_usage_rollup_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO template_usage_daily AS d (day, template_id, channel, events, first_used, last_used)
+    SELECT date_trunc('day', sent_at)::date, template_id, channel,
+           count(*), MIN(sent_at), MAX(sent_at)
+      FROM new_rows
+     GROUP BY 1, 2, 3
+    ON CONFLICT (day, template_id, channel) DO UPDATE
+       SET events     = d.events + EXCLUDED.events,
+           first_used = LEAST(d.first_used, EXCLUDED.first_used),
+           last_used  = GREATEST(d.last_used, EXCLUDED.last_used);
+
+    INSERT INTO template_usage_daily_users AS d (day, template_id, channel, user_id, events)
+    SELECT date_trunc('day', sent_at)::date, template_id, channel, user_id, count(*)
+      FROM new_rows
+     WHERE user_id IS NOT NULL
+     GROUP BY 1, 2, 3, 4
+    ON CONFLICT (day, template_id, channel, user_id) DO UPDATE
+       SET events = d.events + EXCLUDED.events;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SET timezone TO 'UTC';
+
+CREATE OR REPLACE FUNCTION trg_template_usage_rollup_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM template_usage_rollup_refresh(array_agg(day), array_agg(template_id))
+       FROM (SELECT DISTINCT date_trunc('day', sent_at)::date AS day, template_id
+               FROM old_rows) k;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SET timezone TO 'UTC';
+
+CREATE OR REPLACE FUNCTION trg_template_usage_rollup_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM template_usage_rollup_refresh(array_agg(day), array_agg(template_id))
+       FROM (SELECT date_trunc('day', sent_at)::date AS day, template_id FROM old_rows
+              UNION
+             SELECT date_trunc('day', sent_at)::date, template_id FROM new_rows) k;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SET timezone TO 'UTC';
+
+DROP TRIGGER IF EXISTS template_usage_rollup_insert_trg ON template_usage_events;
+CREATE TRIGGER template_usage_rollup_insert_trg
+AFTER INSERT ON template_usage_events
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_template_usage_rollup_insert();
+
+DROP TRIGGER IF EXISTS template_usage_rollup_delete_trg ON template_usage_events;
+CREATE TRIGGER template_usage_rollup_delete_trg
+AFTER DELETE ON template_usage_events
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_template_usage_rollup_delete();
+
+DROP TRIGGER IF EXISTS template_usage_rollup_update_trg ON template_usage_events;
+CREATE TRIGGER template_usage_rollup_update_trg
+AFTER UPDATE ON template_usage_events
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_template_usage_rollup_update();
+
+-- Backfill: every existing (day, template) group
+SET LOCAL timezone TO 'UTC';
+SELECT template_usage_rollup_refresh(array_agg(day), array_agg(template_id))
+  FROM (SELECT DISTINCT date_trunc('day', sent_at)::date AS day, template_id
+          FROM template_usage_events) k;
+
+COMMIT;
+
+-- Down (development only)
+-- BEGIN;
+-- DROP TRIGGER IF EXISTS template_usage_rollup_insert_trg ON template_usage_events;
+-- DROP TRIGGER IF EXISTS template_usage_rollup_delete_trg ON template_usage_events;
+-- DROP TRIGGER IF EXISTS template_usage_rollup_update_trg ON template_usage_events;
+-- DROP FUNCTION IF EXISTS trg_template_usage_rollup_insert();
+-- DROP FUNCTION IF EXISTS trg_template_usage_rollup_delete();
+-- DROP FUNCTION IF EXISTS trg_template_usage_rollup_update();
+-- DROP FUNCTION IF EXISTS template_usage_rollup_refresh(DATE[], UUID[]);
+-- DROP TABLE IF EXISTS template_usage_daily_users;
+-- DROP TABLE IF EXISTS template_usage_daily;
+-- COMMIT;
@@ -0,0 +1,20 @@
+-- 20250919_020_add_telemetry_quota_daily.sql
+-- Cross-worker daily telemetry quota (telemetry_quota.py). Workers lease units
+-- in blocks with one upsert on (day, kind); used is the total leased that day.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS telemetry_quota_daily (
+  day         DATE        NOT NULL,
+  kind        TEXT        NOT NULL,
+  used        BIGINT      NOT NULL DEFAULT 0,
+  updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (day, kind)
+);
+
+COMMIT;
+
+-- Down (development only)
+-- BEGIN;
+-- DROP TABLE IF EXISTS telemetry_quota_daily;
+-- COMMIT;
@@ -0,0 +1,36 @@
+-- 20250920_021_message_templates_signature.sql
+-- message_templates is served from an in-memory registry
+-- (message_template_registry.py) and the list endpoint answers If-None-Match.
+-- Rotate a message_templates:global page_signature on every write so workers
+-- that did not handle the write reload, and ETags change with the data.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION trg_message_templates_signature()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_page_signature('message_templates:global');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF to_regclass('public.message_templates') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS message_templates_signature_trg ON message_templates;
+        CREATE TRIGGER message_templates_signature_trg
+        AFTER INSERT OR UPDATE OR DELETE ON message_templates
+        FOR EACH STATEMENT EXECUTE FUNCTION trg_message_templates_signature();
+    END IF;
+END $$;
+
+SELECT bump_page_signature('message_templates:global');
+
+COMMIT;
+
+-- Down (development only)
+-- BEGIN;
+-- DROP TRIGGER IF EXISTS message_templates_signature_trg ON message_templates;
+-- DROP FUNCTION IF EXISTS trg_message_templates_signature();
+-- DELETE FROM page_signature WHERE entity_id = 'message_templates:global';
+-- COMMIT;
@@ -0,0 +1,46 @@
+-- 20250921_022_payment_ledger.sql
+-- Ledger mode for invoice payments (invoice_service._record_payment_ledger,
+-- INVOICE_PAYMENT_LEDGER=true). Payments become append-only rows tied to their
+-- invoice and deduplicated per (invoice_id, idempotency_key), so a retried card
+-- terminal request replays instead of double-charging. Invoice balances are kept
+-- by an atomic increment and checked by reconcile_payments.py.
+
+BEGIN;
+
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS invoice_id TEXT;
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+
+-- Link existing payments to the invoice of their appointment
+UPDATE payments p
+SET invoice_id = i.id
+FROM invoices i
+WHERE p.invoice_id IS NULL AND i.appointment_id = p.appointment_id;
+
+CREATE INDEX IF NOT EXISTS idx_payments_invoice ON payments(invoice_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_payments_invoice_idempotency
+    ON payments(invoice_id, idempotency_key) WHERE idempotency_key IS NOT NULL;
+
+-- Ledger rows are immutable: corrections are recorded as new rows
+CREATE OR REPLACE FUNCTION trg_payments_immutable()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'payments are append-only (id=%)', OLD.id;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS payments_immutable_trg ON payments;
+CREATE TRIGGER payments_immutable_trg
+BEFORE UPDATE ON payments
+FOR EACH ROW EXECUTE FUNCTION trg_payments_immutable();
+
+COMMIT;
+
+-- Down (development only)
+-- BEGIN;
+-- DROP TRIGGER IF EXISTS payments_immutable_trg ON payments;
+-- DROP FUNCTION IF EXISTS trg_payments_immutable();
+-- DROP INDEX IF EXISTS uq_payments_invoice_idempotency;
+-- DROP INDEX IF EXISTS idx_payments_invoice;
+-- ALTER TABLE payments DROP COLUMN IF EXISTS idempotency_key;
+-- ALTER TABLE payments DROP COLUMN IF EXISTS invoice_id;
+-- COMMIT;
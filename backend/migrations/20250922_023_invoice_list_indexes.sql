@@ -0,0 +1,27 @@
+-- 20250922_023_invoice_list_indexes.sql
+-- The admin invoice list pages by keyset over (created_at DESC, id DESC)
+-- (invoice_service.invoice_list_page) and filters by status or customer under
+-- the tenant RLS predicate. One composite index per common filter lets every
+-- page be a bounded index range scan; counts are capped instead of COUNT(*).
+-- For large production tables build these with CREATE INDEX CONCURRENTLY
+-- outside a transaction.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_invoices_tenant_created_id
+    ON invoices (tenant_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_invoices_tenant_status_created_id
+    ON invoices (tenant_id, status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_invoices_tenant_customer_created_id
+    ON invoices (tenant_id, customer_id, created_at DESC, id DESC);
+
+ANALYZE invoices;
+
+COMMIT;
+
+-- Down (development only)
+-- BEGIN;
+-- DROP INDEX IF EXISTS idx_invoices_tenant_customer_created_id;
+-- DROP INDEX IF EXISTS idx_invoices_tenant_status_created_id;
+-- DROP INDEX IF EXISTS idx_invoices_tenant_created_id;
+-- COMMIT;
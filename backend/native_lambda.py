@@ -259,7 +259,10 @@ def route_request(
         path_parts = path.split("/")
         if len(path_parts) >= 5:
             appointment_id = path_parts[4]
-            return handle_get_appointment(appointment_id, correlation_id)
+            headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+            return handle_get_appointment(
+                appointment_id, correlation_id, if_none_match=headers.get("if-none-match")
+            )
 
     elif path.startswith("/api/admin/appointments/") and method == "PATCH":
         # Extract appointment ID from path: /api/admin/appointments/{id}
@@ -956,21 +959,38 @@ def handle_create_appointment(body: str, correlation_id: str) -> Dict[str, Any]:
         return make_response(500, error="Internal server error", correlation_id=correlation_id)
 
 
-def handle_get_appointment(appointment_id: str, correlation_id: str) -> Dict[str, Any]:
-    """Get appointment by ID"""
+def handle_get_appointment(
+    appointment_id: str, correlation_id: str, if_none_match: str = None
+) -> Dict[str, Any]:
+    """Get appointment drawer (appointment, customer, vehicles, services) by ID"""
     try:
         logger.info(f"[{correlation_id}] Getting appointment {appointment_id}")
 
-        # Call service layer
+        from backend.appointment_drawer import parse_appointment_id
+
+        if parse_appointment_id(appointment_id) is None:
+            return make_response(
+                404, error=f"Appointment {appointment_id} not found", correlation_id=correlation_id
+            )
+
+        # Call service layer (single-query drawer read model)
         service = get_appointment_service()
-        result = service.get_appointment(appointment_id)
+        result = service.get_appointment_drawer(appointment_id)
 
         if not result:
             return make_response(
                 404, error=f"Appointment {appointment_id} not found", correlation_id=correlation_id
             )
 
-        return make_response(200, data=result, correlation_id=correlation_id)
+        etag = result["etag"]
+        if if_none_match and etag in {t.strip() for t in if_none_match.split(",")}:
+            response = make_response(304, correlation_id=correlation_id)
+            response["body"] = ""
+        else:
+            response = make_response(200, data=result["data"], correlation_id=correlation_id)
+        response["headers"]["ETag"] = etag
+        response["headers"]["Cache-Control"] = "private, max-age=0, must-revalidate"
+        return response
 
     except Exception as e:
         logger.error(
@@ -188,44 +188,36 @@ def validate_and_format_phone(raw: str) -> str:
     return None
 
 
-def format_confirmation_message(customer_name, appointment_time, service, location_address=""):
-    """Format appointment confirmation message"""
-    formatted_time = format_appointment_time(appointment_time)
-    location_text = (
-        f"\n📍 Location: {location_address}"
-        if location_address
-        else "\n📍 Location: We'll come to you!"
-    )
+try:
+    from backend.message_template_registry import compile_body
+except ImportError:  # pragma: no cover - flat import when packaged as a Lambda
+    from message_template_registry import compile_body  # type: ignore
 
-    return f"""Hello {customer_name}!
+# Compiled once per container; bulk reminder runs only join segments.
+CONFIRMATION_SMS = compile_body(
+    """Hello {{ customer_name }}!
 
 Your appointment with Edgar's Mobile Auto Shop has been confirmed:
 
-🔧 Service: {service}
-📅 Date & Time: {formatted_time}{location_text}
+🔧 Service: {{ service }}
+📅 Date & Time: {{ formatted_time }}
+📍 Location: {{ location_address | "We'll come to you!" }}
 
 We'll send a reminder 24 hours before your appointment. If you need to reschedule, please call us.
 
 Thank you for choosing Edgar's Auto Shop!
 
 Reply STOP to opt out of SMS notifications."""
+)
 
-
-def format_reminder_message(customer_name, appointment_time, service, location_address=""):
-    """Format 24-hour reminder message"""
-    formatted_time = format_appointment_time(appointment_time)
-    location_text = (
-        f"\n📍 Address: {location_address}"
-        if location_address
-        else "\n📍 We'll come to your location"
-    )
-
-    return f"""Hi {customer_name}!
+REMINDER_SMS = compile_body(
+    """Hi {{ customer_name }}!
 
 This is a friendly reminder about your appointment tomorrow:
 
-🔧 Service: {service}
-📅 Time: {formatted_time}{location_text}
+🔧 Service: {{ service }}
+📅 Time: {{ formatted_time }}
+📍 {{ location_line }}
 
 Please ensure someone is available and the vehicle is accessible.
 
@@ -233,6 +225,35 @@ See you tomorrow!
 Edgar's Mobile Auto Shop
 
 Reply STOP to opt out."""
+)
+
+
+def format_confirmation_message(customer_name, appointment_time, service, location_address=""):
+    """Format appointment confirmation message"""
+    return CONFIRMATION_SMS.render(
+        {
+            "customer_name": customer_name,
+            "service": service,
+            "formatted_time": format_appointment_time(appointment_time),
+            "location_address": location_address or None,
+        }
+    )
+
+
+def format_reminder_message(customer_name, appointment_time, service, location_address=""):
+    """Format 24-hour reminder message"""
+    return REMINDER_SMS.render(
+        {
+            "customer_name": customer_name,
+            "service": service,
+            "formatted_time": format_appointment_time(appointment_time),
+            "location_line": (
+                f"Address: {location_address}"
+                if location_address
+                else "We'll come to your location"
+            ),
+        }
+    )
 
 
 def format_cancellation_message(customer_name, appointment_time):
@@ -0,0 +1,36 @@
+"""Helpers for ETags derived from ``page_signature`` rows.
+
+``page_signature`` (create_page_signature_table.sql, migrations/*_page_signature*)
+holds one weak ETag per entity key, rotated by triggers on every write that
+affects the entity. A response built from several entities is validated by
+combining their rows; both the Flask conditional-GET layer (local_server) and
+read models that join the rows into their own query (appointment_drawer) use
+``signature_validator`` so their ETags agree.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+__all__ = ["signature_validator"]
+
+
+def signature_validator(
+    tenant_id: Any,
+    signatures: Dict[str, Optional[str]],
+    vary: Sequence[Tuple[str, Any]] = (),
+) -> Optional[str]:
+    """Weak validator for the given {entity_key: weak_etag} map.
+
+    Returns None when any signature is missing: that entity has never been
+    written through a trigger, so there is nothing safe to validate against.
+    vary is a sequence of (name, value) pairs for request options that change
+    the representation (query args).
+    """
+    if not signatures or any(not v for v in signatures.values()):
+        return None
+    parts = [str(tenant_id or "global")]
+    parts += [f"{k}={signatures[k]}" for k in sorted(signatures)]
+    parts += [f"{name}={value if value is not None else ''}" for name, value in vary]
+    return 'W/"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest() + '"'
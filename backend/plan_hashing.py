@@ -1,71 +1,112 @@
 """Plan hashing helper (Phase B - Plan Regression Detection).
 
 Given a SQL text, obtains EXPLAIN (FORMAT JSON) and produces a stable SHA1 hash
-of the normalized plan where volatile attributes are removed.
+of the plan *shape*: node types, access paths (relation / index names), join
+types and strategies. Costs, row estimates, timings and buffer counts move with
+data volume and load, so they never change the hash.
+
+explain_analyze() runs EXPLAIN (ANALYZE, BUFFERS) on a caller-supplied cursor
+and returns the plan plus server-side timings for the regression sampler.
 """
 
 from __future__ import annotations
 
 import hashlib
 import json
-import re
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from . import local_server as srv  # type: ignore
 
-VOLATILE_KEYS = {
-    "Actual Startup Time",
-    "Actual Total Time",
-    "Actual Rows",
-    "Actual Loops",
-    "Rows Removed by Filter",
-    "Rows Removed by Join Filter",
-    "Plan Width",  # optional depending on stability preference
-    "JIT",  # entire JIT object can vary
-}
-
-# Regex patterns for ephemeral values inside node strings (e.g., cost=.. rows=.. width=..)
-COST_PATTERN = re.compile(r"cost=([0-9\.]+)\.\.([0-9\.]+)")
-ROWS_PATTERN = re.compile(r"rows=\d+")
-WIDTH_PATTERN = re.compile(r"width=\d+")
-
-
-def _normalize_node(node: Any) -> Any:
-    if isinstance(node, dict):
-        clean: Dict[str, Any] = {}
-        for k, v in node.items():
-            if k in VOLATILE_KEYS:
-                continue
-            if k == "Plans" and isinstance(v, list):
-                clean[k] = [_normalize_node(p) for p in v]
-            elif isinstance(v, (dict, list)):
-                clean[k] = _normalize_node(v)
-            elif isinstance(v, str):
-                # Scrub volatile inline attributes
-                s = COST_PATTERN.sub("cost=X..Y", v)
-                s = ROWS_PATTERN.sub("rows=N", s)
-                s = WIDTH_PATTERN.sub("width=W", s)
-                clean[k] = s
-            else:
-                clean[k] = v
-        # Sort keys deterministically
-        return {k: clean[k] for k in sorted(clean)}
-    if isinstance(node, list):
-        return [_normalize_node(x) for x in node]
-    return node
-
-
-def compute_plan_id(sql: str, conn=None) -> str:
-    """Return stable SHA1 for normalized plan JSON.
+# Node attributes that make up a plan's shape (see module docstring)
+SHAPE_KEYS = (
+    "Node Type",
+    "Parent Relationship",
+    "Subplan Name",
+    "CTE Name",
+    "Relation Name",
+    "Index Name",
+    "Join Type",
+    "Strategy",
+    "Partial Mode",
+    "Scan Direction",
+    "Command",
+    "Operation",
+)
 
-    Caller may supply an existing connection; otherwise a new one is created.
-    """
-    # Safety guard: only allow single-statement SELECTs to be explained
+
+def _root_plan(plan_json: Any) -> Dict[str, Any]:
+    root = plan_json
+    if isinstance(root, list):
+        root = root[0] if root else {}
+    if isinstance(root, dict) and "Plan" in root:
+        root = root["Plan"]
+    return root if isinstance(root, dict) else {}
+
+
+def _shape(node: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {k: node[k] for k in SHAPE_KEYS if k in node}
+    children = node.get("Plans") or []
+    if children:
+        out["Plans"] = [_shape(c) for c in children if isinstance(c, dict)]
+    return out
+
+
+def plan_shape(plan_json: Any) -> Dict[str, Any]:
+    """Structural skeleton of an EXPLAIN (FORMAT JSON) document (root node)."""
+    return _shape(_root_plan(plan_json))
+
+
+def plan_shape_id(plan_json: Any) -> str:
+    """SHA1 of plan_shape(); identical for plain EXPLAIN and EXPLAIN ANALYZE output."""
+    encoded = json.dumps(plan_shape(plan_json), sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha1(encoded).hexdigest()  # nosec B324 - fingerprint, not security
+
+
+def describe_plan(plan_json: Any) -> List[str]:
+    """Indented one-line-per-node outline, for printing plan changes."""
+    lines: List[str] = []
+
+    def walk(node: Dict[str, Any], depth: int) -> None:
+        label = node.get("Node Type", "?")
+        if node.get("Strategy") and node.get("Strategy") != "Plain":
+            label = f"{node['Strategy']} {label}"
+        if node.get("Join Type") and "Join" in label:
+            label = f"{label} ({node['Join Type']})"
+        if node.get("Index Name"):
+            label += f" using {node['Index Name']}"
+        if node.get("Relation Name"):
+            label += f" on {node['Relation Name']}"
+        if node.get("CTE Name"):
+            label += f" [CTE {node['CTE Name']}]"
+        lines.append("  " * depth + label)
+        for child in node.get("Plans") or []:
+            walk(child, depth + 1)
+
+    walk(_root_plan(plan_json), 0)
+    return lines
+
+
+def _check_explainable(sql: str) -> None:
+    # Safety guard: only allow single-statement SELECTs (optionally with CTEs)
     candidate = sql.strip()
     if ";" in candidate:
         raise ValueError("Refusing to EXPLAIN multi-statement SQL")
-    if not candidate.lower().lstrip().startswith("select"):
+    if not candidate.lower().startswith(("select", "with")):
         raise ValueError("Only SELECT statements are supported for plan hashing")
+
+
+def _first_value(row: Any) -> Any:
+    if isinstance(row, dict):
+        return next(iter(row.values()), None)
+    return row[0] if row else None
+
+
+def compute_plan_id(sql: str, conn=None, params: Optional[Any] = None) -> str:
+    """Return stable SHA1 for the plan shape (see plan_shape_id).
+
+    Caller may supply an existing connection; otherwise a new one is created.
+    """
+    _check_explainable(sql)
     owns_conn = False
     if conn is None:
         conn = srv.db_conn()
@@ -74,17 +115,45 @@ def compute_plan_id(sql: str, conn=None) -> str:
         with conn.cursor() as cur:
             # We strictly validate above to allow only a single SELECT statement without semicolons.
             # Bandit B608 false positive: this is safe given the guards and EXPLAIN context.
-            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}")  # nosec B608
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)  # nosec B608
             row = cur.fetchone()
             if not row:
                 raise RuntimeError("No EXPLAIN output")
-            plan_json = row[0]
-            norm = _normalize_node(plan_json)
-            encoded = json.dumps(norm, sort_keys=True, separators=(",", ":")).encode()
-            return hashlib.sha1(encoded).hexdigest()
+            return plan_shape_id(_first_value(row))
     finally:
         if owns_conn and conn:
             try:
                 conn.close()
             except Exception:
                 pass
+
+
+def explain_analyze(cur, sql: str, params: Optional[Any] = None) -> Dict[str, Any]:
+    """Execute sql once under EXPLAIN (ANALYZE, BUFFERS) on cur.
+
+    Returns {"plan", "plan_id", "planning_ms", "execution_ms", "total_ms",
+    "shared_hit", "shared_read"}. TIMING OFF skips per-node clock reads (the
+    main EXPLAIN ANALYZE overhead) while keeping the statement's total times.
+    Result rows are not shipped to the client, so this measures server work.
+    """
+    _check_explainable(sql)
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, TIMING OFF, FORMAT JSON) {sql}", params)  # nosec B608
+    row = cur.fetchone()
+    if not row:
+        raise RuntimeError("No EXPLAIN output")
+    plan_json = _first_value(row)
+    if isinstance(plan_json, str):
+        plan_json = json.loads(plan_json)
+    doc = plan_json[0] if isinstance(plan_json, list) and plan_json else plan_json
+    root = _root_plan(plan_json)
+    planning = float(doc.get("Planning Time") or 0.0)
+    execution = float(doc.get("Execution Time") or 0.0)
+    return {
+        "plan": plan_json,
+        "plan_id": plan_shape_id(plan_json),
+        "planning_ms": planning,
+        "execution_ms": execution,
+        "total_ms": planning + execution,
+        "shared_hit": int(root.get("Shared Hit Blocks") or 0),
+        "shared_read": int(root.get("Shared Read Blocks") or 0),
+    }
@@ -0,0 +1,333 @@
+"""Hot query registry for plan regression detection (Phase B).
+
+Each entry mirrors the SQL an endpoint actually runs (see ``source``) with
+named parameters. ``params_sql`` is a single-row SELECT evaluated once per
+run on the same connection; its columns become the parameters, so the
+regression suite always exercises representative values from the current
+dataset (busiest day, heaviest customer, a real plate prefix) instead of
+``WHERE id = 1``. A ``params_sql`` that returns no row means the dataset has
+nothing to exercise and the query is skipped.
+
+When an endpoint's SQL changes, update its entry here in the same change and
+re-baseline it (``run_plan_baseline_snapshot.py baseline --only <key>``).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+try:
+    from backend import template_analytics as _template_analytics
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import template_analytics as _template_analytics  # type: ignore
+
+__all__ = ["HotQuery", "HOT_QUERIES", "get_hot_query"]
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    key: str
+    source: str
+    sql: str
+    params_sql: Optional[str] = None
+
+
+_BOARD_COLUMNS = """
+    SELECT a.id::text,
+           a.status::text,
+           a.start_ts,
+           a.end_ts,
+           a.started_at,
+           a.completed_at,
+           a.primary_operation_id,
+           so.name AS primary_operation_name,
+           a.service_category,
+           a.tech_id,
+           t.initials AS tech_initials,
+           t.name      AS tech_name,
+           a.check_in_at,
+           a.check_out_at,
+           COALESCE(c.name, 'Unknown Customer') AS customer_name,
+           v.make, v.model, v.year, v.license_plate AS vin,
+           COALESCE(a.total_amount, 0) AS price
+      FROM appointments a
+      LEFT JOIN customers c ON c.id = a.customer_id
+      LEFT JOIN vehicles  v ON v.id = a.vehicle_id
+      LEFT JOIN technicians t ON t.id = a.tech_id
+      LEFT JOIN service_operations so ON so.id = a.primary_operation_id
+"""
+
+# Busiest recent shop day: the board / dashboard worst case
+_BUSIEST_DAY = """
+    SELECT date_trunc('day', start_ts) AS day_start,
+           date_trunc('day', start_ts) + INTERVAL '1 day' AS day_end
+      FROM appointments
+     WHERE start_ts IS NOT NULL
+     GROUP BY 1
+     ORDER BY count(*) DESC, 1 DESC
+     LIMIT 1
+"""
+
+# Customer with the most appointments: the profile worst case
+_HEAVIEST_CUSTOMER = """
+    SELECT customer_id::text AS customer_id
+      FROM appointments
+     WHERE customer_id IS NOT NULL
+     GROUP BY customer_id
+     ORDER BY count(*) DESC, customer_id
+     LIMIT 1
+"""
+
+# Busiest technician: a two-hour window and the week of their latest booking
+_BUSIEST_TECH = """
+    SELECT tech_id::text AS tech_id,
+           date_trunc('day', max(start_ts)) + INTERVAL '10 hours' AS window_start,
+           date_trunc('day', max(start_ts)) + INTERVAL '12 hours' AS window_end,
+           date_trunc('week', max(start_ts)) AS week_start,
+           date_trunc('week', max(start_ts)) + INTERVAL '7 days' AS week_end
+      FROM appointments
+     WHERE tech_id IS NOT NULL AND start_ts IS NOT NULL
+     GROUP BY tech_id
+     ORDER BY count(*) DESC, tech_id
+     LIMIT 1
+"""
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery(
+        key="board_day",
+        source="GET /api/admin/appointments/board (day window)",
+        sql=_BOARD_COLUMNS
+        + """
+     WHERE a.start_ts >= %(day_start)s AND a.start_ts < %(day_end)s
+     ORDER BY a.start_ts ASC NULLS LAST, a.id ASC
+     LIMIT 500
+""",
+        params_sql=_BUSIEST_DAY,
+    ),
+    HotQuery(
+        key="board_carryover",
+        source="GET /api/admin/appointments/board (carryover)",
+        sql=_BOARD_COLUMNS
+        + """
+     WHERE a.start_ts < %(day_start)s
+       AND (
+         a.status IN ('IN_PROGRESS','READY')
+         OR (a.check_in_at IS NOT NULL AND a.check_out_at IS NULL)
+       )
+     ORDER BY a.start_ts ASC NULLS LAST, a.id ASC
+     LIMIT 500
+""",
+        params_sql=_BUSIEST_DAY,
+    ),
+    HotQuery(
+        key="customer_search",
+        source="GET /api/admin/customers/search (relevance sort)",
+        sql="""
+    WITH hits AS (
+      SELECT v.id::text AS vehicle_id,
+             v.license_plate,
+             v.year, v.make, v.model,
+             c.id::text AS customer_id,
+             COALESCE(NULLIF(TRIM(c.name), ''), 'Unknown Customer') AS customer_name,
+             c.phone, c.email,
+             c.is_vip
+        FROM vehicles v
+        JOIN customers c ON c.id = v.customer_id
+       WHERE v.license_plate ILIKE %(pat)s
+      UNION ALL
+      SELECT v2.id::text, v2.license_plate, v2.year, v2.make, v2.model,
+             c2.id::text, COALESCE(NULLIF(TRIM(c2.name), ''), 'Unknown Customer'), c2.phone, c2.email,
+             c2.is_vip
+        FROM customers c2
+        JOIN vehicles v2 ON v2.customer_id = c2.id
+       WHERE (c2.name ILIKE %(pat)s OR c2.phone ILIKE %(pat)s OR c2.email ILIKE %(pat)s)
+      UNION ALL
+      SELECT NULL::text AS vehicle_id,
+             NULL::text AS license_plate,
+             NULL::int AS year,
+             NULL::text AS make,
+             NULL::text AS model,
+             c3.id::text AS customer_id,
+             COALESCE(NULLIF(TRIM(c3.name), ''), 'Unknown Customer') AS customer_name,
+             c3.phone, c3.email,
+             c3.is_vip
+        FROM customers c3
+       WHERE (c3.name ILIKE %(pat)s OR c3.phone ILIKE %(pat)s OR c3.email ILIKE %(pat)s)
+         AND NOT EXISTS (SELECT 1 FROM vehicles vx WHERE vx.customer_id = c3.id)
+    )
+    SELECT h.vehicle_id, h.customer_id, h.customer_name, h.phone, h.email,
+           h.license_plate, h.year, h.make, h.model,
+           COUNT(a.id) AS visits_count,
+           SUM(COALESCE(a.total_amount,0)) AS total_spent,
+           MAX(a.start_ts) AS last_visit,
+           MAX(CASE WHEN a.status = 'COMPLETED' THEN COALESCE(a.end_ts, a.start_ts) END) AS last_service_at,
+           (BOOL_OR(h.is_vip) OR SUM(COALESCE(a.total_amount,0)) >= 5000) AS is_vip
+      FROM hits h
+      LEFT JOIN appointments a
+        ON a.customer_id::text = h.customer_id
+       AND (h.vehicle_id IS NULL OR a.vehicle_id::text = h.vehicle_id)
+     GROUP BY h.vehicle_id, h.customer_id, h.customer_name, h.phone, h.email,
+              h.license_plate, h.year, h.make, h.model
+     ORDER BY (h.license_plate ILIKE %(prefix)s) DESC, last_visit DESC NULLS LAST, h.customer_name ASC
+     LIMIT 25
+""",
+        # A three-character plate prefix taken from the middle of the table
+        params_sql="""
+    SELECT '%' || left(license_plate, 3) || '%' AS pat,
+           left(license_plate, 3) || '%' AS prefix
+      FROM vehicles
+     WHERE length(license_plate) >= 3
+     ORDER BY id
+    OFFSET (SELECT count(*) / 2 FROM vehicles)
+     LIMIT 1
+""",
+    ),
+    HotQuery(
+        key="customer_profile",
+        source="GET /api/admin/customers/<id>/profile (stats)",
+        sql="""
+    WITH inv AS (
+        SELECT customer_id,
+               SUM(total_cents)/100.0 AS lifetime_spend,
+               SUM(GREATEST(amount_due_cents,0))/100.0 AS unpaid_balance
+          FROM invoices
+         WHERE customer_id::text = %(customer_id)s
+         GROUP BY 1
+    ), visits AS (
+        SELECT customer_id,
+               COUNT(*) FILTER (WHERE status::text IN ('COMPLETED', 'READY')) AS total_visits,
+               MAX(COALESCE(check_out_at, start_ts))
+                   FILTER (WHERE status::text IN ('COMPLETED', 'READY')) AS last_service_at
+          FROM appointments
+         WHERE customer_id::text = %(customer_id)s
+         GROUP BY 1
+    ), avg_ticket AS (
+        SELECT i.customer_id,
+               AVG(i.total_cents/100.0) AS avg_ticket
+          FROM invoices i
+          JOIN appointments a ON a.id = i.appointment_id
+               AND a.status::text IN ('COMPLETED', 'READY')
+         WHERE i.customer_id::text = %(customer_id)s
+           AND i.status::text NOT IN ('VOID', 'CANCELLED', 'DELETED')
+         GROUP BY i.customer_id
+    )
+    SELECT COALESCE(inv.lifetime_spend,0) AS lifetime_spend,
+           COALESCE(inv.unpaid_balance,0) AS unpaid_balance,
+           COALESCE(visits.total_visits,0) AS total_visits,
+           visits.last_service_at,
+           COALESCE(avg_ticket.avg_ticket, 0) AS avg_ticket
+      FROM (SELECT 1) x
+ LEFT JOIN inv ON TRUE
+ LEFT JOIN visits ON TRUE
+ LEFT JOIN avg_ticket ON TRUE
+""",
+        params_sql=_HEAVIEST_CUSTOMER,
+    ),
+    HotQuery(
+        key="customer_profile_appointments",
+        source="GET /api/admin/customers/<id>/profile (appointments page, include_invoices)",
+        sql="""
+    WITH base AS (
+      SELECT a.id, a.vehicle_id, a.start_ts, a.status, a.updated_at
+        FROM appointments a
+       WHERE a.customer_id::text = %(customer_id)s
+       ORDER BY a.start_ts DESC NULLS LAST, a.id DESC
+       LIMIT 26
+    ), inv AS (
+      SELECT i.appointment_id,
+             jsonb_build_object('id', i.id::text, 'total', i.total_cents/100.0,
+                                'paid', i.amount_paid_cents/100.0,
+                                'unpaid', i.amount_due_cents/100.0) AS invoice
+        FROM invoices i
+       WHERE i.appointment_id IN (SELECT id FROM base)
+    )
+    SELECT b.id::text, b.vehicle_id::text, b.start_ts, b.status::text, b.updated_at,
+           '[]'::jsonb AS services,
+           inv.invoice AS invoice
+      FROM base b
+      LEFT JOIN inv ON inv.appointment_id = b.id
+     ORDER BY b.start_ts DESC NULLS LAST, b.id DESC
+""",
+        params_sql=_HEAVIEST_CUSTOMER,
+    ),
+    HotQuery(
+        key="dashboard_status_count",
+        source="GET /api/admin/dashboard/stats (per-status count)",
+        sql="""
+    SELECT count(1) FROM appointments a
+     WHERE a.start_ts >= %(day_start)s AND a.start_ts < %(day_end)s AND a.status = 'SCHEDULED'
+""",
+        params_sql=_BUSIEST_DAY,
+    ),
+    HotQuery(
+        key="dashboard_avg_cycle",
+        source="GET /api/admin/dashboard/stats (average cycle time)",
+        sql="""
+    SELECT AVG(EXTRACT(EPOCH FROM (COALESCE(a.end_ts,a.start_ts) - a.start_ts))/3600.0) AS avg_hours
+      FROM appointments a
+     WHERE a.end_ts IS NOT NULL AND a.start_ts IS NOT NULL AND a.status='COMPLETED'
+       AND a.start_ts >= %(day_start)s AND a.start_ts < %(day_end)s
+""",
+        params_sql=_BUSIEST_DAY,
+    ),
+    HotQuery(
+        key="dashboard_unpaid_total",
+        source="GET /api/admin/dashboard/stats (unpaid total)",
+        sql="SELECT COALESCE(SUM(a.total_amount - a.paid_amount),0) AS u FROM appointments a",
+    ),
+    HotQuery(
+        key="conflicts_tech",
+        source="conflict_engine.conflicting_ids (create / patch conflict path)",
+        sql="""
+    SELECT id FROM appointments WHERE tech_id = %(tech_id)s
+       AND block_range && tstzrange(%(window_start)s, %(window_end)s, '[)')
+       AND status NOT IN ('CANCELED','NO_SHOW')
+""",
+        params_sql=_BUSIEST_TECH,
+    ),
+    HotQuery(
+        key="scheduling_free_slots",
+        source="GET /api/admin/scheduling/free-slots, /slots (scheduling_service.load_snapshot)",
+        # Busy-block query with no vehicle filter (%(vehicle)s bound to NULL)
+        sql="""
+    SELECT a.tech_id::text AS tech_id, a.vehicle_id::text AS vehicle_id, a.start_ts, a.end_ts,
+           a.status::text AS status, a.check_in_at, a.check_out_at
+      FROM appointments a
+     WHERE a.block_range && tstzrange(%(week_start)s, %(week_end)s, '[)')
+       AND a.status NOT IN ('CANCELED','NO_SHOW')
+       AND (a.tech_id = ANY(ARRAY[%(tech_id)s]::uuid[]) OR a.vehicle_id::text = NULL)
+    UNION ALL
+    SELECT a.tech_id::text, a.vehicle_id::text, a.start_ts, a.end_ts,
+           a.status::text, a.check_in_at, a.check_out_at
+      FROM appointments a
+     WHERE a.start_ts < %(week_start)s
+       AND upper(a.block_range) <= %(week_start)s
+       AND (
+         a.status IN ('IN_PROGRESS','READY')
+         OR (a.check_in_at IS NOT NULL AND a.check_out_at IS NULL)
+       )
+       AND (a.tech_id = ANY(ARRAY[%(tech_id)s]::uuid[]) OR a.vehicle_id::text = NULL)
+""",
+        params_sql=_BUSIEST_TECH,
+    ),
+    HotQuery(
+        key="template_analytics",
+        source="GET /api/admin/analytics/templates (30 days, daily, all channels)",
+        sql=_template_analytics.rollup_sql("day", channel_filtered=False),
+        params_sql="""
+    SELECT (now() AT TIME ZONE 'UTC')::date - 30 AS start_day,
+           (now() AT TIME ZONE 'UTC')::date AS today,
+           date_trunc('day', now() AT TIME ZONE 'UTC') AS today_start,
+           date_trunc('second', now() AT TIME ZONE 'UTC') AS range_end,
+           50 AS limit
+""",
+    ),
+]
+
+
+def get_hot_query(key: str) -> Optional[HotQuery]:
+    for query in HOT_QUERIES:
+        if query.key == key:
+            return query
+    return None
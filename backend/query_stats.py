@@ -0,0 +1,260 @@
+"""Per-request database accounting: statements, connections, rows and DB time.
+
+local_server's cursor proxy (``_LoggingCursorProxy``) reports every
+``execute`` / ``executemany`` through ``record()``. The stats of the request
+in flight live in a ContextVar that is opened when Flask starts dispatching
+(``request_started``, before any ``before_request`` hook) and closed on
+teardown, so statements from background threads (deferred rehash, log and
+metrics shippers) are never attributed to a request.
+
+Per request the app emits:
+
+  * a ``Server-Timing`` header: ``db;dur=<ms>``, ``db-queries``, ``db-conns``
+    and ``db-rows``
+  * a ``db`` object in the api.request log payload
+  * the ``http_request_db_queries`` histogram by route
+
+Shape tracking (the N+1 detector) normalizes each statement (whitespace
+collapsed, literals and ``IN (...)`` lists folded) and counts repeats. Shapes
+executed at least ``QUERY_N_PLUS_ONE_THRESHOLD`` times in one request are
+listed under ``db.n_plus_one`` and logged as a warning. It is on under pytest
+and otherwise opt-in, since normalizing costs a few regex passes per
+statement. Tests bound an endpoint's cost with ``query_budget``::
+
+    with query_stats.query_budget(max_queries=6, max_repeats=2):
+        client.get("/api/admin/customers/1/profile")
+
+Env:
+  QUERY_STATS_SHAPES          1/0 forces shape tracking on/off (default: on under pytest)
+  QUERY_N_PLUS_ONE_THRESHOLD  repeats of one shape reported as N+1 (default 5)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+__all__ = [
+    "QueryBudgetExceeded",
+    "RequestQueryStats",
+    "begin",
+    "connection_serial",
+    "current",
+    "finish",
+    "query_budget",
+    "record",
+    "statement_shape",
+]
+
+log = logging.getLogger(__name__)
+
+_CURRENT: contextvars.ContextVar[Optional[RequestQueryStats]] = contextvars.ContextVar(
+    "request_query_stats", default=None
+)
+_SERIALS = itertools.count(1)
+_SHAPE_CACHE: Dict[str, str] = {}
+_SHAPE_CACHE_MAX = 2048
+_SHAPE_MAX_LEN = 240
+
+_WS = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))+\s*\)")
+
+
+def _env_flag(name: str) -> Optional[bool]:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return None
+    return raw.lower() in ("1", "true", "yes", "on")
+
+
+def track_shapes() -> bool:
+    forced = _env_flag("QUERY_STATS_SHAPES")
+    return ("pytest" in sys.modules) if forced is None else forced
+
+
+def n_plus_one_threshold() -> int:
+    try:
+        return max(2, int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "5")))
+    except ValueError:
+        return 5
+
+
+def statement_shape(sql: str) -> str:
+    """Statement with whitespace, literals and placeholder lists normalized."""
+    cached = _SHAPE_CACHE.get(sql)
+    if cached is not None:
+        return cached
+    shape = _WS.sub(" ", sql).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?...)", shape)
+    if len(shape) > _SHAPE_MAX_LEN:
+        shape = shape[: _SHAPE_MAX_LEN - 3] + "..."
+    if len(_SHAPE_CACHE) < _SHAPE_CACHE_MAX:
+        _SHAPE_CACHE[sql] = shape
+    return shape
+
+
+def connection_serial(conn: Any) -> int:
+    """Stable per-connection number (``id()`` can be reused after close)."""
+    serial = getattr(conn, "_query_stats_serial", None)
+    if serial is None:
+        serial = next(_SERIALS)
+        try:
+            conn._query_stats_serial = serial
+        except Exception:  # pragma: no cover - C connection without __dict__
+            pass
+    return serial
+
+
+class RequestQueryStats:
+    """Statement counters for one request."""
+
+    __slots__ = ("label", "queries", "rows", "db_seconds", "_connections", "shapes")
+
+    def __init__(self, shapes: bool = False):
+        self.label = ""
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self._connections: set = set()
+        self.shapes: Optional[Counter] = Counter() if shapes else None
+
+    @property
+    def connections(self) -> int:
+        return len(self._connections)
+
+    def record(self, conn_serial: Optional[int], sql: str, seconds: float, rows: int) -> None:
+        self.queries += 1
+        self.rows += max(0, rows)
+        self.db_seconds += seconds
+        if conn_serial is not None:
+            self._connections.add(conn_serial)
+        if self.shapes is not None:
+            self.shapes[statement_shape(sql)] += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Shapes executed at least ``threshold`` times, most repeated first."""
+        if not self.shapes:
+            return []
+        limit = threshold or n_plus_one_threshold()
+        return [(s, n) for s, n in self.shapes.most_common() if n >= limit]
+
+    def as_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "queries": self.queries,
+            "connections": self.connections,
+            "rows": self.rows,
+            "ms": round(self.db_seconds * 1000.0, 2),
+        }
+        repeats = self.repeated()
+        if repeats:
+            out["n_plus_one"] = [{"shape": s, "count": n} for s, n in repeats]
+        return out
+
+    def server_timing(self) -> str:
+        return (
+            f"db;dur={self.db_seconds * 1000.0:.2f}, db-queries;desc={self.queries}, "
+            f"db-conns;desc={self.connections}, db-rows;desc={self.rows}"
+        )
+
+
+def begin() -> RequestQueryStats:
+    stats = RequestQueryStats(shapes=track_shapes())
+    _CURRENT.set(stats)
+    return stats
+
+
+def current() -> Optional[RequestQueryStats]:
+    return _CURRENT.get()
+
+
+def record(conn_serial: Optional[int], sql: Any, seconds: float, rows: int = 0) -> None:
+    stats = _CURRENT.get()
+    if stats is not None:
+        stats.record(conn_serial, sql if isinstance(sql, str) else str(sql), seconds, rows)
+
+
+_CAPTURES: List[List[RequestQueryStats]] = []
+_CAPTURES_LOCK = threading.Lock()
+
+
+def finish(label: str = "") -> Optional[RequestQueryStats]:
+    """Close the current request's stats and hand them to active captures."""
+    stats = _CURRENT.get()
+    if stats is None:
+        return None
+    _CURRENT.set(None)
+    stats.label = label
+    repeats = stats.repeated()
+    if repeats:
+        shape, count = repeats[0]
+        log.warning("query.n_plus_one %s: %d x %s", label, count, shape)
+    if _CAPTURES:
+        with _CAPTURES_LOCK:
+            for sink in _CAPTURES:
+                sink.append(stats)
+    return stats
+
+
+@contextmanager
+def capture() -> Iterator[List[RequestQueryStats]]:
+    """Collect the stats of every request that finishes inside the block."""
+    sink: List[RequestQueryStats] = []
+    with _CAPTURES_LOCK:
+        _CAPTURES.append(sink)
+    try:
+        yield sink
+    finally:
+        with _CAPTURES_LOCK:
+            _CAPTURES.remove(sink)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request inside ``query_budget`` issued more statements than allowed."""
+
+
+@contextmanager
+def query_budget(
+    max_queries: int,
+    max_repeats: Optional[int] = None,
+    max_connections: Optional[int] = None,
+) -> Iterator[List[RequestQueryStats]]:
+    """Fail when any request in the block exceeds the statement budget.
+
+    ``max_repeats`` bounds how often one statement shape may run per request
+    (an N+1 loop shows up as a shape repeated once per row).
+    """
+    previous = os.environ.get("QUERY_STATS_SHAPES")
+    if max_repeats is not None:
+        os.environ["QUERY_STATS_SHAPES"] = "1"
+    try:
+        with capture() as seen:
+            yield seen
+    finally:
+        if max_repeats is not None:
+            if previous is None:
+                os.environ.pop("QUERY_STATS_SHAPES", None)
+            else:
+                os.environ["QUERY_STATS_SHAPES"] = previous
+    problems = []
+    for stats in seen:
+        if stats.queries > max_queries:
+            problems.append(f"{stats.label}: {stats.queries} queries > {max_queries}")
+        if max_connections is not None and stats.connections > max_connections:
+            problems.append(f"{stats.label}: {stats.connections} connections > {max_connections}")
+        if max_repeats is not None:
+            for shape, n in stats.repeated(max_repeats + 1):
+                problems.append(f"{stats.label}: {n} x {shape}")
+    if problems:
+        raise QueryBudgetExceeded("query budget exceeded:\n  " + "\n  ".join(problems))
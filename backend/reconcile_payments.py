@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Reconcile invoice balances against the payment ledger.
+
+Compares every invoice's ``amount_paid_cents`` with the sum of its payments
+(``invoice_service.reconcile_invoice_payments``) and prints the invoices that
+drifted. With --fix the balance and status are rewritten from the ledger;
+invoices whose payments exceed the total are reported only. Meant to run on a
+schedule when INVOICE_PAYMENT_LEDGER=true.
+
+Exit codes: 0 no drift (or all drift fixed), 1 drift remains, 2 the run failed.
+
+Examples:
+  python backend/reconcile_payments.py
+  python backend/reconcile_payments.py --since 2025-09-01 --fix
+  python backend/reconcile_payments.py --ids inv-1 inv-2 --json
+
+Env: same database settings as local_server (POSTGRES_* / DATABASE_URL).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from typing import List, Optional
+
+try:
+    from backend import invoice_service
+except ImportError:  # pragma: no cover - flat import when executed directly
+    import invoice_service  # type: ignore
+
+
+def _parse_day(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}") from e
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Reconcile invoice balances with payments")
+    target = p.add_mutually_exclusive_group()
+    target.add_argument("--ids", nargs="+", help="explicit invoice ids")
+    target.add_argument("--since", type=_parse_day, help="invoices updated on/after this UTC day")
+    p.add_argument("--fix", action="store_true", help="rewrite drifted balances from the ledger")
+    p.add_argument("--tenant", help="tenant id for RLS context")
+    p.add_argument("--json", action="store_true", help="print the raw result as JSON")
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        result = invoice_service.reconcile_invoice_payments(
+            args.ids, since=args.since, fix=args.fix, tenant_id=args.tenant
+        )
+    except invoice_service.InvoiceError as e:
+        print(f"error: {e.code}: {e.message}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for d in result["drift"]:
+            print(
+                f"{d['invoice_id']}\t{d['outcome']}\t"
+                f"paid={d['amount_paid_cents']}\tledger={d['ledger_cents']}"
+            )
+        s = result["summary"]
+        print(
+            f"checked={s['checked']} drifted={s['drifted']} "
+            f"fixed={s['fixed']} unfixable={s['unfixable']}"
+        )
+    return 1 if any(d["outcome"] != "fixed" for d in result["drift"]) else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Disk-backed LRU cache for rendered invoice documents (PDF / HTML).
+
+Rendered bytes are stored under ``directory`` as one file per key, where the key
+is built from the invoice id, its ``updated_at`` and the document kind. Every
+invoice write bumps ``updated_at``, so a changed invoice simply misses and the old
+files age out; nothing is invalidated explicitly.
+
+Writes go to a temp file followed by ``os.replace`` so concurrent workers sharing
+the directory never read a torn file. Reads touch the file's mtime, and eviction
+(run after a write once the directory exceeds ``max_bytes``) removes the oldest
+files first, which makes the directory an LRU shared by every worker on the host.
+
+Env:
+  INVOICE_RENDER_CACHE         "false" disables the cache (default on; off under
+                               pytest so route tests exercise rendering)
+  INVOICE_RENDER_CACHE_DIR     cache directory (default <tmp>/invoice-render-cache)
+  INVOICE_RENDER_CACHE_MAX_MB  size budget before LRU eviction (default 256)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from typing import Optional
+
+__all__ = ["DiskRenderCache", "render_key"]
+
+# Bump when the document layout changes so stale renders are never served.
+RENDER_REVISION = "3"
+
+
+def render_key(invoice_id: str, updated_at: str, kind: str) -> str:
+    src = f"{RENDER_REVISION}|{invoice_id}|{updated_at}|{kind}"
+    return hashlib.sha1(src.encode("utf-8")).hexdigest()
+
+
+class DiskRenderCache:
+    """Byte blobs on local disk with size-bounded LRU eviction."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        if enabled is None:
+            default = "false" if "pytest" in sys.modules else "true"
+            enabled = os.getenv("INVOICE_RENDER_CACHE", default).lower() != "false"
+        if directory is None:
+            directory = os.getenv("INVOICE_RENDER_CACHE_DIR") or os.path.join(
+                tempfile.gettempdir(), "invoice-render-cache"
+            )
+        if max_bytes is None:
+            try:
+                max_bytes = int(float(os.getenv("INVOICE_RENDER_CACHE_MAX_MB", "256")) * 1024**2)
+            except ValueError:
+                max_bytes = 256 * 1024**2
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".bin")
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            return  # a full or read-only disk only costs the cache
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                with os.scandir(self.directory) as it:
+                    for e in it:
+                        if not e.name.endswith(".bin"):
+                            continue
+                        try:
+                            st = e.stat()
+                        except OSError:
+                            continue
+                        entries.append((st.st_mtime, e.path, st.st_size))
+                        total += st.st_size
+            except OSError:
+                return
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _mtime, path, size in entries:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                if name.endswith(".bin"):
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
@@ -0,0 +1,428 @@
+"""Route-level request metrics with an hourly Postgres rollup.
+
+Every request is recorded against its Flask route template (``url_rule.rule``,
+so ``/api/admin/customers/<int:cust_id>/profile`` rather than the concrete
+path) and method. Per route and hour the store keeps:
+
+  * counters for 200 / 304 / 4xx / 5xx / other statuses and cold starts
+    (``START_TYPE == "cold"``)
+  * fixed-bucket histograms for total latency and first-byte time
+    (bucket upper bounds in ``LATENCY_BUCKETS_MS`` plus an overflow bucket)
+
+Recording is in-process and lock-protected. Each gunicorn worker periodically
+upserts its deltas into ``route_metrics_hourly`` (see
+migrations/20250901_014_add_route_metrics_hourly.sql); counters and buckets
+are additive so the table is the cross-worker aggregate. ``summary()`` merges
+the rollup window with the not-yet-flushed local deltas and derives
+p50/p95/p99 and 304 efficiency.
+
+Env:
+  ROUTE_METRICS_FLUSH_SECONDS   rollup interval (default 60; 0 disables, the
+                                default under pytest)
+  ROUTE_METRICS_RETENTION_DAYS  unflushed local hours older than this are
+                                discarded (default 7)
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__all__ = [
+    "LATENCY_BUCKETS_MS",
+    "RouteCounters",
+    "RouteMetricsStore",
+    "histogram_quantile",
+]
+
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    1,
+    2,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+)
+_N_BUCKETS = len(LATENCY_BUCKETS_MS) + 1  # + overflow
+
+Key = Tuple[datetime, str, str]  # (hour bucket, method, route)
+
+
+def _bucket_index(ms: float) -> int:
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return _N_BUCKETS - 1
+
+
+def histogram_quantile(buckets: List[int], q: float, max_ms: float = 0.0) -> Optional[float]:
+    """Estimate quantile ``q`` by linear interpolation inside the matching bucket."""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    cum = 0
+    for i, count in enumerate(buckets):
+        if not count:
+            continue
+        if cum + count >= rank:
+            lower = LATENCY_BUCKETS_MS[i - 1] if i > 0 else 0.0
+            if i < len(LATENCY_BUCKETS_MS):
+                upper = LATENCY_BUCKETS_MS[i]
+                if max_ms:
+                    upper = min(upper, max_ms)
+            else:
+                upper = max(max_ms, lower)
+            return round(lower + (upper - lower) * (rank - cum) / count, 2)
+        cum += count
+    return round(max_ms, 2) if max_ms else None
+
+
+class RouteCounters:
+    """Counters and histograms for one (hour, method, route)."""
+
+    __slots__ = (
+        "total",
+        "status_200",
+        "status_304",
+        "status_4xx",
+        "status_5xx",
+        "status_other",
+        "cold_starts",
+        "latency_sum_ms",
+        "latency_max_ms",
+        "latency_buckets",
+        "first_byte_buckets",
+    )
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.status_200 = 0
+        self.status_304 = 0
+        self.status_4xx = 0
+        self.status_5xx = 0
+        self.status_other = 0
+        self.cold_starts = 0
+        self.latency_sum_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.latency_buckets = [0] * _N_BUCKETS
+        self.first_byte_buckets = [0] * _N_BUCKETS
+
+    def add(self, status: int, latency_ms: float, first_byte_ms: float, cold: bool) -> None:
+        self.total += 1
+        if status == 200:
+            self.status_200 += 1
+        elif status == 304:
+            self.status_304 += 1
+        elif 400 <= status < 500:
+            self.status_4xx += 1
+        elif status >= 500:
+            self.status_5xx += 1
+        else:
+            self.status_other += 1
+        if cold:
+            self.cold_starts += 1
+        self.latency_sum_ms += latency_ms
+        if latency_ms > self.latency_max_ms:
+            self.latency_max_ms = latency_ms
+        self.latency_buckets[_bucket_index(latency_ms)] += 1
+        self.first_byte_buckets[_bucket_index(first_byte_ms)] += 1
+
+    def merge(self, other: RouteCounters) -> None:
+        for name in (
+            "total",
+            "status_200",
+            "status_304",
+            "status_4xx",
+            "status_5xx",
+            "status_other",
+            "cold_starts",
+            "latency_sum_ms",
+        ):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.latency_max_ms = max(self.latency_max_ms, other.latency_max_ms)
+        for i in range(_N_BUCKETS):
+            self.latency_buckets[i] += other.latency_buckets[i]
+            self.first_byte_buckets[i] += other.first_byte_buckets[i]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> RouteCounters:
+        c = cls()
+        for name in cls.__slots__:
+            val = row.get(name)
+            if val is None:
+                continue
+            if name.endswith("_buckets"):
+                vals = [int(v) for v in val][:_N_BUCKETS]
+                setattr(c, name, vals + [0] * (_N_BUCKETS - len(vals)))
+            elif name.endswith("_ms"):
+                setattr(c, name, float(val))
+            else:
+                setattr(c, name, int(val))
+        return c
+
+
+_UPSERT_SQL = """
+INSERT INTO route_metrics_hourly (
+    bucket_start, method, route, total, status_200, status_304, status_4xx, status_5xx,
+    status_other, cold_starts, latency_sum_ms, latency_max_ms, latency_buckets,
+    first_byte_buckets
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON CONFLICT (bucket_start, method, route) DO UPDATE SET
+    total = route_metrics_hourly.total + EXCLUDED.total,
+    status_200 = route_metrics_hourly.status_200 + EXCLUDED.status_200,
+    status_304 = route_metrics_hourly.status_304 + EXCLUDED.status_304,
+    status_4xx = route_metrics_hourly.status_4xx + EXCLUDED.status_4xx,
+    status_5xx = route_metrics_hourly.status_5xx + EXCLUDED.status_5xx,
+    status_other = route_metrics_hourly.status_other + EXCLUDED.status_other,
+    cold_starts = route_metrics_hourly.cold_starts + EXCLUDED.cold_starts,
+    latency_sum_ms = route_metrics_hourly.latency_sum_ms + EXCLUDED.latency_sum_ms,
+    latency_max_ms = GREATEST(route_metrics_hourly.latency_max_ms, EXCLUDED.latency_max_ms),
+    latency_buckets = ARRAY(
+        SELECT a + b FROM unnest(route_metrics_hourly.latency_buckets,
+                                 EXCLUDED.latency_buckets) AS t(a, b)
+    ),
+    first_byte_buckets = ARRAY(
+        SELECT a + b FROM unnest(route_metrics_hourly.first_byte_buckets,
+                                 EXCLUDED.first_byte_buckets) AS t(a, b)
+    ),
+    updated_at = NOW()
+"""
+
+_WINDOW_SQL = """
+SELECT method, route, total, status_200, status_304, status_4xx, status_5xx, status_other,
+       cold_starts, latency_sum_ms, latency_max_ms, latency_buckets, first_byte_buckets
+  FROM route_metrics_hourly
+ WHERE bucket_start >= %s
+"""
+
+
+def _hour(ts: float) -> datetime:
+    dt = datetime.fromtimestamp(ts, tz=timezone.utc)
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+class RouteMetricsStore:
+    """Per-process route metrics with periodic additive rollup to Postgres."""
+
+    def __init__(
+        self,
+        connect: Optional[Callable[[], Any]] = None,
+        flush_interval: Optional[float] = None,
+        retention_days: Optional[int] = None,
+    ):
+        if flush_interval is None:
+            in_tests = bool(os.getenv("PYTEST_CURRENT_TEST")) or "pytest" in sys.modules
+            default = "0" if in_tests else "60"
+            try:
+                flush_interval = float(os.getenv("ROUTE_METRICS_FLUSH_SECONDS", default))
+            except ValueError:
+                flush_interval = 60.0
+        if retention_days is None:
+            try:
+                retention_days = int(os.getenv("ROUTE_METRICS_RETENTION_DAYS", "7"))
+            except ValueError:
+                retention_days = 7
+        self.connect = connect
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[Key, RouteCounters] = {}
+        self._next_flush = time.monotonic() + (flush_interval or 0)
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_error: Optional[str] = None
+
+    # -- hot path -------------------------------------------------------
+    def record(
+        self,
+        route: str,
+        method: str,
+        status: int,
+        latency_ms: float,
+        first_byte_ms: Optional[float] = None,
+        start_type: str = "warm",
+        now: Optional[float] = None,
+    ) -> None:
+        key = (_hour(time.time() if now is None else now), method, route)
+        fb = latency_ms if first_byte_ms is None else first_byte_ms
+        with self._lock:
+            counters = self._pending.get(key)
+            if counters is None:
+                counters = self._pending[key] = RouteCounters()
+            counters.add(int(status), float(latency_ms), float(fb), start_type == "cold")
+        if self.flush_interval and self.connect and time.monotonic() >= self._next_flush:
+            self._next_flush = time.monotonic() + self.flush_interval
+            threading.Thread(target=self.flush, name="route-metrics-flush", daemon=True).start()
+
+    # -- rollup ---------------------------------------------------------
+    def _take_pending(self) -> Dict[Key, RouteCounters]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _restore_pending(self, pending: Dict[Key, RouteCounters]) -> None:
+        cutoff = _hour(time.time()) - timedelta(days=self.retention_days)
+        with self._lock:
+            for key, counters in pending.items():
+                if key[0] < cutoff:
+                    continue
+                cur = self._pending.get(key)
+                if cur is None:
+                    self._pending[key] = counters
+                else:
+                    cur.merge(counters)
+
+    def flush(self, conn: Any = None) -> int:
+        """Upsert pending deltas; on failure they are kept for the next attempt."""
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            pending = self._take_pending()
+            if not pending:
+                return 0
+            own_conn = conn is None
+            try:
+                if own_conn:
+                    if self.connect is None:
+                        raise RuntimeError("no connection factory configured")
+                    conn = self.connect()
+                with conn:
+                    with conn.cursor() as cur:
+                        for (hour, method, route), c in pending.items():
+                            cur.execute(
+                                _UPSERT_SQL,
+                                (
+                                    hour,
+                                    method,
+                                    route,
+                                    c.total,
+                                    c.status_200,
+                                    c.status_304,
+                                    c.status_4xx,
+                                    c.status_5xx,
+                                    c.status_other,
+                                    c.cold_starts,
+                                    c.latency_sum_ms,
+                                    c.latency_max_ms,
+                                    c.latency_buckets,
+                                    c.first_byte_buckets,
+                                ),
+                            )
+            except Exception as e:
+                self.flush_errors += 1
+                self.last_flush_error = str(e)[:200]
+                self._restore_pending(pending)
+                return 0
+            finally:
+                if own_conn and conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self.flush_count += 1
+            return len(pending)
+        finally:
+            self._flush_lock.release()
+
+    # -- reporting ------------------------------------------------------
+    def _window_rows(self, since: datetime, conn: Any) -> List[Dict[str, Any]]:
+        with conn.cursor() as cur:
+            cur.execute(_WINDOW_SQL, (since,))
+            rows = cur.fetchall() or []
+        cols = (
+            "method",
+            "route",
+            "total",
+            "status_200",
+            "status_304",
+            "status_4xx",
+            "status_5xx",
+            "status_other",
+            "cold_starts",
+            "latency_sum_ms",
+            "latency_max_ms",
+            "latency_buckets",
+            "first_byte_buckets",
+        )
+        return [r if isinstance(r, dict) else dict(zip(cols, r)) for r in rows]
+
+    def summary(self, days: int = 7, conn: Any = None) -> Dict[str, Any]:
+        """Aggregate the rollup window plus unflushed local deltas per route."""
+        since = _hour(time.time()) - timedelta(days=days)
+        merged: Dict[Tuple[str, str], RouteCounters] = {}
+        source = "memory"
+        if conn is not None:
+            try:
+                for row in self._window_rows(since, conn):
+                    key = (row["method"], row["route"])
+                    merged.setdefault(key, RouteCounters()).merge(RouteCounters.from_row(row))
+                source = "postgres+memory"
+            except Exception as e:
+                self.last_flush_error = str(e)[:200]
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+        with self._lock:
+            local = [(k, c) for k, c in self._pending.items() if k[0] >= since]
+            for (_hour_start, method, route), c in local:
+                merged.setdefault((method, route), RouteCounters()).merge(c)
+
+        routes: Dict[str, Dict[str, Any]] = {}
+        for (method, route), c in sorted(merged.items(), key=lambda kv: (kv[0][1], kv[0][0])):
+            cacheable = c.status_200 + c.status_304
+            routes[f"{method} {route}"] = {
+                "method": method,
+                "route": route,
+                "total": c.total,
+                "hits_304": c.status_304,
+                "efficiency_pct": (
+                    round(c.status_304 / cacheable * 100.0, 2)
+                    if method == "GET" and cacheable
+                    else None
+                ),
+                "status": {
+                    "200": c.status_200,
+                    "304": c.status_304,
+                    "4xx": c.status_4xx,
+                    "5xx": c.status_5xx,
+                    "other": c.status_other,
+                },
+                "start_type": {"cold": c.cold_starts, "warm": c.total - c.cold_starts},
+                "latency_ms": {
+                    "avg": round(c.latency_sum_ms / c.total, 2) if c.total else None,
+                    "max": round(c.latency_max_ms, 2),
+                    "p50": histogram_quantile(c.latency_buckets, 0.50, c.latency_max_ms),
+                    "p95": histogram_quantile(c.latency_buckets, 0.95, c.latency_max_ms),
+                    "p99": histogram_quantile(c.latency_buckets, 0.99, c.latency_max_ms),
+                },
+                "first_byte_ms": {
+                    "p50": histogram_quantile(c.first_byte_buckets, 0.50, c.latency_max_ms),
+                    "p95": histogram_quantile(c.first_byte_buckets, 0.95, c.latency_max_ms),
+                    "p99": histogram_quantile(c.first_byte_buckets, 0.99, c.latency_max_ms),
+                },
+            }
+        return {
+            "window_days": days,
+            "since": since.isoformat(),
+            "source": source,
+            "buckets_ms": list(LATENCY_BUCKETS_MS),
+            "routes": routes,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pending = {}
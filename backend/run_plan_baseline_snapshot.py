@@ -1,44 +1,61 @@
-"""Nightly baseline snapshot script (Phase B - Plan Regression Detection).
+"""Plan baseline snapshot & regression detector (Phase B - Plan Regression Detection).
 
-Executes defined hot-path queries, computes plan_id and stores baseline stats
-into plan_baselines table. Latencies (p50/p95) are approximated here via N timed
-executions (simple; replace with production-grade histogram later).
+Runs every registered hot query (plan_hot_queries.HOT_QUERIES) under
+EXPLAIN (ANALYZE, BUFFERS) on one connection: ``--warmup`` discarded runs to
+settle caches, then ``--samples`` measured runs (default 200). Each sample is
+the server-side planning + execution time, so client and network jitter do
+not leak into the distribution.
+
+Modes:
+  baseline  store plan shape id, plan JSON and the latency distribution
+            (p50/p95/p99, mean, stddev, raw samples, buffers) in plan_baselines
+  check     compare every hot query with its baseline; exit 1 when a plan
+            changed shape or p95 regressed (CI gate)
+  detect    same comparison for a single query_key
+  demo      print sample outputs without DB access
+
+A p95 regression needs all of: relative increase >= --threshold, absolute
+increase >= --min-delta-ms (sub-millisecond jitter is not a regression), and,
+when the baseline kept its raw samples, a one-sided Mann-Whitney U test
+showing the live distribution is shifted up at --alpha.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
+import math
+import os
 import statistics
 import sys
-import time
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 # Use absolute import since script may be executed as module (-m backend.run_plan_baseline_snapshot)
 try:  # flexible import (package vs direct script execution)
     from backend import local_server as srv  # type: ignore
-    from backend.plan_hashing import compute_plan_id  # type: ignore
+    from backend.plan_hashing import describe_plan, explain_analyze  # type: ignore
+    from backend.plan_hot_queries import HOT_QUERIES, HotQuery, get_hot_query  # type: ignore
 except Exception:  # pragma: no cover
-    import os
-    import sys
-
     here = os.path.dirname(os.path.abspath(__file__))
     parent = os.path.dirname(here)
     if parent not in sys.path:
         sys.path.insert(0, parent)
     try:
         from backend import local_server as srv  # type: ignore
-        from backend.plan_hashing import compute_plan_id  # type: ignore
+        from backend.plan_hashing import describe_plan, explain_analyze  # type: ignore
+        from backend.plan_hot_queries import HOT_QUERIES, HotQuery, get_hot_query  # type: ignore
     except Exception:
         from . import local_server as srv  # type: ignore  # type: ignore
-        from .plan_hashing import compute_plan_id  # type: ignore
+        from .plan_hashing import describe_plan, explain_analyze  # type: ignore
+        from .plan_hot_queries import HOT_QUERIES, HotQuery, get_hot_query  # type: ignore
 
-# Define hot path queries (query_key, sql)
-HOT_QUERIES: List[Tuple[str, str]] = [
-    ("customer_profile", "SELECT id, name, email FROM customers WHERE id = 1"),
-    ("vehicle_profile", "SELECT id, customer_id, make, model FROM vehicles WHERE id = 1"),
-]
-
-SAMPLES_PER_QUERY = 5
+SAMPLES_PER_QUERY = 200
+WARMUP_PER_QUERY = 20
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_MIN_DELTA_MS = 0.5
+DEFAULT_ALPHA = 0.01
+DEFAULT_TENANT = "00000000-0000-0000-0000-000000000001"
 
 GUC_NAMES = [
     "random_page_cost",
@@ -47,6 +64,54 @@ GUC_NAMES = [
     "jit",
 ]
 
+BASELINE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS plan_baselines (
+        query_key TEXT PRIMARY KEY,
+        plan_id CHAR(40) NOT NULL,
+        p50_ms NUMERIC(10,2) NOT NULL,
+        p95_ms NUMERIC(10,2) NOT NULL,
+        sample_n INTEGER NOT NULL,
+        planner_seed INTEGER,
+        random_page_cost TEXT,
+        effective_cache_size TEXT,
+        work_mem TEXT,
+        jit TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+    """
+    ALTER TABLE plan_baselines
+        ADD COLUMN IF NOT EXISTS p99_ms NUMERIC(12,3),
+        ADD COLUMN IF NOT EXISTS mean_ms NUMERIC(12,3),
+        ADD COLUMN IF NOT EXISTS stddev_ms NUMERIC(12,3),
+        ADD COLUMN IF NOT EXISTS samples_ms DOUBLE PRECISION[],
+        ADD COLUMN IF NOT EXISTS warmup_n INTEGER,
+        ADD COLUMN IF NOT EXISTS planning_ms NUMERIC(12,3),
+        ADD COLUMN IF NOT EXISTS shared_hit_blocks NUMERIC(14,1),
+        ADD COLUMN IF NOT EXISTS shared_read_blocks NUMERIC(14,1),
+        ADD COLUMN IF NOT EXISTS plan_json JSONB,
+        ADD COLUMN IF NOT EXISTS sql_sha1 CHAR(40),
+        ADD COLUMN IF NOT EXISTS params JSONB
+    """,
+]
+
+_BASELINE_COLUMNS = ("plan_id", "p50_ms", "p95_ms", "samples_ms", "plan_json", "sql_sha1")
+
+
+def _scalar(row: Any) -> Any:
+    if isinstance(row, dict):
+        return next(iter(row.values()), None)
+    return row[0] if row else None
+
+
+def _as_dict(cur, row: Any, columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    if isinstance(row, dict):
+        return dict(row)
+    if columns is None:
+        columns = [d[0] for d in (getattr(cur, "description", None) or [])]
+    return dict(zip(columns, row))
+
 
 def _fetch_gucs(cur) -> dict:
     gucs = {}
@@ -54,159 +119,437 @@ def _fetch_gucs(cur) -> dict:
         try:
             # Use current_setting with parameter to avoid dynamic identifier interpolation
             cur.execute("SELECT current_setting(%s, true)", (name,))
-            row = cur.fetchone()
-            val = row[0] if row else None
-            gucs[name] = val
+            gucs[name] = _scalar(cur.fetchone())
         except Exception:
             gucs[name] = None
     return gucs
 
 
-def _collect_latency(cur, sql: str, samples: int) -> List[float]:
-    durations: List[float] = []
-    for _ in range(samples):
-        t0 = time.perf_counter()
-        cur.execute(sql)
-        # consume rows to ensure execution
-        try:
-            _ = cur.fetchall()
-        except Exception:
-            pass
-        durations.append((time.perf_counter() - t0) * 1000.0)
-    durations.sort()
-    return durations
+def _sql_sha1(sql: str) -> str:
+    normalized = " ".join(sql.split())
+    return hashlib.sha1(normalized.encode()).hexdigest()  # nosec B324 - change detection only
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+def _percentile(durations: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    idx = max(0, min(len(durations) - 1, int(round(q * (len(durations) - 1)))))
+    return durations[idx]
 
 
 def _compute_p50_p95(durations: List[float]) -> Tuple[float, float]:
-    p50 = statistics.median(durations)
-    idx95 = max(0, min(len(durations) - 1, int(round(0.95 * (len(durations) - 1)))))
-    p95 = durations[idx95]
-    return p50, p95
+    return statistics.median(durations), _percentile(durations, 0.95)
+
+
+def summarize(durations: Sequence[float]) -> Dict[str, float]:
+    ordered = sorted(durations)
+    return {
+        "n": len(ordered),
+        "p50": statistics.median(ordered),
+        "p95": _percentile(ordered, 0.95),
+        "p99": _percentile(ordered, 0.99),
+        "mean": statistics.fmean(ordered),
+        "stddev": statistics.pstdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def mann_whitney_greater(baseline: Sequence[float], live: Sequence[float]) -> float:
+    """One-sided p-value that live is stochastically greater than baseline.
 
+    Normal approximation with tie and continuity correction; fine for the
+    hundreds of samples collected here (returns 1.0 for degenerate input).
+    """
+    n1, n2 = len(live), len(baseline)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(v, 1) for v in live] + [(v, 0) for v in baseline])
+    n = n1 + n2
+    rank_sum_live = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2.0 + 1.0
+        ties = j - i + 1
+        tie_term += ties**3 - ties
+        rank_sum_live += avg_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 1)
+        i = j + 1
+    u_live = rank_sum_live - n1 * (n1 + 1) / 2.0
+    mean_u = n1 * n2 / 2.0
+    var_u = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var_u <= 0:
+        return 1.0
+    z = (u_live - mean_u - 0.5) / math.sqrt(var_u)
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
 
-def run_baseline_mode(samples: int = SAMPLES_PER_QUERY) -> None:
+
+def evaluate(
+    baseline: Dict[str, Any],
+    live: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+    alpha: float = DEFAULT_ALPHA,
+) -> Dict[str, Any]:
+    """Compare a live measurement with its stored baseline.
+
+    baseline: plan_id, p50_ms, p95_ms and optionally samples_ms / sql_sha1.
+    live: plan_id, durations (ascending ms) and optionally sql_sha1.
+    """
+    durations = live["durations"]
+    p50, p95 = _compute_p50_p95(durations)
+    base_p50 = float(baseline.get("p50_ms") or 0.0)
+    base_p95 = float(baseline.get("p95_ms") or 0.0)
+    p50_delta = (p50 - base_p50) / base_p50 if base_p50 else 0.0
+    p95_delta = (p95 - base_p95) / base_p95 if base_p95 else 0.0
+    base_samples = baseline.get("samples_ms") or []
+    p_value = mann_whitney_greater(base_samples, durations) if base_samples else None
+    plan_changed = (baseline.get("plan_id") or "").strip() != live["plan_id"]
+    p95_regressed = (
+        p95_delta >= threshold
+        and (p95 - base_p95) >= min_delta_ms
+        and (p_value is None or p_value < alpha)
+    )
+    reasons = []
+    if plan_changed:
+        reasons.append("plan_changed")
+    if p95_regressed:
+        reasons.append(f"p95 +{p95_delta*100:.1f}%")
+    return {
+        "plan_changed": plan_changed,
+        "p95_regressed": p95_regressed,
+        "sql_changed": bool(
+            baseline.get("sql_sha1")
+            and live.get("sql_sha1")
+            and baseline["sql_sha1"].strip() != live["sql_sha1"]
+        ),
+        "failed": plan_changed or p95_regressed,
+        # Over the threshold but below the noise floor / not significant
+        "p95_noise": p95_delta >= threshold and not p95_regressed,
+        "reasons": reasons,
+        "p50": p50,
+        "p95": p95,
+        "p50_delta": p50_delta,
+        "p95_delta": p95_delta,
+        "p_value": p_value,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+def _open_connection(tenant: Optional[str]):
     conn = srv.db_conn()
+    # Every EXPLAIN in its own transaction: one failing query (missing table
+    # in an older schema) must not abort the rest of the run.
     try:
+        conn.autocommit = True
+    except Exception:
+        pass
+    if tenant:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS plan_baselines (
-                    query_key TEXT PRIMARY KEY,
-                    plan_id CHAR(40) NOT NULL,
-                    p50_ms NUMERIC(10,2) NOT NULL,
-                    p95_ms NUMERIC(10,2) NOT NULL,
-                    sample_n INTEGER NOT NULL,
-                    planner_seed INTEGER,
-                    random_page_cost TEXT,
-                    effective_cache_size TEXT,
-                    work_mem TEXT,
-                    jit TEXT,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
-            )
-            for query_key, sql in HOT_QUERIES:
-                plan_id = compute_plan_id(sql, conn)
-                durations = _collect_latency(cur, sql, samples)
-                p50, p95 = _compute_p50_p95(durations)
-                gucs = _fetch_gucs(cur)
-                cur.execute(
-                    """
-                    INSERT INTO plan_baselines (query_key, plan_id, p50_ms, p95_ms, sample_n, planner_seed, random_page_cost, effective_cache_size, work_mem, jit)
-                    VALUES (%s, %s, %s, %s, %s, NULL, %s, %s, %s, %s)
-                    ON CONFLICT (query_key)
-                    DO UPDATE SET plan_id = EXCLUDED.plan_id,
-                                  p50_ms = EXCLUDED.p50_ms,
-                                  p95_ms = EXCLUDED.p95_ms,
-                                  sample_n = EXCLUDED.sample_n,
-                                  random_page_cost = EXCLUDED.random_page_cost,
-                                  effective_cache_size = EXCLUDED.effective_cache_size,
-                                  work_mem = EXCLUDED.work_mem,
-                                  jit = EXCLUDED.jit,
-                                  created_at = NOW()
-                    """,
-                    [
-                        query_key,
-                        plan_id,
-                        round(p50, 2),
-                        round(p95, 2),
-                        len(durations),
-                        gucs.get("random_page_cost"),
-                        gucs.get("effective_cache_size"),
-                        gucs.get("work_mem"),
-                        gucs.get("jit"),
-                    ],
-                )
+            cur.execute("SELECT set_config('app.tenant_id', %s, false)", (tenant,))
+    return conn
+
+
+def _resolve_params(cur, query: HotQuery) -> Optional[Dict[str, Any]]:
+    """Representative parameters for query (None when the dataset has none)."""
+    if not query.params_sql:
+        return {}
+    cur.execute(query.params_sql)
+    row = cur.fetchone()
+    if not row:
+        return None
+    return _as_dict(cur, row)
+
+
+def _collect_samples(
+    cur, query: HotQuery, params: Dict[str, Any], samples: int, warmup: int
+) -> Dict[str, Any]:
+    durations: List[float] = []
+    planning: List[float] = []
+    plan_ids: Dict[str, int] = {}
+    hit = read = 0
+    last: Dict[str, Any] = {}
+    for i in range(warmup + samples):
+        last = explain_analyze(cur, query.sql, params or None)
+        if i < warmup:
+            continue
+        durations.append(last["total_ms"])
+        planning.append(last["planning_ms"])
+        plan_ids[last["plan_id"]] = plan_ids.get(last["plan_id"], 0) + 1
+        hit += last["shared_hit"]
+        read += last["shared_read"]
+    durations.sort()
+    n = max(1, len(durations))
+    return {
+        # The plan seen most often; a flip mid-run is reported as unstable
+        "plan_id": max(plan_ids, key=plan_ids.get) if plan_ids else last.get("plan_id"),
+        "plan": last.get("plan"),
+        "plan_ids": plan_ids,
+        "durations": durations,
+        "planning_ms": statistics.median(planning) if planning else 0.0,
+        "shared_hit": hit / n,
+        "shared_read": read / n,
+        "sql_sha1": _sql_sha1(query.sql),
+        "warmup": warmup,
+    }
+
+
+def _selected(only: Optional[Sequence[str]]) -> List[HotQuery]:
+    if not only:
+        return list(HOT_QUERIES)
+    wanted = set(only)
+    unknown = wanted - {q.key for q in HOT_QUERIES}
+    if unknown:
+        raise SystemExit(f"ERROR: unknown query_key(s): {', '.join(sorted(unknown))}")
+    return [q for q in HOT_QUERIES if q.key in wanted]
+
+
+def _store_baseline(cur, query: HotQuery, params: Dict[str, Any], live: Dict[str, Any]) -> None:
+    stats = summarize(live["durations"])
+    gucs = _fetch_gucs(cur)
+    cur.execute(
+        """
+        INSERT INTO plan_baselines (
+            query_key, plan_id, p50_ms, p95_ms, p99_ms, mean_ms, stddev_ms, samples_ms,
+            sample_n, warmup_n, planning_ms, shared_hit_blocks, shared_read_blocks,
+            plan_json, sql_sha1, params, planner_seed,
+            random_page_cost, effective_cache_size, work_mem, jit)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s::float8[], %s, %s, %s, %s, %s,
+                %s::jsonb, %s, %s::jsonb, NULL, %s, %s, %s, %s)
+        ON CONFLICT (query_key)
+        DO UPDATE SET plan_id = EXCLUDED.plan_id,
+                      p50_ms = EXCLUDED.p50_ms,
+                      p95_ms = EXCLUDED.p95_ms,
+                      p99_ms = EXCLUDED.p99_ms,
+                      mean_ms = EXCLUDED.mean_ms,
+                      stddev_ms = EXCLUDED.stddev_ms,
+                      samples_ms = EXCLUDED.samples_ms,
+                      sample_n = EXCLUDED.sample_n,
+                      warmup_n = EXCLUDED.warmup_n,
+                      planning_ms = EXCLUDED.planning_ms,
+                      shared_hit_blocks = EXCLUDED.shared_hit_blocks,
+                      shared_read_blocks = EXCLUDED.shared_read_blocks,
+                      plan_json = EXCLUDED.plan_json,
+                      sql_sha1 = EXCLUDED.sql_sha1,
+                      params = EXCLUDED.params,
+                      random_page_cost = EXCLUDED.random_page_cost,
+                      effective_cache_size = EXCLUDED.effective_cache_size,
+                      work_mem = EXCLUDED.work_mem,
+                      jit = EXCLUDED.jit,
+                      created_at = NOW()
+        """,
+        [
+            query.key,
+            live["plan_id"],
+            round(stats["p50"], 2),
+            round(stats["p95"], 2),
+            round(stats["p99"], 3),
+            round(stats["mean"], 3),
+            round(stats["stddev"], 3),
+            [round(d, 4) for d in live["durations"]],
+            stats["n"],
+            live["warmup"],
+            round(live["planning_ms"], 3),
+            round(live["shared_hit"], 1),
+            round(live["shared_read"], 1),
+            json.dumps(live["plan"]),
+            live["sql_sha1"],
+            json.dumps(params, default=str),
+            gucs.get("random_page_cost"),
+            gucs.get("effective_cache_size"),
+            gucs.get("work_mem"),
+            gucs.get("jit"),
+        ],
+    )
+
+
+def run_baseline_mode(
+    samples: int = SAMPLES_PER_QUERY,
+    warmup: int = WARMUP_PER_QUERY,
+    only: Optional[Sequence[str]] = None,
+    tenant: Optional[str] = DEFAULT_TENANT,
+) -> int:
+    queries = _selected(only)
+    conn = _open_connection(tenant)
+    failures = 0
+    try:
+        with conn.cursor() as cur:
+            for ddl in BASELINE_DDL:
+                cur.execute(ddl)
+            for query in queries:
+                try:
+                    params = _resolve_params(cur, query)
+                    if params is None:
+                        print(f"SKIP query_key={query.key} reason=no_representative_data")
+                        continue
+                    live = _collect_samples(cur, query, params, samples, warmup)
+                    _store_baseline(cur, query, params, live)
+                except Exception as e:
+                    failures += 1
+                    print(f"ERROR query_key={query.key} error={e}")
+                    continue
+                stats = summarize(live["durations"])
+                unstable = " unstable_plan" if len(live["plan_ids"]) > 1 else ""
                 print(
-                    f"BASELINE UPDATED query_key={query_key} plan_id={plan_id} p50={p50:.2f} p95={p95:.2f}"
+                    f"BASELINE UPDATED query_key={query.key} plan_id={live['plan_id']} "
+                    f"p50={stats['p50']:.3f} p95={stats['p95']:.3f} p99={stats['p99']:.3f} "
+                    f"n={stats['n']}{unstable}"
                 )
-            conn.commit()
     finally:
         try:
             conn.close()
         except Exception:
             pass
+    return 1 if failures else 0
 
 
-def _lookup_sql(query_key: str) -> Optional[str]:
-    for k, sql in HOT_QUERIES:
-        if k == query_key:
-            return sql
-    return None
+def _fetch_baseline(cur, query_key: str) -> Optional[Dict[str, Any]]:
+    cur.execute(
+        f"SELECT {', '.join(_BASELINE_COLUMNS)} FROM plan_baselines WHERE query_key = %s",
+        [query_key],
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+    return _as_dict(cur, row, _BASELINE_COLUMNS)
+
+
+def _report(query_key: str, baseline: Dict[str, Any], live: Dict[str, Any], result) -> None:
+    base_plan = (baseline.get("plan_id") or "").strip()
+    sql_note = " sql_changed" if result["sql_changed"] else ""
+    p_note = f" p_value={result['p_value']:.4f}" if result["p_value"] is not None else ""
+    if result["failed"]:
+        print(
+            "REGRESSION DETECTED "
+            f"query_key={query_key} baseline_plan={base_plan} live_plan={live['plan_id']} "
+            f"baseline_p50={baseline.get('p50_ms')} live_p50={result['p50']:.2f} "
+            f"baseline_p95={baseline.get('p95_ms')} live_p95={result['p95']:.2f}{p_note} "
+            f"reasons=[{', '.join(result['reasons'])}]{sql_note}"
+        )
+        if result["plan_changed"] and baseline.get("plan_json") and live.get("plan"):
+            base_json = baseline["plan_json"]
+            if isinstance(base_json, str):
+                base_json = json.loads(base_json)
+            print("  baseline plan:")
+            for line in describe_plan(base_json):
+                print(f"    {line}")
+            print("  live plan:")
+            for line in describe_plan(live["plan"]):
+                print(f"    {line}")
+        return
+    status_bits = ["plan_same", "perf_noise" if result["p95_noise"] else "perf_ok"]
+    print(
+        "OK "
+        f"query_key={query_key} {' '.join(status_bits)} baseline_plan={base_plan} "
+        f"live_plan={live['plan_id']} baseline_p50={baseline.get('p50_ms')} "
+        f"live_p50={result['p50']:.2f} delta_p50={result['p50_delta']*100:.1f}% "
+        f"baseline_p95={baseline.get('p95_ms')} live_p95={result['p95']:.2f} "
+        f"delta_p95={result['p95_delta']*100:.1f}%{p_note}{sql_note}"
+    )
+
+
+def run_check_mode(
+    threshold: float = DEFAULT_THRESHOLD,
+    samples: int = SAMPLES_PER_QUERY,
+    warmup: int = WARMUP_PER_QUERY,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+    alpha: float = DEFAULT_ALPHA,
+    only: Optional[Sequence[str]] = None,
+    tenant: Optional[str] = DEFAULT_TENANT,
+    allow_missing: bool = False,
+    json_path: Optional[str] = None,
+) -> int:
+    """Check hot queries against plan_baselines.
+
+    Returns 0 (all OK), 1 (regression or query error) or 3 (baseline missing
+    and allow_missing not set).
+    """
+    queries = _selected(only)
+    counts = {"ok": 0, "regressed": 0, "missing": 0, "skipped": 0, "errors": 0}
+    results: List[Dict[str, Any]] = []
+    conn = _open_connection(tenant)
+    try:
+        with conn.cursor() as cur:
+            for query in queries:
+                entry: Dict[str, Any] = {"query_key": query.key, "source": query.source}
+                results.append(entry)
+                try:
+                    baseline = _fetch_baseline(cur, query.key)
+                    if baseline is None:
+                        counts["missing"] += 1
+                        entry["status"] = "missing"
+                        print(f"NO BASELINE FOUND query_key={query.key}")
+                        continue
+                    params = _resolve_params(cur, query)
+                    if params is None:
+                        counts["skipped"] += 1
+                        entry["status"] = "skipped"
+                        print(f"SKIP query_key={query.key} reason=no_representative_data")
+                        continue
+                    live = _collect_samples(cur, query, params, samples, warmup)
+                except Exception as e:
+                    counts["errors"] += 1
+                    entry.update(status="error", error=str(e))
+                    print(f"ERROR query_key={query.key} error={e}")
+                    continue
+                result = evaluate(baseline, live, threshold, min_delta_ms, alpha)
+                counts["regressed" if result["failed"] else "ok"] += 1
+                entry.update(
+                    status="regressed" if result["failed"] else "ok",
+                    baseline_plan=(baseline.get("plan_id") or "").strip(),
+                    live_plan=live["plan_id"],
+                    **{k: result[k] for k in ("reasons", "p50", "p95", "p95_delta", "p_value")},
+                )
+                _report(query.key, baseline, live, result)
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    print("SUMMARY " + " ".join(f"{k}={v}" for k, v in counts.items()))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as fh:
+            json.dump({"counts": counts, "results": results}, fh, indent=2, default=str)
+    if counts["regressed"] or counts["errors"]:
+        return 1
+    if counts["missing"] and not allow_missing:
+        return 3
+    return 0
 
 
-def run_detection_mode(query_key: str, threshold: float, samples: int) -> int:
-    sql = _lookup_sql(query_key)
-    if not sql:
+def run_detection_mode(
+    query_key: str,
+    threshold: float,
+    samples: int,
+    warmup: int = WARMUP_PER_QUERY,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+    alpha: float = DEFAULT_ALPHA,
+    tenant: Optional[str] = DEFAULT_TENANT,
+) -> int:
+    query = get_hot_query(query_key)
+    if not query:
         print(f"ERROR: query_key '{query_key}' not found in HOT_QUERIES")
         return 2
-    conn = srv.db_conn()
+    conn = _open_connection(tenant)
     try:
         with conn.cursor() as cur:
-            cur.execute(
-                "SELECT plan_id, p50_ms, p95_ms FROM plan_baselines WHERE query_key = %s",
-                [query_key],
-            )
-            row = cur.fetchone()
-            if not row:
+            baseline = _fetch_baseline(cur, query_key)
+            if not baseline:
                 print(f"NO BASELINE FOUND query_key={query_key}")
                 return 3
-            baseline_plan_id, baseline_p50, baseline_p95 = row
-            live_plan_id = compute_plan_id(sql, conn)
-            durations = _collect_latency(cur, sql, samples)
-            p50, p95 = _compute_p50_p95(durations)
-            p50_delta = (p50 - float(baseline_p50)) / float(baseline_p50) if baseline_p50 else 0.0
-            p95_delta = (p95 - float(baseline_p95)) / float(baseline_p95) if baseline_p95 else 0.0
-            plan_changed = live_plan_id != baseline_plan_id
-            perf_regressed = (p50_delta >= threshold) or (p95_delta >= threshold)
-            if plan_changed and perf_regressed:
-                reasons = []
-                if p50_delta >= threshold:
-                    reasons.append(f"p50 +{p50_delta*100:.1f}%")
-                if p95_delta >= threshold:
-                    reasons.append(f"p95 +{p95_delta*100:.1f}%")
-                reason_str = ", ".join(reasons)
-                print(
-                    "REGRESSION DETECTED "
-                    f"query_key={query_key} baseline_plan={baseline_plan_id} live_plan={live_plan_id} "
-                    f"baseline_p50={baseline_p50} live_p50={p50:.2f} baseline_p95={baseline_p95} live_p95={p95:.2f} "
-                    f"reasons=[plan_changed, {reason_str}]"
-                )
-                return 1
-            else:
-                status_bits = []
-                status_bits.append("plan_changed" if plan_changed else "plan_same")
-                if perf_regressed:
-                    status_bits.append("perf_regressed")
-                else:
-                    status_bits.append("perf_ok")
-                print(
-                    "OK "
-                    f"query_key={query_key} {' '.join(status_bits)} baseline_plan={baseline_plan_id} live_plan={live_plan_id} "
-                    f"baseline_p50={baseline_p50} live_p50={p50:.2f} delta_p50={p50_delta*100:.1f}% "
-                    f"baseline_p95={baseline_p95} live_p95={p95:.2f} delta_p95={p95_delta*100:.1f}%"
-                )
+            params = _resolve_params(cur, query)
+            if params is None:
+                print(f"SKIP query_key={query_key} reason=no_representative_data")
                 return 0
+            live = _collect_samples(cur, query, params, samples, warmup)
+            result = evaluate(baseline, live, threshold, min_delta_ms, alpha)
+            _report(query_key, baseline, live, result)
+            return 1 if result["failed"] else 0
     finally:
         try:
             conn.close()
@@ -216,10 +559,57 @@ def run_detection_mode(query_key: str, threshold: float, samples: int) -> int:
 
 def run_demo_outputs():  # pragma: no cover - demonstration helper
     print(
-        "OK query_key=customer_profile plan_same perf_ok baseline_plan=aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa live_plan=aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa baseline_p50=10.0 live_p50=10.3 delta_p50=3.0% baseline_p95=20.0 live_p95=20.5 delta_p95=2.5%"
+        "OK query_key=customer_profile plan_same perf_ok baseline_plan=aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa live_plan=aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa baseline_p50=10.0 live_p50=10.3 delta_p50=3.0% baseline_p95=20.0 live_p95=20.5 delta_p95=2.5% p_value=0.4120"
+    )
+    print(
+        "REGRESSION DETECTED query_key=board_day baseline_plan=bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb live_plan=cccccccccccccccccccccccccccccccccccccccc baseline_p50=12.0 live_p50=13.8 baseline_p95=30.0 live_p95=34.2 p_value=0.0003 reasons=[plan_changed, p95 +14.0%]"
     )
+    print("  baseline plan:")
     print(
-        "REGRESSION DETECTED query_key=vehicle_profile baseline_plan=bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb live_plan=cccccccccccccccccccccccccccccccccccccccc baseline_p50=12.0 live_p50=13.8 baseline_p95=30.0 live_p95=34.2 reasons=[plan_changed, p50 +15.0%, p95 +14.0%]"
+        "    Limit\n      Sort\n        Index Scan using idx_appointments_start_ts on appointments"
+    )
+    print("  live plan:")
+    print("    Limit\n      Sort\n        Seq Scan on appointments")
+
+
+def _add_common(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--samples",
+        type=int,
+        default=SAMPLES_PER_QUERY,
+        help="Measured EXPLAIN ANALYZE runs per query (default: %(default)s)",
+    )
+    p.add_argument(
+        "--warmup",
+        type=int,
+        default=WARMUP_PER_QUERY,
+        help="Discarded runs before measuring (default: %(default)s)",
+    )
+    p.add_argument(
+        "--tenant",
+        default=os.getenv("PLAN_BASELINE_TENANT", DEFAULT_TENANT),
+        help="app.tenant_id for row-level security (default: %(default)s)",
+    )
+
+
+def _add_thresholds(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Regression threshold as fraction (default 0.10 = 10%%)",
+    )
+    p.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=DEFAULT_MIN_DELTA_MS,
+        help="Ignore p95 increases smaller than this (default: %(default)s)",
+    )
+    p.add_argument(
+        "--alpha",
+        type=float,
+        default=DEFAULT_ALPHA,
+        help="Significance level for the Mann-Whitney shift test (default: %(default)s)",
     )
 
 
@@ -228,29 +618,61 @@ def main():  # pragma: no cover - operational entry
     sub = parser.add_subparsers(dest="mode")
 
     p_base = sub.add_parser("baseline", help="Update/populate baselines")
-    p_base.add_argument("--samples", type=int, default=SAMPLES_PER_QUERY)
+    _add_common(p_base)
+    p_base.add_argument("--only", nargs="+", metavar="QUERY_KEY", help="Limit to these keys")
+
+    p_check = sub.add_parser("check", help="Check every hot query (CI gate)")
+    _add_common(p_check)
+    _add_thresholds(p_check)
+    p_check.add_argument("--only", nargs="+", metavar="QUERY_KEY", help="Limit to these keys")
+    p_check.add_argument(
+        "--allow-missing", action="store_true", help="Do not fail on queries without a baseline"
+    )
+    p_check.add_argument("--json", metavar="PATH", help="Also write results as JSON")
 
     p_detect = sub.add_parser("detect", help="Detect regression for a query_key")
     p_detect.add_argument(
         "query_key", help="Query key to check (must exist in HOT_QUERIES and plan_baselines)"
     )
-    p_detect.add_argument(
-        "--threshold",
-        type=float,
-        default=0.10,
-        help="Regression threshold as fraction (default 0.10 = 10%)",
-    )
-    p_detect.add_argument(
-        "--samples", type=int, default=SAMPLES_PER_QUERY, help="Samples for live timing (default 5)"
-    )
+    _add_common(p_detect)
+    _add_thresholds(p_detect)
 
     sub.add_parser("demo", help="Print sample OK and REGRESSION outputs without DB access")
 
     args = parser.parse_args()
     if args.mode == "baseline" or args.mode is None:  # default to baseline for backwards compat
-        run_baseline_mode(samples=getattr(args, "samples", SAMPLES_PER_QUERY))
+        sys.exit(
+            run_baseline_mode(
+                samples=getattr(args, "samples", SAMPLES_PER_QUERY),
+                warmup=getattr(args, "warmup", WARMUP_PER_QUERY),
+                only=getattr(args, "only", None),
+                tenant=getattr(args, "tenant", DEFAULT_TENANT),
+            )
+        )
+    elif args.mode == "check":
+        sys.exit(
+            run_check_mode(
+                threshold=args.threshold,
+                samples=args.samples,
+                warmup=args.warmup,
+                min_delta_ms=args.min_delta_ms,
+                alpha=args.alpha,
+                only=args.only,
+                tenant=args.tenant,
+                allow_missing=args.allow_missing,
+                json_path=args.json,
+            )
+        )
     elif args.mode == "detect":
-        rc = run_detection_mode(args.query_key, args.threshold, args.samples)
+        rc = run_detection_mode(
+            args.query_key,
+            args.threshold,
+            args.samples,
+            warmup=args.warmup,
+            min_delta_ms=args.min_delta_ms,
+            alpha=args.alpha,
+            tenant=args.tenant,
+        )
         sys.exit(rc)
     elif args.mode == "demo":
         run_demo_outputs()
@@ -0,0 +1,326 @@
+"""Technician availability and slot finder.
+
+Answers "which techs are free at 10:00 for 2 hours", "free windows per tech
+this week" and "first N open slots (optionally for this vehicle)" from one
+snapshot instead of probing ``validation.find_conflicts`` per candidate.
+
+A snapshot is loaded with two queries (active technicians, then every busy
+block overlapping the range via the ``block_range`` GiST index from
+migrations/20250905_018_add_appointment_exclusion_constraints.sql). Each tech
+and the requested vehicle get an :class:`IntervalIndex`: merged, sorted busy
+intervals probed with ``bisect``, so a point query is O(log n) and a slot scan
+walks gaps rather than candidate times.
+
+Busy blocks:
+  * appointments overlapping the range, except CANCELED / NO_SHOW
+  * carryover jobs, using the same predicate as ``get_board``'s carryover lane
+    (status IN_PROGRESS / READY, or checked in and not checked out) started
+    before the range; like any in-progress job they hold the tech until at
+    least ``as_of`` + SCHEDULING_CARRYOVER_HOLD_MINUTES even when overdue
+  * technicians with ``is_active = FALSE`` are never offered
+
+Slots are clipped to shop hours (UTC, matching ``shop_day_window``).
+
+Env:
+  SHOP_OPEN_HOUR / SHOP_CLOSE_HOUR     bookable hours in UTC (default 8 / 18)
+  SCHEDULING_CARRYOVER_HOLD_MINUTES    overdue in-progress hold (default 60)
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from backend.conflict_engine import block_end, compute_gaps
+except ImportError:  # pragma: no cover - flat import when executed directly
+    from conflict_engine import block_end, compute_gaps  # type: ignore
+
+__all__ = [
+    "IntervalIndex",
+    "ScheduleSnapshot",
+    "is_carryover",
+    "load_snapshot",
+    "shop_hours",
+]
+
+Interval = Tuple[datetime, datetime]
+
+_INACTIVE_STATUSES = ("CANCELED", "NO_SHOW")
+_CARRYOVER_STATUSES = ("IN_PROGRESS", "READY")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def shop_hours() -> Tuple[int, int]:
+    return _env_int("SHOP_OPEN_HOUR", 8), _env_int("SHOP_CLOSE_HOUR", 18)
+
+
+def is_carryover(row: Dict[str, Any]) -> bool:
+    """get_board's carryover predicate: the job is still in the shop."""
+    if row.get("status") in _CARRYOVER_STATUSES:
+        return True
+    return bool(row.get("check_in_at")) and not row.get("check_out_at")
+
+
+class IntervalIndex:
+    """Busy intervals for one resource, merged and sorted for bisect probes."""
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        merged: List[List[datetime]] = []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self._starts = [m[0] for m in merged]
+        self._ends = [m[1] for m in merged]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        i = bisect_right(self._starts, start) - 1
+        if i >= 0 and self._ends[i] > start:
+            return False
+        return i + 1 >= len(self._starts) or self._starts[i + 1] >= end
+
+    def next_free(self, start: datetime, duration: timedelta) -> datetime:
+        """Earliest t >= start with [t, t + duration) free."""
+        i = bisect_right(self._starts, start) - 1
+        t = start
+        if i >= 0 and self._ends[i] > t:
+            t = self._ends[i]
+        for j in range(i + 1, len(self._starts)):
+            if self._starts[j] >= t + duration:
+                break
+            t = max(t, self._ends[j])
+        return t
+
+    def gaps(
+        self, range_start: datetime, range_end: datetime, min_duration: timedelta = timedelta(0)
+    ) -> List[Interval]:
+        lo = max(bisect_right(self._starts, range_start) - 1, 0)
+        hi = bisect_right(self._starts, range_end)
+        busy = zip(self._starts[lo:hi], self._ends[lo:hi])
+        return compute_gaps(busy, range_start, range_end, min_duration)
+
+
+def _open_windows(
+    range_start: datetime, range_end: datetime, hours: Optional[Tuple[int, int]]
+) -> List[Interval]:
+    """[range_start, range_end) clipped to daily shop hours (None = around the clock)."""
+    if hours is None:
+        return [(range_start, range_end)]
+    open_h, close_h = hours
+    windows: List[Interval] = []
+    day = range_start.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < range_end:
+        lo = max(day + timedelta(hours=open_h), range_start)
+        hi = min(day + timedelta(hours=close_h), range_end)
+        if hi > lo:
+            windows.append((lo, hi))
+        day += timedelta(days=1)
+    return windows
+
+
+def _align(t: datetime, step: timedelta) -> datetime:
+    """Round t up to the next multiple of step past the hour."""
+    base = t.replace(minute=0, second=0, microsecond=0)
+    steps = -(-(t - base) // step)
+    return base + steps * step
+
+
+class ScheduleSnapshot:
+    """Active technicians and busy intervals over [range_start, range_end)."""
+
+    def __init__(
+        self,
+        range_start: datetime,
+        range_end: datetime,
+        technicians: Sequence[Dict[str, Any]],
+        appointments: Iterable[Dict[str, Any]],
+        vehicle_id: Optional[str] = None,
+        as_of: Optional[datetime] = None,
+        carryover_hold: Optional[timedelta] = None,
+        hours: Optional[Tuple[int, int]] = None,
+    ):
+        """appointments rows: tech_id, vehicle_id, start_ts, end_ts, status,
+        check_in_at, check_out_at. Rows for inactive techs are ignored."""
+        if carryover_hold is None:
+            carryover_hold = timedelta(minutes=_env_int("SCHEDULING_CARRYOVER_HOLD_MINUTES", 60))
+        as_of = as_of or datetime.now(timezone.utc)
+        self.range_start = range_start
+        self.range_end = range_end
+        self.hours = hours
+        self.technicians = {str(t["id"]): t for t in technicians}
+        busy: Dict[str, List[Interval]] = {tid: [] for tid in self.technicians}
+        vehicle_busy: List[Interval] = []
+        for row in appointments:
+            if row.get("status") in _INACTIVE_STATUSES or not row.get("start_ts"):
+                continue
+            start = row["start_ts"]
+            end = block_end(start, row.get("end_ts"))
+            if is_carryover(row):
+                end = max(end, as_of + carryover_hold)
+            if end <= range_start or start >= range_end:
+                continue
+            tid = str(row["tech_id"]) if row.get("tech_id") else None
+            if tid in busy:
+                busy[tid].append((start, end))
+            if vehicle_id and str(row.get("vehicle_id")) == str(vehicle_id):
+                vehicle_busy.append((start, end))
+        self.index = {tid: IntervalIndex(iv) for tid, iv in busy.items()}
+        self.vehicle_index = IntervalIndex(vehicle_busy) if vehicle_id else None
+
+    def _techs(self, tech_ids: Optional[Sequence[str]]) -> List[str]:
+        if tech_ids is None:
+            return sorted(self.index)
+        return [t for t in tech_ids if t in self.index]
+
+    def free_techs(
+        self, start: datetime, duration: timedelta, tech_ids: Optional[Sequence[str]] = None
+    ) -> List[str]:
+        end = start + duration
+        if self.vehicle_index is not None and not self.vehicle_index.is_free(start, end):
+            return []
+        return [t for t in self._techs(tech_ids) if self.index[t].is_free(start, end)]
+
+    def free_windows(
+        self,
+        min_duration: timedelta = timedelta(0),
+        tech_ids: Optional[Sequence[str]] = None,
+    ) -> Dict[str, List[Interval]]:
+        windows = _open_windows(self.range_start, self.range_end, self.hours)
+        out: Dict[str, List[Interval]] = {}
+        for tid in self._techs(tech_ids):
+            gaps: List[Interval] = []
+            for lo, hi in windows:
+                gaps.extend(self.index[tid].gaps(lo, hi, min_duration))
+            out[tid] = gaps
+        return out
+
+    def _tech_starts(
+        self, tid: str, duration: timedelta, step: timedelta, windows: List[Interval]
+    ) -> Iterator[Tuple[datetime, str]]:
+        idx = self.index[tid]
+        for lo, hi in windows:
+            t = _align(lo, step)
+            while t + duration <= hi:
+                free_at = idx.next_free(t, duration)
+                if self.vehicle_index is not None:
+                    # Alternate until both the tech and the vehicle are free
+                    while True:
+                        v_free = self.vehicle_index.next_free(free_at, duration)
+                        if v_free == free_at:
+                            break
+                        free_at = idx.next_free(v_free, duration)
+                if free_at != t:
+                    t = _align(free_at, step)
+                    continue
+                yield t, tid
+                t += step
+
+    def candidate_slots(
+        self,
+        duration: timedelta,
+        limit: int = 10,
+        tech_ids: Optional[Sequence[str]] = None,
+        step: timedelta = timedelta(minutes=15),
+        not_before: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """First `limit` distinct start times with the techs free for `duration`."""
+        windows = _open_windows(
+            max(self.range_start, not_before or self.range_start), self.range_end, self.hours
+        )
+        streams = [self._tech_starts(tid, duration, step, windows) for tid in self._techs(tech_ids)]
+        slots: List[Dict[str, Any]] = []
+        for start, group in groupby(heapq.merge(*streams), key=lambda s: s[0]):
+            slots.append(
+                {"start": start, "end": start + duration, "tech_ids": [tid for _, tid in group]}
+            )
+            if len(slots) >= limit:
+                break
+        return slots
+
+
+_TECHNICIANS_SQL = """
+SELECT id::text AS id, name, initials
+  FROM technicians
+ WHERE is_active IS TRUE{tech_filter}
+ ORDER BY initials ASC
+"""
+
+# Busy blocks in range via the block_range GiST index, plus the board's carryover lane
+_BUSY_SQL = """
+SELECT a.tech_id::text AS tech_id, a.vehicle_id::text AS vehicle_id, a.start_ts, a.end_ts,
+       a.status::text AS status, a.check_in_at, a.check_out_at
+  FROM appointments a
+ WHERE a.block_range && tstzrange(%(start)s, %(end)s, '[)')
+   AND a.status NOT IN ('CANCELED','NO_SHOW')
+   AND (a.tech_id = ANY(%(techs)s::uuid[]) OR a.vehicle_id::text = %(vehicle)s)
+UNION ALL
+SELECT a.tech_id::text, a.vehicle_id::text, a.start_ts, a.end_ts,
+       a.status::text, a.check_in_at, a.check_out_at
+  FROM appointments a
+ WHERE a.start_ts < %(start)s
+   AND upper(a.block_range) <= %(start)s
+   AND (
+     a.status IN ('IN_PROGRESS','READY')
+     OR (a.check_in_at IS NOT NULL AND a.check_out_at IS NULL)
+   )
+   AND (a.tech_id = ANY(%(techs)s::uuid[]) OR a.vehicle_id::text = %(vehicle)s)
+"""
+
+
+def load_snapshot(
+    conn,
+    range_start: datetime,
+    range_end: datetime,
+    tech_ids: Optional[Sequence[str]] = None,
+    vehicle_id: Optional[str] = None,
+    as_of: Optional[datetime] = None,
+    hours: Optional[Tuple[int, int]] = None,
+) -> ScheduleSnapshot:
+    """Two queries: active technicians, then their (and the vehicle's) busy blocks."""
+    with conn.cursor() as cur:
+        if tech_ids:
+            cur.execute(
+                _TECHNICIANS_SQL.format(tech_filter=" AND id = ANY(%s::uuid[])"),
+                (list(tech_ids),),
+            )
+        else:
+            cur.execute(_TECHNICIANS_SQL.format(tech_filter=""))
+        technicians = list(cur.fetchall() or [])
+        rows: List[Dict[str, Any]] = []
+        if technicians or vehicle_id:
+            cur.execute(
+                _BUSY_SQL,
+                {
+                    "start": range_start,
+                    "end": range_end,
+                    "techs": [t["id"] for t in technicians],
+                    "vehicle": vehicle_id,
+                },
+            )
+            rows = list(cur.fetchall() or [])
+    return ScheduleSnapshot(
+        range_start,
+        range_end,
+        technicians,
+        rows,
+        vehicle_id=vehicle_id,
+        as_of=as_of,
+        hours=hours,
+    )
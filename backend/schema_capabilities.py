@@ -0,0 +1,181 @@
+"""Per-worker schema capability registry.
+
+Handlers that support several schema generations (renamed columns, columns
+added by later migrations, integer vs numeric amounts) used to find out which
+one they were talking to by running the newest SQL and retrying on the error.
+That costs a failed statement per request, and inside a transaction the retry
+cannot succeed anyway once Postgres has aborted it.
+
+``SchemaCapabilities`` reads ``information_schema.columns`` once per worker
+(warmed from gunicorn's ``post_worker_init``, otherwise on first use) and
+answers ``has_table`` / ``has_column`` / ``column_type`` from memory so callers
+pick their SQL up front. The snapshot is tagged with the migration version;
+it is re-read only when that version changes, checked at most every
+``revalidate_seconds``.
+
+Lookups return None while the schema is unknown (registry disabled, or the
+load failed). Callers inside a transaction use ``probe`` instead, which then
+asks ``information_schema`` on their cursor under a savepoint, so an unknown
+schema never costs a failed statement in (and an aborted) transaction. A
+failed load is retried after ``revalidate_seconds`` rather than on every
+request.
+
+Env:
+  SCHEMA_CAPABILITIES                    "false" disables the registry (default
+                                         on; off under pytest so tests see their
+                                         patched connections)
+  SCHEMA_CAPABILITIES_REVALIDATE_SECONDS migration version re-check interval
+                                         (default 30)
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+__all__ = ["SchemaCapabilities", "SchemaSnapshot"]
+
+# table -> column -> information_schema data_type
+Columns = Dict[str, Dict[str, str]]
+
+
+class SchemaSnapshot:
+    """Column map for one migration version; immutable once built."""
+
+    def __init__(self, tables: Columns, version: Optional[str]):
+        self.tables = tables
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    def has_table(self, table: str) -> bool:
+        return table in self.tables
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in self.tables.get(table, ())
+
+    def column_type(self, table: str, column: str) -> Optional[str]:
+        return self.tables.get(table, {}).get(column)
+
+
+class SchemaCapabilities:
+    """Memoised schema snapshot invalidated by the applied migration version.
+
+    load() -> {table: {column: data_type}} for the current schema.
+    fetch_version() -> migration version string or None (no history table).
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Columns],
+        fetch_version: Optional[Callable[[], Optional[str]]] = None,
+        revalidate_seconds: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ):
+        if enabled is None:
+            default = "false" if "pytest" in sys.modules else "true"
+            enabled = os.getenv("SCHEMA_CAPABILITIES", default).lower() != "false"
+        if revalidate_seconds is None:
+            revalidate_seconds = float(os.getenv("SCHEMA_CAPABILITIES_REVALIDATE_SECONDS", "30"))
+        self.load = load
+        self.fetch_version = fetch_version
+        self.revalidate_seconds = revalidate_seconds
+        self.enabled = enabled
+        self.loads = 0
+        self._snapshot: Optional[SchemaSnapshot] = None
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _version(self) -> Optional[str]:
+        if not self.fetch_version:
+            return None
+        return self.fetch_version()
+
+    def _reload(self) -> Optional[SchemaSnapshot]:
+        with self._lock:
+            # Version first: a migration landing mid-load is picked up next check.
+            try:
+                version = self._version()
+            except Exception:
+                version = None
+            try:
+                snapshot = SchemaSnapshot(self.load(), version)
+            except Exception:
+                self._failed_at = time.monotonic()
+                return self._snapshot
+            self.loads += 1
+            self._snapshot = snapshot
+            self._failed_at = None
+            return snapshot
+
+    def snapshot(self) -> Optional[SchemaSnapshot]:
+        """Current snapshot, loading or re-validating when due; None if unknown."""
+        if not self.enabled:
+            return None
+        snap = self._snapshot
+        now = time.monotonic()
+        if snap is None:
+            if self._failed_at is not None and now - self._failed_at < self.revalidate_seconds:
+                return None
+            return self._reload()
+        if now - snap.checked_at < self.revalidate_seconds:
+            return snap
+        try:
+            current = self._version()
+        except Exception:
+            current = snap.version
+        if current != snap.version:
+            return self._reload()
+        snap.checked_at = now
+        return snap
+
+    def warm(self) -> bool:
+        """Load eagerly (worker start); True when a snapshot is available."""
+        return self.snapshot() is not None
+
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next lookup re-reads the schema."""
+        with self._lock:
+            self._snapshot = None
+            self._failed_at = None
+
+    def has_table(self, table: str) -> Optional[bool]:
+        snap = self.snapshot()
+        return None if snap is None else snap.has_table(table)
+
+    def has_column(self, table: str, column: str) -> Optional[bool]:
+        snap = self.snapshot()
+        return None if snap is None else snap.has_column(table, column)
+
+    def column_type(self, table: str, column: str) -> Optional[str]:
+        snap = self.snapshot()
+        return None if snap is None else snap.column_type(table, column)
+
+    def probe(self, cur, table: str, column: str) -> Optional[str]:
+        """column_type(), or a one-off information_schema lookup on cur while unknown.
+
+        Returns the data type, or None when the column is absent. The lookup
+        runs under a savepoint; if it fails the caller's transaction stays
+        usable and the column is treated as absent.
+        """
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.column_type(table, column)
+        cur.execute("SAVEPOINT schema_probe")
+        try:
+            cur.execute(
+                "SELECT data_type FROM information_schema.columns"
+                " WHERE table_schema = current_schema() AND table_name = %s"
+                " AND column_name = %s",
+                (table, column),
+            )
+            row = cur.fetchone()
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT schema_probe")
+            return None
+        cur.execute("RELEASE SAVEPOINT schema_probe")
+        if isinstance(row, dict):
+            return row.get("data_type")
+        return row[0] if row else None
@@ -0,0 +1,198 @@
+"""Versioned in-memory service catalog for ``GET /api/admin/service-operations``.
+
+The catalog is small, read on every estimate/appointment screen and changes
+rarely, so each worker keeps the active catalog per tenant together with:
+
+  * an ETag base fixed when the entry is built (the ``service_catalog:global``
+    page_signature row when available, otherwise a digest of the loaded rows),
+    so ``If-None-Match`` is answered without touching ``service_operations``
+  * a substring index (lower-cased name/category) plus an exact keyword map
+    mirroring the SQL ``name ILIKE %q% OR category ILIKE %q% OR q = ANY(keywords)``
+  * memoised sort orders for the whitelisted sort columns
+
+Write endpoints in this worker call ``bump()`` for an immediate reload. Writes
+from other workers (or direct SQL, package edits) bump the page_signature row
+through triggers; entries re-check that row at most every
+``revalidate_seconds``.
+
+The package composition cache (``service_packages.build_package`` rows) uses the
+same class and signature, looking packages up by id with ``CatalogEntry.get``.
+
+Env:
+  SERVICE_CATALOG_CACHE               "false" disables caching (default on;
+                                      off under pytest so tests see their
+                                      patched connections)
+  SERVICE_CATALOG_REVALIDATE_SECONDS  signature re-check interval (default 5)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__all__ = ["CatalogEntry", "ServiceCatalogCache"]
+
+_MAX_SEARCHES = 256
+
+
+class CatalogEntry:
+    """One tenant's loaded catalog; immutable apart from its memo dicts."""
+
+    def __init__(
+        self,
+        rows: List[Dict[str, Any]],
+        variant: str,
+        version: int,
+        db_version: Optional[str],
+    ):
+        self.rows = rows
+        self.variant = variant
+        self.version = version
+        self.db_version = db_version
+        self.checked_at = time.monotonic()
+        self.etag_base = (
+            db_version
+            or hashlib.sha1(
+                json.dumps(rows, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+        )
+        self._haystacks = [
+            f"{r.get('name') or ''}\x00{r.get('category') or ''}".lower() for r in rows
+        ]
+        self._keywords: Dict[str, List[int]] = {}
+        for pos, r in enumerate(rows):
+            for kw in r.get("keywords") or ():
+                self._keywords.setdefault(kw, []).append(pos)
+        self._by_id = {str(r.get("id")): r for r in rows}
+        self._orders: Dict[Tuple[str, bool], List[int]] = {}
+        self._searches: Dict[str, frozenset] = {}
+        self._lock = threading.Lock()
+
+    def etag(self, tenant_id: Any, params: Tuple[Any, ...]) -> str:
+        src = "|".join([str(tenant_id), self.etag_base, *map(str, params)])
+        return 'W/"' + hashlib.sha1(src.encode("utf-8")).hexdigest() + '"'
+
+    def get(self, row_id: Any) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(str(row_id))
+
+    def _order(self, sort_col: str, desc: bool) -> List[int]:
+        key = (sort_col, desc)
+        order = self._orders.get(key)
+        if order is None:
+            # ORDER BY <col> <dir> NULLS LAST, id ASC
+            by_id = sorted(range(len(self.rows)), key=lambda i: str(self.rows[i].get("id")))
+            present = [i for i in by_id if self.rows[i].get(sort_col) is not None]
+            nulls = [i for i in by_id if self.rows[i].get(sort_col) is None]
+            present.sort(key=lambda i: self.rows[i][sort_col], reverse=desc)
+            order = present + nulls
+            with self._lock:
+                self._orders[key] = order
+        return order
+
+    def _matches(self, q: str) -> frozenset:
+        hit = self._searches.get(q)
+        if hit is None:
+            needle = q.lower()
+            found = {i for i, hay in enumerate(self._haystacks) if needle in hay}
+            found.update(self._keywords.get(q, ()))
+            hit = frozenset(found)
+            with self._lock:
+                if len(self._searches) >= _MAX_SEARCHES:
+                    self._searches.clear()
+                self._searches[q] = hit
+        return hit
+
+    def query(
+        self, q: str = "", sort_col: str = "display_order", desc: bool = False, limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        order = self._order(sort_col, desc)
+        if len(q) >= 2:
+            matches = self._matches(q)
+            order = [i for i in order if i in matches]
+        return [self.rows[i] for i in order[:limit]]
+
+
+class ServiceCatalogCache:
+    """Per-tenant catalog entries invalidated by a local version and a DB signature.
+
+    load(tenant_id) -> (rows, variant) reads the active catalog.
+    fetch_version(tenant_id) -> signature string or None (cheap indexed lookup).
+    """
+
+    def __init__(
+        self,
+        load: Callable[[Any], Tuple[List[Dict[str, Any]], str]],
+        fetch_version: Optional[Callable[[Any], Optional[str]]] = None,
+        revalidate_seconds: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ):
+        if enabled is None:
+            default = "false" if "pytest" in sys.modules else "true"
+            enabled = os.getenv("SERVICE_CATALOG_CACHE", default).lower() != "false"
+        if revalidate_seconds is None:
+            revalidate_seconds = float(os.getenv("SERVICE_CATALOG_REVALIDATE_SECONDS", "5"))
+        self.load = load
+        self.fetch_version = fetch_version
+        self.revalidate_seconds = revalidate_seconds
+        self.enabled = enabled
+        self.version = 0
+        self.loads = 0
+        self._entries: Dict[Any, CatalogEntry] = {}
+        self._lock = threading.Lock()
+
+    def bump(self) -> int:
+        """Invalidate every tenant entry (the catalog table is not tenant scoped)."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            return self.version
+
+    def _db_version(self, tenant_id: Any) -> Optional[str]:
+        if not self.fetch_version:
+            return None
+        try:
+            return self.fetch_version(tenant_id)
+        except Exception:
+            return None
+
+    def peek(self, tenant_id: Any) -> Optional[CatalogEntry]:
+        """Return a still-valid entry or None, re-checking the signature when due."""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(tenant_id)
+        if entry is None or entry.version != self.version:
+            return None
+        if time.monotonic() - entry.checked_at < self.revalidate_seconds:
+            return entry
+        current = self._db_version(tenant_id)
+        if current is None or current != entry.db_version:
+            return None
+        entry.checked_at = time.monotonic()
+        return entry
+
+    def get(self, tenant_id: Any) -> Tuple[CatalogEntry, bool]:
+        """Return (entry, cached). Loads (and stores when enabled) on a miss."""
+        entry = self.peek(tenant_id)
+        if entry is not None:
+            return entry, True
+        version = self.version
+        # Read the signature before the rows: a concurrent write then yields a
+        # newer signature on the next check rather than a stale ETag.
+        db_version = self._db_version(tenant_id) if self.enabled else None
+        rows, variant = self.load(tenant_id)
+        entry = CatalogEntry(rows, variant, version, db_version)
+        self.loads += 1
+        if self.enabled:
+            with self._lock:
+                if self.version == version:
+                    self._entries[tenant_id] = entry
+        return entry, False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,105 @@
+"""Service package composition for the package list and the add-package route.
+
+A package is a ``service_operations`` row whose children live in
+``package_items`` (``service_id`` is the package id, legacy naming). Everything
+derived from that composition is computed once per catalog load here:
+
+  * the ``GET /api/admin/service-packages`` payload (child projection and the
+    ``sum_child_base_labor_rate`` price preview) plus its ETag fingerprint parts
+  * the invoice line templates used by ``POST .../add-package``: one
+    ``(child_id, name, cents)`` per child, already rescaled to the package's
+    own ``default_price`` when it overrides the children's sum
+
+``build_package`` rows are stored in a ``ServiceCatalogCache`` keyed by the
+``service_catalog:global`` signature, which package_items and
+service_operations triggers rotate, so the routes read packages without
+querying the catalog.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+__all__ = ["build_package", "scale_lines"]
+
+# (child_id, name, extended cents)
+Line = Tuple[str, Optional[str], int]
+
+
+def scale_lines(children: Sequence[Dict[str, Any]], package_price: Any) -> Tuple[List[Line], int]:
+    """Child line templates and their total in cents.
+
+    Each child is ``default_price * qty``. When the package has a positive
+    ``default_price`` that differs from the children's sum, child amounts are
+    scaled proportionally to it, with the rounding remainder on the last child.
+    """
+    lines: List[Line] = []
+    total = 0
+    for ch in children:
+        qty = float(ch.get("qty") or 1)
+        price_cents = int(round(float(ch.get("default_price") or 0) * 100))
+        extended = int(round(price_cents * qty))
+        total += extended
+        lines.append((ch["child_id"], ch.get("name"), extended))
+    if package_price is None or float(package_price) <= 0 or total <= 0:
+        return lines, total
+    override = int(round(float(package_price) * 100))
+    if override == total:
+        return lines, total
+    scaled: List[Line] = []
+    running = 0
+    for idx, (child_id, name, extended) in enumerate(lines):
+        if idx < len(lines) - 1:
+            value = int(extended / total * override)
+            running += value
+        else:
+            value = override - running
+        scaled.append((child_id, name, value))
+    return scaled, override
+
+
+def build_package(pkg: Dict[str, Any], children: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Cache row for one package.
+
+    ``pkg`` carries id, name, category, display_order, is_active and
+    default_price; ``children`` are ordered dicts with child_id, qty, name,
+    default_hours, default_price and base_labor_rate.
+    """
+    items = []
+    fingerprint = []
+    preview = 0.0
+    for ch in children:
+        rate = ch.get("base_labor_rate")
+        qty = float(ch.get("qty") or 1)
+        if rate is not None:
+            preview += float(rate) * qty
+        items.append(
+            {
+                "child_id": ch["child_id"],
+                "name": ch.get("name"),
+                "qty": qty,
+                "base_labor_rate": float(rate) if rate is not None else None,
+                "default_hours": (
+                    float(ch["default_hours"]) if ch.get("default_hours") is not None else None
+                ),
+            }
+        )
+        fingerprint.append(f"{pkg['id']}::{ch['child_id']}::{qty}")
+    lines, lines_cents = scale_lines(children, pkg.get("default_price"))
+    return {
+        "id": pkg["id"],
+        "name": pkg["name"],
+        "category": pkg.get("category"),
+        "display_order": pkg.get("display_order"),
+        "is_active": pkg.get("is_active") is not False,
+        "payload": {
+            "id": pkg["id"],
+            "name": pkg["name"],
+            "category": pkg.get("category"),
+            "price_preview": {"sum_child_base_labor_rate": round(preview, 2)},
+            "package_items": items,
+        },
+        "fingerprint": fingerprint,
+        "lines": lines,
+        "lines_cents": lines_cents,
+    }
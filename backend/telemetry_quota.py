@@ -0,0 +1,96 @@
+"""Daily telemetry quota shared by every API worker.
+
+The quota used to be a per-process global, so N gunicorn workers allowed N
+times the limit. The shared count lives in ``telemetry_quota_daily``
+(migrations/20250919_020_add_telemetry_quota_daily.sql), one row per UTC day
+and kind. To keep the hot path off the database each worker leases units in
+blocks of ``lease`` with a single upsert and spends them locally; the
+database count is therefore exact up to the unspent part of each worker's
+current lease (at most ``lease`` per worker).
+
+``take()`` returns ``(allowed, crossed_soft)``. ``crossed_soft`` is True for
+exactly one lease across all workers: the one that moved the shared count
+past the soft limit. If the database is unreachable ``take()`` raises, and the
+caller falls back to its per-process counter.
+
+Env:
+  TELEMETRY_QUOTA_LEASE  units leased per database round trip (default 20)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+__all__ = ["SharedDailyQuota"]
+
+_LEASE_SQL = """
+INSERT INTO telemetry_quota_daily AS q (day, kind, used)
+VALUES (%s, %s, %s)
+ON CONFLICT (day, kind) DO UPDATE SET used = q.used + EXCLUDED.used, updated_at = NOW()
+RETURNING used
+"""
+
+
+class SharedDailyQuota:
+    """Per-kind daily counter leased from Postgres in blocks."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        lease: Optional[int] = None,
+    ):
+        if lease is None:
+            try:
+                lease = int(os.getenv("TELEMETRY_QUOTA_LEASE", "20"))
+            except ValueError:
+                lease = 20
+        self.connect = connect
+        self.lease = max(1, lease)
+        self._lock = threading.Lock()
+        # kind -> (day, units left in the current lease, no further lease today)
+        self._state: Dict[str, Tuple[date, int, bool]] = {}
+
+    def take(
+        self, kind: str, hard_limit: int, soft_limit: int, today: Optional[date] = None
+    ) -> Tuple[bool, bool]:
+        today = today or datetime.now(timezone.utc).date()
+        with self._lock:
+            day, left, exhausted = self._state.get(kind, (today, 0, False))
+            if day != today:
+                left, exhausted = 0, False
+            if left > 0:
+                self._state[kind] = (today, left - 1, exhausted)
+                return True, False
+            if exhausted:
+                return False, False
+            before, after = self._lease(kind, today)
+            granted = max(0, min(self.lease, hard_limit - before))
+            crossed = before < soft_limit <= after
+            if granted == 0:
+                self._state[kind] = (today, 0, True)
+                return False, crossed
+            # A short grant means the hard limit is reached once it is spent.
+            self._state[kind] = (today, granted - 1, granted < self.lease)
+            return True, crossed
+
+    def _lease(self, kind: str, today: date) -> Tuple[int, int]:
+        conn = self.connect()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(_LEASE_SQL, (today, kind, self.lease))
+                    row = cur.fetchone()
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        after = int(row["used"] if isinstance(row, dict) else row[0])
+        return after - self.lease, after
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state.clear()
@@ -0,0 +1,278 @@
+"""Template usage analytics read from daily rollups, plus the response cache.
+
+migrations/20250918_019_add_template_usage_rollups.sql keeps two rollups of
+``template_usage_events`` current through statement-level triggers:
+
+  template_usage_daily        (day, template_id, channel) -> events, first/last use
+  template_usage_daily_users  (day, template_id, channel, user_id) -> events
+
+``GET /api/admin/analytics/templates`` reads complete days from the rollups
+and scans only today's raw events, so a 180-day range costs a few hundred
+rollup rows instead of every event in the range. Until the migration has run
+(``rollups_available`` is False) the endpoint keeps the raw six-CTE scan.
+
+Responses are cached per worker in a ``ResponseCache``: TTL plus LRU eviction,
+entries are the serialized hit body, so a hit is returned as-is with no copy.
+
+Env:
+  TEMPLATE_ANALYTICS_CACHE_TTL_SECONDS  entry lifetime (default 60)
+  TEMPLATE_ANALYTICS_CACHE_MAX          entries kept per worker (default 256)
+  TEMPLATE_ANALYTICS_PROBE_SECONDS      rollup table re-probe interval (default 300)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+__all__ = [
+    "ResponseCache",
+    "query_params",
+    "raw_sql",
+    "reset_probe",
+    "rollup_sql",
+    "rollups_available",
+]
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU map of immutable values (serialized bodies)."""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        now = self._clock()
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ---------------------------------------------------------------------------
+# Rollup probe
+# ---------------------------------------------------------------------------
+_probe_lock = threading.Lock()
+_probe: Dict[str, Any] = {"value": None, "at": 0.0}
+
+
+def reset_probe() -> None:
+    with _probe_lock:
+        _probe["value"] = None
+        _probe["at"] = 0.0
+
+
+def rollups_available(conn) -> bool:
+    """True when both rollup tables exist (cached per process).
+
+    A failed probe counts as False so the caller keeps the raw-event query.
+    """
+    now = time.monotonic()
+    with _probe_lock:
+        if _probe["value"] is not None and now - _probe["at"] < _env_number(
+            "TEMPLATE_ANALYTICS_PROBE_SECONDS", 300.0
+        ):
+            return _probe["value"]
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT to_regclass('template_usage_daily') IS NOT NULL"
+                " AND to_regclass('template_usage_daily_users') IS NOT NULL AS ok"
+            )
+            row = cur.fetchone()
+        value = bool(row.get("ok") if isinstance(row, dict) else (row[0] if row else False))
+    except Exception:
+        return False
+    with _probe_lock:
+        _probe["value"] = value
+        _probe["at"] = now
+    return value
+
+
+# ---------------------------------------------------------------------------
+# SQL
+# ---------------------------------------------------------------------------
+# Both queries return one row: totals, by_channel, agg_rows, template_totals,
+# slice_rows (json), consumed unchanged by local_server.analytics_templates.
+_RESULT_SELECT = """
+SELECT
+  (SELECT row_to_json(t) FROM totals t) AS totals,
+  (SELECT json_agg(row_to_json(b)) FROM by_channel b) AS by_channel,
+  (SELECT json_agg(row_to_json(a)) FROM agg a) AS agg_rows,
+  (SELECT json_agg(row_to_json(tt)) FROM (
+      SELECT * FROM template_totals
+      ORDER BY total_count DESC
+      LIMIT %(limit)s
+   ) tt) AS template_totals,
+  (SELECT json_agg(row_to_json(r)) FROM recent_slice r) AS slice_rows
+"""
+
+
+def rollup_sql(granularity: str, channel_filtered: bool) -> str:
+    """Complete days from the rollups UNION ALL today's raw events."""
+    chan = "AND channel = %(channel)s" if channel_filtered else ""
+    bucket = "date_trunc('week', day::timestamp)::date" if granularity == "week" else "day"
+    return f"""
+WITH daily AS (
+  SELECT day, template_id, channel, events, first_used, last_used
+    FROM template_usage_daily
+   WHERE day >= %(start_day)s AND day < %(today)s
+     {chan}
+  UNION ALL
+  SELECT %(today)s::date, template_id, channel, count(*), MIN(sent_at), MAX(sent_at)
+    FROM template_usage_events
+   WHERE sent_at >= %(today_start)s AND sent_at <= %(range_end)s
+     {chan}
+   GROUP BY template_id, channel
+), users AS (
+  SELECT template_id, user_id
+    FROM template_usage_daily_users
+   WHERE day >= %(start_day)s AND day < %(today)s
+     {chan}
+  UNION
+  SELECT template_id, user_id
+    FROM template_usage_events
+   WHERE sent_at >= %(today_start)s AND sent_at <= %(range_end)s
+     AND user_id IS NOT NULL
+     {chan}
+), template_users AS (
+  SELECT template_id, count(*) AS unique_users
+    FROM users
+   GROUP BY template_id
+), agg AS (
+  SELECT template_id, channel, {bucket} AS bucket_start, SUM(events)::bigint AS cnt
+    FROM daily
+   GROUP BY template_id, channel, bucket_start
+), totals AS (
+  SELECT COALESCE(SUM(events), 0)::bigint AS events,
+         COUNT(DISTINCT template_id) AS unique_templates,
+         (SELECT COUNT(DISTINCT user_id) FROM users) AS unique_users
+    FROM daily
+), by_channel AS (
+  SELECT channel, SUM(events)::bigint AS events
+    FROM daily
+   GROUP BY channel
+), template_totals AS (
+  SELECT d.template_id,
+         MIN(d.first_used) AS first_used,
+         MAX(d.last_used) AS last_used,
+         SUM(d.events)::bigint AS total_count,
+         COALESCE(MAX(tu.unique_users), 0) AS unique_users,
+         COALESCE(mt.label, d.template_id::text) AS template_label
+    FROM daily d
+    LEFT JOIN template_users tu ON tu.template_id = d.template_id
+    LEFT JOIN message_templates mt ON mt.id = d.template_id
+   GROUP BY d.template_id, template_label
+), recent_slice AS (
+  SELECT template_id, {bucket} AS bucket_start, SUM(events)::bigint AS cnt
+    FROM daily
+   GROUP BY template_id, bucket_start
+)
+{_RESULT_SELECT}"""
+
+
+def raw_sql(granularity: str, channel_filtered: bool) -> str:
+    """Pre-rollup query over every event in the range (fallback)."""
+    chan = "AND channel = %(channel)s" if channel_filtered else ""
+    bucket = (
+        "date_trunc('week', sent_at)" if granularity == "week" else "date_trunc('day', sent_at)"
+    )
+    return f"""
+WITH base AS (
+  SELECT template_id, channel, sent_at, user_id
+    FROM template_usage_events
+   WHERE sent_at BETWEEN %(range_start)s AND %(range_end)s
+     {chan}
+), agg AS (
+  SELECT template_id, channel, {bucket} AS bucket_start, count(*) AS cnt
+    FROM base
+   GROUP BY template_id, channel, bucket_start
+), totals AS (
+  SELECT count(*) AS events,
+         COUNT(DISTINCT template_id) AS unique_templates,
+         COUNT(DISTINCT user_id) FILTER (WHERE user_id IS NOT NULL) AS unique_users
+    FROM base
+), by_channel AS (
+  SELECT channel, count(*) AS events
+    FROM base
+   GROUP BY channel
+), template_totals AS (
+  SELECT b.template_id,
+         MIN(b.sent_at) AS first_used,
+         MAX(b.sent_at) AS last_used,
+         COUNT(*) AS total_count,
+         COUNT(DISTINCT b.user_id) FILTER (WHERE b.user_id IS NOT NULL) AS unique_users,
+         COALESCE(mt.label, b.template_id::text) AS template_label
+    FROM base b
+    LEFT JOIN message_templates mt ON mt.id = b.template_id
+   GROUP BY b.template_id, template_label
+), recent_slice AS (
+  SELECT template_id, {bucket} AS bucket_start, count(*) AS cnt
+    FROM base
+   WHERE sent_at >= %(range_start)s - INTERVAL '7 days'
+   GROUP BY template_id, bucket_start
+)
+{_RESULT_SELECT}"""
+
+
+def query_params(
+    start_utc: datetime, now_utc: datetime, channel: Optional[str], limit: int
+) -> Dict[str, Any]:
+    """Named parameters shared by ``rollup_sql`` and ``raw_sql``.
+
+    start_utc must be a UTC midnight; rollup days are UTC days.
+    """
+    today_start = now_utc.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "range_start": start_utc,
+        "range_end": now_utc,
+        "start_day": start_utc.date(),
+        "today": today_start.date(),
+        "today_start": today_start,
+        "channel": channel,
+        "limit": limit,
+    }
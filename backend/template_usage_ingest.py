@@ -0,0 +1,473 @@
+"""Buffered ingestion for ``POST /api/admin/template-usage``.
+
+The synchronous endpoint opened a connection per event, resolved the template,
+ran an idempotency ``SELECT`` and an ``INSERT ... RETURNING``. In buffered
+mode the request does no database work at all:
+
+  * ``TemplateMap`` resolves the template id / slug from an in-memory copy of
+    ``message_templates`` (reloaded every ``ttl_seconds``, and on a miss at
+    most every ``miss_reload_seconds``)
+  * the endpoint validates the event, assigns its ``id`` and ``sent_at`` and
+    hands it to ``UsageBuffer.enqueue``; duplicate idempotency hashes seen by
+    this worker are answered from a bounded recent-hash map
+  * a flusher thread writes the buffer with multi-row
+    ``INSERT ... ON CONFLICT DO NOTHING`` every ``flush_events`` events or
+    ``flush_ms`` milliseconds, whichever comes first. No conflict target, so
+    both the partial unique hash index (duplicates from other workers) and
+    the primary key (replayed spill segments) are absorbed
+  * a batch rejected for bad data (FK / check violations) is retried row by
+    row and the offending rows are dropped; a connection failure keeps the
+    batch for the next attempt with backoff
+
+Crash safety: every accepted event is appended to a per-process spill
+segment (``template_usage.<pid>-<token>.<seq>.jsonl`` in ``spill_dir``; the
+random token keeps names unique when PIDs are reused after a container
+restart) before the request returns. The owner holds an ``flock`` on each of
+its segments until they are deleted, once their batch is committed.
+``recover()`` (run when the flusher starts) claims every other segment it can
+lock, i.e. those of processes that are gone, by renaming it, and re-queues its
+events; replays are idempotent because event ids are assigned here, not by the
+database. Without ``fcntl`` every foreign segment is claimed.
+
+Env:
+  TEMPLATE_USAGE_INGEST                "buffered" (default) or "sync"; sync under pytest
+  TEMPLATE_USAGE_FLUSH_EVENTS          batch size that triggers a flush (default 200)
+  TEMPLATE_USAGE_FLUSH_MS              max age of a buffered event (default 500)
+  TEMPLATE_USAGE_BUFFER_MAX            buffered events before shedding with 503 (default 20000)
+  TEMPLATE_USAGE_SPILL_DIR             spill directory (default <tmp>/template_usage_spill;
+                                       "off" disables spilling)
+  TEMPLATE_USAGE_SPILL_FSYNC           1 to fsync each spilled event (default 0)
+  TEMPLATE_USAGE_TEMPLATE_TTL_SECONDS  template map reload interval (default 60)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None  # type: ignore
+
+__all__ = [
+    "COLUMNS",
+    "TemplateMap",
+    "UsageBuffer",
+    "buffered_ingest_enabled",
+]
+
+log = logging.getLogger("api")
+
+COLUMNS: Tuple[str, ...] = (
+    "id",
+    "template_id",
+    "template_slug",
+    "channel",
+    "appointment_id",
+    "user_id",
+    "sent_at",
+    "delivery_ms",
+    "was_automated",
+    "hash",
+)
+_ROW_SQL = "(" + ",".join(["%s"] * len(COLUMNS)) + ")"
+_INSERT_SQL = "INSERT INTO template_usage_events (" + ", ".join(COLUMNS) + ") VALUES "
+_INSERT_CHUNK = 500
+_RECENT_HASHES = 50_000
+_SEGMENT_RE = re.compile(r"^template_usage\.(\d+(?:-[0-9a-f]+)?)\.(\w+)\.jsonl$")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def buffered_ingest_enabled() -> bool:
+    in_tests = bool(os.getenv("PYTEST_CURRENT_TEST")) or "pytest" in sys.modules
+    mode = os.getenv("TEMPLATE_USAGE_INGEST", "sync" if in_tests else "buffered")
+    return mode.strip().lower() == "buffered"
+
+
+def _row_value(row: Any, key: str, pos: int) -> Any:
+    return row[key] if isinstance(row, dict) else row[pos]
+
+
+class TemplateMap:
+    """message_templates by id and slug -> {"id", "slug", "channel"}."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        ttl_seconds: Optional[float] = None,
+        miss_reload_seconds: float = 5.0,
+    ):
+        if ttl_seconds is None:
+            ttl_seconds = float(_env_int("TEMPLATE_USAGE_TEMPLATE_TTL_SECONDS", 60))
+        self.connect = connect
+        self.ttl_seconds = ttl_seconds
+        self.miss_reload_seconds = miss_reload_seconds
+        self._by_id: Dict[str, Dict[str, str]] = {}
+        self._by_slug: Dict[str, Dict[str, str]] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        conn = self.connect()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT id::text AS id, slug, channel::text AS channel FROM message_templates"
+                    )
+                    rows = cur.fetchall()
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        by_id, by_slug = {}, {}
+        for r in rows:
+            tpl = {
+                "id": _row_value(r, "id", 0),
+                "slug": _row_value(r, "slug", 1),
+                "channel": _row_value(r, "channel", 2),
+            }
+            by_id[tpl["id"]] = tpl
+            by_slug[tpl["slug"]] = tpl
+        self._by_id, self._by_slug = by_id, by_slug
+        self._loaded_at = time.monotonic()
+
+    def _lookup(self, ref: str, slug_only: bool) -> Optional[Dict[str, str]]:
+        if slug_only:
+            return self._by_slug.get(ref)
+        return self._by_id.get(ref.lower()) or self._by_slug.get(ref)
+
+    def resolve(self, ref: str, slug_only: bool = False) -> Optional[Dict[str, str]]:
+        """Template by id or slug (``slug_only``: by slug), None when unknown."""
+        age = time.monotonic() - self._loaded_at
+        tpl = self._lookup(ref, slug_only) if age < self.ttl_seconds else None
+        if tpl is not None:
+            return tpl
+        with self._lock:
+            age = time.monotonic() - self._loaded_at
+            if age >= self.ttl_seconds or age >= self.miss_reload_seconds:
+                self._load()
+        return self._lookup(ref, slug_only)
+
+    def invalidate(self) -> None:
+        self._loaded_at = 0.0
+
+
+class UsageBuffer:
+    """In-process template usage buffer with a spill file and batched flush."""
+
+    def __init__(
+        self,
+        connect: Optional[Callable[[], Any]],
+        flush_events: Optional[int] = None,
+        flush_ms: Optional[int] = None,
+        max_events: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        start_thread: bool = True,
+    ):
+        if spill_dir is None:
+            spill_dir = os.getenv(
+                "TEMPLATE_USAGE_SPILL_DIR",
+                os.path.join(tempfile.gettempdir(), "template_usage_spill"),
+            )
+        self.connect = connect
+        self.flush_events = max(1, flush_events or _env_int("TEMPLATE_USAGE_FLUSH_EVENTS", 200))
+        self.flush_ms = max(1, flush_ms or _env_int("TEMPLATE_USAGE_FLUSH_MS", 500))
+        self.max_events = max_events or _env_int("TEMPLATE_USAGE_BUFFER_MAX", 20_000)
+        self.spill_dir = None if spill_dir in ("", "off") else spill_dir
+        self.fsync = os.getenv("TEMPLATE_USAGE_SPILL_FSYNC", "0") == "1"
+        self.start_thread = start_thread
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._recent: OrderedDict[str, None] = OrderedDict()
+        self._segments: List[str] = []  # spill files covering the buffered events
+        self._held: Dict[str, Any] = {}  # segment path -> open handle holding its flock
+        self._token = os.urandom(6).hex()
+        self._spill: Any = None
+        self._spill_path: Optional[str] = None
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._oldest = 0.0
+        self.counters = {"queued": 0, "duplicates": 0, "shed": 0, "flushed": 0, "rejected": 0}
+        self.flush_errors = 0
+        self.last_flush_error: Optional[str] = None
+
+    # -- request path -------------------------------------------------------
+    def enqueue(self, event: Dict[str, Any]) -> str:
+        """Buffer one event: "queued", "duplicate" (hash seen here) or "full"."""
+        self._ensure_started()
+        row_hash = event.get("hash")
+        with self._lock:
+            if row_hash and row_hash in self._recent:
+                self._recent.move_to_end(row_hash)
+                self.counters["duplicates"] += 1
+                return "duplicate"
+            if len(self._events) >= self.max_events:
+                self.counters["shed"] += 1
+                return "full"
+            self._spill_write(event)
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.append(event)
+            if row_hash:
+                self._recent[row_hash] = None
+                if len(self._recent) > _RECENT_HASHES:
+                    self._recent.popitem(last=False)
+            self.counters["queued"] += 1
+            if len(self._events) in (1, self.flush_events):
+                self._wake.notify()
+        return "queued"
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "buffered": len(self._events),
+            "flush_errors": self.flush_errors,
+            "last_flush_error": self.last_flush_error,
+        }
+
+    # -- spill file ---------------------------------------------------------
+    def _owner(self) -> str:
+        return f"{os.getpid()}-{self._token}"
+
+    def _segment_path(self, tag: str) -> str:
+        return os.path.join(self.spill_dir or "", f"template_usage.{self._owner()}.{tag}.jsonl")
+
+    def _drop(self, path: str) -> None:
+        # Unlink before unlocking so no other process can claim a committed segment
+        _unlink(path)
+        fh = self._held.pop(path, None)
+        if fh is not None:
+            try:
+                fh.close()
+            except OSError:
+                pass
+
+    def _spill_write(self, event: Dict[str, Any]) -> None:
+        if not self.spill_dir:
+            return
+        try:
+            if self._spill is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._seq += 1
+                self._spill_path = self._segment_path(str(self._seq))
+                # Locked before it is visible under a name recover() matches
+                self._spill = open(self._spill_path + ".new", "a", encoding="utf-8")
+                _lock(self._spill)
+                os.rename(self._spill_path + ".new", self._spill_path)
+                self._held[self._spill_path] = self._spill
+                self._segments.append(self._spill_path)
+            self._spill.write(json.dumps(event, default=str) + "\n")
+            self._spill.flush()
+            if self.fsync:
+                os.fsync(self._spill.fileno())
+        except OSError as e:  # spilling is best effort; the event is still buffered
+            log.warning("template_usage.spill_failed %s", e)
+            self._spill = None
+
+    def _rotate_locked(self) -> List[str]:
+        # The handle stays open (and locked) in _held until the segment is dropped
+        self._spill = None
+        segments, self._segments = self._segments, []
+        return segments
+
+    def recover(self) -> int:
+        """Re-queue events from segments no live process holds; returns the count."""
+        if not self.spill_dir or not os.path.isdir(self.spill_dir):
+            return 0
+        recovered = 0
+        for name in sorted(os.listdir(self.spill_dir)):
+            m = _SEGMENT_RE.match(name)
+            if not m or m.group(1) == self._owner():
+                continue
+            try:
+                fh = open(os.path.join(self.spill_dir, name), encoding="utf-8")
+            except OSError:
+                continue  # another worker claimed it first
+            self._seq += 1
+            claimed = self._segment_path(f"r{self._seq}")
+            try:
+                if not _lock(fh, blocking=False):
+                    fh.close()
+                    continue  # its owner is alive
+                os.rename(os.path.join(self.spill_dir, name), claimed)
+            except OSError:
+                fh.close()
+                continue
+            events = []
+            for line in fh:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue  # torn final line from the crash
+            with self._lock:
+                if events and not self._events:
+                    self._oldest = time.monotonic()
+                self._events.extend(events)
+                self._segments.append(claimed)
+                self._held[claimed] = fh
+            recovered += len(events)
+        if recovered:
+            log.info("template_usage.recovered events=%d", recovered)
+        return recovered
+
+    # -- flush --------------------------------------------------------------
+    def flush(self) -> int:
+        """Write every buffered event; returns rows handed to the database."""
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                batch = list(self._events)
+                self._events.clear()
+                segments = self._rotate_locked()
+            if not batch:
+                for path in segments:
+                    self._drop(path)
+                return 0
+            try:
+                written = self._write(batch)
+            except Exception as e:
+                self.flush_errors += 1
+                self.last_flush_error = str(e)[:200]
+                with self._lock:
+                    self._events.extendleft(reversed(batch))
+                    self._segments[:0] = segments
+                    self._oldest = time.monotonic()
+                return 0
+            for path in segments:
+                self._drop(path)
+            self.counters["flushed"] += written
+            return written
+        finally:
+            self._flush_lock.release()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        if self.connect is None:
+            raise RuntimeError("no connection factory configured")
+        rows = [tuple(e.get(c) for c in COLUMNS) for e in batch]
+        conn = self.connect()
+        try:
+            try:
+                with conn:
+                    with conn.cursor() as cur:
+                        for i in range(0, len(rows), _INSERT_CHUNK):
+                            _insert(cur, rows[i : i + _INSERT_CHUNK])
+                return len(rows)
+            except Exception as e:
+                if not _is_data_error(e):
+                    raise
+            # Some row violates a constraint: isolate it instead of losing the batch.
+            written = 0
+            for row in rows:
+                try:
+                    with conn:
+                        with conn.cursor() as cur:
+                            _insert(cur, [row])
+                    written += 1
+                except Exception as e:
+                    if not _is_data_error(e):
+                        raise
+                    self.counters["rejected"] += 1
+                    log.warning("template_usage.rejected id=%s %s", row[0], str(e)[:200])
+            return written
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    # -- flusher thread -----------------------------------------------------
+    def _ensure_started(self) -> None:
+        if not self.start_thread or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # New process (first use, or a fork): the parent's thread, spill
+            # handles and buffered events belong to the parent. Closing the
+            # inherited handles leaves the parent's locks in place.
+            self._pid = os.getpid()
+            self._token = os.urandom(6).hex()
+            self._events.clear()
+            self._segments = []
+            self._spill = None
+            held, self._held = self._held, {}
+            for fh in held.values():
+                try:
+                    fh.close()
+                except OSError:
+                    pass
+        self.recover()
+        threading.Thread(target=self._run, name="template-usage-flush", daemon=True).start()
+
+    def _run(self) -> None:
+        backoff = 0.0
+        while True:
+            with self._lock:
+                while True:
+                    due = self._oldest + self.flush_ms / 1000.0 + backoff
+                    if len(self._events) >= self.flush_events and not backoff:
+                        break
+                    if self._events and time.monotonic() >= due:
+                        break
+                    self._wake.wait(max(0.01, due - time.monotonic()) if self._events else None)
+            errors = self.flush_errors
+            self.flush()
+            backoff = min(30.0, max(1.0, backoff * 2)) if self.flush_errors > errors else 0.0
+
+    def close(self) -> None:
+        """Final flush (exit hook); anything left stays in the spill segment."""
+        self.flush()
+
+
+def _insert(cur: Any, rows: List[Tuple[Any, ...]]) -> None:
+    params: List[Any] = []
+    for row in rows:
+        params.extend(row)
+    cur.execute(_INSERT_SQL + ",".join([_ROW_SQL] * len(rows)) + " ON CONFLICT DO NOTHING", params)
+
+
+def _is_data_error(e: Exception) -> bool:
+    # SQLSTATE class 22 (data exception) / 23 (integrity constraint violation)
+    code = getattr(e, "pgcode", None) or ""
+    return code[:2] in ("22", "23")
+
+
+def _lock(fh: Any, blocking: bool = True) -> bool:
+    """flock fh exclusively; False when another process holds it (non-blocking)."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -0,0 +1,171 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from backend import local_server
+from backend.appointment_drawer import (
+    DRAWER_SQL,
+    DRAWER_SQL_NO_SIGNATURE,
+    build_drawer,
+    drawer_etag,
+    fetch_drawer_row,
+)
+from backend.page_signatures import signature_validator
+
+
+def _row(**over):
+    row = {
+        "id": "42",
+        "status": "SCHEDULED",
+        "start_ts": datetime(2025, 3, 4, 9, tzinfo=timezone.utc),
+        "total_amount": "120.50",
+        "customer_id": "7",
+        "customer_name": "Alice",
+        "vehicle_id": "3",
+        "year": 2020,
+        "make": "Honda",
+        "model": "Civic",
+        "license_plate": "ABC123",
+        "vin": "ABC123",
+        "services": [
+            {
+                "id": "s1",
+                "name": "Alignment",
+                "estimated_price": 59.99,
+                "service_operation_id": "op-align",
+                "op_default_price": 59.99,
+                "op_category": "Chassis",
+            },
+            {"id": "s2", "name": "Custom", "service_operation_id": None},
+        ],
+        "customer_vehicles": '[{"id": "3", "year": 2020, "make": "Honda", "model": "Civic",'
+        ' "license_plate": "ABC123", "vin": "ABC123"}, {"id": "4", "license_plate": "XYZ"}]',
+        "sig_appointment": 'W/"a1"',
+        "sig_catalog": 'W/"c1"',
+    }
+    row.update(over)
+    return row
+
+
+def test_build_drawer_shapes_single_row():
+    data = build_drawer(_row())
+    assert data["appointment"]["start"] == "2025-03-04T09:00:00+00:00"
+    assert data["appointment"]["total_amount"] == 120.5
+    assert data["appointment"]["service_operation_ids"] == ["op-align"]
+    assert [v["display"] for v in data["customer"]["vehicles"]] == ["2020 Honda Civic", "XYZ"]
+    assert data["services"][0]["operation"] == {
+        "id": "op-align",
+        "default_price": 59.99,
+        "category": "Chassis",
+    }
+    assert data["services"][1]["operation"] is None
+    assert data["vehicle"]["display"] == "2020 Honda Civic"
+    assert data["meta"] == {"version": 1}
+
+
+def test_etag_matches_conditional_validator_and_falls_back_to_digest():
+    row = _row()
+    data = build_drawer(row)
+    expected = signature_validator(
+        "t1", {"appointment:42": 'W/"a1"', "service_catalog:global": 'W/"c1"'}
+    )
+    assert drawer_etag(row, data, "t1") == expected
+
+    unsigned = _row(sig_appointment=None)
+    digest = drawer_etag(unsigned, build_drawer(unsigned), "t1")
+    assert digest.startswith('W/"') and digest != expected
+    assert digest == drawer_etag(unsigned, build_drawer(unsigned), "t1")
+
+
+def test_fetch_falls_back_without_page_signature_table():
+    seen = []
+
+    def execute(sql, params):
+        seen.append(sql)
+        if sql is DRAWER_SQL:
+            raise RuntimeError('relation "page_signature" does not exist')
+        return {"id": str(params[0])}
+
+    rolled_back = []
+    assert fetch_drawer_row(execute, 42, rollback=lambda: rolled_back.append(1)) == {"id": "42"}
+    assert seen == [DRAWER_SQL, DRAWER_SQL_NO_SIGNATURE]
+    assert rolled_back == [1]
+
+    with pytest.raises(RuntimeError):
+        fetch_drawer_row(lambda *_: (_ for _ in ()).throw(RuntimeError("boom")), 1)
+
+
+def test_non_integer_ids_never_reach_the_database():
+    seen = []
+    for bad in ("abc", "1.5", "-3", "0", "99999999999", "\u0661"):
+        assert fetch_drawer_row(lambda sql, params: seen.append(params), bad) is None
+    assert seen == []
+    fetch_drawer_row(lambda sql, params: seen.append(params), " 42 ")
+    assert seen == [(42,)] and "a.id = %s" in DRAWER_SQL
+
+
+def test_single_statement_aggregates_services_and_vehicles():
+    assert DRAWER_SQL.count("LEFT JOIN LATERAL") == 2
+    assert DRAWER_SQL.count("json_agg") == 2
+    assert "page_signature" not in DRAWER_SQL_NO_SIGNATURE
+
+
+class _Cursor:
+    def __init__(self, row, log):
+        self.row = row
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.log.append(sql)
+
+    def fetchone(self):
+        return self.row if "FROM appointments a" in self.log[-1] else None
+
+    def fetchall(self):
+        return []
+
+
+class _Conn:
+    def __init__(self, row, log):
+        self.row = row
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self.row, self.log)
+
+    def close(self):
+        pass
+
+
+def test_get_appointment_endpoint_uses_one_query_and_revalidates(monkeypatch):
+    log = []
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"role": "Advisor"})
+    monkeypatch.setattr(local_server, "db_conn", lambda: _Conn(_row(), log))
+    client = local_server.app.test_client()
+
+    resp = client.get("/api/appointments/42")
+    assert resp.status_code == 200
+    assert resp.get_json()["data"]["appointment"]["id"] == "42"
+    drawer_queries = [q for q in log if "FROM appointments a" in q]
+    assert len(drawer_queries) == 1
+    etag = resp.headers["ETag"]
+
+    again = client.get("/api/appointments/42", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+
+    log.clear()
+    assert client.get("/api/appointments/not-a-number").status_code == 404
+    assert not [q for q in log if "FROM appointments a" in q]
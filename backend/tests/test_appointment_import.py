@@ -0,0 +1,274 @@
+import pytest
+from flask import make_response
+
+from backend import appointment_import, local_server
+
+SCHEMA = [
+    {"col": "customers.id", "type": "integer", "seq": "public.customers_id_seq"},
+    {"col": "vehicles.id", "type": "integer", "seq": "public.vehicles_id_seq"},
+    {"col": "appointments.id", "type": "integer", "seq": "public.appointments_id_seq"},
+    {"col": "appointments.status", "type": "appointment_status", "seq": None},
+]
+TECH = "11111111-1111-1111-1111-111111111111"
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.log.append(sql)
+        self.rowcount = 2
+        if "pg_get_serial_sequence" in sql:
+            self._rows = SCHEMA
+        elif sql.lstrip().startswith("SELECT row_no"):
+            self._rows = self.conn.results
+        else:
+            self._rows = []
+
+    def copy_expert(self, sql, buf):
+        self.conn.log.append(sql)
+        self.conn.copied = buf.read()
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Conn:
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.log = []
+        self.copied = ""
+        self.rolled_back = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def _rows(n):
+    return [
+        (
+            i,
+            {
+                "start": f"2025-03-04T{8 + i % 8:02d}:00:00Z",
+                "customer_name": f"Fleet {i}",
+                "license_plate": f"PL{i}",
+                "techId": TECH,
+            },
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def test_read_rows_numbers_and_parse_errors():
+    csv_rows = list(appointment_import.read_rows("start_ts, notes\n2025-03-04T08:00Z,a\n", "csv"))
+    assert csv_rows == [(1, {"start_ts": "2025-03-04T08:00Z", "notes": "a"})]
+    nd = list(appointment_import.read_rows('{"start_ts": "x"}\n\n[1]\n{bad\n', "ndjson"))
+    assert [r[0] for r in nd] == [1, 3, 4]
+    assert nd[1][1] == "each line must be a JSON object"
+    assert nd[2][1].startswith("invalid JSON")
+
+
+def test_normalize_row_aliases_and_errors():
+    values, problem = appointment_import.normalize_row(
+        {"start": "2025-03-04T08:00:00", "customer": "Ann", "vin": "1HGCM", "status": "in-progress"}
+    )
+    assert problem is None
+    assert values["start_ts"].tzinfo is not None
+    assert values["customer_name"] == "Ann"
+    assert values["license_plate"] == "1HGCM"
+    assert values["status"] == "IN_PROGRESS"
+    assert str(values["paid_amount"]) == "0"
+
+    bad = {"start_ts": "2025-03-04T08:00:00Z", "customer_name": "Ann"}
+    assert appointment_import.normalize_row({**bad, "start_ts": "soon"})[1][0] == "start_ts"
+    assert appointment_import.normalize_row({**bad, "status": "LOST"})[1][0] == "status"
+    assert appointment_import.normalize_row({**bad, "tech_id": "t-1"})[1][0] == "tech_id"
+    assert appointment_import.normalize_row({**bad, "total_amount": "ten"})[1][0] == "total_amount"
+    assert appointment_import.normalize_row({"start_ts": bad["start_ts"]})[1][0] == "customer"
+
+
+def test_statement_count_does_not_grow_with_rows():
+    small, large = _Conn(), _Conn()
+    appointment_import.import_appointments(small, _rows(3))
+    report = appointment_import.import_appointments(large, _rows(300))
+    assert len(small.log) == len(large.log)
+    assert any(s.startswith("COPY appt_import_stage") for s in large.log)
+    assert large.copied.count("\n") == 300
+    assert "nextval('public.appointments_id_seq')" in "".join(large.log)
+    assert "status::appointment_status" in "".join(large.log)
+    assert report.received == 300 and report.inserted == 2
+
+
+def test_report_merges_python_and_sql_errors():
+    conn = _Conn(
+        results=[
+            {
+                "row_no": 2,
+                "appt_id": None,
+                "error_code": "conflict",
+                "error_message": "Scheduling conflict detected",
+                "error_detail": '{"tech": ["41"], "vehicle": [], "rows": [1]}',
+            }
+        ]
+    )
+    rows = _rows(2) + [(3, "invalid JSON: x"), (4, {"customer_name": "No start"})]
+    report = appointment_import.import_appointments(conn, rows)
+    assert conn.copied.count("\n") == 2
+    errors = report.as_dict()["errors"]
+    assert [(e["row"], e["code"]) for e in errors] == [
+        (2, "conflict"),
+        (3, "invalid"),
+        (4, "invalid"),
+    ]
+    assert errors[0]["conflicts"]["rows"] == [1]
+    assert errors[2]["field"] == "start_ts"
+    # Only failed rows are fetched back unless ids were requested
+    assert "WHERE error_code IS NOT NULL" in conn.log[-1]
+
+
+def _post(conn, monkeypatch, body, content_type, query=""):
+    monkeypatch.setattr(local_server, "safe_conn", lambda: (conn, False, None))
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"role": "Owner"})
+    path = "/api/admin/appointments/import" + query
+    with local_server.app.test_request_context(
+        path, method="POST", data=body, content_type=content_type
+    ):
+        local_server.g.tenant_id = "t1"
+        return make_response(local_server.import_appointments())
+
+
+def test_import_endpoint(monkeypatch):
+    body = "start_ts,customer_name\n2025-03-04T08:00:00Z,Ann\n"
+    conn = _Conn()
+    resp = _post(conn, monkeypatch, body, "text/csv", "?dryRun=true")
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    assert data["received"] == 1 and data["dry_run"] is True
+    assert conn.rolled_back
+
+    assert _post(_Conn(), monkeypatch, body, "text/plain").status_code == 415
+    assert _post(_Conn(), monkeypatch, "", "text/csv").status_code == 400
+
+
+def _one(cur, sql, params=()):
+    cur.execute(sql, params)
+    row = cur.fetchone()
+    return list(row.values())[0] if isinstance(row, dict) else row[0]
+
+
+@pytest.mark.integration
+def test_import_dedupes_and_rejects_conflicts(pg_container):
+    tech_a = "33333333-3333-3333-3333-333333333333"
+    tech_b = "44444444-4444-4444-4444-444444444444"
+    conn = local_server.db_conn()
+    try:
+        with conn.cursor() as cur:
+            # Production columns test_schema.sql lacks; rolled back with the rest
+            cur.execute(
+                "ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL"
+                " DEFAULT TRUE, ADD COLUMN IF NOT EXISTS total_services INT,"
+                " ADD COLUMN IF NOT EXISTS last_service_date DATE"
+            )
+            cur.execute("ALTER TABLE appointments ADD COLUMN IF NOT EXISTS block_range tstzrange")
+            cust = _one(
+                cur,
+                "INSERT INTO customers (name, phone) VALUES ('Import Known', '555-0100')"
+                " RETURNING id",
+            )
+            veh = _one(
+                cur,
+                "INSERT INTO vehicles (customer_id, make, model, license_plate)"
+                " VALUES (%s, 'Ford', 'Transit', 'IMP-EX1') RETURNING id",
+                (cust,),
+            )
+            existing = _one(
+                cur,
+                "INSERT INTO appointments (customer_id, vehicle_id, status, start_ts, end_ts,"
+                " tech_id, block_range) VALUES (%s, %s, 'SCHEDULED', '2031-01-01T10:00Z',"
+                " '2031-01-01T11:00Z', %s, tstzrange('2031-01-01T10:00Z', '2031-01-01T11:00Z'))"
+                " RETURNING id",
+                (cust, veh, tech_a),
+            )
+        rows = [
+            # existing customer + vehicle, busy vehicle
+            {
+                "start": "2031-01-01T10:30Z",
+                "customer_phone": "555-0100",
+                "license_plate": "IMP-EX1",
+                "techId": tech_b,
+            },
+            # busy tech
+            {
+                "start": "2031-01-01T10:30Z",
+                "customer_name": "Import Fleet",
+                "customer_phone": "555-0199",
+                "license_plate": "IMP-NF1",
+                "techId": tech_a,
+            },
+            # rows 3 and 4 share one new customer (phone) and vehicle (plate)
+            {
+                "start": "2031-01-02T09:00Z",
+                "customer_name": "Import Fleet",
+                "customer_phone": "555-0199",
+                "license_plate": "IMP-NF1",
+                "techId": tech_b,
+            },
+            {
+                "start": "2031-01-02T13:00Z",
+                "customer_name": "Import Fleet Ltd",
+                "customer_phone": "555-0199",
+                "license_plate": "imp-nf1",
+                "techId": tech_a,
+            },
+            # overlaps row 3 on tech_b
+            {
+                "start": "2031-01-02T09:30Z",
+                "customer_name": "Import Walk In",
+                "license_plate": "IMP-WI1",
+                "techId": tech_b,
+            },
+        ]
+        report = appointment_import.import_appointments(
+            conn, enumerate(rows, start=1), include_ids=True
+        )
+        assert report.inserted == 2
+        assert report.customers_created == 1 and report.vehicles_created == 1
+        conflicts = {e["row"]: e["conflicts"] for e in report.errors}
+        assert conflicts == {
+            1: {"tech": [], "vehicle": [str(existing)], "rows": []},
+            2: {"tech": [str(existing)], "vehicle": [], "rows": []},
+            5: {"tech": [], "vehicle": [], "rows": [3]},
+        }
+        ids = [r["id"] for r in report.ids]
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT DISTINCT a.customer_id, a.vehicle_id, c.phone, v.license_plate"
+                "  FROM appointments a JOIN customers c ON c.id = a.customer_id"
+                "  JOIN vehicles v ON v.id = a.vehicle_id WHERE a.id::text = ANY(%s)",
+                (ids,),
+            )
+            found = cur.fetchall()
+        assert len(found) == 1
+        row = found[0]
+        assert (row["phone"], row["license_plate"]) == ("555-0199", "IMP-NF1")
+    finally:
+        conn.rollback()
+        conn.close()
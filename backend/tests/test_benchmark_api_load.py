@@ -0,0 +1,52 @@
+import threading
+
+from backend import benchmark_api_load as bench
+
+
+def test_measure_uses_one_client_per_thread_and_counts_statuses():
+    clients = []
+
+    def factory():
+        clients.append(threading.get_ident())
+
+        def send(url, headers):
+            return 500 if url.endswith("bad") else 200
+
+        return send
+
+    work = [("/ok", {})] * 18 + [("/bad", {})] * 2
+    samples, statuses, wall = bench._measure(factory, work, concurrency=4)
+    assert len(samples) == 20 and wall > 0
+    assert statuses == {200: 18, 500: 2}
+    assert len(clients) == len(set(clients)) <= 4
+
+
+def test_queries_per_request_counts_histogram_delta(monkeypatch):
+    counter = {"n": 0}
+
+    class _Client:
+        def get(self, url, headers=None):
+            counter["n"] += 3 if "t2" in url else 2
+
+    monkeypatch.setattr(bench.srv.app, "test_client", lambda: _Client())
+    monkeypatch.setattr(bench, "db_query_count", lambda: counter["n"])
+    endpoint = bench.Endpoint("x", "/api/x/{tenant_id}")
+    fixtures = [{"tenant_id": "t1"}, {"tenant_id": "t2"}]
+    out = bench.queries_per_request(endpoint, fixtures, [{}, {}], samples=4)
+    assert out == {"mean": 2.5, "max": 3}
+
+
+def test_compare_reports_p95_and_query_deltas():
+    def report(sha, p95, qpr, rows=100):
+        return {
+            "git": {"commit": sha},
+            "mode": "inprocess",
+            "concurrency": 8,
+            "dataset": {"tenants": 1, "rows": {"appointments": rows}},
+            "results": {"board_day": {"p95_ms": p95, "queries_per_request": {"mean": qpr}}},
+        }
+
+    lines = bench.compare(report("a" * 40, 10.0, 4), report("b" * 40, 12.5, 2))
+    assert lines[0].split()[1:3] == ["p95", "aaaaaaaa"]
+    assert "+25.0%" in lines[1] and lines[1].endswith("4 -> 2")
+    assert bench.compare(report("a", 1, 1), report("b", 1, 1, rows=5))[0].startswith("WARNING")
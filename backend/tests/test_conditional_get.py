@@ -0,0 +1,124 @@
+from flask import jsonify, make_response
+
+from backend import local_server
+
+
+class _Cursor:
+    def __init__(self, rows, log):
+        self.rows = rows
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.log.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Conn:
+    def __init__(self, rows, log):
+        self.rows = rows
+        self.log = log
+
+    def cursor(self, *a, **k):
+        return _Cursor(self.rows, self.log)
+
+    def close(self):
+        pass
+
+
+def _setup(monkeypatch, signatures):
+    log = []
+    rows = [{"entity_id": k, "weak_etag": v} for k, v in signatures.items()]
+    monkeypatch.setattr(local_server, "safe_conn", lambda: (_Conn(rows, log), False, None))
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"role": "Advisor"})
+    return log
+
+
+def _call(view, headers=None, **kwargs):
+    with local_server.app.test_request_context("/x", headers=headers or {}):
+        local_server.g.tenant_id = "t1"
+        return make_response(view(**kwargs))
+
+
+def _view(calls, etag=None):
+    @local_server.conditional_get(lambda kw, _t: [f"thing:{kw['thing_id']}"])
+    def view(thing_id):
+        calls.append(thing_id)
+        resp = make_response(jsonify({"id": thing_id}))
+        if etag:
+            resp.headers["ETag"] = etag
+        return resp
+
+    return view
+
+
+def test_stamps_validator_and_answers_304_before_handler(monkeypatch):
+    log = _setup(monkeypatch, {"thing:1": 'W/"a"'})
+    calls = []
+    view = _view(calls)
+
+    first = _call(view, thing_id="1")
+    assert first.status_code == 200
+    validator = first.headers["ETag"]
+    assert validator.startswith('W/"')
+    assert "ANY(%s)" in log[0][0] and log[0][1] == (["thing:1"],)
+
+    second = _call(view, {"If-None-Match": validator}, thing_id="1")
+    assert second.status_code == 304
+    assert second.headers["ETag"] == validator
+    assert calls == ["1"]
+
+
+def test_validator_replaces_handler_etag(monkeypatch):
+    _setup(monkeypatch, {"thing:1": 'W/"a"'})
+    calls = []
+    view = _view(calls, etag='"content-hash"')
+
+    validator = _call(view, thing_id="1").headers["ETag"]
+    assert validator.startswith('W/"') and validator != '"content-hash"'
+    # The handler's own ETag is never honoured once signatures exist
+    miss = _call(view, {"If-None-Match": '"content-hash"'}, thing_id="1")
+    assert miss.status_code == 200 and miss.headers["ETag"] == validator
+    hit = _call(view, {"If-None-Match": validator}, thing_id="1")
+    assert hit.status_code == 304
+    assert calls == ["1", "1"]
+
+
+def test_signature_change_invalidates(monkeypatch):
+    _setup(monkeypatch, {"thing:1": 'W/"a"'})
+    calls = []
+    view = _view(calls)
+    validator = _call(view, thing_id="1").headers["ETag"]
+
+    _setup(monkeypatch, {"thing:1": 'W/"b"'})
+    resp = _call(view, {"If-None-Match": validator}, thing_id="1")
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != validator
+    assert len(calls) == 2
+
+
+def test_missing_signature_runs_handler_without_validator(monkeypatch):
+    _setup(monkeypatch, {})
+    calls = []
+    view = _view(calls)
+    resp = _call(view, {"If-None-Match": 'W/"anything"'}, thing_id="9")
+    assert resp.status_code == 200
+    assert "ETag" not in resp.headers
+    assert calls == ["9"]
+
+
+def test_board_keys_skip_future_carryover_and_ranges():
+    with local_server.app.test_request_context("/b?date=2025-03-04&includeCarryover=false"):
+        keys = local_server._board_signature_keys({}, "t1")
+    assert keys == ["board:t1:2025-03-04", "board_meta:t1", "service_catalog:global"]
+    with local_server.app.test_request_context("/b?date=2999-01-01"):
+        assert local_server._board_signature_keys({}, "t1") is None
+    with local_server.app.test_request_context("/b?from=2025-01-01"):
+        assert local_server._board_signature_keys({}, "t1") is None
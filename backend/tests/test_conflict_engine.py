@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+
+from flask import make_response
+
+from backend import conflict_engine, local_server
+
+T0 = datetime(2025, 3, 4, 8, tzinfo=timezone.utc)
+TECH = "11111111-1111-1111-1111-111111111111"
+
+
+def _h(hours):
+    return T0 + timedelta(hours=hours)
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.log.append((sql, params))
+
+    def fetchone(self):
+        return self.conn.one
+
+    def fetchall(self):
+        return self.conn.rows
+
+
+class _Conn:
+    def __init__(self, rows=None, one=None):
+        self.rows = rows or []
+        self.one = one
+        self.log = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+
+def test_compute_gaps_merges_overlapping_busy_and_drops_short_gaps():
+    busy = [(_h(3), _h(4)), (_h(1), _h(2)), (_h(1.5), _h(2.25)), (_h(4.25), _h(5))]
+    gaps = conflict_engine.compute_gaps(busy, T0, _h(6), timedelta(minutes=30))
+    assert gaps == [(T0, _h(1)), (_h(2.25), _h(3)), (_h(5), _h(6))]
+
+
+def test_exclusion_conflict_kind():
+    class Diag:
+        constraint_name = conflict_engine.VEHICLE_CONSTRAINT
+
+    class Err(Exception):
+        pgcode = "23P01"
+        diag = Diag()
+
+    assert conflict_engine.exclusion_conflict_kind(Err()) == "vehicle"
+
+    class TextOnly(Exception):
+        pgcode = "23P01"
+
+    err = TextOnly(f'violates exclusion constraint "{conflict_engine.TECH_CONSTRAINT}"')
+    assert conflict_engine.exclusion_conflict_kind(err) == "tech"
+    assert conflict_engine.exclusion_conflict_kind(ValueError("x")) is None
+
+
+def test_constraints_probe_is_cached(monkeypatch):
+    conflict_engine.reset_probe()
+    conn = _Conn(one={"n": 2})
+    assert conflict_engine.constraints_enforced(conn) is True
+    assert conflict_engine.constraints_enforced(conn) is True
+    assert [sql.split()[0] for sql, _ in conn.log] == ["SAVEPOINT", "SELECT", "RELEASE"]
+    conflict_engine.reset_probe()
+    assert conflict_engine.constraints_enforced(_Conn(one={"n": 1})) is False
+    conflict_engine.reset_probe()
+
+
+def test_failed_probe_rolls_back_to_its_savepoint():
+    class _Failing(_Cursor):
+        def execute(self, sql, params=None):
+            super().execute(sql, params)
+            if "pg_constraint" in sql:
+                raise RuntimeError("permission denied for pg_constraint")
+
+    conflict_engine.reset_probe()
+    conn = _Conn()
+    conn.cursor = lambda *a, **k: _Failing(conn)
+    assert conflict_engine.constraints_enforced(conn) is False
+    assert conn.log[-1][0] == "ROLLBACK TO SAVEPOINT conflict_probe"
+    conflict_engine.reset_probe()
+
+
+def _get(path):
+    with local_server.app.test_request_context(path):
+        local_server.g.tenant_id = "t1"
+        return make_response(local_server.scheduling_free_slots())
+
+
+def test_free_slots_endpoint_uses_the_scheduling_snapshot(monkeypatch):
+    inactive = "22222222-2222-2222-2222-222222222222"
+    busy = {"tech_id": TECH, "vehicle_id": "v1", "start_ts": _h(1), "end_ts": _h(2)}
+    results = [[{"id": TECH, "name": "Ana", "initials": "AN"}], [{**busy, "status": "SCHEDULED"}]]
+
+    class _Sequenced(_Cursor):
+        def fetchall(self):
+            return results.pop(0) if results else []
+
+    conn = _Conn()
+    conn.cursor = lambda *a, **k: _Sequenced(conn)
+    monkeypatch.setattr(local_server, "safe_conn", lambda: (conn, False, None))
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"role": "Advisor"})
+
+    resp = _get(
+        f"/x?tech_id={TECH},{inactive}&from=2025-03-04T08:00:00Z&to=2025-03-04T12:00:00Z"
+        "&min_minutes=60"
+    )
+    assert resp.status_code == 200
+    techs = resp.get_json()["data"]["techs"]
+    assert list(techs) == [TECH]  # technicians.is_active filtered by the snapshot query
+    assert [s["minutes"] for s in techs[TECH]] == [60, 120]
+    assert any("is_active IS TRUE" in sql for sql, _ in conn.log)
+
+    assert _get("/x?tech_id=nope&from=2025-03-04T08:00:00Z&to=2025-03-05").status_code == 400
+    assert _get(f"/x?tech_id={TECH}&from=2025-03-04&to=2025-06-04").status_code == 400
+    assert _get(f"/x?tech_id={TECH}&from=2025-03-05&to=2025-03-04").status_code == 400
@@ -0,0 +1,92 @@
+import base64
+import re
+import time
+import zlib
+
+import pytest
+
+from backend import document_render as dr
+
+BRAND = {"name": "Test Garage", "address": "1 Main St", "phone": "555-0100", "email": ""}
+
+needs_reportlab = pytest.mark.skipif(not dr.PDF_AVAILABLE, reason="reportlab not installed")
+
+
+def _invoice(n_items, **inv):
+    invoice = {"id": "inv-42", "status": "PAID", "subtotal_cents": 250000, "total_cents": 250000}
+    invoice.update(amount_paid_cents=250000, amount_due_cents=0, **inv)
+    items = [
+        {
+            "name": f"Brake job (axle {i}) <rear>",
+            "quantity": 1,
+            "unit_price_cents": 12550,
+            "total_cents": 12550,
+        }
+        for i in range(n_items)
+    ]
+    payments = [{"amount": "25.00", "method": "credit_card", "created_at": "2025-03-03T10:00:00"}]
+    return {"invoice": invoice, "lineItems": items, "payments": payments}
+
+
+def _page_text(pdf: bytes) -> str:
+    """Concatenated content streams (reportlab writes ASCII85 + Flate)."""
+    text = []
+    for raw in re.findall(rb"stream\r?\n(.*?)endstream", pdf, re.S):
+        raw = raw.strip()
+        if raw.endswith(b"~>"):
+            raw = raw[:-2]
+        text.append(zlib.decompress(base64.a85decode(raw)).decode("latin-1"))
+    return "\n".join(text)
+
+
+@needs_reportlab
+def test_pdf_paginates_with_repeated_header_and_page_count():
+    pdf = dr.render_pdf("receipt", _invoice(120), BRAND)
+    assert pdf.startswith(b"%PDF-") and pdf.rstrip().endswith(b"%%EOF")
+    pages = int(re.search(rb"/Count (\d+)", pdf).group(1))
+    assert pages > 1
+    text = _page_text(pdf)
+    assert f"(Page {pages} of {pages})" in text
+    assert text.count("(Description) Tj") == pages  # table header repeats
+    assert text.count("(Test Garage) Tj") >= pages  # branding on every page
+    assert "(Brake job \\(axle 0\\) <) Tj (rear) Tj (>) Tj" in text
+    assert "($2,500.00) Tj" in text and "($25.00) Tj" in text  # total, payment
+    assert pdf == dr.render_pdf("receipt", _invoice(120), BRAND)  # deterministic
+
+
+def test_html_escapes_and_estimates_omit_payments():
+    html = dr.render_html("estimate", _invoice(2), BRAND)
+    assert "Invoice Estimate inv-42" in html and "&lt;rear&gt;" in html
+    assert "Payments" not in html
+
+
+def test_pool_rejects_when_saturated_and_renders_in_child_process():
+    busy = dr.RenderPool(workers=1, max_pending=1, timeout=30)
+    busy._slots.acquire()
+    with pytest.raises(dr.RenderUnavailable) as ei:
+        busy.render("receipt", "html", _invoice(1), BRAND)
+    assert ei.value.code == "render_busy" and busy.rejected == 1
+
+    pool = dr.RenderPool(workers=1, max_pending=2, timeout=60)
+    try:
+        body = pool.render("receipt", "html", _invoice(3), BRAND)
+    finally:
+        pool.shutdown()
+    assert body == dr.render_html("receipt", _invoice(3), BRAND).encode("utf-8")
+
+
+def test_timed_out_render_recycles_the_pool():
+    pool = dr.RenderPool(workers=1, max_pending=1, timeout=60)
+    try:
+        assert pool._run(abs, -1) == 1  # pool started and warmed
+        (proc,) = pool._executor._processes.values()
+        pool.timeout = 0.5
+        with pytest.raises(dr.RenderUnavailable) as ei:
+            pool._run(time.sleep, 30)
+        assert ei.value.code == "render_timeout"
+        proc.join(5)
+        assert not proc.is_alive()  # the hung call did not keep its process
+        pool.timeout = 60
+        assert pool._run(abs, -3) == 3  # slot released, fresh pool
+    finally:
+        pool.shutdown(terminate=True)
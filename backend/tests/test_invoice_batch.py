@@ -0,0 +1,167 @@
+from datetime import date
+
+import jwt
+import pytest
+
+from backend import generate_invoices, invoice_service, local_server
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.connection = conn
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def mogrify(self, template, args):
+        return (template % tuple(repr(a) for a in args)).encode()
+
+    def execute(self, sql, params=None):
+        sql = sql.decode() if isinstance(sql, bytes) else sql
+        self.conn.statements.append((sql, params))
+        if "FROM appointments a" in sql:
+            self.rows = self.conn.appointments
+        elif "FROM appointment_services" in sql:
+            self.rows = self.conn.services
+        else:
+            self.rows = []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Conn:
+    encoding = "UTF8"
+
+    def __init__(self, appointments, services):
+        self.appointments = appointments
+        self.services = services
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+
+def _appt(appt_id, status="COMPLETED", has_invoice=False):
+    return {
+        "id": appt_id,
+        "status": status,
+        "customer_id": "1",
+        "vehicle_id": "1",
+        "has_invoice": has_invoice,
+    }
+
+
+def _svc(appt_id, name, price):
+    return {
+        "appointment_id": appt_id,
+        "id": f"s-{appt_id}-{name}",
+        "name": name,
+        "estimated_price": price,
+        "estimated_hours": 1,
+        "service_operation_id": None,
+    }
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def use(appointments, services):
+        conn = _Conn(appointments, services)
+        monkeypatch.setattr(invoice_service.srv, "db_conn", lambda: conn)
+        return conn
+
+    return use
+
+
+def test_bulk_generation_uses_one_statement_per_phase(fake_db):
+    conn = fake_db(
+        [
+            _appt("1"),
+            _appt("2", status="completed"),
+            _appt("3", "SCHEDULED"),
+            _appt("4", has_invoice=True),
+        ],
+        [_svc("1", "Oil", 50), _svc("1", "Filter", "12.50"), _svc("2", "Brakes", 200)],
+    )
+    result = invoice_service.generate_invoices_bulk(
+        ["1", "2", "3", "4", "5", "abc"], tenant_id="t1"
+    )
+
+    outcomes = {r["appointment_id"]: r.get("code") or r["total_cents"] for r in result["results"]}
+    assert outcomes == {
+        "1": 6250,
+        "2": 20000,
+        "3": "INVALID_STATE",
+        "4": "ALREADY_EXISTS",
+        "5": "NOT_FOUND",
+        "abc": "NOT_FOUND",
+    }
+    assert result["summary"] == {"requested": 6, "created": 2, "skipped": 4}
+
+    sqls = [s for s, _ in conn.statements]
+    assert "FOR UPDATE OF a" in sqls[1] and conn.statements[1][1][0] == ("1", "2", "3", "4", "5")
+    (invoices,) = [s for s in sqls if "INSERT INTO invoices" in s]
+    (items,) = [s for s in sqls if "INSERT INTO invoice_line_items" in s]
+    assert invoices.count("'USD'") == 2 and items.count("now())") == 3
+    # tenant, lock, column probe (savepoint, select, release), services, invoices, line items
+    assert len(sqls) == 8 and sqls[4].startswith("RELEASE")
+
+
+def test_bulk_generation_by_day_and_cli_exit_code(fake_db, capsys):
+    conn = fake_db([_appt("7", "SCHEDULED")], [])
+    code = generate_invoices.main(["--date", "2025-03-03"])
+    assert code == 1 and "INVALID_STATE" in capsys.readouterr().out
+    sql, params = conn.statements[0]
+    assert "NOT EXISTS (SELECT 1 FROM invoices i" in sql
+    assert params[1].isoformat() == "2025-03-03T00:00:00+00:00"
+    assert params[2].date() == date(2025, 3, 4)
+
+    with pytest.raises(invoice_service.InvoiceError) as ei:
+        invoice_service.generate_invoices_bulk()
+    assert ei.value.code == "INVALID_INPUT"
+
+    conn.statements.clear()
+    result = invoice_service.generate_invoices_bulk(["x", "-1"])
+    assert [r["code"] for r in result["results"]] == ["NOT_FOUND", "NOT_FOUND"]
+    assert conn.statements == []
+
+
+def test_batch_endpoint_validates_and_returns_outcomes(fake_db, monkeypatch):
+    fake_db([_appt("1")], [_svc("1", "Oil", 50)])
+    token = jwt.encode({"sub": "u", "role": "Advisor"}, local_server.JWT_SECRET, "HS256")
+    client = local_server.app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    bad = client.post("/api/admin/invoices/batch", json={"from": "03/03/2025"}, headers=headers)
+    assert bad.status_code == 400
+    resp = client.post(
+        "/api/admin/invoices/batch", json={"appointment_ids": ["1"]}, headers=headers
+    )
+    assert resp.status_code == 200
+    assert resp.get_json()["data"]["summary"]["created"] == 1
+
+    def broken():
+        raise RuntimeError("password=hunter2")
+
+    monkeypatch.setattr(invoice_service.srv, "db_conn", broken)
+    resp = client.post(
+        "/api/admin/invoices/batch", json={"appointment_ids": ["1"]}, headers=headers
+    )
+    assert resp.status_code == 500 and "hunter2" not in resp.get_data(as_text=True)
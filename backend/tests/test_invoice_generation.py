@@ -116,3 +116,26 @@ def test_generate_invoice_not_found_endpoint(client, pg_container):
     data = resp.get_json()
     assert resp.status_code == 404, data
     assert data["error"]["code"] in ("not_found", "not_found_appointment")
+
+
+@pytest.mark.integration
+def test_generate_invoices_bulk_reports_per_appointment(pg_container):
+    conn = srv.db_conn()
+    try:
+        ok_id = _make_appt(conn)
+        _add_service(conn, ok_id, price=30)
+        _add_service(conn, ok_id, name="Wipers", price=12)
+        open_id = _make_appt(conn, status="SCHEDULED")
+        conn.commit()
+    finally:
+        conn.close()
+
+    result = invoice_service.generate_invoices_bulk([ok_id, open_id, "99999999"])
+    by_id = {r["appointment_id"]: r for r in result["results"]}
+    assert by_id[ok_id]["outcome"] == "created" and by_id[ok_id]["total_cents"] == 4200
+    assert by_id[open_id]["code"] == "INVALID_STATE"
+    assert by_id["99999999"]["code"] == "NOT_FOUND"
+    assert result["summary"] == {"requested": 3, "created": 1, "skipped": 2}
+
+    again = invoice_service.generate_invoices_bulk([ok_id])
+    assert again["results"][0]["code"] == "ALREADY_EXISTS"
@@ -85,3 +85,22 @@ def test_list_invoices_filter_status(pg_container):
     data = resp.get_json()
     assert resp.status_code == 200
     assert all(r["status"] == "VOID" for r in data["data"]["items"])
+
+
+@pytest.mark.integration
+def test_list_invoices_keyset_cursor_walks_all_pages(pg_container):
+    conn = srv.db_conn()
+    try:
+        ids = _seed_invoices(conn)
+    finally:
+        conn.close()
+    client = srv.app.test_client()
+    seen = []
+    url = "/api/admin/invoices?pageSize=2"
+    while url:
+        data = client.get(url).get_json()["data"]
+        seen.extend(r["id"] for r in data["items"])
+        cursor = data["next_cursor"]
+        url = f"/api/admin/invoices?pageSize=2&cursor={cursor}" if cursor else None
+    assert len(seen) == len(set(seen))
+    assert set(ids) <= set(seen)
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+
+from backend import invoice_service, local_server
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+        if "COUNT(*)" in sql:
+            self.rows = [{"ct": self.conn.count}]
+        elif "ORDER BY i.created_at DESC" in sql:
+            limit, offset = params[-2], params[-1]
+            self.rows = self.conn.invoices[offset : offset + limit]
+        else:
+            self.rows = []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Conn:
+    def __init__(self, invoices, count=0):
+        self.invoices = invoices
+        self.count = count
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+    def sqls(self):
+        return [s for s, _ in self.statements]
+
+
+def _invoices(n):
+    base = datetime(2025, 9, 1, tzinfo=timezone.utc)
+    return [
+        {"id": f"inv-{i:03d}", "status": "SENT", "created_at": base - timedelta(minutes=i)}
+        for i in range(n)
+    ]
+
+
+def test_keyset_page_fetches_one_extra_row_and_skips_count_on_last_page():
+    conn = _Conn(_invoices(5))
+    cur = conn.cursor()
+    page = invoice_service.invoice_list_page(
+        cur, select_sql="SELECT i.id, i.created_at", where=[], params=[], page_size=3
+    )
+    assert [r["id"] for r in page["items"]] == ["inv-000", "inv-001", "inv-002"]
+    assert page["has_more"] is True
+    at, last_id = invoice_service.decode_invoice_cursor(page["next_cursor"])
+    assert (at, last_id) == (conn.invoices[2]["created_at"], "inv-002")
+    assert conn.statements[0][1][-2:] == [4, 0]  # page_size + 1, no offset
+
+    conn.statements.clear()
+    page = invoice_service.invoice_list_page(
+        cur,
+        select_sql="SELECT i.id, i.created_at",
+        where=["i.status = %s"],
+        params=["SENT"],
+        page_size=10,
+        cursor=page["next_cursor"],
+        count="none",
+    )
+    ((sql, params),) = conn.statements
+    assert "i.status = %s AND (i.created_at, i.id) < (%s, %s)" in sql
+    assert params[:3] == ["SENT", at, "inv-002"] and params[-1] == 0
+    assert page["total_items"] is None and page["next_cursor"] is None
+
+    with pytest.raises(invoice_service.InvoiceError) as ei:
+        invoice_service.decode_invoice_cursor("not-a-cursor")
+    assert ei.value.code == "INVALID_CURSOR"
+
+
+def test_estimated_count_is_capped_and_exact_count_is_opt_in(monkeypatch):
+    monkeypatch.setattr(invoice_service, "INVOICE_LIST_COUNT_CAP", 5)
+    conn = _Conn(_invoices(8), count=6)
+    cur = conn.cursor()
+    page = invoice_service.invoice_list_page(
+        cur, select_sql="SELECT i.id, i.created_at", where=[], params=[], page_size=2
+    )
+    sql, params = conn.statements[-1]
+    assert "LIMIT %s) capped" in sql and params == [6]
+    assert page["total_items"] == 5 and page["total_exact"] is False
+    assert page["total_pages"] is None
+
+    conn.count = 8
+    page = invoice_service.invoice_list_page(
+        cur,
+        select_sql="SELECT i.id, i.created_at",
+        where=[],
+        params=[],
+        page=2,
+        page_size=2,
+        count="exact",
+    )
+    assert conn.statements[-1] == ("SELECT COUNT(*) AS ct FROM invoices i", [])
+    assert page["total_items"] == 8 and page["total_pages"] == 4
+    assert [r["id"] for r in page["items"]] == ["inv-002", "inv-003"]
+
+
+def test_invoice_list_route_accepts_cursor_and_rejects_bad_ones(monkeypatch):
+    conn = _Conn(_invoices(3), count=3)
+    monkeypatch.setattr(local_server, "db_conn", lambda: conn)
+    token = jwt.encode({"sub": "u", "role": "Advisor"}, local_server.JWT_SECRET, "HS256")
+    client = local_server.app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = client.get("/api/admin/invoices?pageSize=2", headers=headers)
+    assert first.status_code == 200, first.get_json()
+    data = first.get_json()["data"]
+    assert data["total_items"] == 3 and data["total_exact"] is True
+    assert data["has_more"] is True
+
+    conn.statements.clear()
+    nxt = client.get(
+        f"/api/admin/invoices?pageSize=2&cursor={data['next_cursor']}", headers=headers
+    )
+    assert nxt.status_code == 200
+    assert nxt.get_json()["data"]["total_items"] is None
+    assert not any("COUNT(*)" in s for s in conn.sqls())
+
+    bad = client.get("/api/admin/invoices?cursor=%%%", headers=headers)
+    assert bad.status_code == 400
+    assert bad.get_json()["error"]["code"] == "invalid_cursor"
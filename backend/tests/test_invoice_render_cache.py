@@ -0,0 +1,127 @@
+import os
+from datetime import datetime, timezone
+
+import jwt
+import pytest
+
+from backend import invoice_service, local_server, render_cache
+
+INV = "inv-render-1"
+STAMP = datetime(2025, 3, 3, 10, 0, tzinfo=timezone.utc)
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(sql)
+
+    def fetchone(self):
+        return self.conn.row
+
+
+class _Conn:
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = render_cache.DiskRenderCache(str(tmp_path), max_bytes=25, enabled=True)
+    cache.set("a", b"x" * 10)
+    cache.set("b", b"y" * 10)
+    os.utime(tmp_path / "a.bin", (1, 1))
+    os.utime(tmp_path / "b.bin", (2, 2))
+    assert cache.get("a") == b"x" * 10  # touch: b is now least recently used
+    cache.set("c", b"z" * 10)
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    assert render_cache.render_key(INV, "t1", "receipt.pdf") != render_cache.render_key(
+        INV, "t2", "receipt.pdf"
+    )
+
+
+def test_invoice_details_come_from_one_query(monkeypatch):
+    row = {
+        "id": INV,
+        "appointment_id": "7",
+        "customer_id": "1",
+        "vehicle_id": "2",
+        "status": "DRAFT",
+        "total_cents": 5000,
+        "updated_at": STAMP,
+        "line_items": [{"id": "li1", "position": 0, "name": "Oil"}],
+        "payments": [{"id": "p1", "amount": "50.00"}, {"id": "p2", "amount": "12.50"}],
+        "vehicle_owner_id": "1",
+    }
+    conn = _Conn(row)
+    monkeypatch.setattr(invoice_service.srv, "db_conn", lambda: conn)
+    data = invoice_service.fetch_invoice_details(INV)
+    assert len(conn.statements) == 1 and "json_agg" in conn.statements[0]
+    assert [p["amount"] for p in data["payments"]] == [50, 12.5]
+    assert data["lineItems"][0]["name"] == "Oil" and data["vehicleOwnerId"] == "1"
+    assert "line_items" not in data["invoice"]
+
+
+@pytest.fixture
+def exports(monkeypatch, tmp_path):
+    calls = {"details": 0, "version": 0}
+    state = {"updated_at": STAMP, "owner": "1"}
+
+    def details(invoice_id):
+        calls["details"] += 1
+        inv = {"id": invoice_id, "status": "DRAFT", "total_cents": 4200, "customer_id": "1"}
+        inv.update(vehicle_id="2", updated_at=state["updated_at"])
+        return {"invoice": inv, "lineItems": [], "payments": [], "vehicleOwnerId": state["owner"]}
+
+    def version(invoice_id):
+        calls["version"] += 1
+        return {
+            "id": invoice_id,
+            "updated_at": state["updated_at"].isoformat(),
+            "customer_id": "1",
+            "vehicle_id": "2",
+            "vehicle_owner_id": state["owner"],
+        }
+
+    monkeypatch.setattr(invoice_service, "fetch_invoice_details", details)
+    monkeypatch.setattr(invoice_service, "fetch_invoice_version", version)
+    cache = render_cache.DiskRenderCache(str(tmp_path), enabled=True)
+    monkeypatch.setattr(local_server, "_INVOICE_RENDER_CACHE", cache)
+    token = jwt.encode({"sub": "u", "role": "Advisor"}, local_server.JWT_SECRET, "HS256")
+    client = local_server.app.test_client()
+
+    def get(kind):
+        return client.get(
+            f"/api/admin/invoices/{INV}/{kind}", headers={"Authorization": f"Bearer {token}"}
+        )
+
+    return get, calls, state
+
+
+def test_repeat_download_is_served_from_disk_without_rendering(exports):
+    get, calls, state = exports
+    first = get("receipt.html")
+    second = get("receipt.html")
+    assert first.status_code == second.status_code == 200
+    assert second.get_data() == first.get_data() and INV in second.get_data(as_text=True)
+    assert calls["details"] == 1  # second request: version probe only
+
+    state["updated_at"] = datetime(2025, 3, 4, tzinfo=timezone.utc)  # payment recorded
+    get("receipt.html")
+    assert calls["details"] == 2
+
+    state["owner"] = "9"  # vehicle reassigned; cached bytes must not leak
+    assert get("receipt.html").status_code == 400
@@ -0,0 +1,69 @@
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from flask import Flask, jsonify
+
+from backend import json_provider
+from backend.json_provider import FastJSONProvider, install_json_provider
+
+
+def _app():
+    app = Flask(__name__)
+    install_json_provider(app)
+    return app
+
+
+def test_native_types_match_legacy_per_row_conversion():
+    app = _app()
+    aware = datetime(2025, 3, 3, 9, 30, 15, 120000, tzinfo=timezone.utc)
+    naive = datetime(2025, 3, 3, 9, 30)
+    uid = uuid.uuid4()
+    with app.app_context():
+        body = jsonify(
+            {
+                "start": aware,
+                "naive": naive,
+                "day": date(2025, 3, 3),
+                "price": Decimal("12.50"),
+                "id": uid,
+            }
+        ).get_data(as_text=True)
+    data = json.loads(body)
+    assert data["start"] == aware.isoformat()
+    assert data["start"].endswith("+00:00")
+    assert data["naive"] == naive.isoformat()
+    assert data["day"] == "2025-03-03"
+    assert data["price"] == 12.5
+    assert data["id"] == str(uid)
+
+
+def test_output_is_compact_sorted_and_newline_terminated():
+    app = _app()
+    with app.app_context():
+        body = jsonify({"b": 1, "a": [1, 2]}).get_data(as_text=True)
+    assert body == '{"a":[1,2],"b":1}\n'
+
+
+def test_stdlib_fallback_produces_identical_bytes(monkeypatch):
+    app = _app()
+    payload = {"z": Decimal("1.25"), "a": datetime(2024, 1, 1, tzinfo=timezone.utc), "n": None}
+    fast = app.json.dumps(payload)
+    monkeypatch.setattr(json_provider, "HAS_ORJSON", False)
+    assert app.json.dumps(payload) == fast
+
+
+def test_install_is_idempotent_and_loads_round_trips():
+    app = _app()
+    provider = app.json
+    install_json_provider(app)
+    assert app.json is provider
+    assert isinstance(app.json, FastJSONProvider)
+    assert app.json.loads(b'{"a": [1, "x"]}') == {"a": [1, "x"]}
+
+
+def test_local_server_uses_fast_provider():
+    from backend import local_server
+
+    assert isinstance(local_server.app.json, FastJSONProvider)
@@ -0,0 +1,236 @@
+import io
+import json
+import logging
+
+import pytest
+
+from backend import local_server
+from backend.log_pipeline import (
+    AsyncLogWorker,
+    DebugCategoryGate,
+    LoggerBatchWriter,
+    NdjsonBatchWriter,
+)
+
+
+def test_gate_disabled_by_default():
+    gate = DebugCategoryGate(env={})
+    assert gate.allow("tenant") is False
+    assert gate.enabled("sql") is False
+    assert gate.snapshot()["emitted"] == {}
+
+
+def test_gate_parses_env_categories_wildcard_and_rates():
+    gate = DebugCategoryGate(
+        env={
+            "DEBUG_LOG_CATEGORIES": "Tenant, auth,sql",
+            "DEBUG_LOG_SAMPLE_RATE": "0.5",
+            "DEBUG_LOG_SAMPLE_AUTH": "1",
+            "DEBUG_LOG_SAMPLE_SQL": "0",
+        }
+    )
+    assert gate.snapshot()["enabled"] == {"tenant": 0.5, "auth": 1.0}
+    assert gate.allow("auth") is True
+    assert gate.allow("move") is False
+
+    everything = DebugCategoryGate(env={"DEBUG_LOG_CATEGORIES": "*"})
+    assert everything.allow("move") is True
+    assert everything.enabled("anything") is True
+
+
+def test_gate_sampling_counts_emitted_and_sampled_out(monkeypatch):
+    gate = DebugCategoryGate(env={})
+    gate.set("board", True, sample_rate=0.25)
+    draws = iter([0.1, 0.9, 0.3, 0.2])
+    monkeypatch.setattr("backend.log_pipeline.random.random", lambda: next(draws))
+    results = [gate.allow("board") for _ in range(4)]
+    assert results == [True, False, False, True]
+    snap = gate.snapshot()
+    assert snap["emitted"] == {"board": 2}
+    assert snap["sampled_out"] == {"board": 2}
+
+
+def test_gate_runtime_toggle_and_reset():
+    gate = DebugCategoryGate(env={"DEBUG_LOG_CATEGORIES": "appt"})
+    gate.set("appt", False)
+    assert gate.allow("appt") is False
+    gate.set("all", True)
+    assert gate.allow("csrf") is True
+    gate.reset()
+    assert gate.snapshot()["enabled"] == {}
+
+
+@pytest.fixture
+def api_log_level():
+    original = local_server.log.level
+    yield local_server.log.setLevel
+    local_server.log.setLevel(original)
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    g = DebugCategoryGate(env={})
+    monkeypatch.setattr(local_server, "_DEBUG_LOG_GATE", g)
+    return g
+
+
+def test_debug_log_is_noop_when_category_disabled(gate, monkeypatch):
+    emitted = []
+    monkeypatch.setattr(local_server._async_log, "emit", lambda *a: emitted.append(a))
+    local_server._debug_log("tenant", "value=%s", object())
+    assert emitted == []
+
+
+def test_debug_log_queues_unformatted_record_when_enabled(gate, monkeypatch, api_log_level):
+    emitted = []
+    monkeypatch.setattr(local_server._async_log, "emit", lambda *a: emitted.append(a))
+    api_log_level(logging.DEBUG)
+    gate.set("move", True)
+    local_server._debug_log("move", "card=%s status=%s", 7, "READY")
+    assert emitted == [
+        (
+            "debug",
+            {
+                "type": "debug",
+                "category": "move",
+                "msg": "card=%s status=%s",
+                "args": (7, "READY"),
+                "request_id": None,
+            },
+        )
+    ]
+
+
+def test_debug_log_respects_logger_level(gate, monkeypatch, api_log_level):
+    emitted = []
+    monkeypatch.setattr(local_server._async_log, "emit", lambda *a: emitted.append(a))
+    api_log_level(logging.INFO)
+    gate.set("move", True)
+    local_server._debug_log("move", "suppressed")
+    assert emitted == []
+
+
+def test_admin_endpoint_toggles_categories(gate, monkeypatch, api_log_level):
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"sub": "owner"})
+    api_log_level(logging.INFO)
+    client = local_server.app.test_client()
+    resp = client.patch(
+        "/api/admin/debug-log/categories",
+        json={"categories": {"tenant": {"enabled": True, "sample_rate": 0.2}, "auth": True}},
+    )
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    data = resp.get_json()["data"]
+    assert data["enabled"] == {"tenant": 0.2, "auth": 1.0}
+    assert "sql" in data["known"]
+
+    resp = client.patch("/api/admin/debug-log/categories", json={"categories": ["tenant"]})
+    assert resp.status_code == 400
+
+    resp = client.get("/api/admin/debug-log/categories")
+    assert resp.get_json()["data"]["enabled"] == {"tenant": 0.2, "auth": 1.0}
+
+
+class _CollectingWriter:
+    def __init__(self):
+        self.batches = []
+
+    def write_batch(self, batch):
+        self.batches.append(list(batch))
+
+
+def _request_record(i):
+    return {"type": "api.request", "request_id": f"rid-{i}", "status": 200}
+
+
+def test_worker_drains_in_batches_up_to_batch_max(monkeypatch):
+    monkeypatch.setenv("LOG_BATCH_MAX", "4")
+    writer = _CollectingWriter()
+    worker = AsyncLogWorker(logging.getLogger("test.pipeline"), writer=writer, start=False)
+    for i in range(10):
+        worker.emit("info", _request_record(i))
+    assert worker.drain() == 10
+    assert [len(b) for b in writer.batches] == [4, 4, 2]
+    stats = worker.stats()
+    assert stats["emitted"] == 10
+    assert stats["batches"] == 3
+    assert stats["max_batch_size"] == 4
+    assert stats["avg_batch_size"] == pytest.approx(10 / 3, rel=1e-2)
+    assert stats["flush_ms_avg"] is not None
+    assert stats["drop_rate"] == 0.0
+
+
+def test_full_queue_rejects_new_records_without_evicting(monkeypatch):
+    monkeypatch.setenv("LOG_QUEUE_MAX", "3")
+    monkeypatch.setenv("LOG_SHED_HIGH_WATER", "1")
+    writer = _CollectingWriter()
+    worker = AsyncLogWorker(logging.getLogger("test.pipeline"), writer=writer, start=False)
+    for i in range(5):
+        worker.emit("info", _request_record(i))
+    worker.drain()
+    kept = [p["request_id"] for b in writer.batches for _, p in b]
+    assert kept == ["rid-0", "rid-1", "rid-2"]
+    stats = worker.stats()
+    assert stats["dropped_full"] == 2
+    assert stats["dropped_by_category"] == {"api.request": 2}
+    assert stats["drop_rate"] == pytest.approx(0.4)
+
+
+def test_debug_records_are_shed_above_high_water(monkeypatch):
+    monkeypatch.setenv("LOG_QUEUE_MAX", "10")
+    monkeypatch.setenv("LOG_SHED_HIGH_WATER", "0.5")
+    monkeypatch.setattr("backend.log_pipeline.random.random", lambda: 0.99)
+    worker = AsyncLogWorker(
+        logging.getLogger("test.pipeline"), writer=_CollectingWriter(), start=False
+    )
+    for i in range(6):
+        worker.emit("info", _request_record(i))
+    worker.emit("debug", {"type": "debug", "category": "tenant", "msg": "x", "args": ()})
+    worker.emit("info", _request_record(99))
+    stats = worker.stats()
+    assert stats["shed_by_category"] == {"debug.tenant": 1}
+    assert stats["accepted"] == 7
+    assert stats["queue_size"] == 7
+
+
+def test_ndjson_writer_emits_one_write_per_batch():
+    class _Stream(io.StringIO):
+        writes = 0
+
+        def write(self, s):
+            type(self).writes += 1
+            return super().write(s)
+
+    stream = _Stream()
+    logger = logging.getLogger("test.ndjson")
+    logger.setLevel(logging.INFO)
+    writer = NdjsonBatchWriter(stream, logger=logger)
+    writer.write_batch(
+        [
+            ("info", _request_record(1)),
+            ("debug", {"type": "debug", "category": "sql", "msg": "q=%s", "args": (1,)}),
+            ("warning", {"type": "debug", "category": "auth", "msg": "n=%s", "args": (2,)}),
+        ]
+    )
+    assert _Stream.writes == 1
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [d["msg"] for d in lines] == ["api.request rid=rid-1", "debug.auth n=2"]
+    assert lines[0]["request_id"] == "rid-1" and lines[0]["level"] == "INFO"
+    assert lines[1]["category"] == "auth"
+
+
+def test_log_writer_defaults_to_logger_and_ndjson_is_opt_in(monkeypatch):
+    monkeypatch.delenv("API_LOG_FORMAT", raising=False)
+    worker = AsyncLogWorker(logging.getLogger("test.default"), start=False)
+    assert local_server._make_log_writer() is None
+    assert isinstance(worker.writer, LoggerBatchWriter)
+    monkeypatch.setenv("API_LOG_FORMAT", "ndjson")
+    assert isinstance(local_server._make_log_writer(), NdjsonBatchWriter)
+
+
+def test_log_pipeline_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"sub": "advisor"})
+    resp = local_server.app.test_client().get("/api/admin/metrics/log-pipeline")
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    for key in ("batches", "avg_batch_size", "flush_ms_p95", "drop_rate", "queue_high_water"):
+        assert key in data
@@ -0,0 +1,74 @@
+import jwt
+
+from backend import local_server
+from backend import message_template_registry as registry
+
+
+def _row(slug, label, body="Hi {{ name }}", category=None, active=True):
+    return {
+        "id": f"id-{slug}",
+        "slug": slug,
+        "label": label,
+        "channel": "sms",
+        "category": category,
+        "body": body,
+        "variables": [],
+        "is_active": active,
+    }
+
+
+BODY = (
+    "Hi {{ customer.name }}, \\{{ raw }} {{ bad path }} {{ vehicle.year }} "
+    '{{ shop | "Edgar\'s" }} {{ missing }}'
+)
+
+
+def test_render_plan_matches_frontend_semantics():
+    plan = registry.compile_body(BODY)
+    out = plan.render({"customer": {"name": "Ann"}, "vehicle": {"year": 2019}})
+    assert out == "Hi Ann, {{ raw }} {{ bad path }} 2019 Edgar's [MISSING: missing]"
+    assert plan.variables == ["customer.name", "missing", "shop", "vehicle.year"]
+    assert local_server._extract_variables_from_body(BODY) == plan.variables
+    assert registry.compile_body(BODY) is plan  # parsed once per distinct body
+    assert plan.render_many([{"customer": {"name": n}} for n in ("A", "B")])[1].startswith("Hi B,")
+
+
+def test_registry_loads_once_until_bumped_or_signature_changes():
+    loads, signature = [], ["v1"]
+
+    def load(tenant):
+        loads.append(tenant)
+        return [_row("b", "Beta", category="x"), _row("a", "Alpha"), _row("c", "Old", active=False)]
+
+    reg = registry.TemplateRegistry(
+        load, fetch_version=lambda t: signature[0], revalidate_seconds=0, enabled=True
+    )
+    entry, cached = reg.get("t1")
+    assert not cached and [r["slug"] for r in entry.query()] == ["b", "a"]
+    assert [r["slug"] for r in entry.query(include_inactive=True, q="OLD")] == ["c"]
+    assert entry.render("a", {"name": "Ann"}) == "Hi Ann"
+    assert reg.get("t1") == (entry, True) and len(loads) == 1
+
+    signature[0] = "v2"  # write committed by another worker
+    assert reg.get("t1")[1] is False and len(loads) == 2
+    reg.bump()
+    assert reg.get("t1")[0].etag("t1", ()) != entry.etag("t1", ())
+    assert len(loads) == 3
+
+
+def test_list_endpoint_answers_if_none_match(monkeypatch):
+    reg = registry.TemplateRegistry(
+        lambda t: [_row("a", "Alpha")], revalidate_seconds=60, enabled=True
+    )
+    monkeypatch.setattr(local_server, "_MESSAGE_TEMPLATES", reg)
+    token = jwt.encode({"sub": "u", "role": "Owner"}, local_server.JWT_SECRET, "HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    client = local_server.app.test_client()
+
+    first = client.get("/api/admin/message-templates", headers=headers)
+    assert first.status_code == 200 and first.headers["ETag"]
+    etag = first.headers["ETag"]
+    again = client.get("/api/admin/message-templates", headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304 and reg.loads == 1
+    other = client.get("/api/admin/message-templates?channel=email", headers=headers)
+    assert other.headers["ETag"] != etag
@@ -0,0 +1,109 @@
+import json
+import os
+
+from backend import local_server
+from backend.metrics_registry import MetricsRegistry, mark_process_dead, statement_name
+
+
+def _registry(tmp_path=None):
+    return MetricsRegistry(multiproc_dir=str(tmp_path) if tmp_path else None, sync_seconds=0)
+
+
+def test_render_counter_gauge_and_cumulative_histogram():
+    reg = _registry()
+    reg.counter("cache_requests_total", "lookups", ("cache", "result")).inc(
+        cache="etag", result="hit"
+    )
+    reg.gauge("queue_depth", "depth").set(3)
+    hist = reg.histogram("latency_seconds", "latency", ("route",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 2.0):
+        hist.observe(v, route="/api/x")
+    text = reg.render()
+    assert "# TYPE cache_requests_total counter" in text
+    assert 'cache_requests_total{cache="etag",result="hit"} 1' in text
+    assert f'queue_depth{{pid="{os.getpid()}"}} 3' in text
+    assert 'latency_seconds_bucket{route="/api/x",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{route="/api/x",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/api/x",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/api/x"} 4' in text
+    assert 'latency_seconds_sum{route="/api/x"} 2.65' in text
+
+
+def _clone_as_worker(tmp_path, pid):
+    src = tmp_path / f"metrics_{os.getpid()}.json"
+    doc = json.loads(src.read_text())
+    doc["pid"] = pid
+    (tmp_path / f"metrics_{pid}.json").write_text(json.dumps(doc))
+
+
+def test_multiprocess_render_sums_counters_and_labels_gauges_by_pid(tmp_path):
+    reg = _registry(tmp_path)
+    reg.counter("requests_total", "requests").inc(5)
+    reg.gauge("queue_depth", "depth").set(2)
+    reg.gauge("pool_size", "size", mode="max").set(7)
+    reg.histogram("q_seconds", "q", buckets=(1.0,)).observe(0.5)
+    reg.write_snapshot()
+    _clone_as_worker(tmp_path, 424242)
+
+    text = reg.render()
+    assert "requests_total 10" in text
+    assert 'queue_depth{pid="424242"} 2' in text
+    assert f'queue_depth{{pid="{os.getpid()}"}} 2' in text
+    assert "pool_size 7" in text
+    assert "q_seconds_count 2" in text
+
+
+def test_mark_process_dead_archives_cumulative_values_and_drops_gauges(tmp_path):
+    reg = _registry(tmp_path)
+    reg.counter("requests_total", "requests").inc(4)
+    reg.gauge("queue_depth", "depth").set(9)
+    reg.write_snapshot()
+    _clone_as_worker(tmp_path, 515151)
+
+    mark_process_dead(515151, str(tmp_path))
+    assert not (tmp_path / "metrics_515151.json").exists()
+    mark_process_dead(515151, str(tmp_path))  # idempotent
+
+    text = reg.render()
+    assert "requests_total 8" in text
+    assert 'pid="515151"' not in text
+
+
+def test_statement_name_uses_hint_or_verb_and_table():
+    assert statement_name("SELECT a.id FROM appointments a JOIN customers c ON 1=1") == (
+        "select_appointments"
+    )
+    assert statement_name("UPDATE invoices SET paid=1 FROM payments") == "update_invoices"
+    assert statement_name("INSERT INTO public.services(id) VALUES (1)") == "insert_services"
+    assert statement_name("/* board.cards */ SELECT 1") == "board.cards"
+    assert statement_name("-- name: profile_visits\nSELECT 1") == "profile_visits"
+    assert statement_name("BEGIN") == "begin"
+
+
+def test_metrics_endpoint_exposes_request_latency(monkeypatch):
+    monkeypatch.setenv("METRICS_AUTH_TOKEN", "s3cret")
+    client = local_server.app.test_client()
+    auth = {"Authorization": "Bearer s3cret"}
+    client.get("/metrics", headers=auth)
+    resp = client.get("/metrics", headers=auth)
+    assert resp.status_code == 200
+    assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = resp.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}' in body
+    assert "api_log_queue_depth{" in body
+
+
+def test_metrics_endpoint_token(monkeypatch):
+    monkeypatch.setenv("METRICS_AUTH_TOKEN", "s3cret")
+    client = local_server.app.test_client()
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+    ok = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert ok.status_code == 200
+
+
+def test_metrics_endpoint_disabled_without_token(monkeypatch):
+    monkeypatch.delenv("METRICS_AUTH_TOKEN", raising=False)
+    resp = local_server.app.test_client().get("/metrics")
+    assert resp.status_code == 403
+    assert "http_request_duration_seconds" not in resp.get_data(as_text=True)
@@ -0,0 +1,147 @@
+import hashlib
+import threading
+
+import pytest
+
+from backend import local_server
+from backend.app.security import password_pool, passwords
+
+
+def _legacy(password, salt):
+    return hashlib.sha256((salt + password).encode("utf-8")).hexdigest()
+
+
+def test_inline_hash_verify_and_cache(monkeypatch):
+    monkeypatch.setenv("BCRYPT_ROUNDS", "10")
+    pool = password_pool.PasswordPool(workers=0)
+    hashed = pool.hash("Secret123!")
+    assert hashed.startswith("$2b$10$")
+    assert passwords.bcrypt_cost(hashed) == 10
+
+    assert pool.verify("Secret123!", hashed) == (True, False)
+    assert pool.verify("Secret123!", hashed) == (True, False)
+    assert pool.verify("wrong", hashed) == (False, False)
+    assert pool.verify("wrong", hashed) == (False, False)
+    stats = pool.stats()
+    assert stats["cache_hits"] == 1
+    assert stats["cache_entries"] == 1
+    assert stats["pending"] == 0
+
+
+def test_rehash_flags_legacy_and_stale_cost(monkeypatch):
+    monkeypatch.setenv("BCRYPT_ROUNDS", "11")
+    pool = password_pool.PasswordPool(workers=0, verify_cache_seconds=0)
+    assert pool.verify("pw", _legacy("pw", "s"), "s") == (True, True)
+    assert pool.verify("pw", _legacy("pw", "s"), "other") == (False, False)
+    stale = passwords.hash_password("pw", rounds=10)
+    assert pool.verify("pw", stale) == (True, True)
+
+    stored = []
+    assert pool.rehash_later("pw", stored.append) is True
+    assert passwords.bcrypt_cost(stored[0]) == 11
+    assert pool.stats()["cache_entries"] == 0
+
+
+def test_full_queue_sheds_with_busy():
+    pool = password_pool.PasswordPool(workers=0, max_pending=0, timeout=3)
+    with pytest.raises(password_pool.PasswordPoolBusy) as exc:
+        pool.hash("pw")
+    assert exc.value.retry_after == 3
+    assert pool.stats()["rejected"] == 1
+    # Deferred rehashes are dropped, never raised, when nothing can be queued
+    pool.max_pending = 1
+    pool._rehash_pending = 1
+    assert pool.rehash_later("pw", lambda h: None) is False
+    assert pool.stats()["rehash_dropped"] == 1
+
+
+def test_process_pool_round_trip(monkeypatch):
+    monkeypatch.setenv("BCRYPT_ROUNDS", "10")
+    pool = password_pool.PasswordPool(workers=1, timeout=30)
+    try:
+        hashed = pool.hash("Secret123!")
+        assert pool.verify("Secret123!", hashed) == (True, False)
+        done = threading.Event()
+        stored = []
+        pool.rehash_later("Secret123!", lambda h: (stored.append(h), done.set()))
+        assert done.wait(30)
+        assert passwords.bcrypt_cost(stored[0]) == 10
+    finally:
+        pool.shutdown()
+    assert pool.stats()["pending"] == 0
+
+
+def test_calibrate_stops_at_target():
+    rounds, timings = password_pool.calibrate(0.0, min_rounds=4, max_rounds=6, samples=1)
+    assert rounds == 4
+    assert list(timings) == [4]
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.log.append((sql, params))
+
+    def fetchone(self):
+        return self.conn.row
+
+
+class _Conn:
+    def __init__(self, row):
+        self.row = row
+        self.log = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+
+def _login(monkeypatch, pool, row, email):
+    conn = _Conn(row)
+    monkeypatch.setattr(local_server, "db_conn", lambda: conn)
+    monkeypatch.setattr(local_server._password_pool, "get_pool", lambda: pool)
+    client = local_server.app.test_client()
+    resp = client.post("/api/customers/login", json={"email": email, "password": "pw"})
+    return resp, conn
+
+
+def test_login_sheds_503_when_pool_busy(monkeypatch):
+    row = {
+        "customer_id": 7,
+        "password_hash": passwords.hash_password("pw", rounds=10),
+        "salt": "s",
+        "name": "Ann",
+    }
+    pool = password_pool.PasswordPool(workers=0, max_pending=0, timeout=2)
+    resp, _ = _login(monkeypatch, pool, row, "busy@example.com")
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "2"
+
+
+def test_login_migrates_legacy_hash_with_compare_and_swap(monkeypatch):
+    row = {"customer_id": 7, "password_hash": _legacy("pw", "s"), "salt": "s", "name": "Ann"}
+    monkeypatch.setenv("BCRYPT_ROUNDS", "10")
+    resp, conn = _login(monkeypatch, password_pool.PasswordPool(workers=0), row, "ann@example.com")
+    assert resp.status_code == 200
+    updates = [(sql, p) for sql, p in conn.log if sql.startswith("UPDATE customer_auth")]
+    assert len(updates) == 1
+    sql, params = updates[0]
+    assert "password_hash=%s" in sql.split("WHERE")[1]
+    assert params[1:] == (7, row["password_hash"])
+    assert params[0].startswith("$2b$10$")
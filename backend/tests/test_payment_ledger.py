@@ -0,0 +1,227 @@
+from decimal import Decimal
+
+import jwt
+import pytest
+
+from backend import invoice_service, local_server, reconcile_payments
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+        self.rows = []
+        self.rowcount = 0
+        for marker, rows in self.conn.responses:
+            if marker in sql:
+                self.rows = rows.pop(0) if rows else []
+                self.rowcount = len(self.rows)
+                break
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Conn:
+    def __init__(self, responses):
+        # [(sql marker, [rows for 1st match, rows for 2nd match, ...])]
+        self.responses = responses
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+    def sqls(self):
+        return [s for s, _ in self.statements]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def use(responses):
+        conn = _Conn(responses)
+        monkeypatch.setattr(invoice_service.srv, "db_conn", lambda: conn)
+        return conn
+
+    return use
+
+
+def _payment(amount="12.50", key="k1"):
+    return {
+        "id": "p1",
+        "appointment_id": "7",
+        "invoice_id": "inv-1",
+        "amount": Decimal(amount),
+        "method": "card",
+        "note": None,
+        "idempotency_key": key,
+        "created_at": "2025-09-21T10:00:00+00:00",
+    }
+
+
+def _invoice(paid=1250, due=750, status="PARTIALLY_PAID"):
+    return {
+        "id": "inv-1",
+        "status": status,
+        "subtotal_cents": 2000,
+        "tax_cents": 0,
+        "total_cents": 2000,
+        "amount_paid_cents": paid,
+        "amount_due_cents": due,
+    }
+
+
+def test_ledger_payment_appends_then_increments_without_row_lock_read(fake_db, monkeypatch):
+    monkeypatch.setattr(local_server.invoice_service, "PAYMENT_LEDGER", True)
+    conn = fake_db(
+        [
+            ("INSERT INTO payments", [[_payment()], []]),
+            ("UPDATE invoices", [[_invoice()]]),
+            ("FROM payments", [[_payment()]]),
+            ("FROM invoices", [[_invoice()]]),
+        ]
+    )
+    token = jwt.encode({"sub": "u", "role": "Advisor"}, local_server.JWT_SECRET, "HS256")
+    client = local_server.app.test_client()
+
+    def pay(key):
+        return client.post(
+            "/api/admin/invoices/inv-1/payments",
+            json={"amountCents": 1250, "method": "card", "idempotencyKey": key},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    resp = pay("k1")
+    assert resp.status_code == 201, resp.get_json()
+    assert resp.get_json()["data"]["payment"]["amount_cents"] == 1250
+    sqls = conn.sqls()
+    assert not any("FOR UPDATE" in s for s in sqls)
+    insert = next(p for s, p in conn.statements if "INSERT INTO payments" in s)
+    assert insert[0] == Decimal("12.5") and insert[3] == "k1"
+    apply = next(p for s, p in conn.statements if "UPDATE invoices" in s)
+    assert apply == {"amount": 1250, "invoice_id": "inv-1"}
+    assert sqls.index(next(s for s in sqls if "INSERT" in s)) < sqls.index(
+        next(s for s in sqls if "UPDATE" in s)
+    )
+
+    replay = pay("k1")  # terminal retry: no second charge, no balance update
+    assert replay.status_code == 200 and replay.get_json()["data"]["replayed"] is True
+    assert sum("UPDATE invoices" in s for s in conn.sqls()) == 1
+
+
+def test_ledger_replays_idempotent_retry_and_reports_domain_errors(fake_db):
+    conn = fake_db(
+        [
+            ("INSERT INTO payments", [[]]),
+            ("FROM payments", [[_payment()]]),
+            ("FROM invoices", [[_invoice()]]),
+        ]
+    )
+    out = invoice_service.record_payment_for_invoice(
+        "inv-1", amount_cents=1250, method="card", idempotency_key="k1", ledger=True
+    )
+    assert out["replayed"] is True and out["payment"]["id"] == "p1"
+    assert not any("UPDATE invoices" in s for s in conn.sqls())
+
+    fake_db([("INSERT INTO payments", [[]]), ("FROM payments", [[_payment("5.00")]])])
+    with pytest.raises(invoice_service.InvoiceError) as ei:
+        invoice_service.record_payment_for_invoice(
+            "inv-1", amount_cents=1250, method="card", idempotency_key="k1", ledger=True
+        )
+    assert ei.value.code == "IDEMPOTENCY_MISMATCH"
+
+    fake_db(
+        [
+            ("INSERT INTO payments", [[_payment()]]),
+            ("UPDATE invoices", [[]]),
+            ("FROM invoices", [[_invoice(paid=1500, due=500)]]),
+        ]
+    )
+    with pytest.raises(invoice_service.InvoiceError) as ei:
+        invoice_service.record_payment_for_invoice(
+            "inv-1", amount_cents=1250, method="card", ledger=True
+        )
+    assert ei.value.code == "OVERPAYMENT"
+
+
+def test_reconcile_fixes_drift_from_ledger_and_cli_exit_code(fake_db, capsys):
+    rows = [
+        {**_invoice(paid=1250), "ledger_cents": 1250},
+        {**_invoice(paid=1250), "id": "inv-2", "ledger_cents": 1500},
+        {**_invoice(paid=0, due=2000, status="SENT"), "id": "inv-3", "ledger_cents": 2500},
+    ]
+    conn = fake_db([("FROM invoices i", [list(rows)]), ("UPDATE invoices", [[{"id": "inv-2"}]])])
+    result = invoice_service.reconcile_invoice_payments(fix=True)
+    (scan,) = [s for s in conn.sqls() if "FROM invoices i" in s]
+    assert "p.invoice_id = i.id" in scan  # appointment_id only for unlinked payments
+    assert result["summary"] == {"checked": 3, "drifted": 2, "fixed": 1, "unfixable": 1}
+    assert [d["outcome"] for d in result["drift"]] == ["fixed", "unfixable"]
+    (fix,) = [p for s, p in conn.statements if "UPDATE invoices" in s]
+    assert fix == {"ledger": 1500, "invoice_id": "inv-2", "paid": 1250}
+
+    conn = fake_db([("FROM invoices i", [rows[:2]])])
+    assert reconcile_payments.main(["--ids", "inv-1", "inv-2"]) == 1
+    assert "inv-2\tdrift" in capsys.readouterr().out
+    assert conn.statements[-1][1] == [["inv-1", "inv-2"]]
+    assert not any("UPDATE" in s for s in conn.sqls())
+
+
+def test_legacy_payment_links_invoice_when_column_exists(fake_db):
+    conn = fake_db(
+        [
+            ("information_schema", [[{"data_type": "numeric"}], [{"data_type": "text"}]]),
+            (
+                "FOR UPDATE",
+                [[{**_invoice(paid=0, due=2000, status="SENT"), "appointment_id": "7"}]],
+            ),
+            ("INSERT INTO payments", [[_payment()]]),
+            ("UPDATE invoices", [[_invoice()]]),
+        ]
+    )
+    invoice_service.record_payment_for_invoice("inv-1", amount_cents=1250, method="card")
+    ((sql, params),) = [(s, p) for s, p in conn.statements if "INSERT INTO payments" in s]
+    assert "invoice_id" in sql and params[0] == "7" and params[-1] == "inv-1"
+
+
+def test_ledger_and_reconcile_use_integer_cents_schema(fake_db):
+    cents = [{"data_type": "integer"}]
+    conn = fake_db(
+        [
+            ("information_schema", [cents, cents]),
+            ("INSERT INTO payments", [[{**_payment(), "amount": 1250}]]),
+            ("UPDATE invoices", [[_invoice()]]),
+        ]
+    )
+    invoice_service.record_payment_for_invoice(
+        "inv-1", amount_cents=1250, method="card", ledger=True
+    )
+    insert = next(p for s, p in conn.statements if "INSERT INTO payments" in s)
+    assert insert[0] == 1250
+
+    conn = fake_db([("information_schema", [cents])])
+    invoice_service.reconcile_invoice_payments(fix=True)
+    (scan,) = [s for s in conn.sqls() if "FROM invoices i" in s]
+    assert "SUM(p.amount)" in scan and "* 100" not in scan
+    # VOID invoices keep their balance; only the paid amount follows the ledger
+    assert "WHEN status::text = 'VOID' THEN amount_due_cents" in invoice_service._RECONCILE_FIX_SQL
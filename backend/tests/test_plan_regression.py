@@ -0,0 +1,162 @@
+import json
+import random
+
+from backend import plan_hashing
+from backend import run_plan_baseline_snapshot as snap
+
+
+def _plan(scan="Index Scan", index="appointments_start_ts_idx", cost=10.0, actual=1.5):
+    leaf = {
+        "Node Type": scan,
+        "Parent Relationship": "Outer",
+        "Relation Name": "appointments",
+        "Total Cost": cost,
+        "Plan Rows": 120,
+        "Actual Total Time": actual,
+        "Shared Hit Blocks": 7,
+    }
+    if index:
+        leaf["Index Name"] = index
+    return [
+        {
+            "Plan": {
+                "Node Type": "Limit",
+                "Total Cost": cost * 2,
+                "Shared Hit Blocks": 9,
+                "Shared Read Blocks": 2,
+                "Plans": [leaf],
+            },
+            "Planning Time": 0.25,
+            "Execution Time": actual,
+        }
+    ]
+
+
+def test_plan_shape_ignores_costs_and_timings():
+    base = plan_hashing.plan_shape_id(_plan())
+    assert plan_hashing.plan_shape_id(_plan(cost=999.0, actual=80.0)) == base
+    assert plan_hashing.plan_shape_id(_plan(scan="Seq Scan", index=None)) != base
+    assert plan_hashing.describe_plan(_plan()) == [
+        "Limit",
+        "  Index Scan using appointments_start_ts_idx on appointments",
+    ]
+
+
+class _ExplainCursor:
+    def __init__(self, plan):
+        self.plan = plan
+        self.sql = []
+
+    def execute(self, sql, params=None):
+        self.sql.append((sql, params))
+
+    def fetchone(self):
+        return {"QUERY PLAN": self.plan}
+
+
+def test_explain_analyze_reads_server_timings():
+    cur = _ExplainCursor(json.dumps(_plan(actual=2.0)))
+    out = plan_hashing.explain_analyze(cur, "WITH x AS (SELECT 1) SELECT * FROM x", {"a": 1})
+    assert cur.sql[0][0].startswith("EXPLAIN (ANALYZE, BUFFERS, TIMING OFF, FORMAT JSON) WITH")
+    assert out["total_ms"] == 2.25
+    assert (out["shared_hit"], out["shared_read"]) == (9, 2)
+    assert out["plan_id"] == plan_hashing.plan_shape_id(_plan())
+
+
+def test_mann_whitney_detects_shift_only():
+    rng = random.Random(3)
+    base = [rng.gauss(5.0, 0.5) for _ in range(200)]
+    same = [rng.gauss(5.0, 0.5) for _ in range(200)]
+    slower = [rng.gauss(5.6, 0.5) for _ in range(200)]
+    assert snap.mann_whitney_greater(base, same) > 0.01
+    assert snap.mann_whitney_greater(base, slower) < 1e-6
+    assert snap.mann_whitney_greater(slower, base) > 0.99
+
+
+def test_evaluate_requires_threshold_floor_and_significance():
+    base = {"plan_id": "a" * 40, "p50_ms": 0.2, "p95_ms": 0.3}
+    # +67% but only 0.2 ms: below the absolute floor
+    jitter = snap.evaluate(base, {"plan_id": "a" * 40, "durations": [0.2] * 10 + [0.5] * 10})
+    assert not jitter["failed"] and jitter["p95_noise"]
+
+    rng = random.Random(5)
+    samples = sorted(rng.gauss(10.0, 1.0) for _ in range(200))
+    stats = snap.summarize(samples)
+    base = {"plan_id": "a" * 40, "p50_ms": stats["p50"], "p95_ms": stats["p95"]}
+    # Same distribution, baseline p95 understated: not significant, so no failure
+    noisy = {**base, "p95_ms": stats["p95"] * 0.85, "samples_ms": samples}
+    assert not snap.evaluate(noisy, {"plan_id": "a" * 40, "durations": samples})["failed"]
+
+    slower = sorted(s * 1.3 for s in samples)
+    result = snap.evaluate(
+        {**base, "samples_ms": samples}, {"plan_id": "a" * 40, "durations": slower}
+    )
+    assert result["failed"] and result["reasons"] == ["p95 +30.0%"]
+
+    moved = snap.evaluate(base, {"plan_id": "b" * 40, "durations": samples})
+    assert moved["failed"] and moved["reasons"] == ["plan_changed"]
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.last = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.last = (sql, params)
+
+    def fetchone(self):
+        sql, params = self.last
+        if "FROM plan_baselines" in sql:
+            return self.conn.baselines.get(params[0])
+        return {"day_start": "2025-03-04", "day_end": "2025-03-05"}
+
+
+class _Conn:
+    def __init__(self, baselines):
+        self.baselines = baselines
+        self.autocommit = False
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+
+def test_check_mode_exit_codes(monkeypatch, tmp_path, capsys):
+    plan_id = plan_hashing.plan_shape_id(_plan())
+    baselines = {
+        "board_day": {"plan_id": plan_id, "p50_ms": 1.0, "p95_ms": 1.2},
+        "dashboard_unpaid_total": {"plan_id": "f" * 40, "p50_ms": 1.0, "p95_ms": 1.2},
+    }
+    conn = _Conn(baselines)
+    monkeypatch.setattr(snap.srv, "db_conn", lambda: conn)
+    monkeypatch.setattr(
+        snap,
+        "_collect_samples",
+        lambda cur, query, params, samples, warmup: {
+            "plan_id": plan_id,
+            "plan": _plan(),
+            "durations": [1.0, 1.1, 1.2],
+        },
+    )
+    assert snap.run_check_mode(only=["board_day"]) == 0
+    assert conn.autocommit is True
+    assert snap.run_check_mode(only=["board_day", "customer_profile"]) == 3
+    assert snap.run_check_mode(only=["board_day", "customer_profile"], allow_missing=True) == 0
+
+    report = tmp_path / "plans.json"
+    rc = snap.run_check_mode(only=["board_day", "dashboard_unpaid_total"], json_path=str(report))
+    assert rc == 1
+    out = capsys.readouterr().out
+    assert "REGRESSION DETECTED query_key=dashboard_unpaid_total" in out
+    assert "SUMMARY ok=1 regressed=1" in out
+    data = json.loads(report.read_text())
+    assert [r["status"] for r in data["results"]] == ["ok", "regressed"]
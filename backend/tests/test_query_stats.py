@@ -0,0 +1,127 @@
+import gc
+import weakref
+
+import pytest
+
+from backend import local_server, query_stats
+
+TECH = "11111111-1111-1111-1111-111111111111"
+SLOTS = f"/api/admin/scheduling/free-slots?tech_id={TECH}&from=2025-03-04T08:00:00Z&to=2025-03-04T12:00:00Z"
+
+
+class _Cursor:
+    description = None
+    rowcount = -1
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.log.append(sql)
+        self.description = [("x",)]
+        self.rowcount = len(self.conn.rows)
+
+    def fetchone(self):
+        return self.conn.rows[0] if self.conn.rows else None
+
+    def fetchall(self):
+        return self.conn.rows
+
+
+class _Conn:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.log = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+
+def test_statement_shape_folds_literals_and_placeholder_lists():
+    a = query_stats.statement_shape("SELECT *  FROM t\n WHERE id = 7 AND s = 'x''y'")
+    b = query_stats.statement_shape("SELECT * FROM t WHERE id = 12 AND s = 'z'")
+    assert a == b == "SELECT * FROM t WHERE id = ? AND s = ?"
+    assert query_stats.statement_shape("SELECT 1 FROM t2 WHERE id IN (%s, %s, %s)").endswith(
+        "t2 WHERE id IN (?...)"
+    )
+
+
+def test_stats_count_connections_rows_and_repeats(monkeypatch):
+    monkeypatch.setenv("QUERY_N_PLUS_ONE_THRESHOLD", "3")
+    stats = query_stats.begin()
+    for i in range(4):
+        query_stats.record(1, f"SELECT name FROM vehicles WHERE id = {i}", 0.001, 1)
+    query_stats.record(2, "SELECT count(*) FROM appointments", 0.002, 1)
+    assert query_stats.finish("GET /x") is stats and query_stats.current() is None
+    assert (stats.queries, stats.connections, stats.rows) == (5, 2, 5)
+    assert stats.as_dict()["n_plus_one"] == [
+        {"shape": "SELECT name FROM vehicles WHERE id = ?", "count": 4}
+    ]
+    assert stats.server_timing().startswith("db;dur=6.00, db-queries;desc=5, db-conns;desc=2")
+
+
+def test_request_reports_server_timing_and_api_log(monkeypatch, client):
+    conn = local_server._wrap_connection_for_logging(_Conn())
+    monkeypatch.setattr(local_server, "safe_conn", lambda: (conn, False, None))
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"role": "Advisor"})
+
+    resp = client.get(SLOTS)
+    assert resp.status_code == 200
+    timing = resp.headers["Server-Timing"]
+    assert f"db-queries;desc={len(conn.log)}" in timing and "db-conns;desc=1" in timing
+    db = local_server.LAST_API_REQUEST_LOG["db"]
+    assert db["queries"] == len(conn.log) >= 1 and db["connections"] == 1
+
+
+def test_query_budget_flags_excess_and_repeats(monkeypatch, client):
+    conn = local_server._wrap_connection_for_logging(_Conn())
+    monkeypatch.setattr(local_server, "safe_conn", lambda: (conn, False, None))
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"role": "Advisor"})
+
+    with query_stats.query_budget(max_queries=5, max_repeats=1) as seen:
+        client.get(SLOTS)
+    assert seen[0].label == "GET /api/admin/scheduling/free-slots"
+
+    with pytest.raises(query_stats.QueryBudgetExceeded, match="free-slots: .* queries > 0"):
+        with query_stats.query_budget(max_queries=0):
+            client.get(SLOTS)
+
+
+def test_wrapped_connection_is_freed_by_refcount():
+    gc.disable()
+    try:
+        conn = local_server._wrap_connection_for_logging(_Conn())
+        with conn.cursor() as cur:
+            assert isinstance(cur, local_server._LoggingCursorProxy)
+        ref = weakref.ref(conn)
+        del conn, cur
+        assert ref() is None  # no reference cycle: freed without the cyclic GC
+    finally:
+        gc.enable()
+
+
+@pytest.mark.integration
+def test_traced_db_connection_is_freed_by_refcount(pg_container):
+    conn = local_server.db_conn()
+    assert isinstance(conn, local_server._TracedConnection) and "cursor" not in vars(conn)
+    with conn.cursor() as cur:
+        assert isinstance(cur, local_server._LoggingCursorProxy)
+        cur.execute("SELECT 1")
+    ref = weakref.ref(conn)
+    del conn, cur
+    assert ref() is None
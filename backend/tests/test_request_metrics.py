@@ -0,0 +1,113 @@
+from backend import local_server
+from backend.request_metrics import RouteMetricsStore, histogram_quantile
+
+ROUTE = "/api/admin/customers/<int:cust_id>/profile"
+
+
+def _store():
+    return RouteMetricsStore(flush_interval=0)
+
+
+def test_summary_counts_statuses_start_types_and_304_efficiency():
+    store = _store()
+    for _ in range(6):
+        store.record(ROUTE, "GET", 200, 12.0, 11.0, "warm")
+    for _ in range(3):
+        store.record(ROUTE, "GET", 304, 2.0, 2.0, "cold")
+    store.record(ROUTE, "GET", 404, 1.0)
+    store.record(ROUTE, "GET", 500, 400.0)
+    store.record("/api/admin/appointments", "POST", 201, 30.0)
+
+    routes = store.summary(days=7)["routes"]
+    get = routes[f"GET {ROUTE}"]
+    assert get["total"] == 11
+    assert get["status"] == {"200": 6, "304": 3, "4xx": 1, "5xx": 1, "other": 0}
+    assert get["start_type"] == {"cold": 3, "warm": 8}
+    assert get["hits_304"] == 3
+    assert get["efficiency_pct"] == round(3 / 9 * 100, 2)
+    assert get["latency_ms"]["max"] == 400.0
+    assert 10.0 <= get["latency_ms"]["p50"] <= 25.0
+    assert get["latency_ms"]["p99"] > 250.0
+
+    post = routes["POST /api/admin/appointments"]
+    assert post["efficiency_pct"] is None
+    assert post["status"]["other"] == 1
+
+
+def test_histogram_quantile_interpolates_within_bucket():
+    buckets = [0] * 14
+    buckets[4] = 10  # all samples in (10, 25] ms
+    assert histogram_quantile(buckets, 0.5) == 17.5
+    assert histogram_quantile(buckets, 1.0, max_ms=20.0) == 20.0
+    assert histogram_quantile([0] * 14, 0.5) is None
+
+
+class _Cursor:
+    def __init__(self, sink, fail):
+        self.sink = sink
+        self.fail = fail
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.fail:
+            raise RuntimeError("relation route_metrics_hourly does not exist")
+        self.sink.append(params)
+
+
+class _Conn:
+    def __init__(self, fail=False):
+        self.executed = []
+        self.fail = fail
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return _Cursor(self.executed, self.fail)
+
+
+def test_flush_upserts_pending_deltas_once():
+    store = _store()
+    store.record(ROUTE, "GET", 200, 5.0)
+    store.record(ROUTE, "GET", 304, 1.0)
+    conn = _Conn()
+    assert store.flush(conn) == 1
+    (params,) = conn.executed
+    assert params[1:4] == ("GET", ROUTE, 2)
+    assert sum(params[12]) == 2
+    # Nothing pending after a successful flush
+    assert store.flush(conn) == 0
+    assert store.summary()["routes"] == {}
+
+
+def test_failed_flush_keeps_deltas_for_retry():
+    store = _store()
+    store.record(ROUTE, "GET", 200, 5.0)
+    assert store.flush(_Conn(fail=True)) == 0
+    assert store.flush_errors == 1
+    assert store.summary()["routes"][f"GET {ROUTE}"]["total"] == 1
+
+
+def test_304_efficiency_endpoint_reports_route_templates(monkeypatch):
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"sub": "advisor"})
+    monkeypatch.setattr(local_server, "safe_conn", lambda: (None, True, None))
+    store = _store()
+    monkeypatch.setattr(local_server, "_ROUTE_METRICS", store)
+    client = local_server.app.test_client()
+    client.get("/api/admin/metrics/304-efficiency")
+    resp = client.get("/api/admin/metrics/304-efficiency?days=1")
+    assert resp.status_code == 200
+    body = resp.get_json()["data"]
+    assert body["window_days"] == 1
+    assert body["source"] == "memory"
+    entry = body["routes"]["GET /api/admin/metrics/304-efficiency"]
+    assert entry["total"] == 1
+    assert entry["latency_ms"]["p95"] is not None
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+
+from flask import make_response
+
+from backend import local_server, scheduling_service
+from backend.scheduling_service import IntervalIndex, ScheduleSnapshot
+
+DAY = datetime(2025, 3, 4, tzinfo=timezone.utc)
+A = "11111111-1111-1111-1111-111111111111"
+B = "22222222-2222-2222-2222-222222222222"
+TECHS = [{"id": A, "name": "Alice", "initials": "AW"}, {"id": B, "name": "Bob", "initials": "BS"}]
+
+
+def _at(hour, minute=0, day=0):
+    return DAY + timedelta(days=day, hours=hour, minutes=minute)
+
+
+def _appt(tech, start, end, vehicle="v1", **extra):
+    return {"tech_id": tech, "vehicle_id": vehicle, "start_ts": start, "end_ts": end, **extra}
+
+
+def _snapshot(rows, **kw):
+    kw.setdefault("as_of", DAY - timedelta(days=7))
+    kw.setdefault("hours", (8, 18))
+    return ScheduleSnapshot(DAY, DAY + timedelta(days=2), TECHS, rows, **kw)
+
+
+def test_interval_index_probes():
+    idx = IntervalIndex([(_at(9), _at(10)), (_at(9, 30), _at(11)), (_at(12), _at(13))])
+    assert len(idx) == 2
+    assert idx.is_free(_at(11), _at(12))
+    assert not idx.is_free(_at(10, 59), _at(11, 30))
+    assert not idx.is_free(_at(8), _at(9, 1))
+    assert idx.next_free(_at(9), timedelta(hours=1)) == _at(11)
+    assert idx.next_free(_at(9), timedelta(hours=2)) == _at(13)
+    assert idx.gaps(_at(8), _at(14), timedelta(minutes=30)) == [
+        (_at(8), _at(9)),
+        (_at(11), _at(12)),
+        (_at(13), _at(14)),
+    ]
+
+
+def test_free_techs_and_canceled_rows():
+    rows = [
+        _appt(A, _at(10), _at(12)),
+        _appt(B, _at(10), _at(12), status="CANCELED"),
+    ]
+    snap = _snapshot(rows)
+    assert snap.free_techs(_at(10), timedelta(hours=2)) == [B]
+    assert snap.free_techs(_at(12), timedelta(hours=2)) == [A, B]
+    # Vehicle already booked at 10:00 -> nobody can take it
+    snap = _snapshot(rows, vehicle_id="v1")
+    assert snap.free_techs(_at(11), timedelta(hours=1)) == []
+
+
+def test_carryover_holds_tech_past_scheduled_end():
+    as_of = _at(9)
+    carry = _appt(A, DAY - timedelta(days=1), DAY - timedelta(hours=20), status="IN_PROGRESS")
+    snap = _snapshot([carry], as_of=as_of, carryover_hold=timedelta(hours=2))
+    assert snap.free_techs(_at(10), timedelta(hours=1)) == [B]
+    assert snap.free_techs(_at(11), timedelta(hours=1)) == [A, B]
+    checked_in = _appt(A, _at(8), _at(8, 30), check_in_at=_at(8), check_out_at=None)
+    snap = _snapshot([checked_in], as_of=as_of, carryover_hold=timedelta(hours=1))
+    assert snap.free_techs(_at(9, 30), timedelta(minutes=30)) == [B]
+
+
+def test_candidate_slots_respect_hours_vehicle_and_limit():
+    rows = [
+        _appt(A, _at(8), _at(17)),
+        _appt(B, _at(8), _at(12)),
+        _appt(B, _at(14), _at(18), vehicle="v2"),
+    ]
+    snap = _snapshot(rows, vehicle_id="v2")
+    slots = snap.candidate_slots(timedelta(hours=2), limit=3, step=timedelta(minutes=30))
+    # Day one: only B is free 12:00-14:00, and it does not collide with v2 on B's 14:00 job
+    assert [(s["start"], s["tech_ids"]) for s in slots] == [
+        (_at(12), [B]),
+        (_at(8, day=1), [A, B]),
+        (_at(8, 30, day=1), [A, B]),
+    ]
+    windows = snap.free_windows(timedelta(hours=1))
+    assert windows[A][0] == (_at(17), _at(18))
+    assert windows[B][0] == (_at(12), _at(14))
+
+
+class _Cursor:
+    def __init__(self, results, log):
+        self.results = results
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.log.append((sql, params))
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+
+class _Conn:
+    def __init__(self, results):
+        self.results = results
+        self.log = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self.results, self.log)
+
+
+def test_load_snapshot_uses_active_techs_and_block_range():
+    conn = _Conn([[TECHS[0]], [_appt(A, _at(9), _at(10))]])
+    snap = scheduling_service.load_snapshot(conn, DAY, DAY + timedelta(days=1), hours=None)
+    assert "is_active IS TRUE" in conn.log[0][0]
+    assert "block_range &&" in conn.log[1][0] and conn.log[1][1]["techs"] == [A]
+    assert list(snap.technicians) == [A]
+    assert snap.free_techs(_at(9), timedelta(hours=1)) == []
+
+
+def test_slots_endpoint(monkeypatch):
+    conn = _Conn([TECHS, [_appt(A, _at(8), _at(18))]])
+    monkeypatch.setattr(local_server, "safe_conn", lambda: (conn, False, None))
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"role": "Advisor"})
+    monkeypatch.setattr(local_server._scheduling, "shop_hours", lambda: (8, 18))
+    path = "/x?from=2025-03-04T00:00:00Z&to=2025-03-05T00:00:00Z&duration_minutes=60&limit=2"
+    with local_server.app.test_request_context(path):
+        local_server.g.tenant_id = "t1"
+        resp = make_response(local_server.scheduling_slots())
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    assert data["windows"][A] == []
+    assert [s["techIds"] for s in data["slots"]] == [[B], [B]]
+    assert data["slots"][0]["start"] == _at(8).isoformat()
+
+    with local_server.app.test_request_context("/x?start=nope"):
+        local_server.g.tenant_id = "t1"
+        assert make_response(local_server.scheduling_availability()).status_code == 400
@@ -285,6 +285,8 @@ CREATE TABLE invoices (
 -- Performance indexes for profile/timeline lookups
 CREATE INDEX idx_invoices_customer_created ON invoices(customer_id, created_at DESC);
 CREATE INDEX idx_invoices_vehicle_created ON invoices(vehicle_id, created_at DESC);
+CREATE INDEX idx_invoices_created_id ON invoices(created_at DESC, id DESC);
+CREATE INDEX idx_invoices_status_created_id ON invoices(status, created_at DESC, id DESC);
 
 CREATE TABLE invoice_line_items (
     id TEXT PRIMARY KEY,
@@ -350,9 +352,14 @@ CREATE TABLE payments (
     amount NUMERIC(10,2) NOT NULL,
     method payment_method NOT NULL,
     note TEXT,
+    invoice_id TEXT,
+    idempotency_key TEXT,
     created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
+CREATE INDEX idx_payments_invoice ON payments(invoice_id);
+CREATE UNIQUE INDEX uq_payments_invoice_idempotency
+    ON payments(invoice_id, idempotency_key) WHERE idempotency_key IS NOT NULL;
 
 -- inspection_checklists table
 CREATE TABLE inspection_checklists (
@@ -0,0 +1,193 @@
+from backend import invoice_service, local_server
+from backend.schema_capabilities import SchemaCapabilities
+
+
+def _registry(tables, version="v1", **kw):
+    state = {"tables": tables, "version": version, "loads": 0, "checks": 0}
+
+    def load():
+        state["loads"] += 1
+        if state["tables"] is None:
+            raise RuntimeError("db down")
+        return state["tables"]
+
+    def fetch_version():
+        state["checks"] += 1
+        return state["version"]
+
+    kw.setdefault("revalidate_seconds", 0)
+    return SchemaCapabilities(load=load, fetch_version=fetch_version, enabled=True, **kw), state
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+        if "FROM service_operations" in sql:
+            self.rows = [
+                {
+                    "id": "svc-1",
+                    "name": "Brake Service",
+                    "category": "SAFETY",
+                    "default_hours": 2,
+                    "base_labor_rate": 120.0,
+                    "is_active": True,
+                    "display_order": 1,
+                }
+            ]
+        elif "FROM invoices WHERE id" in sql:
+            self.rows = [
+                {
+                    "id": "inv-1",
+                    "appointment_id": "appt-1",
+                    "status": "SENT",
+                    "subtotal_cents": 5000,
+                    "tax_cents": 0,
+                    "total_cents": 5000,
+                    "amount_paid_cents": 0,
+                    "amount_due_cents": 5000,
+                }
+            ]
+        elif "INSERT INTO payments" in sql:
+            self.rows = [
+                {
+                    "id": "pay-1",
+                    "appointment_id": "appt-1",
+                    "amount": params[1],
+                    "method": "cash",
+                    "note": None,
+                    "created_at": None,
+                }
+            ]
+        elif "UPDATE invoices" in sql:
+            self.rows = [{"id": "inv-1", "status": params[2]}]
+        else:
+            self.rows = []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Conn:
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+
+def test_snapshot_is_reused_until_the_migration_version_changes():
+    schema, state = _registry({"payments": {"amount": "integer"}})
+    assert schema.column_type("payments", "amount") == "integer"
+    assert schema.has_column("payments", "idempotency_key") is False
+    assert schema.has_table("invoices") is False
+    assert state["loads"] == 1 and state["checks"] >= 1
+
+    state["tables"] = {"payments": {"amount": "numeric", "idempotency_key": "text"}}
+    assert schema.column_type("payments", "amount") == "integer"  # same version
+    state["version"] = "v2"
+    assert schema.column_type("payments", "amount") == "numeric"
+    assert schema.has_column("payments", "idempotency_key") is True
+    assert state["loads"] == 2
+
+    disabled = SchemaCapabilities(load=lambda: {"t": {}}, enabled=False)
+    assert disabled.has_table("t") is None and disabled.warm() is False
+
+
+def test_failed_load_is_unknown_and_retried_after_the_interval():
+    schema, state = _registry(None, revalidate_seconds=3600)
+    assert schema.has_column("payments", "amount") is None
+    assert schema.has_column("payments", "amount") is None
+    assert state["loads"] == 1  # not retried on every lookup
+
+    state["tables"] = {"payments": {"amount": "numeric"}}
+    schema.invalidate()
+    assert schema.warm() is True
+    assert schema.column_type("payments", "amount") == "numeric"
+
+
+def test_handlers_choose_sql_from_capabilities(monkeypatch):
+    schema, _ = _registry(
+        {
+            "service_operations": {
+                c: "text"
+                for c in (
+                    "id name category subcategory internal_code skill_level default_hours "
+                    "base_labor_rate keywords flags is_active display_order"
+                ).split()
+            },
+            "payments": {"amount": "integer"},
+        },
+        revalidate_seconds=3600,
+    )
+    monkeypatch.setattr(local_server, "SCHEMA", schema)
+    conn = _Conn()
+    monkeypatch.setattr(local_server, "db_conn", lambda: conn)
+
+    rows, variant = local_server._load_service_catalog("t-1")
+    assert variant == "v2-flat-newcol" and rows[0]["base_labor_rate"] == 120.0
+    selects = [s for s, _ in conn.statements if "FROM service_operations" in s]
+    assert len(selects) == 1 and "base_labor_rate" in selects[0]
+    assert "default_price" not in selects[0]
+
+    conn.statements.clear()
+    monkeypatch.setattr(invoice_service.srv, "db_conn", lambda: conn)
+    out = invoice_service.record_payment_for_invoice(
+        "inv-1", amount_cents=1250, method="cash", ledger=False
+    )
+    ((sql, params),) = [(s, p) for s, p in conn.statements if "INSERT INTO payments" in s]
+    assert params[1] == 1250 and isinstance(params[1], int)
+    assert out["payment"]["amount_cents"] == 1250
+
+
+def test_probe_uses_a_savepoint_while_the_schema_is_unknown():
+    class _ProbeCursor(_Cursor):
+        def execute(self, sql, params=None):
+            if "information_schema" in sql and params[1] == "missing":
+                self.conn.statements.append((sql, params))
+                raise RuntimeError("permission denied for information_schema")
+            super().execute(sql, params)
+            if "information_schema" in sql:
+                self.rows = [{"data_type": "integer"}]
+
+    schema = SchemaCapabilities(load=lambda: {}, enabled=False)
+    conn = _Conn()
+    cur = _ProbeCursor(conn)
+    assert schema.probe(cur, "payments", "amount") == "integer"
+    assert schema.probe(cur, "payments", "missing") is None
+    assert [s.split()[0] for s, _ in conn.statements] == [
+        "SAVEPOINT",
+        "SELECT",
+        "RELEASE",
+        "SAVEPOINT",
+        "SELECT",
+        "ROLLBACK",
+    ]
+    # Same schema as the snapshot load, not a same-named table elsewhere
+    assert "table_schema = current_schema()" in conn.statements[1][0]
+
+    known, _ = _registry({"payments": {"amount": "numeric"}}, revalidate_seconds=3600)
+    conn.statements.clear()
+    assert known.probe(cur, "payments", "amount") == "numeric"
+    assert conn.statements == []
@@ -0,0 +1,95 @@
+from backend import local_server
+from backend.service_catalog_cache import ServiceCatalogCache
+
+ROWS = [
+    {
+        "id": "b",
+        "name": "Brake Service",
+        "category": "SAFETY",
+        "keywords": ["pads"],
+        "display_order": 2,
+    },
+    {
+        "id": "a",
+        "name": "Oil Change",
+        "category": "MAINTENANCE",
+        "keywords": None,
+        "display_order": 1,
+    },
+    {
+        "id": "c",
+        "name": "Tire Rotation",
+        "category": "MAINTENANCE",
+        "keywords": ["tires"],
+        "display_order": None,
+    },
+]
+
+
+def _cache(version="v1", **kw):
+    loads = []
+    state = {"version": version}
+
+    def load(tenant_id):
+        loads.append(tenant_id)
+        return list(ROWS), "v2-flat"
+
+    cache = ServiceCatalogCache(load, fetch_version=lambda _t: state["version"], enabled=True, **kw)
+    return cache, loads, state
+
+
+def test_entry_is_reused_until_bumped():
+    cache, loads, _ = _cache(revalidate_seconds=60)
+    first, cached = cache.get("t1")
+    assert not cached
+    again, cached = cache.get("t1")
+    assert cached and again is first
+    cache.get("t2")
+    assert loads == ["t1", "t2"]
+
+    cache.bump()
+    fresh, cached = cache.get("t1")
+    assert not cached and fresh is not first
+    assert loads == ["t1", "t2", "t1"]
+
+
+def test_signature_change_invalidates_after_revalidate_window():
+    cache, loads, state = _cache(revalidate_seconds=0)
+    entry, _ = cache.get("t1")
+    assert cache.get("t1")[1] is True  # same signature -> still valid
+    state["version"] = "v2"
+    fresh, cached = cache.get("t1")
+    assert not cached
+    assert fresh.etag("t1", ()) != entry.etag("t1", ())
+    assert len(loads) == 2
+
+
+def test_query_matches_sql_search_and_ordering():
+    entry, _ = _cache()[0].get("t1")
+    assert [r["id"] for r in entry.query()] == ["a", "b", "c"]  # NULLS LAST
+    assert [r["id"] for r in entry.query(sort_col="display_order", desc=True)] == ["b", "a", "c"]
+    assert [r["id"] for r in entry.query("maint", sort_col="name")] == ["a", "c"]
+    assert [r["id"] for r in entry.query("pads")] == ["b"]  # exact keyword
+    assert [r["id"] for r in entry.query("pad")] == []
+    assert [r["id"] for r in entry.query(limit=1)] == ["a"]
+
+
+def test_endpoint_serves_304_from_cache_without_reloading(monkeypatch):
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"sub": "advisor"})
+    cache, loads, _ = _cache(revalidate_seconds=60)
+    monkeypatch.setattr(local_server, "_SERVICE_CATALOG", cache)
+    client = local_server.app.test_client()
+
+    resp = client.get("/api/admin/service-operations?q=maint&sort=name")
+    assert resp.status_code == 200
+    assert [r["id"] for r in resp.get_json()["data"]] == ["a", "c"]
+    etag = resp.headers["ETag"]
+
+    hit = client.get(
+        "/api/admin/service-operations?q=maint&sort=name", headers={"If-None-Match": etag}
+    )
+    assert hit.status_code == 304
+    assert hit.headers["ETag"] == etag
+    other = client.get("/api/admin/service-operations", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert len(loads) == 1
@@ -0,0 +1,202 @@
+import jwt
+import pytest
+
+from backend import local_server, service_packages
+from backend.schema_capabilities import SchemaCapabilities
+
+PACKAGE_ROWS = [
+    {
+        "id": "pkg-ovr",
+        "name": "Override Package",
+        "category": "TEST",
+        "display_order": 1,
+        "is_active": True,
+        "default_price": 50,
+        "children": [
+            {
+                "child_id": "svc-c",
+                "qty": 1,
+                "name": "Svc C",
+                "default_price": 30.0,
+                "base_labor_rate": 30.0,
+                "default_hours": 0.5,
+            },
+            {
+                "child_id": "svc-d",
+                "qty": 1,
+                "name": "Svc D",
+                "default_price": 70.0,
+                "base_labor_rate": 70.0,
+                "default_hours": None,
+            },
+        ],
+    },
+    {
+        "id": "pkg-empty",
+        "name": "Empty",
+        "category": "TEST",
+        "display_order": None,
+        "is_active": True,
+        "default_price": None,
+        "children": [],
+    },
+]
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+        if "information_schema.columns" in sql:
+            self.rows = [
+                {"table_name": "service_operations", "column_name": c, "data_type": "text"}
+                for c in ("id", "name", "is_package", "default_price")
+            ]
+        elif "FROM service_operations p" in sql:
+            self.rows = PACKAGE_ROWS
+        elif "UPDATE invoices" in sql:
+            self.rows = [self.conn.invoice] if self.conn.invoice["status"] == "DRAFT" else []
+        elif "SELECT status::text" in sql:
+            self.rows = [{"status": self.conn.invoice["status"]}]
+        elif "INSERT INTO invoice_line_items" in sql:
+            self.rows = [
+                {"id": f"li-{i}", "position": 4 - i, "name": n, "total_cents": c}
+                for i, (n, c) in enumerate(zip(params["names"], params["cents"]))
+            ]
+        else:
+            self.rows = []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Conn:
+    def __init__(self, status="DRAFT"):
+        self.invoice = {"id": "inv-1", "status": status, "subtotal_cents": 5000}
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+    def sqls(self):
+        return [s for s, _ in self.statements]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    schema = SchemaCapabilities(load=local_server._load_schema_columns, enabled=True)
+    monkeypatch.setattr(local_server, "SCHEMA", schema)
+
+    def use(status="DRAFT"):
+        conn = _Conn(status)
+        monkeypatch.setattr(local_server, "db_conn", lambda: conn)
+        return conn
+
+    return use
+
+
+@pytest.fixture
+def headers():
+    token = jwt.encode({"sub": "advisor", "role": "Advisor"}, local_server.JWT_SECRET, "HS256")
+    return {
+        "Authorization": f"Bearer {token}",
+        "X-Tenant-Id": "00000000-0000-0000-0000-000000000001",
+    }
+
+
+def test_scale_lines_matches_override_and_sum_rules():
+    children = [
+        {"child_id": "a", "name": "A", "qty": 2, "default_price": "10.00"},
+        {"child_id": "b", "name": "B", "qty": 1, "default_price": 13.33},
+    ]
+    assert service_packages.scale_lines(children, None) == (
+        [("a", "A", 2000), ("b", "B", 1333)],
+        3333,
+    )
+    lines, total = service_packages.scale_lines(children, "50.00")
+    assert total == 5000 and sum(c for _, _, c in lines) == 5000
+    assert lines[0] == ("a", "A", int(2000 / 3333 * 5000))
+    assert service_packages.scale_lines(children, 0)[1] == 3333
+
+
+def test_package_list_is_one_query_with_precomputed_previews(fake_db, headers):
+    conn = fake_db()
+    client = local_server.app.test_client()
+    resp = client.get("/api/admin/service-packages?q=override", headers=headers)
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    (pkg,) = resp.get_json()["data"]
+    assert pkg["price_preview"] == {"sum_child_base_labor_rate": 100.0}
+    assert [i["child_id"] for i in pkg["package_items"]] == ["svc-c", "svc-d"]
+    assert not any("LIMIT 1" in s for s in conn.sqls())
+
+    again = client.get(
+        "/api/admin/service-packages?q=override",
+        headers={**headers, "If-None-Match": resp.headers["ETag"]},
+    )
+    assert again.status_code == 304
+    # Column capabilities were read once for both requests
+    assert sum("information_schema" in s for s in conn.sqls()) == 1
+
+
+def test_add_package_is_totals_update_plus_one_insert_select(fake_db, headers):
+    conn = fake_db()
+    client = local_server.app.test_client()
+    resp = client.post(
+        "/api/admin/invoices/inv-1/add-package", json={"packageId": "pkg-ovr"}, headers=headers
+    )
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    data = resp.get_json()["data"]
+    assert data["added_subtotal_cents"] == 5000
+    assert [li["position"] for li in data["added_line_items"]] == [3, 4]
+    writes = [(s, p) for s, p in conn.statements if "UPDATE" in s or "INSERT" in s]
+    assert [s.split()[0] for s, _ in writes] == ["UPDATE", "INSERT"]
+    assert writes[0][1] == {"cents": 5000, "invoice_id": "inv-1"}
+    assert writes[1][1]["cents"] == [1500, 3500]
+
+    conn = fake_db(status="PAID")
+    resp = client.post(
+        "/api/admin/invoices/inv-1/add-package", json={"packageId": "anything"}, headers=headers
+    )
+    assert resp.status_code == 400 and resp.get_json()["error"]["code"].upper() == "INVALID_STATE"
+
+    conn = fake_db()
+    resp = client.post(
+        "/api/admin/invoices/inv-1/add-package", json={"packageId": "pkg-empty"}, headers=headers
+    )
+    assert resp.status_code == 409
+    assert not any("INSERT" in s or "UPDATE" in s for s in conn.sqls())
+
+
+def test_add_package_failure_hides_the_database_error(fake_db, headers, monkeypatch):
+    fake_db()
+
+    def broken():
+        raise RuntimeError("relation invoice_line_items does not exist")
+
+    monkeypatch.setattr(local_server, "db_conn", broken)
+    resp = local_server.app.test_client().post(
+        "/api/admin/invoices/inv-1/add-package", json={"packageId": "pkg-ovr"}, headers=headers
+    )
+    assert resp.status_code == 500
+    assert "invoice_line_items" not in resp.get_data(as_text=True)
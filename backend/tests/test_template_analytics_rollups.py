@@ -0,0 +1,116 @@
+import pytest
+
+from backend import local_server, template_analytics
+
+URL = "/api/admin/analytics/templates?range=180d"
+TPL = "aaaaaaaa-0000-0000-0000-000000000001"
+
+RESULT = {
+    "totals": {"events": 9, "unique_templates": 1, "unique_users": 2},
+    "by_channel": [{"channel": "sms", "events": 9}],
+    "agg_rows": [{"template_id": TPL, "channel": "sms", "bucket_start": "2025-03-03", "cnt": 9}],
+    "template_totals": [
+        {
+            "template_id": TPL,
+            "first_used": "2025-03-01T09:00:00",
+            "last_used": "2025-03-03T10:00:00",
+            "total_count": 9,
+            "unique_users": 2,
+            "template_label": "Vehicle ready",
+        }
+    ],
+    "slice_rows": [{"template_id": TPL, "bucket_start": "2025-03-03", "cnt": 9}],
+}
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.log.append((sql, params))
+        self.row = {"ok": self.conn.rollups} if "to_regclass" in sql else RESULT
+
+    def fetchone(self):
+        return self.row
+
+
+class _Conn:
+    def __init__(self, rollups):
+        self.rollups = rollups
+        self.log = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+
+@pytest.fixture
+def analytics(monkeypatch):
+    def use(rollups):
+        conn = _Conn(rollups)
+        monkeypatch.setattr(local_server, "safe_conn", lambda: (conn, False, None))
+        return conn
+
+    monkeypatch.setattr(local_server, "require_auth_role", lambda *a, **k: {"role": "Advisor"})
+    local_server._TEMPLATE_ANALYTICS_CACHE.clear()
+    template_analytics.reset_probe()
+    yield use
+    local_server._TEMPLATE_ANALYTICS_CACHE.clear()
+    template_analytics.reset_probe()
+
+
+def test_response_cache_expires_and_evicts_least_recently_used():
+    now = [0.0]
+    cache = template_analytics.ResponseCache(ttl_seconds=10, max_entries=2, clock=lambda: now[0])
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"  # a is now most recently used
+    cache.set("c", b"3")
+    assert cache.get("b") is None and len(cache) == 2
+    now[0] = 11.0
+    assert cache.get("a") is None and cache.get("c") is None
+
+
+def test_rollup_query_splits_complete_days_from_today(analytics):
+    conn = analytics(rollups=True)
+    body = local_server.app.test_client().get(URL).get_json()["data"]
+    assert body["totals"]["events"] == 9 and body["templates"][0]["uniqueUsers"] == 2
+    sql, params = conn.log[-1]
+    assert "FROM template_usage_daily\n" in sql and "BETWEEN" not in sql
+    assert params["today"] == params["today_start"].date()
+    assert (params["today"] - params["start_day"]).days == 180
+
+
+def test_raw_scan_used_until_rollups_exist(analytics):
+    conn = analytics(rollups=False)
+    assert local_server.app.test_client().get(URL + "&channel=sms").status_code == 200
+    sql, params = conn.log[-1]
+    assert "template_usage_daily" not in sql and "channel = %(channel)s" in sql
+    assert params["channel"] == "sms"
+
+
+def test_cache_hit_serves_stored_body_without_querying(analytics):
+    conn = analytics(rollups=True)
+    client = local_server.app.test_client()
+    first = client.get(URL)
+    queries = len(conn.log)
+    second = client.get(URL)
+    assert len(conn.log) == queries
+    assert first.get_json()["data"]["meta"]["cache"]["hit"] is False
+    assert second.get_json()["data"]["meta"]["cache"]["hit"] is True
+    assert second.get_json()["data"]["totals"] == first.get_json()["data"]["totals"]
+    client.get(URL + "&flush=1")
+    assert len(conn.log) > queries
@@ -0,0 +1,176 @@
+import json
+import os
+import subprocess
+import uuid
+
+import jwt
+
+from backend import local_server, telemetry_quota
+from backend import template_usage_ingest as ingest
+
+TPL_ID = "11111111-1111-1111-1111-111111111111"
+
+
+class _PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+        err = self.conn.fail and self.conn.fail(sql, params)
+        if err:
+            raise err
+        if sql.lstrip().startswith("INSERT INTO telemetry_quota_daily"):
+            self.conn.used += params[2]
+            self.conn.row = {"used": self.conn.used}
+
+    def fetchone(self):
+        return self.conn.row
+
+    def fetchall(self):
+        return [{"id": TPL_ID, "slug": "reminder", "channel": "sms"}]
+
+
+class _Conn:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.statements = []
+        self.used = 0
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, *a, **k):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+
+def _event(**kw):
+    event = {c: None for c in ingest.COLUMNS}
+    event.update(id=str(uuid.uuid4()), template_id=TPL_ID, template_slug="reminder")
+    event.update(channel="sms", sent_at="2025-03-03T10:00:00", was_automated=False, **kw)
+    return event
+
+
+def _segments(path):
+    return sorted(p for p in os.listdir(path) if p.endswith(".jsonl"))
+
+
+def test_flush_writes_one_multi_row_insert_and_drops_spill(tmp_path):
+    conn = _Conn()
+    buf = ingest.UsageBuffer(lambda: conn, spill_dir=str(tmp_path), start_thread=False)
+    assert buf.enqueue(_event(hash="h1")) == "queued"
+    assert buf.enqueue(_event(hash="h1")) == "duplicate"
+    buf.enqueue(_event())
+    assert len(_segments(tmp_path)) == 1
+
+    assert buf.flush() == 2
+    ((sql, params),) = conn.statements
+    assert sql.count("(%s,") == 2 and sql.endswith("ON CONFLICT DO NOTHING")
+    assert len(params) == 2 * len(ingest.COLUMNS)
+    assert _segments(tmp_path) == [] and len(buf) == 0
+
+
+def test_bad_rows_are_isolated_and_outages_keep_the_batch(tmp_path):
+    conn = _Conn(fail=lambda sql, params: _PgError("23503") if 999 in params else None)
+    buf = ingest.UsageBuffer(lambda: conn, spill_dir=str(tmp_path), start_thread=False)
+    buf.enqueue(_event())
+    buf.enqueue(_event(appointment_id=999))
+    assert buf.flush() == 1
+    assert buf.counters["rejected"] == 1 and len(conn.statements) == 3
+
+    down = _Conn(fail=lambda sql, params: _PgError("08006"))
+    buf.connect = lambda: down
+    buf.enqueue(_event())
+    assert buf.flush() == 0
+    assert len(buf) == 1 and buf.flush_errors == 1
+    assert len(_segments(tmp_path)) == 1  # kept until the batch commits
+
+
+def test_recover_replays_segments_of_dead_processes(tmp_path):
+    proc = subprocess.Popen(["true"])
+    proc.wait()
+    events = [_event(), _event()]
+    with open(tmp_path / f"template_usage.{proc.pid}.1.jsonl", "w") as fh:
+        fh.write("".join(json.dumps(e) + "\n" for e in events) + '{"torn":')
+
+    conn = _Conn()
+    buf = ingest.UsageBuffer(lambda: conn, spill_dir=str(tmp_path), start_thread=False)
+    assert buf.recover() == 2
+    assert buf.flush() == 2
+    assert conn.statements[0][1][:: len(ingest.COLUMNS)] == [e["id"] for e in events]
+    assert _segments(tmp_path) == []
+
+
+def test_recover_skips_locked_segments_but_not_reused_pids(tmp_path):
+    live = ingest.UsageBuffer(None, spill_dir=str(tmp_path), start_thread=False)
+    live.enqueue(_event())
+    # Same PID, different token: left behind before a container restart
+    stale = _event()
+    with open(tmp_path / f"template_usage.{os.getpid()}-0badc0de.1.jsonl", "w") as fh:
+        fh.write(json.dumps(stale) + "\n")
+
+    buf = ingest.UsageBuffer(None, spill_dir=str(tmp_path), start_thread=False)
+    assert buf.recover() == 1
+    assert [e["id"] for e in buf._events] == [stale["id"]]
+    assert len(_segments(tmp_path)) == 2  # live segment kept, stale one claimed
+
+    conn = _Conn()
+    live.connect = lambda: conn
+    assert live.flush() == 1
+    assert len(_segments(tmp_path)) == 1
+
+
+def test_buffered_endpoint_validates_against_template_map(monkeypatch, tmp_path):
+    conn = _Conn()
+    monkeypatch.setenv("TEMPLATE_USAGE_INGEST", "buffered")
+    monkeypatch.setattr(local_server, "_TEMPLATE_MAP", ingest.TemplateMap(lambda: conn))
+    buf = ingest.UsageBuffer(None, spill_dir=str(tmp_path), start_thread=False)
+    monkeypatch.setattr(local_server, "_TEMPLATE_USAGE_BUFFER", buf)
+    token = jwt.encode({"sub": "advisor", "role": "Owner"}, local_server.JWT_SECRET, "HS256")
+    client = local_server.app.test_client()
+
+    def post(**body):
+        return client.post(
+            "/api/admin/template-usage",
+            json=body,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    first = post(template_slug="reminder", idempotency_key="k1", delivery_ms=12)
+    assert first.status_code == 202
+    event = first.get_json()["data"]["template_usage_event"]
+    assert event["channel"] == "sms" and event["user_id"] is None and event["queued"]
+    again = post(template_id=TPL_ID, idempotency_key="k1")
+    assert again.status_code == 200
+    assert again.get_json()["data"]["template_usage_event"]["idempotent"] is True
+    assert post(template_slug="nope").status_code == 404
+    assert post(template_slug="reminder", appointment_id="x").status_code == 400
+    assert len(buf) == 1 and len(conn.statements) == 1  # one template load, no per-event SQL
+
+
+def test_shared_quota_leases_blocks_and_stops_at_hard_limit():
+    conn = _Conn()
+    quota = telemetry_quota.SharedDailyQuota(lambda: conn, lease=3)
+    results = [quota.take("template_usage", hard_limit=7, soft_limit=5) for _ in range(9)]
+    assert [allowed for allowed, _ in results] == [True] * 7 + [False] * 2
+    assert [crossed for _, crossed in results].count(True) == 1
+    assert len(conn.statements) == 3  # 3 + 3 + 1 granted, then exhausted for the day
@@ -42,8 +42,16 @@ export default function InvoicesPage() {
   // Re-fetch whenever pagination changes
   useEffect(() => { load(); }, [load]);
 
+  // has_more is set whether or not the total was counted exactly
+  const hasNext = !!data && (data.has_more ?? table.page < (data.total_pages ?? 0));
   const nextPage = () => {
-    if (data && table.page < data.total_pages) setTable(t => ({ ...t, page: t.page + 1 }));
+    if (hasNext) setTable(t => ({ ...t, page: t.page + 1 }));
+  };
+  const pageLabel = (d: InvoiceListResponse) => {
+    if (d.total_pages == null) {
+      return d.total_items == null ? `Page ${d.page}` : `Page ${d.page} • ${d.total_items}+ total`;
+    }
+    return `Page ${d.page} of ${d.total_pages} • ${d.total_items} total`;
   };
   const prevPage = () => {
     if (table.page > 1) setTable(t => ({ ...t, page: t.page - 1 }));
@@ -97,10 +105,10 @@ export default function InvoicesPage() {
             </tbody>
           </table>
           <div className="flex items-center justify-between p-3 bg-gray-50 text-sm">
-            <div>Page {data.page} of {data.total_pages} • {data.total_items} total</div>
+            <div>{pageLabel(data)}</div>
             <div className="space-x-2">
               <Button size="sm" variant="outline" disabled={table.page === 1} onClick={prevPage}>Prev</Button>
-              <Button size="sm" variant="outline" disabled={data.page >= data.total_pages} onClick={nextPage}>Next</Button>
+              <Button size="sm" variant="outline" disabled={!hasNext} onClick={nextPage}>Next</Button>
             </div>
           </div>
         </div>
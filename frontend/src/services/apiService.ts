@@ -122,8 +122,12 @@ export interface InvoiceListResponse {
   items: InvoiceSummary[];
   page: number;
   page_size: number;
-  total_items: number;
-  total_pages: number;
+  // null (and total_exact false) once the backend stops counting at its cap
+  total_items: number | null;
+  total_pages: number | null;
+  total_exact?: boolean;
+  has_more?: boolean;
+  next_cursor?: string | null;
 }
 
 // Response shape for generating an invoice from an appointment
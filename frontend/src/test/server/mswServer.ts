@@ -746,7 +746,7 @@ const handlers = [
       { id: 'inv1', status: 'PAID', total_cents: 10000, amount_due_cents: 0, amount_paid_cents: 10000, subtotal_cents:10000, tax_cents:0, created_at: new Date().toISOString(), issued_at: new Date().toISOString(), updated_at: new Date().toISOString(), customer_id: 1, customer_name: 'Alice' },
       { id: 'inv2', status: 'DRAFT', total_cents: 2500, amount_due_cents: 2500, amount_paid_cents: 0, subtotal_cents:2500, tax_cents:0, created_at: new Date().toISOString(), updated_at: new Date().toISOString(), customer_id: 2, customer_name: 'Bob' }
     ];
-    return HttpResponse.json({ data: { items, page, page_size: pageSize, total_items: items.length, total_pages: 1 } });
+    return HttpResponse.json({ data: { items, page, page_size: pageSize, total_items: items.length, total_pages: 1, total_exact: true, has_more: false, next_cursor: null } });
   }),
   http.get('http://localhost:3000/api/admin/invoices', ({ request }) => {
     const url = new URL(request.url);
@@ -756,7 +756,7 @@ const handlers = [
       { id: 'inv1', status: 'PAID', total_cents: 10000, amount_due_cents: 0, amount_paid_cents: 10000, subtotal_cents:10000, tax_cents:0, created_at: new Date().toISOString(), issued_at: new Date().toISOString(), updated_at: new Date().toISOString(), customer_id: 1, customer_name: 'Alice' },
       { id: 'inv2', status: 'DRAFT', total_cents: 2500, amount_due_cents: 2500, amount_paid_cents: 0, subtotal_cents:2500, tax_cents:0, created_at: new Date().toISOString(), updated_at: new Date().toISOString(), customer_id: 2, customer_name: 'Bob' }
     ];
-    return HttpResponse.json({ data: { items, page, page_size: pageSize, total_items: items.length, total_pages: 1 } });
+    return HttpResponse.json({ data: { items, page, page_size: pageSize, total_items: items.length, total_pages: 1, total_exact: true, has_more: false, next_cursor: null } });
   }),
   // --- Add package to invoice ---
   http.post('/api/admin/invoices/:id/add-package', async ({ params, request }) => {
@@ -59,6 +59,14 @@ describe('InvoicesPage', () => {
   await waitFor(() => expect(screen.queryByText(/Loading invoices/i)).not.toBeInTheDocument());
   });
 
+  it('Capped count: pages on has_more when total_pages is unknown', async () => {
+    const invoice = { id: 'inv1', status: 'PAID', total_cents: 10000, amount_due_cents: 0, amount_paid_cents: 10000, subtotal_cents:10000, tax_cents:0, created_at: new Date().toISOString(), updated_at: new Date().toISOString(), customer_id: 1, customer_name: 'Alice' };
+    vi.spyOn(api, 'fetchInvoices').mockResolvedValue({ items: [invoice], page:1, page_size:20, total_items:10000, total_pages:null, total_exact:false, has_more:true, next_cursor:'c1' });
+    renderInvoices();
+    expect(await screen.findByText('Page 1 • 10000+ total')).toBeInTheDocument();
+    expect(screen.getByRole('button', { name: 'Next' })).toBeEnabled();
+  });
+
   it('Error State: displays error when fetch fails', async () => {
   vi.spyOn(api, 'fetchInvoices').mockRejectedValue(new Error('Network down'));
     renderInvoices();
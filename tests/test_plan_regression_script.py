@@ -64,10 +64,16 @@ def ensure_module_imported():
 def _patch(monkeypatch, mod, *, baseline_row, live_plan_id, durations: List[float]):
     # Patch db_conn to return a fake connection with provided baseline row
     monkeypatch.setattr(mod.srv, "db_conn", lambda: FakeConn(baseline_row))
-    # Patch compute_plan_id
-    monkeypatch.setattr(mod, "compute_plan_id", lambda sql, conn=None: live_plan_id)
-    # Patch latency collector to deterministic list
-    monkeypatch.setattr(mod, "_collect_latency", lambda cur, sql, samples: list(durations))
+    # Patch the EXPLAIN ANALYZE sampler to a deterministic measurement
+    monkeypatch.setattr(
+        mod,
+        "_collect_samples",
+        lambda cur, query, params, samples, warmup: {
+            "plan_id": live_plan_id,
+            "plan": None,
+            "durations": sorted(durations),
+        },
+    )
 
 
 def test_detect_ok_plan_same_perf_ok(monkeypatch, ensure_module_imported, capsys):